@@ -0,0 +1,26 @@
+"""add filename and (device_id, sha256) index to file_records for content-addressed uploads
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('file_records', sa.Column('filename', sa.String(), nullable=True))
+    op.create_index('ix_file_records_device_sha256', 'file_records', ['device_id', 'sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_file_records_device_sha256', table_name='file_records')
+    op.drop_column('file_records', 'filename')
@@ -0,0 +1,34 @@
+"""add ingestion claim and retry columns to file_records
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('file_records', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('file_records', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('file_records', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('file_records', sa.Column('claimed_by', sa.String(), nullable=True))
+    op.add_column('file_records', sa.Column('last_error', sa.Text(), nullable=True))
+    op.create_index('ix_file_records_status_next_attempt', 'file_records', ['processing_status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_file_records_status_next_attempt', table_name='file_records')
+    op.drop_column('file_records', 'last_error')
+    op.drop_column('file_records', 'claimed_by')
+    op.drop_column('file_records', 'claimed_at')
+    op.drop_column('file_records', 'next_attempt_at')
+    op.drop_column('file_records', 'attempts')
@@ -0,0 +1,32 @@
+"""add depth statistics and sounding counts to trips and tows
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('trips', sa.Column('avg_depth_m', sa.Float(), nullable=True))
+    op.add_column('trips', sa.Column('min_depth_m', sa.Float(), nullable=True))
+    op.add_column('trips', sa.Column('max_depth_m', sa.Float(), nullable=True))
+    op.add_column('trips', sa.Column('sounding_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('tows', sa.Column('sounding_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('tows', 'sounding_count')
+    op.drop_column('trips', 'sounding_count')
+    op.drop_column('trips', 'max_depth_m')
+    op.drop_column('trips', 'min_depth_m')
+    op.drop_column('trips', 'avg_depth_m')
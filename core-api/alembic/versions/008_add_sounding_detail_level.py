@@ -0,0 +1,28 @@
+"""add detail_level to soundings for track simplification
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL for soundings ingested before this revision (served at every zoom
+    # until scripts/backfill_detail_levels.py has run)
+    op.add_column('soundings', sa.Column('detail_level', sa.SmallInteger(), nullable=True))
+    op.create_index('ix_soundings_trip_detail', 'soundings', ['trip_id', 'detail_level'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_soundings_trip_detail', table_name='soundings')
+    op.drop_column('soundings', 'detail_level')
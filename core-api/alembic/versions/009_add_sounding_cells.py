@@ -0,0 +1,37 @@
+"""add sounding_cells for vector tile aggregation
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing soundings are aggregated with scripts/rebuild_tile_aggregates.py
+    op.create_table(
+        'sounding_cells',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('zoom', sa.Integer(), nullable=False),
+        sa.Column('cell_x', sa.Integer(), nullable=False),
+        sa.Column('cell_y', sa.Integer(), nullable=False),
+        sa.Column('sounding_count', sa.Integer(), nullable=False),
+        sa.Column('depth_sum', sa.Float(), nullable=False),
+        sa.Column('depth_min', sa.Float(), nullable=False),
+        sa.Column('depth_max', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id', 'zoom', 'cell_x', 'cell_y')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sounding_cells')
@@ -0,0 +1,32 @@
+"""add quadkey spatial index to soundings, replacing the lat/lon index
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL for soundings ingested before this revision (bounding-box queries
+    # of their device fall back to a lat/lon filter until
+    # scripts/backfill_quadkeys.py has run)
+    op.add_column('soundings', sa.Column('quadkey', sa.BigInteger(), nullable=True))
+    op.create_index('ix_soundings_device_quadkey', 'soundings', ['device_id', 'quadkey'], unique=False)
+    # Only the latitude prefix of this index was ever selective
+    op.drop_index('ix_soundings_location', table_name='soundings')
+
+
+def downgrade() -> None:
+    op.create_index('ix_soundings_location', 'soundings', ['latitude', 'longitude'], unique=False)
+    op.drop_index('ix_soundings_device_quadkey', table_name='soundings')
+    op.drop_column('soundings', 'quadkey')
@@ -0,0 +1,37 @@
+"""add bathymetry_cells for the gridded depth map
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing soundings are aggregated with scripts/rebuild_bathymetry.py
+    op.create_table(
+        'bathymetry_cells',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=False),
+        sa.Column('cell_x', sa.Integer(), nullable=False),
+        sa.Column('cell_y', sa.Integer(), nullable=False),
+        sa.Column('sounding_count', sa.Integer(), nullable=False),
+        sa.Column('depth_sum', sa.Float(), nullable=False),
+        sa.Column('depth_min', sa.Float(), nullable=False),
+        sa.Column('depth_max', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id', 'level', 'cell_x', 'cell_y')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('bathymetry_cells')
@@ -0,0 +1,35 @@
+"""add coverage_cells for the towing coverage index
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing tows are aggregated with scripts/rebuild_coverage.py
+    op.create_table(
+        'coverage_cells',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=False),
+        sa.Column('cell_x', sa.Integer(), nullable=False),
+        sa.Column('cell_y', sa.Integer(), nullable=False),
+        sa.Column('tow_seconds', sa.Float(), nullable=False),
+        sa.Column('tow_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id', 'level', 'cell_x', 'cell_y')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('coverage_cells')
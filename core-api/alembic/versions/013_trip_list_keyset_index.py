@@ -0,0 +1,32 @@
+"""add (device_id, start_time, id) trip index and devices.trip_count
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('devices', sa.Column('trip_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE devices SET trip_count = (SELECT COUNT(*) FROM trips WHERE trips.device_id = devices.id)"
+    )
+    op.create_index('ix_trips_device_start', 'trips', ['device_id', 'start_time', 'id'], unique=False)
+    # device_id is the prefix of the new index
+    op.drop_index('ix_trips_device_id', table_name='trips')
+
+
+def downgrade() -> None:
+    op.create_index('ix_trips_device_id', 'trips', ['device_id'], unique=False)
+    op.drop_index('ix_trips_device_start', table_name='trips')
+    op.drop_column('devices', 'trip_count')
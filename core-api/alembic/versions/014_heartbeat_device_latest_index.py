@@ -0,0 +1,27 @@
+"""add (device_id, id) heartbeat index for latest-heartbeat lookups
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_heartbeats_device_id_id', 'heartbeats', ['device_id', 'id'], unique=False)
+    # device_id is the prefix of the new index
+    op.drop_index('ix_heartbeats_device_id', table_name='heartbeats')
+
+
+def downgrade() -> None:
+    op.create_index('ix_heartbeats_device_id', 'heartbeats', ['device_id'], unique=False)
+    op.drop_index('ix_heartbeats_device_id_id', table_name='heartbeats')
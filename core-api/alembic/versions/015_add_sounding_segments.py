@@ -0,0 +1,45 @@
+"""add sounding_segments catalog for columnar per-trip sounding files
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Segments of existing trips are written with scripts/build_sounding_segments.py
+    op.create_table(
+        'sounding_segments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('trip_version', sa.String(), nullable=False),
+        sa.Column('sounding_count', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('byte_size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('trip_id')
+    )
+    op.create_index(op.f('ix_sounding_segments_id'), 'sounding_segments', ['id'], unique=False)
+    op.create_index(op.f('ix_sounding_segments_device_id'), 'sounding_segments', ['device_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sounding_segments_device_id'), table_name='sounding_segments')
+    op.drop_index(op.f('ix_sounding_segments_id'), table_name='sounding_segments')
+    op.drop_table('sounding_segments')
@@ -0,0 +1,125 @@
+"""store soundings as scaled integers and epoch milliseconds
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+# Scaled columns: units per 1.0 of the value (see core.models.types)
+SCALES = {
+    'latitude': 10**7,
+    'longitude': 10**7,
+    'depth': 1000,
+    'water_temp': 100,
+    'speed_knots': 100,
+    'course_deg': 100,
+}
+NULLABLE = {'water_temp', 'speed_knots', 'course_deg'}
+
+# Indexes of the soundings table: name -> columns
+INDEXES = {
+    'ix_soundings_id': ['id'],
+    'ix_soundings_device_id': ['device_id'],
+    'ix_soundings_trip_id': ['trip_id'],
+    'ix_soundings_tow_id': ['tow_id'],
+    'ix_soundings_timestamp': ['timestamp'],
+    'ix_soundings_device_timestamp': ['device_id', 'timestamp'],
+    'ix_soundings_trip_timestamp': ['trip_id', 'timestamp'],
+    'ix_soundings_trip_detail': ['trip_id', 'detail_level'],
+    'ix_soundings_device_quadkey': ['device_id', 'quadkey'],
+}
+
+
+def _rebuild_sqlite(timestamp_type, value_type, timestamp_sql: str, value_sql: str) -> None:
+    """
+    SQLite cannot change column types: copy soundings into a table of the
+    new layout, converting every value, and swap it in.
+    """
+    op.create_table(
+        'soundings_converted',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=True),
+        sa.Column('tow_id', sa.Integer(), nullable=True),
+        sa.Column('timestamp', timestamp_type, nullable=False),
+        *(sa.Column(name, value_type, nullable=name in NULLABLE) for name in SCALES),
+        sa.Column('detail_level', sa.SmallInteger(), nullable=True),
+        sa.Column('quadkey', sa.BigInteger(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.ForeignKeyConstraint(['tow_id'], ['tows.id'], ),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    values = ", ".join(value_sql.format(column=name, scale=scale) for name, scale in SCALES.items())
+    op.execute(
+        "INSERT INTO soundings_converted (id, device_id, trip_id, tow_id, timestamp, "
+        f"{', '.join(SCALES)}, detail_level, quadkey, created_at) "
+        f"SELECT id, device_id, trip_id, tow_id, {timestamp_sql}, {values}, detail_level, quadkey, created_at "
+        "FROM soundings"
+    )
+    op.drop_table('soundings')
+    op.rename_table('soundings_converted', 'soundings')
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'soundings', columns, unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_sqlite(
+            sa.BigInteger(),
+            sa.Integer(),
+            # 'YYYY-MM-DD HH:MM:SS.ffffff' text: whole seconds plus the first three fraction digits
+            "CAST(strftime('%s', timestamp) AS INTEGER) * 1000 "
+            "+ CAST(substr(substr(timestamp, 21) || '000', 1, 3) AS INTEGER)",
+            "CAST(ROUND({column} * {scale}) AS INTEGER)",
+        )
+        return
+
+    op.alter_column(
+        'soundings', 'timestamp',
+        type_=sa.BigInteger(),
+        postgresql_using="CAST(ROUND(EXTRACT(EPOCH FROM timestamp) * 1000) AS BIGINT)",
+    )
+    for name, scale in SCALES.items():
+        op.alter_column(
+            'soundings', name,
+            type_=sa.Integer(),
+            postgresql_using=f"CAST(ROUND({name} * {scale}) AS INTEGER)",
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_sqlite(
+            sa.DateTime(timezone=True),
+            sa.Float(),
+            # Back to the text layout SQLAlchemy's SQLite DateTime type stores
+            "strftime('%Y-%m-%d %H:%M:%S', timestamp / 1000, 'unixepoch') "
+            "|| '.' || printf('%03d', timestamp % 1000) || '000'",
+            "{column} / {scale}.0",
+        )
+        return
+
+    op.alter_column(
+        'soundings', 'timestamp',
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="to_timestamp(timestamp / 1000.0)",
+    )
+    for name, scale in SCALES.items():
+        op.alter_column(
+            'soundings', name,
+            type_=sa.Float(),
+            postgresql_using=f"{name} / {scale}.0",
+        )
@@ -0,0 +1,69 @@
+"""add device_status and hourly heartbeat_rollups, index heartbeats by received_at
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'device_status',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('queue_size', sa.Integer(), nullable=True),
+        sa.Column('last_upload_ok', sa.Boolean(), nullable=True),
+        sa.Column('connector_version', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id')
+    )
+    op.create_table(
+        'heartbeat_rollups',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('heartbeat_count', sa.Integer(), nullable=False),
+        sa.Column('queue_size_min', sa.Integer(), nullable=True),
+        sa.Column('queue_size_max', sa.Integer(), nullable=True),
+        sa.Column('queue_size_sum', sa.Integer(), nullable=False),
+        sa.Column('queue_size_samples', sa.Integer(), nullable=False),
+        sa.Column('upload_failures', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+        sa.PrimaryKeyConstraint('device_id', 'bucket_start')
+    )
+    op.create_index('ix_heartbeats_received_at', 'heartbeats', ['received_at'], unique=False)
+
+    # Backfill from the heartbeats kept so far: the latest one per device...
+    op.execute(
+        "INSERT INTO device_status (device_id, heartbeat_at, queue_size, last_upload_ok, connector_version) "
+        "SELECT device_id, received_at, queue_size, last_upload_ok, connector_version FROM heartbeats "
+        "WHERE id IN (SELECT MAX(id) FROM heartbeats GROUP BY device_id)"
+    )
+    # ...and every hour (in SQLite, the text layout SQLAlchemy binds datetimes in)
+    if op.get_bind().dialect.name == 'sqlite':
+        bucket = "strftime('%Y-%m-%d %H:00:00.000000', received_at)"
+    else:
+        bucket = "date_trunc('hour', received_at)"
+    op.execute(
+        "INSERT INTO heartbeat_rollups (device_id, bucket_start, heartbeat_count, queue_size_min, "
+        "queue_size_max, queue_size_sum, queue_size_samples, upload_failures) "
+        f"SELECT device_id, {bucket}, COUNT(*), MIN(queue_size), MAX(queue_size), "
+        "COALESCE(SUM(queue_size), 0), COUNT(queue_size), "
+        "SUM(CASE WHEN NOT last_upload_ok THEN 1 ELSE 0 END) "
+        f"FROM heartbeats GROUP BY device_id, {bucket}"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_heartbeats_received_at', table_name='heartbeats')
+    op.drop_table('heartbeat_rollups')
+    op.drop_table('device_status')
@@ -0,0 +1,24 @@
+"""add version column to upload_sessions for compare-and-swap range updates
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_sessions', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_sessions', 'version')
@@ -0,0 +1,32 @@
+"""add file_record_id to soundings so a failed file's committed batches can be removed
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing soundings stay NULL: they were committed together with their file's final status
+    op.add_column('soundings', sa.Column('file_record_id', sa.Integer(), nullable=True))
+    op.create_index('ix_soundings_file_record_id', 'soundings', ['file_record_id'], unique=False)
+    # SQLite cannot add a constraint without copying the whole table; the column is only written by ingestion
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key('fk_soundings_file_record_id', 'soundings', 'file_records', ['file_record_id'], ['id'])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('fk_soundings_file_record_id', 'soundings', type_='foreignkey')
+    op.drop_index('ix_soundings_file_record_id', table_name='soundings')
+    op.drop_column('soundings', 'file_record_id')
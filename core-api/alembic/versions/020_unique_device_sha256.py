@@ -0,0 +1,37 @@
+"""make (device_id, sha256) of file_records unique so concurrent identical uploads create one record
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '020'
+down_revision = '019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Duplicates created before the constraint: the earliest record keeps the hash (it is the one
+    # find_device_file returns); the later ones stay, without a hash, so their soundings are untouched
+    op.execute(
+        "UPDATE file_records SET sha256 = NULL "
+        "WHERE sha256 IS NOT NULL AND id NOT IN ("
+        "SELECT MIN(id) FROM file_records WHERE sha256 IS NOT NULL GROUP BY device_id, sha256)"
+    )
+    op.drop_index('ix_file_records_device_sha256', table_name='file_records')
+    op.create_index(
+        'ix_file_records_device_sha256', 'file_records', ['device_id', 'sha256'], unique=True,
+        postgresql_where=sa.text('sha256 IS NOT NULL'),
+        sqlite_where=sa.text('sha256 IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_file_records_device_sha256', table_name='file_records')
+    op.create_index('ix_file_records_device_sha256', 'file_records', ['device_id', 'sha256'], unique=False)
@@ -18,7 +18,17 @@ from modules.heartbeat import router as heartbeat_router
 from modules.uploads import router as uploads_router
 from modules.ingestion import router as ingestion_router
 from modules.trips import router as trips_router
-from core.db import check_db_initialized
+from modules.tiles import router as tiles_router
+from modules.soundings import router as soundings_router
+from modules.bathymetry import router as bathymetry_router
+from modules.history import router as history_router
+from modules.fleet import router as fleet_router
+from modules.ingestion.worker import start_worker_pool, stop_worker_pool
+from modules.heartbeat.buffer import start_heartbeat_buffer, stop_heartbeat_buffer
+from modules.heartbeat.retention import start_heartbeat_retention, stop_heartbeat_retention
+from modules.uploads.expiry import start_upload_expiry, stop_upload_expiry
+from core.db import async_engine, async_read_engine, check_db_initialized
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +73,32 @@ async def startup_event():
     except RuntimeError as e:
         logger.error(str(e))
         raise
+    
+    # Start background ingestion (uploads only store files; workers parse them)
+    if settings.ingestion_worker_enabled:
+        start_worker_pool()
+    
+    # Batch heartbeat writes (unless HEARTBEAT_WRITE_MODE=sync)
+    start_heartbeat_buffer()
+    
+    # Delete heartbeats beyond HEARTBEAT_RETENTION_DAYS (unless HEARTBEAT_RETENTION_INTERVAL_MINUTES=0)
+    start_heartbeat_retention()
+    
+    # Abort upload sessions idle for UPLOAD_SESSION_EXPIRY_HOURS, deleting their part files
+    start_upload_expiry()
+
+
+# Shutdown event: stop background workers
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the ingestion worker pool, letting in-flight files finish, write buffered heartbeats, then close async connections."""
+    await stop_heartbeat_retention()
+    await stop_upload_expiry()
+    await stop_worker_pool()
+    await stop_heartbeat_buffer()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 
 # Include routers
@@ -72,6 +108,11 @@ app.include_router(heartbeat_router.router, prefix="/api", tags=["heartbeat"])
 app.include_router(uploads_router.router, prefix="/api", tags=["uploads"])
 app.include_router(ingestion_router.router, prefix="/api", tags=["ingestion"])
 app.include_router(trips_router.router, prefix="/api", tags=["trips"])
+app.include_router(tiles_router.router, prefix="/api", tags=["tiles"])
+app.include_router(soundings_router.router, prefix="/api", tags=["soundings"])
+app.include_router(bathymetry_router.router, prefix="/api", tags=["bathymetry"])
+app.include_router(history_router.router, prefix="/api", tags=["history"])
+app.include_router(fleet_router.router, prefix="/api", tags=["fleet"])
 
 # TODO: Add additional routers as modules are implemented:
 # - history
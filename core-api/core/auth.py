@@ -2,24 +2,35 @@
 DeckBrain Core API - Authentication utilities.
 
 Handles device authentication for connector endpoints.
+
+Verified keys are served from the authenticated-device cache
+(core/auth_cache.py), and last_seen_at is written at most every
+AUTH_LAST_SEEN_INTERVAL_SECONDS per device, so a connector's repeated
+requests cost neither a devices query nor a write.
 """
 
 import hashlib
 import hmac
 import logging
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import Header, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.db import get_db
+from core.auth_cache import get_auth_cache
+from core.db import get_async_db
 from core.models import Device
 from core.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+# devices.id -> time.monotonic() of this process's last last_seen_at write
+_last_seen_writes: Dict[int, float] = {}
+
 
 def hash_api_key(api_key: str) -> str:
     """
@@ -53,21 +64,44 @@ def verify_api_key(plain_key: str, hashed_key: str) -> bool:
     return hmac.compare_digest(computed_hash, hashed_key)
 
 
-def get_authenticated_device(
-    x_device_id: str = Header(..., alias="X-Device-ID"),
-    x_api_key: str = Header(..., alias="X-API-Key"),
-    x_plotter_type: Optional[str] = Header(None, alias="X-Plotter-Type"),
-    db: Session = Depends(get_db)
+async def touch_last_seen(db: AsyncSession, device_pk: int) -> None:
+    """
+    Commit a device's last_seen_at, unless this process already did so
+    within AUTH_LAST_SEEN_INTERVAL_SECONDS.
+    
+    Args:
+        db: Async database session
+        device_pk: devices.id
+    """
+    now = time.monotonic()
+    written = _last_seen_writes.get(device_pk)
+    if written is not None and now - written < settings.auth_last_seen_interval_seconds:
+        return
+    await db.execute(update(Device).where(Device.id == device_pk).values(last_seen_at=datetime.utcnow()))
+    await db.commit()
+    _last_seen_writes[device_pk] = now
+
+
+async def authenticate_device(
+    db: AsyncSession,
+    x_device_id: str,
+    x_api_key: str,
+    x_plotter_type: Optional[str] = None,
+    touch: bool = True
 ) -> Device:
     """
-    FastAPI dependency for authenticating connector requests.
+    Validate device credentials and return the authenticated device.
     
-    Validates device credentials and returns the authenticated device.
+    Devices found in the authentication cache are returned as detached
+    copies of their columns (use device.id, not relationships).
     
-    Headers:
-        X-Device-ID: Required. Unique device identifier.
-        X-API-Key: Required. API key for authentication.
-        X-Plotter-Type: Optional. Plotter type (olex, maxsea, etc.)
+    Args:
+        db: Async database session
+        x_device_id: X-Device-ID header
+        x_api_key: X-API-Key header
+        x_plotter_type: X-Plotter-Type header (auto-registration in development)
+        touch: Update last_seen_at (see touch_last_seen()); callers passing False record it
+            themselves (the heartbeat buffer coalesces it into its batched writes)
     
     Returns:
         Authenticated Device object
@@ -89,8 +123,18 @@ def get_authenticated_device(
             detail="Missing required header: X-API-Key"
         )
     
+    key_digest = hash_api_key(x_api_key)
+    cache = get_auth_cache()
+    if cache is not None:
+        device = cache.get(x_device_id, key_digest)
+        if device is not None:
+            if touch:
+                await touch_last_seen(db, device.id)
+            logger.debug(f"Device {x_device_id} authenticated from cache")
+            return device
+    
     # Look up device by device_id
-    device = db.query(Device).filter(Device.device_id == x_device_id).first()
+    device = await db.scalar(select(Device).where(Device.device_id == x_device_id))
     
     if device:
         # Device exists - validate API key
@@ -102,17 +146,20 @@ def get_authenticated_device(
                 detail="Device authentication not configured. Please contact support."
             )
         
-        # Verify API key
-        if not verify_api_key(x_api_key, device.api_key_hash):
+        # Verify API key (constant-time comparison to prevent timing attacks)
+        if not hmac.compare_digest(key_digest, device.api_key_hash):
             logger.warning(f"Invalid API key for device {x_device_id}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid API key for device"
             )
         
+        if cache is not None:
+            cache.put(device, key_digest)
+        
         # Update last_seen_at
-        device.last_seen_at = datetime.utcnow()
-        db.commit()
+        if touch:
+            await touch_last_seen(db, device.id)
         
         logger.info(f"Device {x_device_id} authenticated successfully")
         return device
@@ -128,13 +175,14 @@ def get_authenticated_device(
             new_device = Device(
                 device_id=x_device_id,
                 plotter_type=plotter_type,
-                api_key_hash=hash_api_key(x_api_key),
+                api_key_hash=key_digest,
                 last_seen_at=datetime.utcnow()
             )
             
             db.add(new_device)
-            db.commit()
-            db.refresh(new_device)
+            await db.commit()
+            await db.refresh(new_device)
+            _last_seen_writes[new_device.id] = time.monotonic()
             
             logger.info(f"Created new device {x_device_id} with plotter_type={plotter_type}")
             return new_device
@@ -147,3 +195,32 @@ def get_authenticated_device(
                 detail="Device not registered. Please register your device first."
             )
 
+
+async def get_authenticated_device(
+    x_device_id: str = Header(..., alias="X-Device-ID"),
+    x_api_key: str = Header(..., alias="X-API-Key"),
+    x_plotter_type: Optional[str] = Header(None, alias="X-Plotter-Type"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Device:
+    """
+    FastAPI dependency for authenticating connector requests.
+    
+    Validates device credentials and returns the authenticated device.
+    Runs on the async session, so authentication never blocks the event
+    loop. The returned Device belongs to the async session, or to no
+    session when served from the authentication cache; endpoints use its
+    column values (device.id), not the object.
+    
+    Headers:
+        X-Device-ID: Required. Unique device identifier.
+        X-API-Key: Required. API key for authentication.
+        X-Plotter-Type: Optional. Plotter type (olex, maxsea, etc.)
+    
+    Returns:
+        Authenticated Device object
+        
+    Raises:
+        HTTPException 400: Missing required headers
+        HTTPException 401: Invalid credentials or device not registered
+    """
+    return await authenticate_device(db, x_device_id, x_api_key, x_plotter_type)
@@ -0,0 +1,161 @@
+"""
+DeckBrain Core API - Authenticated-device cache.
+
+Every connector request (heartbeats, uploads) authenticates: a devices
+query, then the presented key's SHA-256 compared with the stored hash. The
+same few connectors repeat this every 30 s for the lifetime of the process.
+
+DeviceAuthCache remembers devices whose key was verified, keyed by
+(device_id, SHA-256 digest of the key), for AUTH_CACHE_TTL_SECONDS and up
+to AUTH_CACHE_MAX_ENTRIES devices (least recently used evicted). A hit
+returns a detached copy of the device's columns without a query. Any other
+key for the device misses and is verified against the database; failed
+authentications are never cached.
+
+Entries of a device are dropped when it is updated (e.g. a new key) or
+deleted through the ORM, once that transaction commits (see the events at
+the end of this module); invalidate_device() does the same for changes
+made with bulk statements. An API process does not see changes committed
+by another process until its entry expires, so the TTL bounds how long a
+replaced key keeps working there.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from core.models import Device
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the device_ids to invalidate when the session commits
+PENDING_INVALIDATIONS = "auth_cache_invalidate"
+
+
+@dataclass
+class CachedDevice:
+    """Column values of an authenticated device and when the entry expires (time.monotonic())."""
+    values: Dict[str, Any]
+    expires_at: float
+
+
+class DeviceAuthCache:
+    """
+    Bounded, TTL-based cache of authenticated devices (see module docstring).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        """
+        Args:
+            ttl_seconds: How long a verified key is trusted without a database lookup
+            max_entries: Entries kept (least recently used evicted)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple, CachedDevice]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, device_id: str, key_digest: str) -> Optional[Device]:
+        """
+        Look up a device authenticated with this key.
+
+        Args:
+            device_id: X-Device-ID of the request
+            key_digest: hash_api_key() of the request's X-API-Key
+
+        Returns:
+            A new, detached Device holding the cached column values, or None on a miss
+        """
+        key = (device_id, key_digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return Device(**entry.values)
+
+    def put(self, device: Device, key_digest: str) -> None:
+        """
+        Remember a device whose key was just verified.
+
+        Args:
+            device: The authenticated device (loaded from the database)
+            key_digest: hash_api_key() of the key it authenticated with
+        """
+        values = {attr.key: getattr(device, attr.key) for attr in inspect(Device).column_attrs}
+        entry = CachedDevice(values=values, expires_at=time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._entries[(device.device_id, key_digest)] = entry
+            self._entries.move_to_end((device.device_id, key_digest))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_device(self, device_id: str) -> None:
+        """Drop every entry of a device (its key changed or it was deleted)."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == device_id]:
+                del self._entries[key]
+        logger.debug(f"Invalidated authentication cache for device {device_id}")
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+_auth_cache: Optional[DeviceAuthCache] = None
+
+
+def get_auth_cache() -> Optional[DeviceAuthCache]:
+    """Process-wide authentication cache (None when AUTH_CACHE_ENABLED is false)."""
+    global _auth_cache
+    if not settings.auth_cache_enabled:
+        return None
+    if _auth_cache is None:
+        _auth_cache = DeviceAuthCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)
+    return _auth_cache
+
+
+def invalidate_device(device_id: str) -> None:
+    """Drop cached authentications of a device (no-op when caching is off)."""
+    cache = get_auth_cache()
+    if cache is not None:
+        cache.invalidate_device(device_id)
+
+
+@event.listens_for(Device, "after_update")
+@event.listens_for(Device, "after_delete")
+def _device_changed(mapper, connection, target: Device) -> None:
+    """Queue the device for invalidation when its session commits."""
+    # Also the previous device_id if it was renamed
+    device_ids = {target.device_id, *inspect(target).attrs.device_id.history.deleted}
+    session = object_session(target)
+    if session is None:
+        for device_id in device_ids:
+            invalidate_device(device_id)
+        return
+    session.info.setdefault(PENDING_INVALIDATIONS, set()).update(device_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for device_id in session.info.pop(PENDING_INVALIDATIONS, ()):
+        invalidate_device(device_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -2,29 +2,156 @@
 DeckBrain Core API - Database connection and session management.
 
 This module handles SQLAlchemy engine and session setup.
+
+Two engines share the database: the synchronous engine (ingestion workers,
+scripts, sync endpoints) and an async engine for async endpoints, whose
+queries must not block the event loop. Read-heavy endpoints can be routed to
+a read-only replica (DATABASE_REPLICA_URL) through get_read_db() and
+get_async_read_db().
+
+Pool sizing is configured in settings (DB_POOL_*); SQLite connections get
+WAL and related PRAGMAs (SQLITE_*) when they are opened.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Any, AsyncGenerator, Dict, Generator
 
 from .config import settings
 
 # Database URL from configuration
 database_url = settings.database_url
 
-# Create SQLAlchemy engine
-# For SQLite, we need check_same_thread=False for FastAPI
-engine = create_engine(
-    database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in database_url else {},
-    echo=True if settings.app_env == "development" else False,
-)
+
+def async_url(url: str) -> str:
+    """
+    Async driver URL for a database URL.
+    
+    sqlite:// becomes sqlite+aiosqlite:// and postgresql:// (any sync driver)
+    becomes postgresql+asyncpg://; URLs with another driver are kept.
+    
+    Args:
+        url: Database URL (as in DATABASE_URL)
+        
+    Returns:
+        URL for create_async_engine()
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() == "pysqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif parsed.get_backend_name() == "postgresql" and parsed.get_driver_name() != "asyncpg":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    create_engine() keyword arguments for a database URL.
+    
+    Pool sizing, pre-ping and recycling come from settings. In-memory
+    SQLite keeps SQLAlchemy's single-connection pool (every connection
+    would be a separate, empty database).
+    
+    Args:
+        url: Database URL (sync or async driver)
+        
+    Returns:
+        Keyword arguments for create_engine() / create_async_engine()
+    """
+    parsed = make_url(url)
+    options: Dict[str, Any] = {"echo": settings.database_echo}
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.get_driver_name() == "pysqlite":
+            # Connections are shared with FastAPI's threadpool
+            options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+    )
+    return options
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs applied to every SQLite connection (from settings)."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "cache_size": -settings.sqlite_cache_size_mb * 1024,  # negative = KiB
+        "mmap_size": settings.sqlite_mmap_size_mb * 1024 * 1024,
+    }
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """
+    Apply sqlite_pragmas() to each new connection of an engine.
+    
+    WAL (persistent in the database file) lets the API read while ingestion
+    or heartbeats write; busy_timeout makes writers queue for the lock
+    instead of failing with "database is locked". No-op for other databases.
+    
+    Args:
+        engine: Sync engine, or the sync_engine of an async engine
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+    
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def _create_engine(url: str) -> Engine:
+    created = create_engine(url, **engine_options(url))
+    configure_sqlite(created)
+    return created
+
+
+def _create_async_engine(url: str):
+    created = create_async_engine(url, **engine_options(url))
+    configure_sqlite(created.sync_engine)
+    return created
+
+
+# Sync engine: ingestion workers, scripts and sync endpoints
+engine = _create_engine(database_url)
 
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for async endpoints (asyncpg / aiosqlite)
+async_engine = _create_async_engine(settings.async_database_url or async_url(database_url))
+
+# Objects stay readable after commit: async sessions cannot lazy-load
+# expired attributes, and authenticated devices outlive their session
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read-only replica for read-heavy endpoints (trips, history); the primary
+# engines when no replica is configured. Replicas may lag the primary by a
+# few seconds, so only endpoints that tolerate that use them.
+if settings.database_replica_url:
+    read_engine = _create_engine(settings.database_replica_url)
+    async_read_engine = _create_async_engine(
+        settings.async_database_replica_url or async_url(settings.database_replica_url)
+    )
+else:
+    read_engine = engine
+    async_read_engine = async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for declarative models
 Base = declarative_base()
 
@@ -47,6 +174,46 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency for async database sessions.
+    
+    Queries are awaited, so the event loop keeps serving other requests
+    while the database works. Relationships are not lazy-loaded; load them
+    in the query (selectinload/joinedload).
+    
+    Usage in FastAPI endpoints:
+        @router.get("/example")
+        async def example(db: AsyncSession = Depends(get_async_db)):
+            rows = (await db.execute(select(...))).all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db() -> Generator[Session, None, None]:
+    """
+    FastAPI dependency for read-only sessions (replica when configured).
+    
+    Use only for endpoints that never write and tolerate replica lag.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency for read-only async sessions (replica when configured).
+    
+    Use only for endpoints that never write and tolerate replica lag.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """
     Initialize database tables.
@@ -6,10 +6,17 @@ This package contains SQLAlchemy models for the Core API.
 
 from .device import Device
 from .heartbeat import Heartbeat
+from .device_status import DeviceStatus
+from .heartbeat_rollup import HeartbeatRollup
 from .file_record import FileRecord
 from .trip import Trip
 from .tow import Tow
 from .sounding import Sounding
+from .sounding_segment import SoundingSegment
+from .sounding_cell import SoundingCell
+from .bathymetry_cell import BathymetryCell
+from .coverage_cell import CoverageCell
+from .upload_session import UploadSession
 
-__all__ = ["Device", "Heartbeat", "FileRecord", "Trip", "Tow", "Sounding"]
+__all__ = ["Device", "Heartbeat", "DeviceStatus", "HeartbeatRollup", "FileRecord", "Trip", "Tow", "Sounding", "SoundingSegment", "SoundingCell", "BathymetryCell", "CoverageCell", "UploadSession"]
 
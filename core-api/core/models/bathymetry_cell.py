@@ -0,0 +1,42 @@
+"""
+DeckBrain Core API - BathymetryCell model.
+
+Per-device depth grid on a regular latitude/longitude grid (used by the bathymetry raster).
+"""
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, PrimaryKeyConstraint
+
+from core.db import Base
+
+
+class BathymetryCell(Base):
+    """
+    BathymetryCell model.
+    
+    Soundings of one device aggregated into a cell of the depth grid. Level 0
+    cells are BATHYMETRY_CELL_SIZE_DEG degrees square; each further level
+    doubles the cell size (a level l cell covers 2^l x 2^l level 0 cells), so
+    large viewports are read from a coarse level (see modules.bathymetry.grid).
+    Rows are maintained incrementally during ingestion, in the same
+    transaction as the soundings.
+    """
+    __tablename__ = "bathymetry_cells"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    level = Column(Integer, nullable=False)  # 0 = finest grid
+    cell_x = Column(Integer, nullable=False)  # Column, counted east from 180°W
+    cell_y = Column(Integer, nullable=False)  # Row, counted north from 90°S
+    
+    # Aggregates
+    sounding_count = Column(Integer, nullable=False)
+    depth_sum = Column(Float, nullable=False)  # Sum of depths in meters (mean = depth_sum / sounding_count)
+    depth_min = Column(Float, nullable=False)
+    depth_max = Column(Float, nullable=False)
+    
+    # Primary key order matches the raster lookup: device, level, then a cell_x range
+    __table_args__ = (
+        PrimaryKeyConstraint('device_id', 'level', 'cell_x', 'cell_y'),
+    )
+    
+    def __repr__(self):
+        return f"<BathymetryCell(device_id={self.device_id}, level={self.level}, cell=({self.cell_x}, {self.cell_y}), count={self.sounding_count})>"
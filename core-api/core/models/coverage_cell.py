@@ -0,0 +1,39 @@
+"""
+DeckBrain Core API - CoverageCell model.
+
+Per-device towing coverage on a multi-resolution latitude/longitude grid (History module).
+"""
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, PrimaryKeyConstraint
+
+from core.db import Base
+
+
+class CoverageCell(Base):
+    """
+    CoverageCell model.
+    
+    Towing time and number of distinct tows of one device in a grid cell.
+    Level 0 cells are COVERAGE_CELL_SIZE_DEG degrees square; each further
+    level doubles the cell size (see modules.history.coverage). Rows are
+    maintained incrementally as ingestion creates tows, in the same
+    transaction as the soundings.
+    """
+    __tablename__ = "coverage_cells"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    level = Column(Integer, nullable=False)  # 0 = finest grid
+    cell_x = Column(Integer, nullable=False)  # Column, counted east from 180°W
+    cell_y = Column(Integer, nullable=False)  # Row, counted north from 90°S
+    
+    # Aggregates
+    tow_seconds = Column(Float, nullable=False)  # Time spent towing in the cell
+    tow_count = Column(Integer, nullable=False)  # Distinct tows that passed through the cell
+    
+    # Primary key order matches the viewport lookup: device, level, then a cell_x range
+    __table_args__ = (
+        PrimaryKeyConstraint('device_id', 'level', 'cell_x', 'cell_y'),
+    )
+    
+    def __repr__(self):
+        return f"<CoverageCell(device_id={self.device_id}, level={self.level}, cell=({self.cell_x}, {self.cell_y}), tows={self.tow_count})>"
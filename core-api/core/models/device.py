@@ -39,6 +39,9 @@ class Device(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     last_seen_at = Column(DateTime(timezone=True), nullable=True)  # updated on heartbeat
     
+    # Counters (maintained when rows are inserted, so lists don't need COUNT(*))
+    trip_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relationships
     heartbeats = relationship("Heartbeat", back_populates="device")
     file_records = relationship("FileRecord", back_populates="device")
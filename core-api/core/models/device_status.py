@@ -0,0 +1,33 @@
+"""
+DeckBrain Core API - DeviceStatus model.
+
+Latest heartbeat of each device, maintained as heartbeats are written.
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+
+from core.db import Base
+
+
+class DeviceStatus(Base):
+    """
+    DeviceStatus model.
+    
+    One row per device that ever sent a heartbeat, holding the fields of its
+    latest one. Upserted in the same transaction as the heartbeats (see
+    modules.heartbeat.buffer), so the current status of a fleet is a
+    primary key lookup per device instead of a latest-per-device search
+    over heartbeats, and survives the retention of raw heartbeats.
+    """
+    __tablename__ = "device_status"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    
+    # Fields of the latest heartbeat
+    heartbeat_at = Column(DateTime(timezone=True), nullable=False)  # received_at of the latest heartbeat
+    queue_size = Column(Integer, nullable=True)
+    last_upload_ok = Column(Boolean, nullable=True)
+    connector_version = Column(String, nullable=True)
+    
+    def __repr__(self):
+        return f"<DeviceStatus(device_id={self.device_id}, heartbeat_at='{self.heartbeat_at}', queue_size={self.queue_size})>"
@@ -4,7 +4,7 @@ DeckBrain Core API - FileRecord model.
 Tracks uploaded files from connectors.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -31,13 +31,21 @@ class FileRecord(Base):
     source_format = Column(String, nullable=False)  # olex_raw|maxsea_mf2|tz_backup|unknown
     
     # File storage
+    filename = Column(String, nullable=True)  # original filename as uploaded
     local_path = Column(String, nullable=True)  # path on connector's disk
-    remote_path = Column(String, nullable=True)  # path in Core API storage
+    remote_path = Column(String, nullable=True)  # path in Core API storage (content-addressed blob)
     size_bytes = Column(Integer, nullable=True)  # file size
     sha256 = Column(String, nullable=True, index=True)  # file hash for deduplication
     
     # Processing status
-    processing_status = Column(String, nullable=False, default="pending")  # pending|stored|processed|failed
+    processing_status = Column(String, nullable=False, default="pending")  # pending|stored|processing|processed|failed
+    
+    # Background ingestion bookkeeping
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # ingestion attempts so far
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # when a failed file may be retried (null = never)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # when a worker claimed the file
+    claimed_by = Column(String, nullable=True)  # worker identifier holding the claim
+    last_error = Column(Text, nullable=True)  # message from the last failed attempt
     
     # Timestamps
     received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # when file was received
@@ -46,6 +54,16 @@ class FileRecord(Base):
     # Relationship
     device = relationship("Device", back_populates="file_records")
     
+    # Per-device content lookups; unique, so concurrent identical uploads create one record
+    __table_args__ = (
+        Index(
+            'ix_file_records_device_sha256', 'device_id', 'sha256', unique=True,
+            postgresql_where=text('sha256 IS NOT NULL'),
+            sqlite_where=text('sha256 IS NOT NULL'),
+        ),
+        Index('ix_file_records_status_next_attempt', 'processing_status', 'next_attempt_at'),
+    )
+    
     def __repr__(self):
         return f"<FileRecord(device_id={self.device_id}, file_type='{self.file_type}', status='{self.processing_status}')>"
 
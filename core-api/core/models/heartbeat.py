@@ -4,7 +4,7 @@ DeckBrain Core API - Heartbeat model.
 Records periodic status updates from connectors.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -16,7 +16,9 @@ class Heartbeat(Base):
     Heartbeat model.
     
     Stores periodic status updates from connectors including queue size,
-    connector version, and sync status.
+    connector version, and sync status. Raw heartbeats are kept for
+    HEARTBEAT_RETENTION_DAYS; device_status and heartbeat_rollups keep the
+    latest status and hourly statistics beyond that.
     """
     __tablename__ = "heartbeats"
     
@@ -24,7 +26,7 @@ class Heartbeat(Base):
     id = Column(Integer, primary_key=True, index=True)
     
     # Foreign key to device
-    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     
     # Heartbeat data
     queue_size = Column(Integer, nullable=True)  # number of pending files in connector queue
@@ -37,6 +39,12 @@ class Heartbeat(Base):
     # Relationship
     device = relationship("Device", back_populates="heartbeats")
     
+    # A device's heartbeats in order; retention deletes by received_at
+    __table_args__ = (
+        Index('ix_heartbeats_device_id_id', 'device_id', 'id'),
+        Index('ix_heartbeats_received_at', 'received_at'),
+    )
+    
     def __repr__(self):
         return f"<Heartbeat(device_id={self.device_id}, queue_size={self.queue_size}, received_at='{self.received_at}')>"
 
@@ -0,0 +1,46 @@
+"""
+DeckBrain Core API - HeartbeatRollup model.
+
+Hourly heartbeat statistics per device, kept after raw heartbeats are pruned.
+"""
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, PrimaryKeyConstraint
+
+from core.db import Base
+
+
+class HeartbeatRollup(Base):
+    """
+    HeartbeatRollup model.
+    
+    Heartbeats of one device received within one UTC hour, summarised:
+    how many arrived, the connector queue size they reported (min, max and
+    the sum and number of reports for the average) and how many reported a
+    failed last upload. Rows are merged incrementally as heartbeats are
+    written (see modules.heartbeat.buffer).
+    """
+    __tablename__ = "heartbeat_rollups"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # Start of the hour (UTC)
+    
+    # Aggregates
+    heartbeat_count = Column(Integer, nullable=False)
+    queue_size_min = Column(Integer, nullable=True)  # NULL if no heartbeat reported a queue size
+    queue_size_max = Column(Integer, nullable=True)
+    queue_size_sum = Column(Integer, nullable=False)
+    queue_size_samples = Column(Integer, nullable=False)  # Heartbeats that reported a queue size
+    upload_failures = Column(Integer, nullable=False)  # Heartbeats with last_upload_ok false
+    
+    # Primary key order matches the per-device time range lookup
+    __table_args__ = (
+        PrimaryKeyConstraint('device_id', 'bucket_start'),
+    )
+    
+    @property
+    def queue_size_avg(self):
+        """Average reported queue size, or None if none was reported."""
+        return self.queue_size_sum / self.queue_size_samples if self.queue_size_samples else None
+    
+    def __repr__(self):
+        return f"<HeartbeatRollup(device_id={self.device_id}, bucket_start='{self.bucket_start}', heartbeats={self.heartbeat_count})>"
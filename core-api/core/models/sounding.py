@@ -4,11 +4,12 @@ DeckBrain Core API - Sounding model.
 Tracks depth readings with coordinates (normalized across all plotter types).
 """
 
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Float, Index
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey, Index, SmallInteger
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from core.db import Base
+from .types import EpochMillis, ScaledInteger
 
 
 class Sounding(Base):
@@ -18,6 +19,9 @@ class Sounding(Base):
     Represents a depth reading at a specific location and time. Soundings
     are created by ingestion modules from raw plotter files and are normalized
     across all plotter types.
+    
+    Values are stored as integers (see core.models.types) and read back as
+    floats and naive UTC datetimes; the comments give the stored unit.
     """
     __tablename__ = "soundings"
     
@@ -28,21 +32,28 @@ class Sounding(Base):
     device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
     trip_id = Column(Integer, ForeignKey("trips.id"), nullable=True, index=True)
     tow_id = Column(Integer, ForeignKey("tows.id"), nullable=True, index=True)
+    file_record_id = Column(Integer, ForeignKey("file_records.id"), nullable=True, index=True)  # File the sounding was ingested from
     
     # Timestamp
-    timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
+    timestamp = Column(EpochMillis(), nullable=False, index=True)  # UTC epoch milliseconds
     
     # Geographic coordinates
-    latitude = Column(Float, nullable=False)
-    longitude = Column(Float, nullable=False)
+    latitude = Column(ScaledInteger(10**7), nullable=False)  # 1e-7 degrees (about 1 cm)
+    longitude = Column(ScaledInteger(10**7), nullable=False)  # 1e-7 degrees
     
     # Depth reading
-    depth = Column(Float, nullable=False)  # Depth in meters
+    depth = Column(ScaledInteger(1000), nullable=False)  # Depth in millimetres (meters in the API)
     
     # Optional metadata
-    water_temp = Column(Float, nullable=True)  # Water temperature in Celsius
-    speed_knots = Column(Float, nullable=True)  # Vessel speed in knots
-    course_deg = Column(Float, nullable=True)  # Vessel course in degrees
+    water_temp = Column(ScaledInteger(100), nullable=True)  # Water temperature in 0.01 °C
+    speed_knots = Column(ScaledInteger(100), nullable=True)  # Vessel speed in 0.01 knots
+    course_deg = Column(ScaledInteger(100), nullable=True)  # Vessel course in 0.01 degrees
+    
+    # Track simplification: lowest map zoom at which this point is drawn (NULL = not computed)
+    detail_level = Column(SmallInteger, nullable=True)
+    
+    # Spatial index: quadtree cell (Morton code) of the position (NULL = not computed)
+    quadkey = Column(BigInteger, nullable=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -56,7 +67,8 @@ class Sounding(Base):
     __table_args__ = (
         Index('ix_soundings_device_timestamp', 'device_id', 'timestamp'),
         Index('ix_soundings_trip_timestamp', 'trip_id', 'timestamp'),
-        Index('ix_soundings_location', 'latitude', 'longitude'),
+        Index('ix_soundings_trip_detail', 'trip_id', 'detail_level'),
+        Index('ix_soundings_device_quadkey', 'device_id', 'quadkey'),
     )
     
     def __repr__(self):
@@ -0,0 +1,40 @@
+"""
+DeckBrain Core API - SoundingCell model.
+
+Per-zoom aggregation of soundings on the Web Mercator grid (used by vector tiles).
+"""
+
+from sqlalchemy import Column, Integer, Float, ForeignKey, PrimaryKeyConstraint
+
+from core.db import Base
+
+
+class SoundingCell(Base):
+    """
+    SoundingCell model.
+    
+    Soundings of one device aggregated into a grid cell. Cells of zoom z are
+    the tiles of zoom z + CELL_ZOOM_OFFSET (see modules.tiles.cells), so one
+    tile of zoom z holds a fixed 64 x 64 grid of cells. Rows are maintained
+    incrementally during ingestion, in the same transaction as the soundings.
+    """
+    __tablename__ = "sounding_cells"
+    
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
+    zoom = Column(Integer, nullable=False)  # Tile zoom the cell is rendered at
+    cell_x = Column(Integer, nullable=False)  # Column at zoom + CELL_ZOOM_OFFSET
+    cell_y = Column(Integer, nullable=False)  # Row at zoom + CELL_ZOOM_OFFSET
+    
+    # Aggregates
+    sounding_count = Column(Integer, nullable=False)
+    depth_sum = Column(Float, nullable=False)  # Sum of depths in meters (mean = depth_sum / sounding_count)
+    depth_min = Column(Float, nullable=False)
+    depth_max = Column(Float, nullable=False)
+    
+    # Primary key order matches the tile lookup: device, zoom, then a cell_x range
+    __table_args__ = (
+        PrimaryKeyConstraint('device_id', 'zoom', 'cell_x', 'cell_y'),
+    )
+    
+    def __repr__(self):
+        return f"<SoundingCell(device_id={self.device_id}, zoom={self.zoom}, cell=({self.cell_x}, {self.cell_y}), count={self.sounding_count})>"
@@ -0,0 +1,47 @@
+"""
+DeckBrain Core API - SoundingSegment model.
+
+Catalog of columnar per-trip sounding segments (see modules.soundings.store).
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from core.db import Base
+
+
+class SoundingSegment(Base):
+    """
+    SoundingSegment model.
+
+    Points at the compressed column file holding every sounding of one trip,
+    written next to the soundings table when SOUNDING_STORE_BACKEND is
+    "segments". Files are immutable: when a trip receives more soundings a
+    new file is written and the row is repointed. A segment is only served
+    while trip_version matches the trip's current version, so a stale file
+    is never read.
+    """
+    __tablename__ = "sounding_segments"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # One segment per trip
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False, unique=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+
+    # Segment file, relative to STORAGE_PATH
+    path = Column(String, nullable=False)
+
+    # Contents
+    trip_version = Column(String, nullable=False)  # track_cache.trip_version() of the trip when written
+    sounding_count = Column(Integer, nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=True)
+    end_time = Column(DateTime(timezone=True), nullable=True)
+    byte_size = Column(Integer, nullable=False)  # Size of the file on disk
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<SoundingSegment(trip_id={self.trip_id}, soundings={self.sounding_count}, path='{self.path}')>"
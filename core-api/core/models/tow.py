@@ -46,6 +46,7 @@ class Tow(Base):
     avg_depth_m = Column(Float, nullable=True)  # Average depth in meters
     min_depth_m = Column(Float, nullable=True)  # Minimum depth in meters
     max_depth_m = Column(Float, nullable=True)  # Maximum depth in meters
+    sounding_count = Column(Integer, nullable=False, default=0, server_default="0")  # Soundings in this tow
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -4,7 +4,7 @@ DeckBrain Core API - Trip model.
 Tracks vessel trips (normalized across all plotter types).
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -24,7 +24,7 @@ class Trip(Base):
     id = Column(Integer, primary_key=True, index=True)
     
     # Foreign key to device
-    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False)
     
     # Trip timing
     start_time = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -42,6 +42,10 @@ class Trip(Base):
     # Statistics
     distance_nm = Column(Float, nullable=True)  # Distance in nautical miles
     duration_hours = Column(Float, nullable=True)  # Duration in hours
+    avg_depth_m = Column(Float, nullable=True)  # Average depth in meters
+    min_depth_m = Column(Float, nullable=True)  # Minimum depth in meters
+    max_depth_m = Column(Float, nullable=True)  # Maximum depth in meters
+    sounding_count = Column(Integer, nullable=False, default=0, server_default="0")  # Soundings in this trip
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -52,6 +56,11 @@ class Trip(Base):
     tows = relationship("Tow", back_populates="trip", cascade="all, delete-orphan")
     soundings = relationship("Sounding", back_populates="trip", cascade="all, delete-orphan")
     
+    # Trip list pages seek into (device_id, start_time, id) and read it backwards
+    __table_args__ = (
+        Index('ix_trips_device_start', 'device_id', 'start_time', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Trip(id={self.id}, device_id={self.device_id}, start_time={self.start_time}, name='{self.name}')>"
 
@@ -0,0 +1,108 @@
+"""
+DeckBrain Core API - Compact column types.
+
+Soundings are the only table that grows with every fix, so their values
+are stored as integers instead of doubles and ISO text:
+
+- ScaledInteger: a float stored as round(value * scale) (e.g. degrees at
+  1e-7, about 1 cm; depth in millimetres)
+- EpochMillis: a UTC datetime stored as epoch milliseconds
+
+The conversion happens at the model boundary: ORM and Core queries bind
+and return floats and naive UTC datetimes as before, and comparisons such
+as Sounding.timestamp >= start bind the scaled value. Selected scaled
+columns are divided back in SQL (CAST(latitude AS FLOAT) / 10000000.0),
+which is exact and keeps Python out of the per-row path. Code that bypasses
+SQLAlchemy's type processing (bulk inserts, raw column reads) uses the
+vectorised encode()/decode() of the column's type instead.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import BigInteger, Float, Integer, cast, literal_column
+from sqlalchemy.types import TypeDecorator
+
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+
+class ScaledInteger(TypeDecorator):
+    """Float stored as an integer number of 1/scale units."""
+
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, scale: int):
+        """
+        Args:
+            scale: Units per 1.0 of the value (e.g. 10**7 for 1e-7 degrees)
+        """
+        super().__init__()
+        self.scale = scale
+
+    def process_bind_param(self, value: Optional[float], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return int(round(float(value) * self.scale))
+
+    def column_expression(self, colexpr):
+        # Selected values are divided by the database rather than per row in Python
+        return cast(colexpr, Float).op("/", return_type=Float)(literal_column(repr(float(self.scale))))
+
+    def result_processor(self, dialect, coltype):
+        # column_expression() already returns the float
+        return None
+
+    def quantize(self, values: np.ndarray) -> np.ndarray:
+        """Round float values to the stored precision (NaN stays NaN)."""
+        return np.rint(values * self.scale) / self.scale
+
+    def encode(self, values: Optional[np.ndarray], n: int) -> List[Optional[int]]:
+        """Stored integers for a float column; None for NaN or a missing column."""
+        if values is None:
+            return [None] * n
+        scaled = np.rint(values * self.scale)
+        missing = np.isnan(scaled)
+        encoded = np.nan_to_num(scaled).astype(np.int64).tolist()
+        for i in np.flatnonzero(missing).tolist():
+            encoded[i] = None
+        return encoded
+
+    def decode(self, values: np.ndarray) -> np.ndarray:
+        """Float values for stored integers (NaN stays NaN)."""
+        return values / self.scale
+
+
+class EpochMillis(TypeDecorator):
+    """UTC datetime stored as integer epoch milliseconds."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[datetime], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - EPOCH) // MILLISECOND
+
+    def result_processor(self, dialect, coltype):
+        # Called for every selected row: skip TypeDecorator's process_result_value() indirection
+        def process(value: Optional[int]) -> Optional[datetime]:
+            if value is None:
+                return None
+            # Naive UTC, the convention used across the API
+            return EPOCH + MILLISECOND * value
+        return process
+
+    @staticmethod
+    def quantize(epoch_seconds: np.ndarray) -> np.ndarray:
+        """Round epoch seconds to whole milliseconds."""
+        return np.rint(epoch_seconds * 1000.0) / 1000.0
+
+    @staticmethod
+    def encode(epoch_seconds: np.ndarray) -> List[int]:
+        """Stored integers for UTC epoch seconds."""
+        return np.rint(epoch_seconds * 1000.0).astype(np.int64).tolist()
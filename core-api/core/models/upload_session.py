@@ -0,0 +1,59 @@
+"""
+DeckBrain Core API - UploadSession model.
+
+Tracks resumable, range-based uploads from connectors.
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from core.db import Base
+
+
+class UploadSession(Base):
+    """
+    UploadSession model.
+    
+    A resumable upload in progress. Connectors open a session, send the file
+    in Content-Range chunks (in any order, with retries), and finalize it once
+    every byte has been received. Finalizing creates the FileRecord.
+    """
+    __tablename__ = "upload_sessions"
+    
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Public session identifier (returned to the connector)
+    upload_id = Column(String, unique=True, index=True, nullable=False)
+    
+    # Foreign key to device
+    device_id = Column(Integer, ForeignKey("devices.id"), nullable=False, index=True)
+    
+    # File metadata (copied to the FileRecord on finalize)
+    filename = Column(String, nullable=False)
+    file_type = Column(String, nullable=False)  # track|soundings|marks|backup|unknown
+    source_format = Column(String, nullable=False)  # olex_raw|maxsea_mf2|tz_backup|unknown
+    local_path = Column(String, nullable=True)  # path on connector's disk
+    size_bytes = Column(BigInteger, nullable=False)  # declared total size
+    expected_sha256 = Column(String, nullable=True)  # declared hash, verified on finalize
+    
+    # Transfer progress
+    received_ranges = Column(Text, nullable=False, default="[]")  # JSON list of [start, end) byte ranges
+    bytes_received = Column(BigInteger, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every range update (compare-and-swap)
+    
+    # Session status
+    status = Column(String, nullable=False, default="open")  # open|completing|completed|aborted
+    file_record_id = Column(Integer, ForeignKey("file_records.id"), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Relationships
+    device = relationship("Device")
+    file_record = relationship("FileRecord")
+    
+    def __repr__(self):
+        return f"<UploadSession(upload_id='{self.upload_id}', device_id={self.device_id}, received={self.bytes_received}/{self.size_bytes}, status='{self.status}')>"
@@ -0,0 +1,67 @@
+"""
+DeckBrain Core API - Keyset pagination cursors.
+
+List endpoints page with keyset (seek) pagination: a page continues after
+the sort key of the last row returned instead of skipping OFFSET rows, so
+every page costs one index range scan however deep the client has paged.
+The position is handed to clients as an opaque cursor string.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode a keyset position as an opaque, URL-safe cursor.
+
+    Args:
+        *values: Sort key of the last row returned (ints, floats, strings,
+            datetimes or None)
+
+    Returns:
+        Cursor string
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Datetimes come back as ISO strings; use parse_cursor_datetime() on them.
+
+    Args:
+        cursor: Cursor string from a client
+        length: Expected number of values
+
+    Returns:
+        List of values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    """
+    Parse a datetime value of a decoded cursor.
+
+    Raises:
+        ValueError: If the value is not an ISO datetime
+    """
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    return datetime.fromisoformat(value)
@@ -0,0 +1,5 @@
+"""
+DeckBrain Core API - Bathymetry module.
+
+Builds per-device depth grids from soundings and serves them as rasters.
+"""
@@ -0,0 +1,293 @@
+"""
+DeckBrain Core API - Gridded bathymetry aggregation.
+
+A depth map of a device is built from every sounding it ever recorded, so
+it is never computed from raw soundings at request time. Instead, ingestion
+bins each batch into a regular latitude/longitude grid and merges the
+per-cell count and depth sum/min/max into bathymetry_cells:
+
+- level 0 cells are BATHYMETRY_CELL_SIZE_DEG degrees square, numbered by
+  column east from 180°W and row north from 90°S;
+- level l cells are 2^l times larger (the level 0 column/row shifted right
+  by l), up to BATHYMETRY_LEVELS - 1.
+
+A viewport is read from the finest level at which it fits the requested
+raster size, as one primary key range scan; the result never depends on
+how much data lies underneath.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import BathymetryCell, Sounding
+from modules.tiles.cells import REBUILD_CHUNK_SIZE, group_depths, merge_statement, split_key, tile_key
+
+logger = logging.getLogger(__name__)
+
+
+def grid_shape(cell_size: float) -> Tuple[int, int]:
+    """Columns and rows of the level 0 grid."""
+    return math.ceil(360.0 / cell_size), math.ceil(180.0 / cell_size)
+
+
+def cell_coordinates(lat, lon, cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Level 0 column and row of coordinates.
+
+    Args:
+        lat: Latitudes in degrees
+        lon: Longitudes in degrees
+        cell_size: Level 0 cell size in degrees
+
+    Returns:
+        (columns, rows) as int64 arrays
+    """
+    columns, rows = grid_shape(cell_size)
+    x = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / cell_size)
+    y = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / cell_size)
+    return (
+        np.clip(x, 0, columns - 1).astype(np.int64),
+        np.clip(y, 0, rows - 1).astype(np.int64),
+    )
+
+
+def viewport_cells(
+    cell_size: float,
+    levels: int,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    max_size: int
+) -> Tuple[int, int, int, int, int]:
+    """
+    Pick the finest level whose cells cover a bounding box in at most
+    max_size columns and rows.
+
+    Args:
+        cell_size: Level 0 cell size in degrees
+        levels: Number of levels of the grid
+        min_lat, min_lon, max_lat, max_lon: Bounding box in degrees (min_lon <= max_lon)
+        max_size: Largest number of columns/rows
+
+    Returns:
+        (level, x0, y0, x1, y1): the level and its inclusive cell range
+
+    Raises:
+        ValueError: If the box does not fit max_size even at the coarsest level
+    """
+    (x0, x1), (y0, y1) = (
+        values.tolist() for values in cell_coordinates([min_lat, max_lat], [min_lon, max_lon], cell_size)
+    )
+    level = 0
+    while max((x1 >> level) - (x0 >> level), (y1 >> level) - (y0 >> level)) + 1 > max_size:
+        level += 1
+        if level >= levels:
+            raise ValueError(f"bbox does not fit in {max_size} x {max_size} cells at the coarsest grid level")
+    return level, x0 >> level, y0 >> level, x1 >> level, y1 >> level
+
+
+class BathymetryAggregator:
+    """
+    Merges sounding batches of one device into bathymetry_cells.
+
+    Like TileAggregator, it writes inside the caller's transaction, so cells
+    and soundings are committed (or rolled back) together.
+    """
+
+    def __init__(self, db: Session, device_id: int):
+        """
+        Args:
+            db: Database session
+            device_id: Internal devices.id the soundings belong to
+        """
+        self.db = db
+        self.device_id = device_id
+        self.cell_size = settings.bathymetry_cell_size_deg
+        self.levels = settings.bathymetry_levels
+        self._sql: Optional[str] = None
+        self._positions: Optional[List[str]] = None
+        self.cells_written = 0
+
+    def _prepare(self) -> None:
+        """Compile the upsert once; rows bypass SQLAlchemy's per-row bind processing."""
+        dialect = self.db.connection().dialect
+        statement = merge_statement(
+            BathymetryCell, ["device_id", "level", "cell_x", "cell_y"], dialect.name
+        )
+        compiled = statement.compile(dialect=dialect)
+        self._sql = str(compiled)
+        self._positions = list(compiled.positiontup) if compiled.positional else None
+
+    def add(self, lat: np.ndarray, lon: np.ndarray, depth: np.ndarray) -> None:
+        """
+        Aggregate one batch of soundings into the cells of every level.
+
+        Args:
+            lat: Latitudes in degrees
+            lon: Longitudes in degrees
+            depth: Depths in meters
+        """
+        if len(lat) == 0:
+            return
+        if self._sql is None:
+            self._prepare()
+
+        ix, iy = cell_coordinates(lat, lon, self.cell_size)
+        columns: Dict[str, List] = {name: [] for name in (
+            "device_id", "level", "cell_x", "cell_y", "sounding_count", "depth_sum", "depth_min", "depth_max"
+        )}
+        for level in range(self.levels):
+            keys, counts, sums, mins, maxs = group_depths(tile_key(ix >> level, iy >> level), depth)
+            cell_x, cell_y = split_key(keys)
+            columns["device_id"].extend([self.device_id] * len(keys))
+            columns["level"].extend([level] * len(keys))
+            columns["cell_x"].extend(cell_x.tolist())
+            columns["cell_y"].extend(cell_y.tolist())
+            columns["sounding_count"].extend(counts.tolist())
+            columns["depth_sum"].extend(sums.tolist())
+            columns["depth_min"].extend(mins.tolist())
+            columns["depth_max"].extend(maxs.tolist())
+
+        if self._positions is not None:
+            rows = list(zip(*(columns[name] for name in self._positions)))
+        else:
+            names = list(columns)
+            rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+        self.db.connection().exec_driver_sql(self._sql, rows)
+        self.cells_written += len(rows)
+
+
+def rebuild_bathymetry_cells(db: Session, device_id: int) -> int:
+    """
+    Replace a device's bathymetry_cells with a fresh aggregation of its soundings.
+
+    Runs in the caller's transaction (nothing is committed here).
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+
+    Returns:
+        Number of soundings aggregated
+    """
+    db.query(BathymetryCell).filter(BathymetryCell.device_id == device_id).delete(synchronize_session=False)
+    aggregator = BathymetryAggregator(db, device_id)
+    query = (
+        select(Sounding.latitude, Sounding.longitude, Sounding.depth)
+        .where(Sounding.device_id == device_id)
+        .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+    count = 0
+    for chunk in db.execute(query).partitions():
+        values = np.array([tuple(row) for row in chunk], dtype=np.float64)
+        aggregator.add(values[:, 0], values[:, 1], values[:, 2])
+        count += len(values)
+    return count
+
+
+@dataclass
+class BathymetryRaster:
+    """
+    A viewport of a device's depth grid.
+
+    Arrays have shape (height, width); row 0 is the northernmost row. Cells
+    without soundings have count 0 and NaN depths.
+    """
+    level: int
+    cell_size: float  # Degrees
+    west: float
+    south: float
+    east: float
+    north: float
+    count: np.ndarray  # uint32
+    mean: np.ndarray  # float32, meters
+    minimum: np.ndarray  # float32, meters
+    maximum: np.ndarray  # float32, meters
+
+    @property
+    def width(self) -> int:
+        return self.count.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.count.shape[0]
+
+
+def read_raster(
+    db: Session,
+    device_id: int,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    max_size: int
+) -> BathymetryRaster:
+    """
+    Read the depth grid of a bounding box.
+
+    The finest level whose cells cover the box in at most max_size columns
+    and rows is used; the raster spans the whole cells the box touches.
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+        min_lat, min_lon, max_lat, max_lon: Bounding box in degrees (min_lon <= max_lon)
+        max_size: Largest width/height of the raster, in cells
+
+    Returns:
+        BathymetryRaster
+
+    Raises:
+        ValueError: If the box does not fit max_size even at the coarsest level
+    """
+    cell_size = settings.bathymetry_cell_size_deg
+    level, x0, y0, x1, y1 = viewport_cells(
+        cell_size, settings.bathymetry_levels, min_lat, min_lon, max_lat, max_lon, max_size
+    )
+    width, height = x1 - x0 + 1, y1 - y0 + 1
+
+    cell = BathymetryCell.__table__.c
+    query = select(
+        cell.cell_x, cell.cell_y, cell.sounding_count, cell.depth_sum, cell.depth_min, cell.depth_max
+    ).where(
+        cell.device_id == device_id,
+        cell.level == level,
+        cell.cell_x.between(x0, x1),
+        cell.cell_y.between(y0, y1),
+    )
+    rows = db.connection().execute(query).all()
+
+    count = np.zeros((height, width), dtype=np.uint32)
+    mean = np.full((height, width), np.nan, dtype=np.float32)
+    minimum = np.full((height, width), np.nan, dtype=np.float32)
+    maximum = np.full((height, width), np.nan, dtype=np.float32)
+    if rows:
+        values = np.array([tuple(row) for row in rows], dtype=np.float64)
+        r = (y1 - values[:, 1]).astype(np.int64)
+        c = (values[:, 0] - x0).astype(np.int64)
+        count[r, c] = values[:, 2]
+        mean[r, c] = values[:, 3] / values[:, 2]
+        minimum[r, c] = values[:, 4]
+        maximum[r, c] = values[:, 5]
+
+    size = cell_size * (1 << level)
+    return BathymetryRaster(
+        level=level,
+        cell_size=size,
+        west=x0 * size - 180.0,
+        south=y0 * size - 90.0,
+        east=(x1 + 1) * size - 180.0,
+        north=(y1 + 1) * size - 90.0,
+        count=count,
+        mean=mean,
+        minimum=minimum,
+        maximum=maximum,
+    )
@@ -0,0 +1,112 @@
+"""
+DeckBrain Core API - Bathymetry raster encoding.
+
+The binary format sends a BathymetryRaster as little-endian bands that can
+be wrapped in typed arrays (or uploaded as WebGL textures) without parsing:
+
+    offset          type          content
+    0               char[4]       magic "DBBG"
+    4               uint16        format version (1)
+    6               uint16        band count (4)
+    8               uint32        width w (columns)
+    12              uint32        height h (rows)
+    16              uint32        grid level
+    20              uint32        reserved (0)
+    24              float64[4]    west, south, east, north (degrees)
+    56              uint32[w*h]   sounding count
+    56 + 4wh        float32[w*h]  mean depth, meters (NaN = no data)
+    56 + 8wh        float32[w*h]  minimum depth, meters
+    56 + 12wh       float32[w*h]  maximum depth, meters
+
+Bands are row-major with the northernmost row first, like image rasters.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .grid import BathymetryRaster
+
+MEDIA_TYPE = "application/vnd.deckbrain.bathymetry"
+MAGIC = b"DBBG"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("band_count", "<u2"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("level", "<u4"),
+    ("reserved", "<u4"),
+    ("bounds", "<f8", (4,)),
+])
+
+# Band name -> wire dtype, in wire order
+BANDS = (
+    ("count", np.dtype("<u4")),
+    ("mean", np.dtype("<f4")),
+    ("minimum", np.dtype("<f4")),
+    ("maximum", np.dtype("<f4")),
+)
+
+
+def encode_binary(raster: BathymetryRaster) -> bytes:
+    """Encode a raster in the binary band format."""
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["band_count"] = len(BANDS)
+    header["width"] = raster.width
+    header["height"] = raster.height
+    header["level"] = raster.level
+    header["bounds"] = (raster.west, raster.south, raster.east, raster.north)
+    parts = [header.tobytes()]
+    parts.extend(np.ascontiguousarray(getattr(raster, name), dtype=dtype).tobytes() for name, dtype in BANDS)
+    return b"".join(parts)
+
+
+def decode_binary(body: bytes) -> Dict:
+    """
+    Parse a binary raster (for scripts and debugging).
+
+    Returns:
+        Dict with level, bounds and one (height, width) array per band
+
+    Raises:
+        ValueError: If the body is not a supported binary raster
+    """
+    header = np.frombuffer(body, dtype=HEADER_DTYPE, count=1)[0]
+    if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+        raise ValueError("Not a DeckBrain bathymetry raster (version 1)")
+    width, height = int(header["width"]), int(header["height"])
+    decoded = {"level": int(header["level"]), "bounds": header["bounds"].tolist()}
+    offset = HEADER_DTYPE.itemsize
+    for name, dtype in BANDS:
+        decoded[name] = np.frombuffer(body, dtype=dtype, count=width * height, offset=offset).reshape(height, width)
+        offset += dtype.itemsize * width * height
+    return decoded
+
+
+def _rows(band: np.ndarray) -> List[List[Optional[float]]]:
+    """Depth band as nested lists, NaN as None, rounded to centimeters."""
+    return [
+        [None if value != value else value for value in row]
+        for row in np.round(band.astype(np.float64), 2).tolist()
+    ]
+
+
+def encode_json(device_id: str, raster: BathymetryRaster) -> Dict:
+    """Raster as a JSON-serialisable dict."""
+    return {
+        "device_id": device_id,
+        "level": raster.level,
+        "cell_size": raster.cell_size,
+        "bounds": [raster.west, raster.south, raster.east, raster.north],
+        "width": raster.width,
+        "height": raster.height,
+        "count": raster.count.tolist(),
+        "mean": _rows(raster.mean),
+        "depth_min": _rows(raster.minimum),
+        "depth_max": _rows(raster.maximum),
+    }
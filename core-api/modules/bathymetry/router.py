@@ -0,0 +1,88 @@
+"""
+DeckBrain Core API - Bathymetry endpoints.
+
+Serves viewports of a device's gridded depth map.
+"""
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.db import get_db
+from core.models import Device
+from modules.soundings.router import parse_bbox
+from .grid import read_raster
+from .raster import MEDIA_TYPE, encode_binary, encode_json
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/bathymetry")
+def get_bathymetry(
+    device_id: str = Query(..., description="Device whose soundings make up the grid"),
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat in degrees"),
+    size: int = Query(
+        512, ge=1, le=settings.bathymetry_max_raster_size,
+        description="Largest width/height of the raster, in cells"
+    ),
+    response_format: str = Query(
+        "json",
+        alias="format",
+        pattern="^(json|binary)$",
+        description="json (default) or binary (little-endian bands)"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a viewport of a device's depth grid.
+    
+    The grid is read at the finest level whose cells cover the bounding box
+    in at most `size` columns and rows. Each cell holds the sounding count
+    and mean/min/max depth of every sounding the device recorded in it.
+    
+    Query Parameters:
+    - device_id: Device to read (required)
+    - bbox: Bounding box "min_lon,min_lat,max_lon,max_lat" (required)
+    - size: Largest raster width/height in cells (default: 512)
+    - format: json (default) or binary
+    
+    Returns:
+        JSON raster (nested rows, north first, null = no data) or the binary
+        format described in modules/bathymetry/raster.py
+        
+    Raises:
+        HTTPException 400: If bbox is invalid, crosses the antimeridian or is too large for size
+        HTTPException 404: If the device is not found
+    """
+    min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox)
+    if min_lon > max_lon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox must not cross the antimeridian"
+        )
+    
+    device = db.query(Device).filter(Device.device_id == device_id).first()
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device not found: {device_id}"
+        )
+    
+    try:
+        raster = read_raster(db, device.id, min_lat, min_lon, max_lat, max_lon, size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    logger.info(
+        f"Bathymetry for {device_id}: bbox={bbox}, level={raster.level}, "
+        f"{raster.width}x{raster.height} cells"
+    )
+    
+    if response_format == "binary":
+        return Response(content=encode_binary(raster), media_type=MEDIA_TYPE)
+    return encode_json(device_id, raster)
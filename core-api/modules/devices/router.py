@@ -4,14 +4,17 @@ DeckBrain Core API - Device management endpoints.
 Handles device registration, listing, and status queries.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from core.db import get_db
-from core.models import Device as DeviceModel
+from core.db import get_async_db
+from core.models import Device as DeviceModel, HeartbeatRollup
+from core.pagination import decode_cursor, encode_cursor
+from modules.soundings.router import as_utc
 
 
 router = APIRouter()
@@ -33,29 +36,75 @@ class DeviceListResponse(BaseModel):
     """Response model for device listing."""
     devices: List[DeviceResponse]
     total: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page (None on the last page)
+
+
+class HeartbeatHourResponse(BaseModel):
+    """Heartbeat statistics of one hour."""
+    bucket_start: datetime
+    heartbeat_count: int
+    queue_size_min: Optional[int] = None
+    queue_size_max: Optional[int] = None
+    queue_size_avg: Optional[float] = None
+    upload_failures: int
+    
+    class Config:
+        from_attributes = True
+
+
+class HeartbeatHistoryResponse(BaseModel):
+    """Response model for a device's hourly heartbeat statistics."""
+    device_id: str
+    hours: List[HeartbeatHourResponse]
 
 
 @router.get("/devices", response_model=DeviceListResponse)
-def list_devices(db: Session = Depends(get_db)):
+async def list_devices(
+    plotter_type: Optional[str] = Query(None, description="Filter by plotter type"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of devices to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    List all registered devices.
+    List registered devices.
     
-    Returns list of devices from the database.
+    Returns devices ordered by device_id, keyset-paginated (pass next_cursor
+    of a response as cursor). Rollups per device are in GET /api/fleet.
     
     TODO:
-    - Add pagination support
-    - Add filtering by plotter_type, status, etc.
+    - Add filtering by status
     - Implement authentication/authorization
     """
-    devices = db.query(DeviceModel).all()
+    query = select(DeviceModel)
+    if plotter_type:
+        query = query.where(DeviceModel.plotter_type == plotter_type)
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    
+    if cursor:
+        try:
+            (after,) = decode_cursor(cursor, 1)
+            if not isinstance(after, str):
+                raise ValueError("Invalid cursor")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(DeviceModel.device_id > after)
+    
+    # One device beyond the page tells whether there is a next page
+    devices = (await db.scalars(query.order_by(DeviceModel.device_id).limit(limit + 1))).all()
+    next_cursor = None
+    if len(devices) > limit:
+        devices = devices[:limit]
+        next_cursor = encode_cursor(devices[-1].device_id)
+    
     return DeviceListResponse(
         devices=[DeviceResponse.model_validate(device) for device in devices],
-        total=len(devices),
+        total=total,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/devices/{device_id}", response_model=DeviceResponse)
-def get_device(device_id: str, db: Session = Depends(get_db)):
+async def get_device(device_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Get details for a specific device.
     
@@ -65,9 +114,53 @@ def get_device(device_id: str, db: Session = Depends(get_db)):
     - Add authentication/authorization
     - Include additional device metadata (heartbeat stats, file counts)
     """
-    device = db.query(DeviceModel).filter(DeviceModel.device_id == device_id).first()
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.device_id == device_id))
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
     return DeviceResponse.model_validate(device)
 
+
+
+@router.get("/devices/{device_id}/heartbeats/hourly", response_model=HeartbeatHistoryResponse)
+async def get_heartbeat_history(
+    device_id: str,
+    start: Optional[datetime] = Query(None, description="First hour to include (ISO 8601; default: 24 hours ago)"),
+    end: Optional[datetime] = Query(None, description="Last hour to include (ISO 8601; default: now)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Hourly heartbeat statistics of a device.
+    
+    Served from heartbeat_rollups, which outlive the raw heartbeats (see
+    HEARTBEAT_RETENTION_DAYS). Hours without heartbeats are omitted.
+    
+    Query Parameters:
+    - start, end: Window on the start of the hours (inclusive; at most 90 days)
+    
+    Raises:
+        HTTPException 400: If the window is invalid
+        HTTPException 404: If the device is not found
+    """
+    end = as_utc(end) or datetime.utcnow()
+    start = as_utc(start) or end - timedelta(hours=24)
+    if start > end or end - start > timedelta(days=90):
+        raise HTTPException(status_code=400, detail="start must not be after end, nor more than 90 days before it")
+    
+    device = await db.scalar(select(DeviceModel).where(DeviceModel.device_id == device_id))
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    hours = await db.scalars(
+        select(HeartbeatRollup)
+        .where(
+            HeartbeatRollup.device_id == device.id,
+            HeartbeatRollup.bucket_start >= start.replace(minute=0, second=0, microsecond=0),
+            HeartbeatRollup.bucket_start <= end,
+        )
+        .order_by(HeartbeatRollup.bucket_start)
+    )
+    return HeartbeatHistoryResponse(
+        device_id=device.device_id,
+        hours=[HeartbeatHourResponse.model_validate(hour) for hour in hours],
+    )
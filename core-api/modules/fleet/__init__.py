@@ -0,0 +1,5 @@
+"""
+DeckBrain Core API - Fleet module.
+
+Fleet-wide views over many devices: per-device rollups and trip listings.
+"""
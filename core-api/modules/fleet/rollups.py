@@ -0,0 +1,184 @@
+"""
+DeckBrain Core API - Fleet rollup queries.
+
+The dashboard of an owner with many vessels used to request each device's
+trips and heartbeats separately (N + 1 round trips). These queries answer a
+whole page of devices at once with a fixed number of statements:
+
+- device_rollups(): devices with their trip totals (grouped aggregate over
+  the page's trips) and latest heartbeat (device_status, one primary key
+  lookup per device), as one statement
+- fleet_totals(): the same totals over every matching device
+- recent_trips(): the latest N trips of each device on the page, ranked with
+  ROW_NUMBER() per device
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from core.models import Device, DeviceStatus, Trip
+
+
+@dataclass
+class FleetFilter:
+    """Device filters of fleet queries; None means unrestricted."""
+    device_ids: Optional[Sequence[str]] = None  # devices.device_id values
+    plotter_type: Optional[str] = None
+    active_since: Optional[datetime] = None  # last_seen_at at or after (naive UTC)
+
+    def criteria(self) -> List:
+        criteria = []
+        if self.device_ids:
+            criteria.append(Device.device_id.in_(self.device_ids))
+        if self.plotter_type:
+            criteria.append(Device.plotter_type == self.plotter_type)
+        if self.active_since is not None:
+            criteria.append(Device.last_seen_at >= self.active_since)
+        return criteria
+
+
+def device_rollups(db: Session, filters: FleetFilter, limit: int, after: Optional[str] = None) -> List:
+    """
+    A page of devices with their rollups, ordered by device_id.
+
+    Args:
+        db: Database session
+        filters: Device filters
+        limit: Devices to return
+        after: device_id to continue after (keyset)
+
+    Returns:
+        Rows with id, device_id, name, plotter_type, last_seen_at,
+        trip_count, distance_nm, duration_hours, last_trip_start,
+        heartbeat_at, queue_size, last_upload_ok, connector_version
+    """
+    page = select(Device.id).where(*filters.criteria())
+    if after is not None:
+        page = page.where(Device.device_id > after)
+    page = page.order_by(Device.device_id).limit(limit).cte("page")
+
+    trip_totals = (
+        select(
+            Trip.device_id,
+            func.sum(Trip.distance_nm).label("distance_nm"),
+            func.sum(Trip.duration_hours).label("duration_hours"),
+            func.max(Trip.start_time).label("last_trip_start"),
+        )
+        .where(Trip.device_id.in_(select(page.c.id)))
+        .group_by(Trip.device_id)
+        .subquery()
+    )
+    query = (
+        select(
+            Device.id,
+            Device.device_id,
+            Device.name,
+            Device.plotter_type,
+            Device.last_seen_at,
+            Device.trip_count,
+            trip_totals.c.distance_nm,
+            trip_totals.c.duration_hours,
+            trip_totals.c.last_trip_start,
+            DeviceStatus.heartbeat_at,
+            DeviceStatus.queue_size,
+            DeviceStatus.last_upload_ok,
+            DeviceStatus.connector_version,
+        )
+        .join(page, page.c.id == Device.id)
+        .outerjoin(trip_totals, trip_totals.c.device_id == Device.id)
+        .outerjoin(DeviceStatus, DeviceStatus.device_id == Device.id)
+        .order_by(Device.device_id)
+    )
+    return db.execute(query).all()
+
+
+def fleet_totals(db: Session, filters: FleetFilter) -> Dict:
+    """
+    Totals over every device matching the filters.
+
+    Returns:
+        Dict with device_count, trip_count, distance_nm and duration_hours
+    """
+    device_count, trip_count = db.execute(
+        select(func.count(Device.id), func.coalesce(func.sum(Device.trip_count), 0)).where(*filters.criteria())
+    ).one()
+    distance, hours = db.execute(
+        select(
+            func.coalesce(func.sum(Trip.distance_nm), 0.0),
+            func.coalesce(func.sum(Trip.duration_hours), 0.0),
+        ).where(Trip.device_id.in_(select(Device.id).where(*filters.criteria())))
+    ).one()
+    return {
+        "device_count": device_count,
+        "trip_count": int(trip_count),
+        "distance_nm": float(distance),
+        "duration_hours": float(hours),
+    }
+
+
+def recent_trips(db: Session, device_pks: Sequence[int], per_device: int) -> Dict[int, List[Trip]]:
+    """
+    The latest trips of each device.
+
+    Args:
+        db: Database session
+        device_pks: Internal devices.id values
+        per_device: Trips per device
+
+    Returns:
+        Mapping of devices.id to its trips, most recent first
+    """
+    if not device_pks or per_device <= 0:
+        return {}
+    rank = func.row_number().over(
+        partition_by=Trip.device_id,
+        order_by=(Trip.start_time.desc(), Trip.id.desc()),
+    ).label("rank")
+    ranked = select(Trip.id, rank).where(Trip.device_id.in_(device_pks)).subquery()
+    trips = (
+        db.query(Trip)
+        .join(ranked, ranked.c.id == Trip.id)
+        .filter(ranked.c.rank <= per_device)
+        .order_by(Trip.device_id, Trip.start_time.desc(), Trip.id.desc())
+        .all()
+    )
+    by_device: Dict[int, List[Trip]] = {}
+    for trip in trips:
+        by_device.setdefault(trip.device_id, []).append(trip)
+    return by_device
+
+
+def fleet_trips(
+    db: Session,
+    filters: FleetFilter,
+    limit: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[tuple] = None
+) -> List:
+    """
+    Trips of every matching device, most recent first.
+
+    Args:
+        db: Database session
+        filters: Device filters
+        limit: Trips to return
+        start: Only trips starting at or after this time
+        end: Only trips starting at or before this time
+        after: (start_time, id) to continue after (keyset)
+
+    Returns:
+        (Trip, devices.device_id) rows
+    """
+    query = db.query(Trip, Device.device_id).join(Device, Device.id == Trip.device_id).filter(*filters.criteria())
+    if start is not None:
+        query = query.filter(Trip.start_time >= start)
+    if end is not None:
+        query = query.filter(Trip.start_time <= end)
+    if after is not None:
+        query = query.filter(tuple_(Trip.start_time, Trip.id) < after)
+    return query.order_by(Trip.start_time.desc(), Trip.id.desc()).limit(limit).all()
@@ -0,0 +1,188 @@
+"""
+DeckBrain Core API - Fleet endpoints.
+
+Rollups and trip listings across many devices in one request, so dashboards
+of multi-vessel owners don't fetch every device separately.
+"""
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.db import get_async_db
+from core.pagination import decode_cursor, encode_cursor, parse_cursor_datetime
+from modules.soundings.router import as_utc
+from modules.trips.geojson_utils import trip_to_summary_dict
+from .rollups import FleetFilter, device_rollups, fleet_totals, fleet_trips, recent_trips
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class FleetResponse(BaseModel):
+    """Response model for the fleet overview."""
+    devices: List[dict]
+    totals: dict
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page (None on the last page)
+
+
+class FleetTripsResponse(BaseModel):
+    """Response model for the fleet trip listing."""
+    trips: List[dict]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page (None on the last page)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+@router.get("/fleet", response_model=FleetResponse)
+async def get_fleet(
+    device_id: Optional[List[str]] = Query(None, description="Device(s) to include (repeatable); all devices if omitted"),
+    plotter_type: Optional[str] = Query(None, description="Filter by plotter type"),
+    active_since: Optional[datetime] = Query(None, description="Only devices seen at or after this time (ISO 8601)"),
+    recent: int = Query(3, ge=0, le=20, description="Most recent trips to include per device"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of devices to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Overview of many devices: rollups and recent trips per device.
+
+    A page costs a fixed number of queries whatever its size: the devices
+    with their trip totals and latest heartbeat, the fleet totals, and the
+    recent trips of all devices on the page. Devices are ordered by
+    device_id and keyset-paginated.
+
+    Query Parameters:
+    - device_id: Device(s) to include (repeatable; default: all devices)
+    - plotter_type: Only devices of this plotter type
+    - active_since: Only devices seen at or after this time
+    - recent: Trips per device in recent_trips (default: 3, max: 20)
+    - limit: Devices per page (default: 50, max: 200)
+    - cursor: Continue after the previous page
+
+    Returns:
+        FleetResponse with one rollup per device, totals over every
+        matching device (not just this page) and next_cursor
+
+    Raises:
+        HTTPException 400: If the cursor is invalid
+    """
+    after = None
+    if cursor:
+        try:
+            (after,) = decode_cursor(cursor, 1)
+        except ValueError:
+            raise _invalid_cursor()
+        if not isinstance(after, str):
+            raise _invalid_cursor()
+
+    filters = FleetFilter(device_ids=device_id, plotter_type=plotter_type, active_since=as_utc(active_since))
+    logger.info(f"Fleet overview: devices={device_id}, plotter_type={plotter_type}, limit={limit}, cursor={cursor}")
+
+    # One row beyond the page tells whether there is a next page
+    rows = await db.run_sync(device_rollups, filters, limit + 1, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].device_id)
+    trips = await db.run_sync(recent_trips, [row.id for row in rows], recent)
+
+    devices = [
+        {
+            "device_id": row.device_id,
+            "name": row.name,
+            "plotter_type": row.plotter_type,
+            "last_seen_at": _iso(row.last_seen_at),
+            "trip_count": row.trip_count,
+            "total_distance_nm": row.distance_nm or 0.0,
+            "total_hours": row.duration_hours or 0.0,
+            "last_trip_start": _iso(row.last_trip_start),
+            "last_heartbeat": {
+                "received_at": _iso(row.heartbeat_at),
+                "queue_size": row.queue_size,
+                "last_upload_ok": row.last_upload_ok,
+                "connector_version": row.connector_version,
+            } if row.heartbeat_at is not None else None,
+            "recent_trips": [trip_to_summary_dict(trip) for trip in trips.get(row.id, [])],
+        }
+        for row in rows
+    ]
+    totals = await db.run_sync(fleet_totals, filters)
+    return FleetResponse(devices=devices, totals=totals, next_cursor=next_cursor)
+
+
+@router.get("/fleet/trips", response_model=FleetTripsResponse)
+async def list_fleet_trips(
+    device_id: Optional[List[str]] = Query(None, description="Device(s) to include (repeatable); all devices if omitted"),
+    plotter_type: Optional[str] = Query(None, description="Filter by plotter type"),
+    start: Optional[datetime] = Query(None, description="Only trips starting at or after this time (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Only trips starting at or before this time (ISO 8601)"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of trips to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List trips across devices, most recent first.
+
+    Same ordering and keyset pagination as GET /api/trips, but over every
+    matching device; each trip names its device.
+
+    Query Parameters:
+    - device_id: Device(s) to include (repeatable; default: all devices)
+    - plotter_type: Only devices of this plotter type
+    - start, end: Window on trip start times (inclusive)
+    - limit: Trips per page (default: 50, max: 200)
+    - cursor: Continue after the previous page
+
+    Returns:
+        FleetTripsResponse with trip summaries and next_cursor
+
+    Raises:
+        HTTPException 400: If the time window or the cursor is invalid
+    """
+    start, end = as_utc(start), as_utc(end)
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    after = None
+    if cursor:
+        try:
+            start_time, trip_id = decode_cursor(cursor, 2)
+            if not isinstance(trip_id, int):
+                raise ValueError("Invalid cursor")
+            after = (parse_cursor_datetime(start_time), trip_id)
+        except ValueError:
+            raise _invalid_cursor()
+
+    filters = FleetFilter(device_ids=device_id, plotter_type=plotter_type)
+    logger.info(f"Fleet trips: devices={device_id}, plotter_type={plotter_type}, start={start}, end={end}, "
+                f"limit={limit}, cursor={cursor}")
+
+    rows = await db.run_sync(fleet_trips, filters, limit + 1, start, end, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.start_time, last.id)
+
+    trips = []
+    for trip, device_name in rows:
+        summary = trip_to_summary_dict(trip)
+        summary["device"] = device_name
+        trips.append(summary)
+    return FleetTripsResponse(trips=trips, next_cursor=next_cursor)
@@ -0,0 +1,377 @@
+"""
+DeckBrain Core API - Heartbeat write buffer.
+
+Written one by one, every heartbeat costs two write transactions (the
+device's last_seen_at, then the heartbeats row). A fleet of connectors
+beating every 30 s keeps the database's write lock busy for nothing, which
+SQLite serialises. The buffer collects heartbeats in memory and writes them
+in one transaction per flush: a multi-row insert into heartbeats, one
+last_seen_at update per device (the latest time it was seen), and the
+upserts that keep device_status (latest heartbeat per device) and the hourly
+heartbeat_rollups current.
+
+A batch is written every HEARTBEAT_FLUSH_INTERVAL_SECONDS, or as soon as
+HEARTBEAT_FLUSH_MAX_BATCH heartbeats are waiting. HEARTBEAT_WRITE_MODE
+sets what an acknowledged heartbeat guarantees:
+
+- sync: no buffer; each request commits its heartbeat (with status and
+  rollup) before responding, and authentication writes last_seen_at (at
+  most every AUTH_LAST_SEEN_INTERVAL_SECONDS)
+- group: the request waits until the batch holding its heartbeat is
+  committed (at most about one flush interval), so every acknowledged
+  heartbeat is stored; a failed write fails the requests of that batch
+- async: the request is acknowledged on receipt. A batch that fails to
+  write is retried with the next flush; heartbeats not yet written (one
+  flush interval's worth, up to HEARTBEAT_BUFFER_MAX_PENDING while the
+  database is unavailable) are lost if the process dies
+
+The buffer runs on the API event loop (one per API process) and is flushed
+on shutdown.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.config import settings
+from core.db import async_engine
+from core.models import Device, DeviceStatus, Heartbeat, HeartbeatRollup
+
+logger = logging.getLogger(__name__)
+
+
+def heartbeat_row(
+    device_pk: int,
+    queue_size: Optional[int] = None,
+    last_upload_ok: Optional[bool] = None,
+    connector_version: Optional[str] = None
+) -> dict:
+    """heartbeats column values of a heartbeat received now (naive UTC)."""
+    return {
+        "device_id": device_pk,
+        "queue_size": queue_size,
+        "last_upload_ok": last_upload_ok,
+        "connector_version": connector_version,
+        "received_at": datetime.utcnow(),
+    }
+
+
+def rollup_rows(rows: List[dict]) -> List[dict]:
+    """
+    Summarise heartbeats per device and hour, as heartbeat_rollups rows.
+
+    Args:
+        rows: heartbeats column values
+
+    Returns:
+        One row per (device_id, bucket_start)
+    """
+    buckets: Dict[tuple, dict] = {}
+    for row in rows:
+        bucket_start = row["received_at"].replace(minute=0, second=0, microsecond=0)
+        bucket = buckets.get((row["device_id"], bucket_start))
+        if bucket is None:
+            bucket = buckets[(row["device_id"], bucket_start)] = {
+                "device_id": row["device_id"],
+                "bucket_start": bucket_start,
+                "heartbeat_count": 0,
+                "queue_size_min": None,
+                "queue_size_max": None,
+                "queue_size_sum": 0,
+                "queue_size_samples": 0,
+                "upload_failures": 0,
+            }
+        bucket["heartbeat_count"] += 1
+        queue_size = row["queue_size"]
+        if queue_size is not None:
+            if bucket["queue_size_samples"] == 0:
+                bucket["queue_size_min"] = bucket["queue_size_max"] = queue_size
+            else:
+                bucket["queue_size_min"] = min(bucket["queue_size_min"], queue_size)
+                bucket["queue_size_max"] = max(bucket["queue_size_max"], queue_size)
+            bucket["queue_size_sum"] += queue_size
+            bucket["queue_size_samples"] += 1
+        if row["last_upload_ok"] is False:
+            bucket["upload_failures"] += 1
+    return list(buckets.values())
+
+
+def _status_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT that replaces a device's status unless it holds a later heartbeat."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+
+    stmt = upsert(DeviceStatus)
+    status = DeviceStatus.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=["device_id"],
+        set_={
+            "heartbeat_at": stmt.excluded.heartbeat_at,
+            "queue_size": stmt.excluded.queue_size,
+            "last_upload_ok": stmt.excluded.last_upload_ok,
+            "connector_version": stmt.excluded.connector_version,
+        },
+        # Another request or process may have written a later heartbeat
+        where=status.heartbeat_at <= stmt.excluded.heartbeat_at,
+    )
+
+
+def _rollup_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT that merges an hour's heartbeat statistics into the stored row."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+        least, greatest = func.least, func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        least, greatest = func.min, func.max  # SQLite's scalar min()/max()
+
+    stmt = upsert(HeartbeatRollup)
+    rollup = HeartbeatRollup.__table__.c
+    new = stmt.excluded
+    # Either side's min/max is NULL when it has no queue size (SQLite's min()/max() would return NULL)
+    stored_min = func.coalesce(rollup.queue_size_min, new.queue_size_min)
+    stored_max = func.coalesce(rollup.queue_size_max, new.queue_size_max)
+    return stmt.on_conflict_do_update(
+        index_elements=["device_id", "bucket_start"],
+        set_={
+            "heartbeat_count": rollup.heartbeat_count + new.heartbeat_count,
+            "queue_size_min": least(stored_min, func.coalesce(new.queue_size_min, stored_min)),
+            "queue_size_max": greatest(stored_max, func.coalesce(new.queue_size_max, stored_max)),
+            "queue_size_sum": rollup.queue_size_sum + new.queue_size_sum,
+            "queue_size_samples": rollup.queue_size_samples + new.queue_size_samples,
+            "upload_failures": rollup.upload_failures + new.upload_failures,
+        },
+    )
+
+
+async def record_heartbeats(conn: AsyncConnection, rows: List[dict]) -> None:
+    """
+    Insert heartbeats and fold them into device_status and heartbeat_rollups.
+
+    Writes inside the caller's transaction, so the derived rows are
+    committed (or rolled back) with the heartbeats.
+
+    Args:
+        conn: Connection of the transaction
+        rows: heartbeats column values, in the order received
+    """
+    # Latest heartbeat per device (rows are in the order received)
+    latest: Dict[int, dict] = {row["device_id"]: row for row in rows}
+    dialect_name = conn.dialect.name
+
+    await conn.execute(insert(Heartbeat), rows)
+    await conn.execute(
+        _status_statement(dialect_name),
+        [
+            {
+                "device_id": row["device_id"],
+                "heartbeat_at": row["received_at"],
+                "queue_size": row["queue_size"],
+                "last_upload_ok": row["last_upload_ok"],
+                "connector_version": row["connector_version"],
+            }
+            for row in latest.values()
+        ],
+    )
+    await conn.execute(_rollup_statement(dialect_name), rollup_rows(rows))
+
+
+async def write_heartbeats(rows: List[dict]) -> None:
+    """
+    Record heartbeats and advance last_seen_at of their devices, in one transaction.
+
+    Args:
+        rows: heartbeats column values, in the order received
+    """
+    # Latest heartbeat per device (rows are in the order received)
+    last_seen: Dict[int, datetime] = {row["device_id"]: row["received_at"] for row in rows}
+
+    async with async_engine.begin() as conn:
+        await record_heartbeats(conn, rows)
+        # Never move last_seen_at back (another request or process may have seen the device later)
+        await conn.execute(
+            update(Device)
+            .where(
+                Device.id == bindparam("device_pk"),
+                or_(Device.last_seen_at.is_(None), Device.last_seen_at < bindparam("seen_at")),
+            )
+            .values(last_seen_at=bindparam("seen_at")),
+            [{"device_pk": device_pk, "seen_at": seen_at} for device_pk, seen_at in last_seen.items()],
+        )
+
+
+class HeartbeatBuffer:
+    """
+    Collects heartbeats and writes them in batches (see module docstring).
+    """
+
+    def __init__(
+        self,
+        wait_for_write: bool = False,
+        flush_interval: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        """
+        Initialize the buffer (call start() to begin flushing).
+
+        Args:
+            wait_for_write: submit() returns only once the heartbeat is committed ("group" mode)
+            flush_interval: Seconds between flushes (defaults to settings.heartbeat_flush_interval_seconds)
+            max_batch: Waiting heartbeats that trigger an early flush (defaults to settings.heartbeat_flush_max_batch)
+            max_pending: Unwritten heartbeats kept without wait_for_write (defaults to settings.heartbeat_buffer_max_pending)
+        """
+        self.wait_for_write = wait_for_write
+        self.flush_interval = flush_interval if flush_interval is not None else settings.heartbeat_flush_interval_seconds
+        self.max_batch = max(1, max_batch or settings.heartbeat_flush_max_batch)
+        self.max_pending = max(self.max_batch, max_pending or settings.heartbeat_buffer_max_pending)
+        self.written = 0
+        self.dropped = 0
+        self._rows: List[dict] = []
+        self._waiters: List[asyncio.Future] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the flush loop on the running event loop."""
+        self._loop_task = asyncio.get_running_loop().create_task(self._run())
+        mode = "group" if self.wait_for_write else "async"
+        logger.info(f"Heartbeat buffer started: mode={mode}, flush every {self.flush_interval}s or {self.max_batch} heartbeats")
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write everything still buffered."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._loop_task:
+            await self._loop_task
+        await self.flush()
+        logger.info(f"Heartbeat buffer stopped ({self.written} written, {self.dropped} dropped)")
+
+    async def submit(
+        self,
+        device_pk: int,
+        queue_size: Optional[int] = None,
+        last_upload_ok: Optional[bool] = None,
+        connector_version: Optional[str] = None
+    ) -> datetime:
+        """
+        Buffer a heartbeat of an authenticated device.
+
+        Args:
+            device_pk: devices.id
+            queue_size: Files waiting in the connector's queue
+            last_upload_ok: Whether the connector's last upload succeeded
+            connector_version: Connector software version
+
+        Returns:
+            received_at of the heartbeat (naive UTC), also the device's new last_seen_at
+
+        Raises:
+            Exception: With wait_for_write, the error that failed the batch write
+        """
+        row = heartbeat_row(device_pk, queue_size, last_upload_ok, connector_version)
+        self._rows.append(row)
+        if len(self._rows) >= self.max_batch:
+            self._wakeup.set()
+        if self.wait_for_write:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        else:
+            self._trim()
+        return row["received_at"]
+
+    async def flush(self) -> int:
+        """
+        Write the buffered heartbeats now.
+
+        Returns:
+            Number of heartbeats written
+        """
+        async with self._flush_lock:
+            rows, waiters = self._rows, self._waiters
+            self._rows, self._waiters = [], []
+            if not rows:
+                return 0
+            try:
+                await write_heartbeats(rows)
+            except Exception as e:
+                if waiters:
+                    logger.error(f"Failed to write {len(rows)} heartbeats: {e}")
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    # Acknowledged already: keep them (oldest first) for the next flush
+                    logger.warning(f"Failed to write {len(rows)} heartbeats, retrying with the next flush: {e}")
+                    self._rows[:0] = rows
+                    self._trim()
+                return 0
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            self.written += len(rows)
+            logger.debug(f"Wrote {len(rows)} heartbeats")
+            return len(rows)
+
+    def _trim(self) -> None:
+        """Drop the oldest unwritten heartbeats beyond max_pending."""
+        excess = len(self._rows) - self.max_pending
+        if excess > 0:
+            del self._rows[:excess]
+            self.dropped += excess
+            logger.warning(f"Heartbeat buffer full: dropped the {excess} oldest unwritten heartbeats")
+
+    async def _run(self) -> None:
+        """Flush loop: every flush_interval, or early when a batch is full."""
+        retrying = False
+        while not self._stopping:
+            if retrying:
+                # The database just failed a write: wait out the interval even if the batch is full
+                await asyncio.sleep(self.flush_interval)
+            elif len(self._rows) < self.max_batch:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                retrying = await self.flush() == 0 and bool(self._rows)
+            except Exception as e:
+                logger.error(f"Heartbeat flush failed: {e}", exc_info=True)
+                retrying = True
+
+
+# Buffer started by the API process (see app.main) unless HEARTBEAT_WRITE_MODE=sync
+_buffer: Optional[HeartbeatBuffer] = None
+
+
+def get_heartbeat_buffer() -> Optional[HeartbeatBuffer]:
+    """The running heartbeat buffer, or None when heartbeats are written per request."""
+    return _buffer
+
+
+def start_heartbeat_buffer() -> Optional[HeartbeatBuffer]:
+    """Start the global heartbeat buffer on the running event loop (unless the write mode is "sync")."""
+    global _buffer
+    if _buffer is None and settings.heartbeat_write_mode != "sync":
+        _buffer = HeartbeatBuffer(wait_for_write=settings.heartbeat_write_mode == "group")
+        _buffer.start()
+    return _buffer
+
+
+async def stop_heartbeat_buffer() -> None:
+    """Stop the global heartbeat buffer, writing what it still holds."""
+    global _buffer
+    if _buffer is not None:
+        buffer, _buffer = _buffer, None
+        await buffer.stop()
@@ -0,0 +1,108 @@
+"""
+DeckBrain Core API - Heartbeat retention.
+
+Every connector beats every 30 s or so, for as long as it runs: kept
+forever, heartbeats grow without bound while nothing reads old ones. The
+latest status of each device lives in device_status and hourly statistics
+in heartbeat_rollups (see modules.heartbeat.buffer), so raw heartbeats are
+only kept for HEARTBEAT_RETENTION_DAYS. Rollups, one row per device and
+hour, can be pruned too with HEARTBEAT_ROLLUP_RETENTION_DAYS.
+
+Heartbeats are deleted in batches of DELETE_BATCH_SIZE, one short
+transaction each, so the job never holds the write lock for long. The API
+process runs it every HEARTBEAT_RETENTION_INTERVAL_MINUTES; with several
+API processes each runs it, which is harmless (a batch deletes only what is
+still there). scripts/prune_heartbeats.py runs it once, e.g. from cron.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+
+from core.config import settings
+from core.db import async_engine
+from core.models import Heartbeat, HeartbeatRollup
+
+logger = logging.getLogger(__name__)
+
+# Heartbeats deleted per transaction
+DELETE_BATCH_SIZE = 10000
+
+
+async def _delete_heartbeats_before(cutoff: datetime, batch_size: int) -> int:
+    """Delete heartbeats received before cutoff, batch by batch; returns the count."""
+    deleted = 0
+    while True:
+        batch = select(Heartbeat.id).where(Heartbeat.received_at < cutoff).limit(batch_size)
+        async with async_engine.begin() as conn:
+            result = await conn.execute(delete(Heartbeat).where(Heartbeat.id.in_(batch)))
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+async def prune_heartbeats(now: Optional[datetime] = None, batch_size: int = DELETE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Delete heartbeats (and rollups) beyond their retention horizon.
+
+    Args:
+        now: Reference time (naive UTC; defaults to now)
+        batch_size: Heartbeats deleted per transaction
+
+    Returns:
+        Rows deleted: {"heartbeats": n, "heartbeat_rollups": n}
+    """
+    now = now or datetime.utcnow()
+    deleted = {"heartbeats": 0, "heartbeat_rollups": 0}
+    if settings.heartbeat_retention_days > 0:
+        cutoff = now - timedelta(days=settings.heartbeat_retention_days)
+        deleted["heartbeats"] = await _delete_heartbeats_before(cutoff, batch_size)
+    if settings.heartbeat_rollup_retention_days > 0:
+        # One row per device and hour: small enough for one statement
+        cutoff = now - timedelta(days=settings.heartbeat_rollup_retention_days)
+        async with async_engine.begin() as conn:
+            result = await conn.execute(delete(HeartbeatRollup).where(HeartbeatRollup.bucket_start < cutoff))
+        deleted["heartbeat_rollups"] = result.rowcount
+    if any(deleted.values()):
+        logger.info(f"Heartbeat retention: deleted {deleted['heartbeats']} heartbeats, "
+                    f"{deleted['heartbeat_rollups']} hourly rollups")
+    return deleted
+
+
+async def _run(interval: float) -> None:
+    """Retention loop: prune now, then every interval seconds."""
+    while True:
+        try:
+            await prune_heartbeats()
+        except Exception as e:
+            logger.error(f"Heartbeat retention failed: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+# Retention loop of the API process (see app.main)
+_task: Optional[asyncio.Task] = None
+
+
+def start_heartbeat_retention() -> Optional[asyncio.Task]:
+    """Start the retention loop on the running event loop (unless HEARTBEAT_RETENTION_INTERVAL_MINUTES is 0)."""
+    global _task
+    if _task is None and settings.heartbeat_retention_interval_minutes > 0:
+        _task = asyncio.get_running_loop().create_task(_run(settings.heartbeat_retention_interval_minutes * 60))
+        logger.info(f"Heartbeat retention started: every {settings.heartbeat_retention_interval_minutes} min, "
+                    f"heartbeats kept {settings.heartbeat_retention_days} days")
+    return _task
+
+
+async def stop_heartbeat_retention() -> None:
+    """Stop the retention loop (a batch in progress is rolled back)."""
+    global _task
+    if _task is not None:
+        task, _task = _task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
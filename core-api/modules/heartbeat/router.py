@@ -4,17 +4,18 @@ DeckBrain Core API - Heartbeat endpoints.
 Handles periodic status updates from connectors.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import OperationalError
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 import logging
 
-from core.db import get_db
-from core.models import Device, Heartbeat
-from core.auth import get_authenticated_device
+from core.db import get_async_db
+from core.models import Device
+from core.auth import authenticate_device
+from .buffer import get_heartbeat_buffer, heartbeat_row, record_heartbeats
 
 
 logger = logging.getLogger(__name__)
@@ -35,16 +36,39 @@ class HeartbeatResponse(BaseModel):
     received_at: datetime
 
 
+async def get_heartbeat_device(
+    x_device_id: str = Header(..., alias="X-Device-ID"),
+    x_api_key: str = Header(..., alias="X-API-Key"),
+    x_plotter_type: Optional[str] = Header(None, alias="X-Plotter-Type"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Device:
+    """
+    get_authenticated_device() for heartbeats.
+    
+    While the heartbeat buffer runs, last_seen_at is not committed here but
+    written with the buffered heartbeat.
+    """
+    return await authenticate_device(
+        db, x_device_id, x_api_key, x_plotter_type,
+        touch=get_heartbeat_buffer() is None
+    )
+
+
 @router.post("/heartbeat", response_model=HeartbeatResponse)
-def receive_heartbeat(
+async def receive_heartbeat(
     request: HeartbeatRequest,
-    device: Device = Depends(get_authenticated_device),
-    db: Session = Depends(get_db)
+    device: Device = Depends(get_heartbeat_device),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Receive heartbeat from connector.
     
-    Stores heartbeat data for an authenticated device.
+    Stores heartbeat data for an authenticated device and updates its
+    last_seen_at, its device_status row and the hourly heartbeat_rollups.
+    Depending on HEARTBEAT_WRITE_MODE the heartbeat is committed before the
+    response ("sync"), batched and committed before the response ("group"),
+    or batched and written within HEARTBEAT_FLUSH_INTERVAL_SECONDS of the
+    response ("async", default); see modules/heartbeat/buffer.py.
     
     Headers:
     - X-Device-ID: Required. Unique device identifier.
@@ -58,27 +82,37 @@ def receive_heartbeat(
     """
     try:
         # Device is already authenticated by dependency
-        # last_seen_at is already updated by auth dependency
-        
-        # Create heartbeat record
-        heartbeat = Heartbeat(
-            device_id=device.id,
-            queue_size=request.queue_size,
-            last_upload_ok=request.last_upload_ok,
-            connector_version=request.connector_version,
-        )
-        db.add(heartbeat)
-        
-        # Commit transaction
-        db.commit()
-        db.refresh(heartbeat)
+        buffer = get_heartbeat_buffer()
+        if buffer is not None:
+            # Batched with other heartbeats, together with last_seen_at. Return the
+            # session's connection first: the flush needs one from the same pool
+            await db.close()
+            received_at = await buffer.submit(
+                device.id,
+                queue_size=request.queue_size,
+                last_upload_ok=request.last_upload_ok,
+                connector_version=request.connector_version,
+            )
+        else:
+            # last_seen_at is updated by the auth dependency
+            row = heartbeat_row(
+                device.id,
+                queue_size=request.queue_size,
+                last_upload_ok=request.last_upload_ok,
+                connector_version=request.connector_version,
+            )
+            await record_heartbeats(await db.connection(), [row])
+            
+            # Commit transaction
+            await db.commit()
+            received_at = row["received_at"]
         
         logger.info(f"Heartbeat received from device {device.device_id}")
         
         return HeartbeatResponse(
             status="ok",
             device_id=device.device_id,
-            received_at=heartbeat.received_at,
+            received_at=received_at,
         )
     except OperationalError as e:
         # Check if error is about missing tables
@@ -92,4 +126,3 @@ def receive_heartbeat(
         # Re-raise other operational errors
         logger.error(f"OperationalError in heartbeat: {e}")
         raise
-
@@ -0,0 +1,5 @@
+"""
+DeckBrain Core API - History module.
+
+Long-term views of a device's fishing: ground coverage and hot zones.
+"""
@@ -0,0 +1,277 @@
+"""
+DeckBrain Core API - Towing coverage index.
+
+Coverage ("where have I towed, and how much") would cost a scan of every
+towing sounding a device ever recorded if computed on request. Instead,
+ingestion maintains coverage_cells as the segmenter builds tows: for every
+cell of a multi-resolution latitude/longitude grid (level 0 cells of
+COVERAGE_CELL_SIZE_DEG degrees, each level doubling the cell size, the same
+layout as the bathymetry grid) it keeps the time spent towing there and the
+number of distinct tows that passed through.
+
+Towing time is attributed fix by fix: the interval since the previous fix
+of the tow goes to the cell of the later fix. A tow is only counted once it
+reaches TOW_MIN_DURATION_MINUTES, since shorter tows are dropped again by
+the segmenter; until then its fixes are held in memory (or reloaded from
+the tow's soundings when a later file resumes it).
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import CoverageCell, Sounding, Tow, Trip
+from modules.bathymetry.grid import cell_coordinates, viewport_cells
+from modules.soundings.store import read_track
+from modules.tiles.cells import split_key, tile_key
+from modules.trips.aggregates import datetime_to_epoch
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("device_id", "level", "cell_x", "cell_y", "tow_seconds", "tow_count")
+
+
+def _merge_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT that adds a cell's towing time and tow count to the stored row."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(CoverageCell)
+    cell = CoverageCell.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=["device_id", "level", "cell_x", "cell_y"],
+        set_={
+            "tow_seconds": cell.tow_seconds + stmt.excluded.tow_seconds,
+            "tow_count": cell.tow_count + stmt.excluded.tow_count,
+        },
+    )
+
+
+class CoverageAggregator:
+    """
+    Merges the tows of one device into coverage_cells.
+
+    Driven by the TripSegmenter, which reports every slice of soundings it
+    assigns to a tow, the tow it resumes from an earlier file, and the tows
+    it drops as too short. Writes go into the caller's transaction.
+    """
+
+    def __init__(self, db: Session, device_id: int):
+        """
+        Args:
+            db: Database session
+            device_id: Internal devices.id the tows belong to
+        """
+        self.db = db
+        self.device_id = device_id
+        self.cell_size = settings.coverage_cell_size_deg
+        self.levels = settings.coverage_levels
+        self.min_duration = settings.tow_min_duration_minutes * 60.0
+        self._sql: Optional[str] = None
+        self._positions: Optional[List[str]] = None
+        self.cells_written = 0
+        self._start(None)
+
+    def _start(self, tow_id: Optional[int]) -> None:
+        """Reset the per-tow state for a new current tow."""
+        self._tow_id = tow_id
+        self._seen: List[np.ndarray] = [np.empty(0, dtype=np.int64)] * self.levels  # Counted cells, per level
+        self._last_ts: Optional[float] = None  # Last counted fix
+        self._pending = [np.empty(0)] * 3  # Fixes (ts, lat, lon) of a tow not counted yet
+
+    def _counted(self, tow: Tow) -> bool:
+        return (tow.duration_hours or 0.0) * 3600.0 >= self.min_duration
+
+    def _prepare(self) -> None:
+        """Compile the upsert once; rows bypass SQLAlchemy's per-row bind processing."""
+        dialect = self.db.connection().dialect
+        compiled = _merge_statement(dialect.name).compile(dialect=dialect)
+        self._sql = str(compiled)
+        self._positions = list(compiled.positiontup) if compiled.positional else None
+
+    def resume_tow(self, tow: Tow) -> None:
+        """
+        Continue a tow stored by an earlier ingestion.
+
+        Args:
+            tow: The open tow the segmenter resumes
+        """
+        self._start(tow.id)
+        rows = self.db.execute(
+            select(Sounding.timestamp, Sounding.latitude, Sounding.longitude)
+            .where(Sounding.tow_id == tow.id)
+            .order_by(Sounding.timestamp, Sounding.id)
+        ).all()
+        if not rows:
+            return
+        ts = np.array([datetime_to_epoch(row.timestamp) for row in rows])
+        lat = np.array([row.latitude for row in rows])
+        lon = np.array([row.longitude for row in rows])
+        if not self._counted(tow):
+            self._pending = [ts, lat, lon]
+            return
+        # Already in coverage_cells: only remember where it has been
+        ix, iy = cell_coordinates(lat, lon, self.cell_size)
+        self._seen = [np.unique(tile_key(ix >> level, iy >> level)) for level in range(self.levels)]
+        self._last_ts = float(ts[-1])
+
+    def add_tow_soundings(self, tow: Tow, ts: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> None:
+        """
+        Add fixes assigned to a tow (after its aggregates were updated).
+
+        Args:
+            tow: Tow the fixes belong to
+            ts: UTC epoch seconds, ascending
+            lat: Latitudes in degrees
+            lon: Longitudes in degrees
+        """
+        if len(ts) == 0:
+            return
+        if tow.id != self._tow_id:
+            self._start(tow.id)
+        ts, lat, lon = (np.concatenate((held, new)) for held, new in zip(self._pending, (ts, lat, lon)))
+        if not self._counted(tow):
+            self._pending = [ts, lat, lon]
+            return
+        self._pending = [np.empty(0)] * 3
+        self._merge(ts, lat, lon)
+
+    def drop_tow(self, tow: Tow) -> None:
+        """Forget a tow the segmenter dropped as too short (it was never counted)."""
+        if tow.id == self._tow_id:
+            self._start(None)
+
+    def _merge(self, ts: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> None:
+        """Upsert the towing time and new cells of counted fixes of the current tow."""
+        if self._sql is None:
+            self._prepare()
+
+        dt = np.diff(ts, prepend=ts[0] if self._last_ts is None else self._last_ts)
+        self._last_ts = float(ts[-1])
+        ix, iy = cell_coordinates(lat, lon, self.cell_size)
+
+        columns: Dict[str, List] = {name: [] for name in COLUMNS}
+        for level in range(self.levels):
+            keys, inverse = np.unique(tile_key(ix >> level, iy >> level), return_inverse=True)
+            seconds = np.bincount(inverse.ravel(), weights=dt, minlength=len(keys))
+            new = ~np.isin(keys, self._seen[level], assume_unique=True)
+            self._seen[level] = np.union1d(self._seen[level], keys)
+            cell_x, cell_y = split_key(keys)
+            columns["device_id"].extend([self.device_id] * len(keys))
+            columns["level"].extend([level] * len(keys))
+            columns["cell_x"].extend(cell_x.tolist())
+            columns["cell_y"].extend(cell_y.tolist())
+            columns["tow_seconds"].extend(seconds.tolist())
+            columns["tow_count"].extend(new.astype(int).tolist())
+
+        if self._positions is not None:
+            rows = list(zip(*(columns[name] for name in self._positions)))
+        else:
+            rows = [dict(zip(COLUMNS, values)) for values in zip(*(columns[name] for name in COLUMNS))]
+        self.db.connection().exec_driver_sql(self._sql, rows)
+        self.cells_written += len(rows)
+
+
+def rebuild_coverage_cells(db: Session, device_id: int) -> int:
+    """
+    Replace a device's coverage_cells with a fresh aggregation of its tows.
+
+    Runs in the caller's transaction (nothing is committed here).
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+
+    Returns:
+        Number of tows aggregated
+    """
+    db.query(CoverageCell).filter(CoverageCell.device_id == device_id).delete(synchronize_session=False)
+    aggregator = CoverageAggregator(db, device_id)
+    tows = (
+        db.query(Tow)
+        .join(Trip, Tow.trip_id == Trip.id)
+        .filter(Trip.device_id == device_id)
+        .order_by(Tow.start_time, Tow.id)
+        .all()
+    )
+    # Tows come grouped by trip: one read per trip (segment or rows), split into its tows
+    track, track_trip_id = None, None
+    for tow in tows:
+        if tow.trip_id != track_trip_id:
+            track, track_trip_id = read_track(db, tow.trip), tow.trip_id
+        in_tow = track["tow_id"] == tow.id
+        aggregator.add_tow_soundings(
+            tow,
+            track["time"][in_tow] / 1e6,
+            track["latitude"][in_tow],
+            track["longitude"][in_tow],
+        )
+    return len(tows)
+
+
+def read_coverage(
+    db: Session,
+    device_id: int,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    max_size: int
+) -> Dict:
+    """
+    Read the covered cells of a bounding box.
+
+    The finest level whose cells cover the box in at most max_size columns
+    and rows is used (see modules.bathymetry.grid.viewport_cells).
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+        min_lat, min_lon, max_lat, max_lon: Bounding box in degrees (min_lon <= max_lon)
+        max_size: Largest number of cell columns/rows
+
+    Returns:
+        Dict with level, cell_size, bounds and the non-empty cells (as columns)
+
+    Raises:
+        ValueError: If the box does not fit max_size even at the coarsest level
+    """
+    level, x0, y0, x1, y1 = viewport_cells(
+        settings.coverage_cell_size_deg, settings.coverage_levels, min_lat, min_lon, max_lat, max_lon, max_size
+    )
+    size = settings.coverage_cell_size_deg * (1 << level)
+
+    cell = CoverageCell.__table__.c
+    rows = db.connection().execute(
+        select(cell.cell_x, cell.cell_y, cell.tow_seconds, cell.tow_count).where(
+            cell.device_id == device_id,
+            cell.level == level,
+            cell.cell_x.between(x0, x1),
+            cell.cell_y.between(y0, y1),
+        )
+    ).all()
+
+    values = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 4)
+    hours = np.round(values[:, 2] / 3600.0, 3)
+    counts = values[:, 3].astype(np.int64)
+    return {
+        "level": level,
+        "cell_size": size,
+        "bounds": [x0 * size - 180.0, y0 * size - 90.0, (x1 + 1) * size - 180.0, (y1 + 1) * size - 90.0],
+        "cell_count": len(rows),
+        "max_tow_hours": float(hours.max()) if len(rows) else 0.0,
+        "max_tow_count": int(counts.max()) if len(rows) else 0,
+        # Columnar: one array per property, cell i is element i of each
+        "cells": {
+            "west": np.round(values[:, 0] * size - 180.0, 7).tolist(),
+            "south": np.round(values[:, 1] * size - 90.0, 7).tolist(),
+            "tow_hours": hours.tolist(),
+            "tow_count": counts.tolist(),
+        },
+    }
@@ -0,0 +1,77 @@
+"""
+DeckBrain Core API - History endpoints.
+
+Serves a device's long-term towing coverage.
+"""
+
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.db import get_read_db
+from core.models import Device
+from modules.soundings.router import parse_bbox
+from .coverage import read_coverage
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/history/coverage")
+def get_coverage(
+    device_id: str = Query(..., description="Device whose tows make up the coverage"),
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat in degrees"),
+    size: int = Query(
+        256, ge=1, le=settings.coverage_max_viewport_size,
+        description="Largest viewport width/height, in cells"
+    ),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a device's towing coverage in a viewport.
+    
+    Coverage is read from the precomputed coverage index at the finest grid
+    level whose cells cover the bounding box in at most `size` columns and
+    rows. Only cells that were towed through are returned.
+    
+    Query Parameters:
+    - device_id: Device to read (required)
+    - bbox: Bounding box "min_lon,min_lat,max_lon,max_lat" (required)
+    - size: Largest viewport width/height in cells (default: 256)
+    
+    Returns:
+        Grid level, cell size, bounds, and the towed cells as columns: the
+        south-west corner, hours towed and number of distinct tows of each
+        
+    Raises:
+        HTTPException 400: If bbox is invalid, crosses the antimeridian or is too large for size
+        HTTPException 404: If the device is not found
+    """
+    min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox)
+    if min_lon > max_lon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox must not cross the antimeridian"
+        )
+    
+    device = db.query(Device).filter(Device.device_id == device_id).first()
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device not found: {device_id}"
+        )
+    
+    try:
+        coverage = read_coverage(db, device.id, min_lat, min_lon, max_lat, max_lon, size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    logger.info(f"Coverage for {device_id}: bbox={bbox}, level={coverage['level']}, {coverage['cell_count']} cells")
+    # Serialised directly: the cell columns are plain lists, FastAPI's encoder would walk every value
+    body = json.dumps({"device_id": device_id, **coverage}, separators=(",", ":")).encode()
+    return Response(content=body, media_type="application/json")
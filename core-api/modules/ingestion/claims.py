@@ -0,0 +1,77 @@
+"""
+DeckBrain Core API - Ingestion claims.
+
+A worker owns a file_record while its claimed_by and claimed_at are the
+values the worker wrote (see modules.ingestion.worker.claim_files). A claim
+older than INGESTION_CLAIM_TIMEOUT_SECONDS is considered abandoned and may
+be taken over, so a file that takes longer than that to ingest keeps its
+claim fresh: Claim.renew() moves claimed_at forward with a compare-and-swap
+on both columns, in the same transaction as every commit of the file's
+soundings and status.
+
+A renewal rolled back with its transaction leaves the previous value in
+place, so both the last and the previous value written are accepted. When
+the swap matches neither, another worker has taken the file over. The
+attempt then stops with ClaimLostError, without writing, cleaning up or
+recording anything for the file: all of that belongs to the new owner.
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core.models import FileRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimLostError(Exception):
+    """Raised when another worker has taken over a file this worker was ingesting."""
+    pass
+
+
+class Claim:
+    """A worker's claim on a file_record, as last written by that worker."""
+
+    def __init__(self, file_record_id: int, worker_id: str, claimed_at: datetime):
+        """
+        Args:
+            file_record_id: ID of the claimed FileRecord
+            worker_id: claimed_by written by the worker
+            claimed_at: claimed_at written by the worker (naive UTC)
+        """
+        self.file_record_id = file_record_id
+        self.worker_id = worker_id
+        self.claimed_at = claimed_at
+        self._previous = claimed_at  # Still in place if the last renewal was rolled back
+
+    def owned(self):
+        """SQL condition matching the file_record only while this claim holds."""
+        return (
+            (FileRecord.id == self.file_record_id)
+            & (FileRecord.claimed_by == self.worker_id)
+            & FileRecord.claimed_at.in_([self.claimed_at, self._previous])
+        )
+
+    def renew(self, db: Session) -> None:
+        """
+        Move claimed_at to now in the session's transaction (committed with it).
+
+        Raises:
+            ClaimLostError: If another worker has taken the file over
+        """
+        now = datetime.utcnow()
+        result = db.execute(
+            update(FileRecord)
+            .where(self.owned(), FileRecord.processing_status == "processing")
+            .values(claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            logger.warning(f"Worker {self.worker_id} lost its claim on file_record {self.file_record_id}")
+            raise ClaimLostError(
+                f"FileRecord {self.file_record_id} was claimed by another worker during ingestion"
+            )
+        self._previous, self.claimed_at = self.claimed_at, now
@@ -0,0 +1,129 @@
+"""
+DeckBrain Core API - Removal of a failed file's soundings.
+
+Ingestion commits a file's soundings every INGESTION_COMMIT_SOUNDINGS (see
+modules.ingestion.sink), so a file that fails after its first commit, or
+whose worker died, leaves part of its data behind. Every sounding records
+the file_record_id it was ingested from, and discard_file_soundings()
+removes them again:
+
+1. The file's soundings are deleted, DELETE_BATCH_SIZE per transaction
+2. Trips and tows that received them are recomputed from their remaining
+   soundings (modules.trips.aggregates), or deleted when none are left
+3. The device's vector tile, bathymetry and coverage cells are rebuilt
+   from what remains (their depth min/max cannot be un-merged), and the
+   cached tiles and tracks involved are dropped
+
+ingest_file() calls it when an attempt fails, and before parsing a file
+that still has soundings from an earlier attempt. Files that fail before
+their first commit are simply rolled back and never get here.
+"""
+
+import logging
+from pathlib import Path
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import FileRecord, Sounding, SoundingSegment, Tow, Trip
+from modules.bathymetry.grid import rebuild_bathymetry_cells
+from modules.history.coverage import rebuild_coverage_cells
+from modules.soundings.store import write_segments
+from modules.tiles.cache import get_tile_cache
+from modules.tiles.cells import rebuild_tile_cells
+from modules.trips.aggregates import adjust_trip_count, apply_aggregates, recompute_tow, recompute_trip
+from modules.trips.track_cache import invalidate_trips
+
+logger = logging.getLogger(__name__)
+
+# Soundings deleted per transaction
+DELETE_BATCH_SIZE = 10000
+
+
+def discard_file_soundings(db: Session, file_record: FileRecord) -> int:
+    """
+    Remove everything a partially ingested file committed (commits as it goes).
+
+    Args:
+        db: Database session (nothing may be pending in it)
+        file_record: File whose soundings are removed
+
+    Returns:
+        Number of soundings deleted (0 if the file has none)
+    """
+    file_record_id, device_id = file_record.id, file_record.device_id
+    touched = (
+        db.query(Sounding.trip_id, Sounding.tow_id)
+        .filter(Sounding.file_record_id == file_record_id)
+        .distinct()
+        .all()
+    )
+    if not touched:
+        return 0
+    trip_ids = {trip_id for trip_id, _ in touched if trip_id is not None}
+    tow_ids = {tow_id for _, tow_id in touched if tow_id is not None}
+    logger.warning(f"Discarding soundings of file_record {file_record_id} "
+                   f"({len(trip_ids)} trip(s), {len(tow_ids)} tow(s) affected)")
+
+    deleted = 0
+    while True:
+        batch = select(Sounding.id).where(Sounding.file_record_id == file_record_id).limit(DELETE_BATCH_SIZE)
+        result = db.execute(
+            delete(Sounding).where(Sounding.id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < DELETE_BATCH_SIZE:
+            break
+
+    # Bulk deletes below: the relationship cascades would load (and delete) soundings
+    empty_tows = []
+    for tow in db.query(Tow).filter(Tow.id.in_(tow_ids)).all():
+        values = recompute_tow(db, tow)
+        if values["sounding_count"]:
+            apply_aggregates(tow, values)
+        else:
+            empty_tows.append(tow.id)
+    empty_trips = []
+    for trip in db.query(Trip).filter(Trip.id.in_(trip_ids)).all():
+        values = recompute_trip(db, trip)
+        if values["sounding_count"]:
+            apply_aggregates(trip, values)
+        else:
+            empty_trips.append(trip.id)
+    db.flush()
+    segment_paths = [
+        path for path, in db.query(SoundingSegment.path).filter(SoundingSegment.trip_id.in_(empty_trips))
+    ]
+    db.execute(delete(Tow).where(Tow.id.in_(empty_tows) | Tow.trip_id.in_(empty_trips)))
+    db.execute(delete(SoundingSegment).where(SoundingSegment.trip_id.in_(empty_trips)))
+    db.execute(delete(Trip).where(Trip.id.in_(empty_trips)))
+    if empty_trips:
+        adjust_trip_count(db, device_id, -len(empty_trips))
+    db.commit()
+    for path in segment_paths:
+        (Path(settings.storage_path) / path).unlink(missing_ok=True)
+
+    if settings.tile_aggregation_enabled:
+        rebuild_tile_cells(db, device_id)
+        db.commit()
+    if settings.bathymetry_enabled:
+        rebuild_bathymetry_cells(db, device_id)
+        db.commit()
+    if settings.coverage_enabled:
+        rebuild_coverage_cells(db, device_id)
+        db.commit()
+
+    invalidate_trips(trip_ids)
+    cache = get_tile_cache()
+    if cache is not None:
+        cache.clear_device(device_id)
+    remaining = trip_ids.difference(empty_trips)
+    if remaining and settings.sounding_store_backend == "segments":
+        write_segments(db, remaining)
+
+    logger.warning(f"Discarded {deleted} soundings of file_record {file_record_id}: "
+                   f"{len(empty_trips)} trip(s) and {len(empty_tows)} tow(s) removed, "
+                   f"{len(remaining)} trip(s) recomputed")
+    return deleted
@@ -6,10 +6,13 @@ Defines the abstract interface that all vendor-specific parsers must implement.
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
 from core.models import FileRecord
 
+if TYPE_CHECKING:
+    from ..sink import SoundingSink
+
 
 @dataclass
 class ParseResult:
@@ -19,13 +22,16 @@ class ParseResult:
     Attributes:
         success: Whether parsing completed successfully
         message: Human-readable message describing the result
-        parsed_entities: List of entities extracted from the file (trips, tows, soundings, marks)
+        parsed_entities: List of small entities extracted from the file (trips, tows, marks)
         metadata: Optional additional metadata from parsing
+        soundings_count: Number of soundings streamed to the SoundingSink
+            (soundings are never returned in parsed_entities)
     """
     success: bool
     message: str
     parsed_entities: List[Dict[str, Any]]
     metadata: Optional[Dict[str, Any]] = None
+    soundings_count: int = 0
 
 
 class BaseParser(ABC):
@@ -38,6 +44,9 @@ class BaseParser(ABC):
     2. Reading and interpreting the file format
     3. Extracting normalized entities (trips, tows, soundings, marks)
     4. Returning a ParseResult with success/failure status
+    
+    Soundings can number in the millions per file, so parsers stream them to
+    the SoundingSink in fixed-size batches rather than returning them.
     """
     
     @property
@@ -67,12 +76,13 @@ class BaseParser(ABC):
         pass
     
     @abstractmethod
-    def parse(self, file_record: FileRecord) -> ParseResult:
+    def parse(self, file_record: FileRecord, sink: Optional["SoundingSink"] = None) -> ParseResult:
         """
         Parse a raw plotter file and extract normalized entities.
         
         Args:
             file_record: FileRecord to parse (includes remote_path, source_format, etc.)
+            sink: Destination for sounding batches (None for a dry run that only counts)
             
         Returns:
             ParseResult with success status, message, and extracted entities
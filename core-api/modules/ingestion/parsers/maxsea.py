@@ -1,71 +1,361 @@
 """
-DeckBrain Core API - MaxSea parser stub.
+DeckBrain Core API - MaxSea parser.
 
-This is a STUB implementation. No real MaxSea parsing is performed yet.
-The parser validates it can handle MaxSea files but returns a "not implemented" result.
+Decodes MaxSea / TimeZero binary track files (.mf2 and track members of TZ
+backup archives) into soundings.
+
+Track files are memory-mapped and decoded with a NumPy structured dtype,
+one batch of settings.ingestion_batch_size records at a time, so no Python
+object is created per record and the file is never read into memory as a
+whole. Zip archives (TZ backups) are scanned for track members: stored
+(uncompressed) members are memory-mapped in place inside the archive,
+compressed members are first streamed to a temp file next to the storage
+tree and mapped from there.
+
+PROVISIONAL LAYOUT: no MaxSea samples have been inspected yet (see
+docs/research/maxsea/README.md). The layout below is the fixed-width track
+record layout DeckBrain expects; files that do not start with the track
+header are reported as not recognised and left unparsed (stub result),
+exactly as before this parser existed.
+
+    Header (16 bytes, little-endian):
+        magic          4s   b"MF2T"
+        version        u2   layout version (1)
+        record_size    u2   bytes per record (24)
+        record_count   u4   number of records (0 = until end of data)
+        reserved       4x
+
+    Record (24 bytes, little-endian):
+        time           i4   UTC epoch seconds
+        lat_e7         i4   latitude  * 1e7
+        lon_e7         i4   longitude * 1e7
+        depth_m        f4   depth in meters (NaN/<=0 = no depth)
+        water_temp_c   f4   water temperature (NaN = missing)
+        speed_cknots   u2   speed over ground in 1/100 knots (0xFFFF = missing)
+        course_cdeg    u2   course over ground in 1/100 degrees (0xFFFF = missing)
 """
 
 import logging
-from typing import List
+import mmap
+import shutil
+import struct
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
 
+from core.config import settings
 from core.models import FileRecord
 from .base import BaseParser, ParseResult
+from ..sink import SoundingBatch, SoundingSink, batch_size
 
 logger = logging.getLogger(__name__)
 
+MF2_MAGIC = b"MF2T"
+MF2_VERSION = 1
+ZIP_MAGIC = b"PK\x03\x04"
+
+MF2_HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("record_size", "<u2"),
+    ("record_count", "<u4"),
+    ("reserved", "V4"),
+])
+
+MF2_RECORD_DTYPE = np.dtype([
+    ("time", "<i4"),
+    ("lat_e7", "<i4"),
+    ("lon_e7", "<i4"),
+    ("depth_m", "<f4"),
+    ("water_temp_c", "<f4"),
+    ("speed_cknots", "<u2"),
+    ("course_cdeg", "<u2"),
+])
+
+MISSING_U16 = 0xFFFF
+
+# Fixed part of a zip local file header (signature .. extra field length)
+_ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+class UnrecognisedLayoutError(ValueError):
+    """Raised when a file does not carry the expected MF2 track header."""
+    pass
+
+
+@dataclass
+class TrackSection:
+    """A run of fixed-width track records inside a mapped buffer."""
+    offset: int  # Byte offset of the first record
+    count: int  # Number of records
+
+
+def read_track_header(buffer, offset: int = 0) -> TrackSection:
+    """
+    Validate an MF2 track header and locate its records.
+
+    Args:
+        buffer: Bytes-like object (typically an mmap) holding the track data
+        offset: Byte offset of the header within the buffer
+
+    Returns:
+        TrackSection describing the records that follow the header
+
+    Raises:
+        UnrecognisedLayoutError: If the header is missing or unsupported
+    """
+    if len(buffer) - offset < MF2_HEADER_DTYPE.itemsize:
+        raise UnrecognisedLayoutError("File too small for an MF2 track header")
+
+    header = np.frombuffer(buffer, dtype=MF2_HEADER_DTYPE, count=1, offset=offset)[0]
+    if header["magic"] != MF2_MAGIC:
+        raise UnrecognisedLayoutError("Missing MF2 track header")
+    if header["version"] != MF2_VERSION or header["record_size"] != MF2_RECORD_DTYPE.itemsize:
+        raise UnrecognisedLayoutError(
+            f"Unsupported MF2 layout: version={header['version']}, record_size={header['record_size']}"
+        )
+
+    data_offset = offset + MF2_HEADER_DTYPE.itemsize
+    available = (len(buffer) - data_offset) // MF2_RECORD_DTYPE.itemsize
+    count = int(header["record_count"]) or available
+    return TrackSection(offset=data_offset, count=min(count, available))
+
+
+def decode_records(records: np.ndarray) -> SoundingBatch:
+    """
+    Convert raw MF2 records into a SoundingBatch (vectorised).
+
+    Records without a usable depth are dropped.
+
+    Args:
+        records: Structured array with MF2_RECORD_DTYPE
+
+    Returns:
+        SoundingBatch with the records that carry a depth
+    """
+    depth = records["depth_m"].astype(np.float64)
+    keep = np.isfinite(depth) & (depth > 0)
+    if not keep.all():
+        records = records[keep]
+        depth = depth[keep]
+
+    def scaled_u16(values: np.ndarray) -> np.ndarray:
+        out = values.astype(np.float64) / 100.0
+        out[values == MISSING_U16] = np.nan
+        return out
+
+    return SoundingBatch(
+        timestamp=records["time"].astype(np.float64),
+        latitude=records["lat_e7"] * 1e-7,
+        longitude=records["lon_e7"] * 1e-7,
+        depth=depth,
+        water_temp=records["water_temp_c"].astype(np.float64),
+        speed_knots=scaled_u16(records["speed_cknots"]),
+        course_deg=scaled_u16(records["course_cdeg"]),
+    )
+
+
+def iter_section_batches(
+    buffer,
+    section: TrackSection,
+    size: int,
+    stats: Dict[str, int],
+) -> Iterator[SoundingBatch]:
+    """
+    Decode a track section in batches of `size` records.
+
+    Each batch is a zero-copy structured view into the buffer; only the
+    decoded float columns are allocated.
+    """
+    for start in range(0, section.count, size):
+        count = min(size, section.count - start)
+        records = np.frombuffer(
+            buffer,
+            dtype=MF2_RECORD_DTYPE,
+            count=count,
+            offset=section.offset + start * MF2_RECORD_DTYPE.itemsize,
+        )
+        batch = decode_records(records)
+        stats["records"] += count
+        stats["records_without_depth"] += count - len(batch)
+        if len(batch):
+            yield batch
+
+
+def _read_section(buffer, name: str, stats: Dict[str, int]) -> Optional[TrackSection]:
+    """Read a track header, logging and skipping layouts this parser does not support."""
+    try:
+        section = read_track_header(buffer)
+    except UnrecognisedLayoutError as e:
+        logger.warning(f"MaxSeaParser: skipping {name}: {e}")
+        return None
+    stats["track_sections"] += 1
+    return section
+
+
+@contextmanager
+def _mapped(path: Path):
+    """Memory-map a file read-only."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _member_data_offset(archive: mmap.mmap, info: zipfile.ZipInfo) -> int:
+    """Byte offset of a zip member's data within the archive."""
+    fields = _ZIP_LOCAL_HEADER.unpack_from(archive, info.header_offset)
+    name_length, extra_length = fields[-2], fields[-1]
+    return info.header_offset + _ZIP_LOCAL_HEADER.size + name_length + extra_length
+
 
 class MaxSeaParser(BaseParser):
     """
-    Parser for MaxSea TimeZero plotter files.
-    
-    STUB IMPLEMENTATION: This parser currently does not parse real MaxSea data.
-    It validates file records and returns a stub result indicating parsing is not yet implemented.
+    Parser for MaxSea TimeZero track files and TZ backup archives.
+
+    Records are decoded from memory-mapped files with a NumPy structured
+    dtype and streamed to the SoundingSink in batches.
     """
-    
+
     @property
     def source_format(self) -> str:
         """Return the source_format identifier for MaxSea files."""
         return "maxsea"
-    
+
     def can_parse(self, file_record: FileRecord) -> bool:
         """
         Check if this parser can handle the given file record.
-        
+
         Args:
             file_record: FileRecord to check
-            
+
         Returns:
             True if source_format matches MaxSea formats
         """
         maxsea_formats = ["maxsea", "maxsea_mf2", "maxsea_timezero", "tz_backup"]
         return file_record.source_format in maxsea_formats
-    
-    def parse(self, file_record: FileRecord) -> ParseResult:
+
+    def parse(self, file_record: FileRecord, sink: Optional[SoundingSink] = None) -> ParseResult:
         """
-        Parse a MaxSea plotter file (STUB).
-        
-        This is a stub implementation that does not actually parse MaxSea files.
-        It logs the attempt and returns a successful ParseResult with no entities.
-        
+        Parse a MaxSea track file or TZ backup and stream its soundings to the sink.
+
         Args:
             file_record: FileRecord to parse
-            
+            sink: Destination for sounding batches (None counts records without storing them)
+
         Returns:
-            ParseResult indicating stub behavior
+            ParseResult with soundings_count and decode statistics in metadata.
+            Files without a recognised track layout return a stub result.
         """
-        logger.info(f"[STUB] MaxSeaParser.parse() called for file_record_id={file_record.id}")
-        logger.info(f"[STUB] File: {file_record.remote_path}, type={file_record.file_type}, format={file_record.source_format}")
-        logger.info("[STUB] Real MaxSea parsing not yet implemented - returning stub result")
-        
+        path = Path(settings.storage_path) / file_record.remote_path
+        logger.info(f"MaxSeaParser.parse() for file_record_id={file_record.id}: {path}")
+
+        stats = {"records": 0, "records_without_depth": 0, "track_sections": 0}
+        soundings_count = 0
+        for batch in self.iter_batches(path, stats):
+            if sink is not None:
+                sink.write(batch)
+            soundings_count += len(batch)
+
+        metadata = {
+            "parser": "MaxSeaParser",
+            "file_record_id": file_record.id,
+            "source_format": file_record.source_format,
+            **stats,
+        }
+
+        if stats["track_sections"] == 0:
+            # Not a layout we can decode yet: keep the file, report it as unparsed
+            logger.warning(f"MaxSeaParser: no recognised track data in file_record_id={file_record.id}")
+            return ParseResult(
+                success=True,
+                message="STUB: No recognised MaxSea track data. File validated but not parsed.",
+                parsed_entities=[],
+                metadata={**metadata, "stub": True},
+            )
+
+        logger.info(f"MaxSeaParser: file_record_id={file_record.id}, {stats['records']} records, "
+                    f"{soundings_count} soundings in {stats['track_sections']} track section(s)")
+
         return ParseResult(
             success=True,
-            message="STUB: MaxSea parsing not yet implemented. File validated but not parsed.",
+            message=f"Decoded {stats['records']} records, stored {soundings_count} soundings",
             parsed_entities=[],
-            metadata={
-                "parser": "MaxSeaParser",
-                "stub": True,
-                "file_record_id": file_record.id,
-                "source_format": file_record.source_format
-            }
+            metadata=metadata,
+            soundings_count=soundings_count,
         )
 
+    def iter_batches(self, path: Path, stats: Optional[Dict[str, int]] = None) -> Iterator[SoundingBatch]:
+        """
+        Yield soundings from a MaxSea file in batches.
+
+        Args:
+            path: Path to an MF2 track file or a zip archive containing them
+            stats: Optional dict updated with record/section counters
+
+        Yields:
+            SoundingBatch of at most settings.ingestion_batch_size soundings
+        """
+        stats = stats if stats is not None else {}
+        for key in ("records", "records_without_depth", "track_sections"):
+            stats.setdefault(key, 0)
+
+        with open(path, "rb") as f:
+            magic = f.read(4)
+
+        if magic == ZIP_MAGIC:
+            yield from self._iter_archive(path, stats)
+        elif magic == MF2_MAGIC:
+            with _mapped(path) as mm:
+                section = _read_section(mm, path.name, stats)
+                if section:
+                    yield from iter_section_batches(mm, section, batch_size(), stats)
+
+    def _iter_archive(self, path: Path, stats: Dict[str, int]) -> Iterator[SoundingBatch]:
+        """Decode every MF2 track member of a zip archive."""
+        size = batch_size()
+        with zipfile.ZipFile(path, "r") as zf, _mapped(path) as archive:
+            for info in zf.infolist():
+                if info.is_dir() or info.file_size < MF2_HEADER_DTYPE.itemsize:
+                    continue
+                with zf.open(info, "r") as member:
+                    if member.read(4) != MF2_MAGIC:
+                        continue
+
+                if info.compress_type == zipfile.ZIP_STORED:
+                    # Map the member in place: no extraction, no copy
+                    logger.debug(f"MaxSeaParser: mapping stored member {info.filename}")
+                    offset = _member_data_offset(archive, info)
+                    view = memoryview(archive)[offset:offset + info.file_size]
+                    try:
+                        section = _read_section(view, info.filename, stats)
+                        if section:
+                            yield from iter_section_batches(view, section, size, stats)
+                    finally:
+                        view.release()
+                else:
+                    logger.debug(f"MaxSeaParser: extracting compressed member {info.filename} ({info.file_size} bytes)")
+                    yield from self._iter_extracted_member(zf, info, size, stats)
+
+    def _iter_extracted_member(
+        self,
+        zf: zipfile.ZipFile,
+        info: zipfile.ZipInfo,
+        size: int,
+        stats: Dict[str, int],
+    ) -> Iterator[SoundingBatch]:
+        """Stream a compressed member to a temp file, then decode it memory-mapped."""
+        temp_dir = Path(settings.storage_path) / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=temp_dir, prefix="maxsea-", suffix=".mf2") as temp:
+            with zf.open(info, "r") as member:
+                shutil.copyfileobj(member, temp, length=settings.upload_chunk_size)
+            temp.flush()
+            with _mapped(Path(temp.name)) as mm:
+                section = _read_section(mm, info.filename, stats)
+                if section:
+                    yield from iter_section_batches(mm, section, size, stats)
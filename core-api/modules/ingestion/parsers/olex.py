@@ -1,70 +1,210 @@
 """
-DeckBrain Core API - Olex parser stub.
+DeckBrain Core API - Olex parser.
 
-This is a STUB implementation. No real Olex parsing is performed yet.
-The parser validates it can handle Olex files but returns a "not implemented" result.
+Parses Olex plain-text position exports into soundings. Olex writes track
+fixes as whitespace-separated lines in its plain-text export format:
+
+    Rute uten navn
+    Rutetype Skjult
+    Fikspos
+    5852.123400 1016.500000 1419336521 Brunsirkel
+    5852.124100 1016.502300 1419336522 87.4 Brunsirkel
+
+Each fix line is `<lat> <lon> <unix_time> [<depth_m>] [<symbol>]` where
+latitude and longitude are in decimal minutes (degrees * 60, negative for
+S/W). Header and metadata lines (route name, colour, etc.) are skipped.
+Only fixes that carry a depth become soundings; fixes without one are
+counted in the result metadata.
+
+The export may arrive as a plain text file, gzip-compressed, or as a zip
+archive of such files (the layout scripts/inspect_plotter_file.py reports).
+Zip members and gzip streams are decompressed on the fly, line by line, so
+memory stays bounded by the batch size regardless of export size.
+
+NOTE: The field layout follows the Olex plain-text export; the checklist in
+docs/research/olex/README.md should be used to confirm it (in particular the
+depth column) against real sample files.
 """
 
+import gzip
+import io
 import logging
-from typing import List
+import zipfile
+from pathlib import Path
+from typing import Dict, IO, Iterator, List, Optional, Tuple
 
+from core.config import settings
 from core.models import FileRecord
 from .base import BaseParser, ParseResult
+from ..sink import SoundingBatch, SoundingSink, batch_size
 
 logger = logging.getLogger(__name__)
 
+ZIP_MAGIC = b"PK\x03\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+TEXT_ENCODING = "latin-1"  # Olex writes Norwegian labels; latin-1 never fails to decode
+
 
 class OlexParser(BaseParser):
     """
-    Parser for Olex raw plotter files.
-    
-    STUB IMPLEMENTATION: This parser currently does not parse real Olex data.
-    It validates file records and returns a stub result indicating parsing is not yet implemented.
+    Parser for Olex plain-text position exports (plain, gzip or zip).
+
+    Fixes are parsed line by line and streamed to the SoundingSink in
+    batches of settings.ingestion_batch_size.
     """
-    
+
     @property
     def source_format(self) -> str:
         """Return the source_format identifier for Olex files."""
         return "olex_raw"
-    
+
     def can_parse(self, file_record: FileRecord) -> bool:
         """
         Check if this parser can handle the given file record.
-        
+
         Args:
             file_record: FileRecord to check
-            
+
         Returns:
             True if source_format matches "olex_raw" or "olex"
         """
         return file_record.source_format in ["olex_raw", "olex"]
-    
-    def parse(self, file_record: FileRecord) -> ParseResult:
+
+    def parse(self, file_record: FileRecord, sink: Optional[SoundingSink] = None) -> ParseResult:
         """
-        Parse an Olex raw plotter file (STUB).
-        
-        This is a stub implementation that does not actually parse Olex files.
-        It logs the attempt and returns a successful ParseResult with no entities.
-        
+        Parse an Olex export and stream its soundings to the sink.
+
         Args:
             file_record: FileRecord to parse
-            
+            sink: Destination for sounding batches (None counts fixes without storing them)
+
         Returns:
-            ParseResult indicating stub behavior
+            ParseResult with soundings_count and parse statistics in metadata
         """
-        logger.info(f"[STUB] OlexParser.parse() called for file_record_id={file_record.id}")
-        logger.info(f"[STUB] File: {file_record.remote_path}, type={file_record.file_type}, format={file_record.source_format}")
-        logger.info("[STUB] Real Olex parsing not yet implemented - returning stub result")
-        
+        path = Path(settings.storage_path) / file_record.remote_path
+        logger.info(f"OlexParser.parse() for file_record_id={file_record.id}: {path}")
+
+        stats = {"lines": 0, "fixes": 0, "fixes_without_depth": 0, "members": 0}
+        soundings_count = 0
+        for batch in self.iter_batches(path, stats):
+            if sink is not None:
+                sink.write(batch)
+            soundings_count += len(batch)
+
+        logger.info(f"OlexParser: file_record_id={file_record.id}, {stats['fixes']} fixes, "
+                    f"{soundings_count} soundings, {stats['fixes_without_depth']} fixes without depth")
+
+        if stats["fixes"] == 0:
+            return ParseResult(
+                success=False,
+                message="No Olex position fixes found in file",
+                parsed_entities=[],
+                metadata={"parser": "OlexParser", "file_record_id": file_record.id, **stats},
+            )
+
         return ParseResult(
             success=True,
-            message="STUB: Olex parsing not yet implemented. File validated but not parsed.",
+            message=f"Parsed {stats['fixes']} fixes, stored {soundings_count} soundings",
             parsed_entities=[],
-            metadata={
-                "parser": "OlexParser",
-                "stub": True,
-                "file_record_id": file_record.id,
-                "source_format": file_record.source_format
-            }
+            metadata={"parser": "OlexParser", "file_record_id": file_record.id, **stats},
+            soundings_count=soundings_count,
         )
 
+    def iter_batches(self, path: Path, stats: Optional[Dict[str, int]] = None) -> Iterator[SoundingBatch]:
+        """
+        Yield soundings from an Olex export in fixed-size columnar batches.
+
+        Args:
+            path: Path to the stored export (plain text, gzip or zip)
+            stats: Optional dict updated with line/fix counters
+
+        Yields:
+            SoundingBatch of at most settings.ingestion_batch_size soundings
+        """
+        stats = stats if stats is not None else {}
+        for key in ("lines", "fixes", "fixes_without_depth", "members"):
+            stats.setdefault(key, 0)
+
+        size = batch_size()
+        columns = _empty_columns()
+        for stream in _open_text_streams(path, stats):
+            with stream:
+                for lat_min, lon_min, epoch, depth in _iter_fixes(stream, stats):
+                    columns["timestamp"].append(epoch)
+                    columns["latitude"].append(lat_min / 60.0)
+                    columns["longitude"].append(lon_min / 60.0)
+                    columns["depth"].append(depth)
+                    if len(columns["timestamp"]) >= size:
+                        yield SoundingBatch.from_columns(columns)
+                        columns = _empty_columns()
+        # Batches span member boundaries; flush whatever is left at the end
+        if columns["timestamp"]:
+            yield SoundingBatch.from_columns(columns)
+
+
+def _empty_columns() -> Dict[str, List[float]]:
+    """Fresh column buffers for one batch."""
+    return {"timestamp": [], "latitude": [], "longitude": [], "depth": []}
+
+
+def _iter_fixes(stream: IO[str], stats: Dict[str, int]) -> Iterator[Tuple[float, float, float, float]]:
+    """
+    Parse fix lines from a text stream.
+
+    Args:
+        stream: Text stream of an Olex export
+        stats: Dict updated with line/fix counters
+
+    Yields:
+        Tuple of (lat_minutes, lon_minutes, epoch_seconds, depth_m) for fixes with a depth
+    """
+    for line in stream:
+        stats["lines"] += 1
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        try:
+            lat_min = float(parts[0])
+            lon_min = float(parts[1])
+            epoch = float(parts[2])
+        except ValueError:
+            continue  # header / metadata line
+        stats["fixes"] += 1
+
+        depth = None
+        if len(parts) > 3:
+            try:
+                depth = float(parts[3])
+            except ValueError:
+                pass  # 4th token is the symbol name
+        if depth is None:
+            stats["fixes_without_depth"] += 1
+            continue
+
+        yield lat_min, lon_min, epoch, depth
+
+
+def _open_text_streams(path: Path, stats: Dict[str, int]) -> Iterator[IO[str]]:
+    """
+    Open the export as one or more decompressing text streams.
+
+    Zip archives yield one stream per (non-directory) member; gzip and plain
+    files yield a single stream.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(ZIP_MAGIC):
+        with zipfile.ZipFile(path, "r") as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                stats["members"] += 1
+                logger.debug(f"OlexParser: streaming zip member {info.filename} ({info.file_size} bytes)")
+                yield io.TextIOWrapper(zf.open(info, "r"), encoding=TEXT_ENCODING, newline=None)
+    elif magic.startswith(GZIP_MAGIC):
+        stats["members"] += 1
+        yield io.TextIOWrapper(gzip.open(path, "rb"), encoding=TEXT_ENCODING, newline=None)
+    else:
+        stats["members"] += 1
+        yield open(path, "r", encoding=TEXT_ENCODING, newline=None)
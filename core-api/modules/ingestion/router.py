@@ -2,20 +2,26 @@
 DeckBrain Core API - Ingestion endpoints.
 
 Provides manual ingestion trigger endpoints for development and debugging.
+
+When the ingestion worker pool is enabled, a manual trigger only wakes the
+pool: the file is then claimed like any other (see
+modules.ingestion.worker), so it is never parsed by two workers at once.
 """
 
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
+from core.config import settings
 from core.db import get_db
 from core.models import FileRecord
 from core.auth import get_authenticated_device
 from .service import ingest_file_safe
 from .registry import get_registry
+from .worker import notify_new_file
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,6 +33,7 @@ class IngestResponse(BaseModel):
     file_record_id: int
     message: str
     parsed_entities_count: Optional[int] = None
+    soundings_count: Optional[int] = None
     metadata: Optional[dict] = None
     error_type: Optional[str] = None
 
@@ -37,8 +44,9 @@ class RegistryResponse(BaseModel):
 
 
 @router.post("/ingest/{file_record_id}", response_model=IngestResponse)
-async def trigger_ingestion(
+def trigger_ingestion(
     file_record_id: int,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -50,8 +58,13 @@ async def trigger_ingestion(
     This endpoint does NOT require authentication to simplify dev testing.
     In production, this should be protected or removed.
     
+    With the worker pool enabled, the file is left to the workers to claim
+    and the endpoint returns 202 with status "queued". Without it, the file
+    is ingested inline and the result is returned.
+    
     Args:
         file_record_id: ID of the FileRecord to ingest
+        response: Response (status code set to 202 when queued)
         db: Database session
         
     Returns:
@@ -64,6 +77,27 @@ async def trigger_ingestion(
     """
     logger.info(f"Manual ingestion triggered for file_record_id={file_record_id}")
     
+    # Workers own ingestion when enabled: queue instead of racing their claims
+    if settings.ingestion_worker_enabled:
+        file_record = db.query(FileRecord).filter(FileRecord.id == file_record_id).first()
+        if not file_record:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"FileRecord {file_record_id} not found"
+            )
+        if file_record.processing_status != "stored":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"FileRecord {file_record_id} has status '{file_record.processing_status}', expected 'stored'"
+            )
+        notify_new_file()
+        response.status_code = status.HTTP_202_ACCEPTED
+        return IngestResponse(
+            status="queued",
+            file_record_id=file_record_id,
+            message="Queued for background ingestion"
+        )
+    
     # Call ingestion service
     result = ingest_file_safe(file_record_id, db)
     
@@ -74,6 +108,7 @@ async def trigger_ingestion(
             file_record_id=file_record_id,
             message=result["message"],
             parsed_entities_count=result.get("parsed_entities_count"),
+            soundings_count=result.get("soundings_count"),
             metadata=result.get("metadata")
         )
     elif result["status"] == "failed":
@@ -82,6 +117,7 @@ async def trigger_ingestion(
             file_record_id=file_record_id,
             message=result["message"],
             parsed_entities_count=result.get("parsed_entities_count"),
+            soundings_count=result.get("soundings_count"),
             metadata=result.get("metadata")
         )
     else:  # error
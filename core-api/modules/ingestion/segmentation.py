@@ -0,0 +1,364 @@
+"""
+DeckBrain Core API - Trip and tow segmentation.
+
+Splits a device's sounding stream into trips and tows while it is being
+ingested, and maintains the Trip/Tow aggregates (time span, bounds,
+distance, duration, depth statistics) as it goes.
+
+Rules (thresholds come from settings):
+- Trips: a gap longer than trip_gap_hours between consecutive fixes starts
+  a new trip.
+- Tows: fixes whose speed is within [tow_min_speed_knots,
+  tow_max_speed_knots] and whose turn rate is below
+  tow_max_turn_rate_deg_per_min are "towing". Towing runs separated by less
+  than tow_merge_gap_minutes are merged; runs shorter than
+  tow_min_duration_minutes are ignored. Speed is derived from positions when
+  the plotter does not record it.
+
+Each batch is processed in one vectorised NumPy pass; only the (few) trip
+and tow boundaries are handled in Python. Segmentation is incremental: the
+first batch of a file resumes the device's trip that ends within the trip
+gap of the new data (and its open tow, if any) from the stored aggregates
+and the trip's last sounding, so existing soundings are never rescanned.
+Aggregates are merged per batch by modules.trips.aggregates.
+
+A device's files must be segmented one at a time: the read-modify-write of
+the Trip/Tow aggregates assumes no other transaction extends the same trip.
+The ingestion workers serialize claims per device, oldest file first (see
+modules.ingestion.worker). Files are expected to arrive roughly in
+chronological order per device; data that overlaps an existing trip is
+added to the trip that precedes it.
+"""
+
+import logging
+from typing import Optional, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import Sounding, Tow, Trip
+from modules.trips.aggregates import (
+    Fix,
+    adjust_trip_count,
+    attach_soundings,
+    datetime_to_epoch,
+    epoch_to_datetime,
+    haversine_nm,
+    last_fix,
+)
+
+if TYPE_CHECKING:
+    from modules.history.coverage import CoverageAggregator
+
+logger = logging.getLogger(__name__)
+
+class TripSegmenter:
+    """
+    Assigns trip_id/tow_id to sounding batches of one device.
+
+    Used by the SoundingSink: call assign() for each time-ordered batch
+    before it is inserted, and finish() after the file's last batch. Trips and tows are created (and flushed, to get
+    their ids) in the caller's transaction. If a CoverageAggregator is given,
+    it is fed the fixes of every tow as they are assigned.
+    """
+
+    def __init__(self, db: Session, device_id: int, coverage: Optional["CoverageAggregator"] = None):
+        """
+        Args:
+            db: Database session
+            device_id: Internal devices.id of the soundings
+            coverage: Optional towing coverage aggregator for this device
+        """
+        self.db = db
+        self.device_id = device_id
+        self.coverage = coverage
+
+        self.trip_gap = settings.trip_gap_hours * 3600.0
+        self.tow_min_duration = settings.tow_min_duration_minutes * 60.0
+        self.tow_merge_gap = settings.tow_merge_gap_minutes * 60.0
+
+        self.trip: Optional[Trip] = None
+        self.tow: Optional[Tow] = None
+        self.next_tow_number = 1
+        self.last_ts: Optional[float] = None
+        self.last_lat = np.nan
+        self.last_lon = np.nan
+        self.last_course = np.nan
+        self.last_tow_ts: Optional[float] = None  # Last towing fix of the open tow
+        self.trip_fix: Optional[Fix] = None  # Last fix attached to the current trip
+        self.tow_fix: Optional[Fix] = None  # Last fix attached to the open tow
+
+        self.trips_created = 0
+        self.tows_created = 0
+        self.tows_dropped = 0
+        self.touched_trip_ids: Set[int] = set()  # Trips that received soundings (for cache invalidation)
+        self._resumed = False
+        self._tow_ids: Optional[np.ndarray] = None  # tow_id column of the batch being assigned
+
+    def _resume(self, first_ts: float) -> None:
+        """Continue the trip (and open tow) that the new data extends, if any."""
+        trip = (
+            self.db.query(Trip)
+            .filter(Trip.device_id == self.device_id, Trip.start_time <= epoch_to_datetime(first_ts))
+            .order_by(Trip.start_time.desc())
+            .first()
+        )
+        if trip is None or trip.end_time is None:
+            return
+        if first_ts - datetime_to_epoch(trip.end_time) > self.trip_gap:
+            return
+
+        last = (
+            self.db.query(Sounding.timestamp, Sounding.latitude, Sounding.longitude, Sounding.course_deg)
+            .filter(Sounding.trip_id == trip.id)
+            .order_by(Sounding.timestamp.desc(), Sounding.id.desc())
+            .first()
+        )
+        if last is None:
+            return
+
+        self.trip = trip
+        self.last_ts = datetime_to_epoch(last.timestamp)
+        self.last_lat = last.latitude
+        self.last_lon = last.longitude
+        self.last_course = last.course_deg if last.course_deg is not None else np.nan
+        self.trip_fix = Fix(timestamp=self.last_ts, latitude=last.latitude, longitude=last.longitude)
+
+        max_number = self.db.query(func.max(Tow.tow_number)).filter(Tow.trip_id == trip.id).scalar()
+        self.next_tow_number = (max_number or 0) + 1
+
+        tow = (
+            self.db.query(Tow)
+            .filter(Tow.trip_id == trip.id)
+            .order_by(Tow.end_time.desc())
+            .first()
+        )
+        if tow is not None and tow.end_time is not None:
+            tow_end = datetime_to_epoch(tow.end_time)
+            if self.last_ts - tow_end <= self.tow_merge_gap:
+                self.tow = tow
+                self.last_tow_ts = tow_end
+                self.tow_fix = last_fix(self.db, tow)
+                if self.coverage is not None:
+                    self.coverage.resume_tow(tow)
+
+        logger.info(f"Resuming trip {trip.id} for device_id={self.device_id}"
+                    f"{f' with open tow {self.tow.id}' if self.tow else ''}")
+
+    def assign(self, batch) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Segment one time-ordered batch.
+
+        Args:
+            batch: SoundingBatch sorted by timestamp
+
+        Returns:
+            Tuple of (trip_ids, tow_ids) int64 arrays; tow_id 0 means no tow
+        """
+        n = len(batch)
+        ts = batch.timestamp
+        if not self._resumed:
+            self._resume(float(ts[0]))
+            self._resumed = True
+
+        prev_ts = np.empty(n)
+        prev_ts[0] = self.last_ts if self.last_ts is not None else -np.inf
+        prev_ts[1:] = ts[:-1]
+        prev_lat = np.concatenate(([self.last_lat], batch.latitude[:-1]))
+        prev_lon = np.concatenate(([self.last_lon], batch.longitude[:-1]))
+
+        dt = ts - prev_ts
+        breaks = dt > self.trip_gap
+        if self.trip is None:
+            breaks[0] = True
+
+        distance = np.nan_to_num(haversine_nm(prev_lat, prev_lon, batch.latitude, batch.longitude))
+        distance[breaks] = 0.0
+
+        # Recorded speed, falling back to speed derived from consecutive positions
+        with np.errstate(divide="ignore", invalid="ignore"):
+            derived_speed = np.where(dt > 0, distance / (dt / 3600.0), np.nan)
+        speed = derived_speed if batch.speed_knots is None else np.where(
+            np.isnan(batch.speed_knots), derived_speed, batch.speed_knots
+        )
+
+        towing = (speed >= settings.tow_min_speed_knots) & (speed <= settings.tow_max_speed_knots)
+        if batch.course_deg is not None:
+            prev_course = np.concatenate(([self.last_course], batch.course_deg[:-1]))
+            turn = np.abs((batch.course_deg - prev_course + 180.0) % 360.0 - 180.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                turn_rate = turn / (dt / 60.0)
+            towing &= ~(turn_rate > settings.tow_max_turn_rate_deg_per_min)  # NaN counts as steady
+            self.last_course = float(batch.course_deg[-1])
+        else:
+            self.last_course = np.nan
+
+        trip_ids = np.empty(n, dtype=np.int64)
+        tow_ids = np.zeros(n, dtype=np.int64)
+        self._tow_ids = tow_ids
+
+        starts = np.flatnonzero(breaks)
+        if len(starts) == 0 or starts[0] != 0:
+            starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:], [n]))
+
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            if breaks[a]:
+                self._close_trip()
+                self._open_trip(float(ts[a]))
+            self._segment_trip_slice(batch, a, b, b == n, towing, trip_ids, tow_ids)
+
+        self.last_ts = float(ts[-1])
+        self.last_lat = float(batch.latitude[-1])
+        self.last_lon = float(batch.longitude[-1])
+        self._tow_ids = None
+        return trip_ids, tow_ids
+
+    def _segment_trip_slice(
+        self,
+        batch,
+        a: int,
+        b: int,
+        at_batch_end: bool,
+        towing: np.ndarray,
+        trip_ids: np.ndarray,
+        tow_ids: np.ndarray,
+    ) -> None:
+        """Assign fixes [a, b) of the batch, all of which belong to the current trip."""
+        ts = batch.timestamp[a:b]
+        lat = batch.latitude[a:b]
+        lon = batch.longitude[a:b]
+        depth = batch.depth[a:b]
+        trip_ids[a:b] = self.trip.id
+        self.touched_trip_ids.add(self.trip.id)
+        self.trip_fix = attach_soundings(self.trip, ts, lat, lon, depth, self.trip_fix)
+
+        # Towing runs as half-open [start, end) index ranges within the slice
+        edges = np.diff(np.concatenate(([0], towing[a:b].astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        if len(run_starts) > 1:
+            keep = ts[run_starts[1:]] - ts[run_ends[:-1] - 1] > self.tow_merge_gap
+            run_starts = np.concatenate((run_starts[:1], run_starts[1:][keep]))
+            run_ends = np.concatenate((run_ends[:-1][keep], run_ends[-1:]))
+
+        runs = list(zip(run_starts.tolist(), run_ends.tolist()))
+        continuing = (
+            self.tow is not None
+            and bool(runs)
+            and ts[runs[0][0]] - self.last_tow_ts <= self.tow_merge_gap
+        )
+        if self.tow is not None and not continuing:
+            self._close_tow()
+        if continuing:
+            runs[0] = (0, runs[0][1])  # the bridged gap belongs to the open tow
+
+        for i, (rs, re) in enumerate(runs):
+            first_of_tow = not (i == 0 and continuing)
+            open_at_end = (
+                i == len(runs) - 1
+                and at_batch_end
+                and ts[-1] - ts[re - 1] <= self.tow_merge_gap
+            )
+            if first_of_tow and not open_at_end and ts[re - 1] - ts[rs] < self.tow_min_duration:
+                continue
+
+            if first_of_tow:
+                self._open_tow(float(ts[rs]), float(lat[rs]), float(lon[rs]))
+            tow_ids[a + rs:a + re] = self.tow.id
+            self.tow_fix = attach_soundings(
+                self.tow, ts[rs:re], lat[rs:re], lon[rs:re], depth[rs:re], self.tow_fix
+            )
+            if self.coverage is not None:
+                self.coverage.add_tow_soundings(self.tow, ts[rs:re], lat[rs:re], lon[rs:re])
+            self.last_tow_ts = float(ts[re - 1])
+
+            if not open_at_end:
+                self._close_tow()
+
+    def finish(self) -> None:
+        """
+        End segmentation of the file: close its open tow.
+
+        Call once after the last batch. A tow still open at the end of the
+        file is dropped if it is shorter than tow_min_duration_minutes, like
+        any other tow; a following file only reopens tows that were kept.
+        """
+        self._close_tow()
+
+    def _open_trip(self, first_ts: float) -> None:
+        """Start a new trip at the given time."""
+        start = epoch_to_datetime(first_ts)
+        self.trip = Trip(
+            device_id=self.device_id,
+            start_time=start,
+            end_time=start,
+            distance_nm=0.0,
+            duration_hours=0.0,
+            sounding_count=0,
+        )
+        self.db.add(self.trip)
+        self.db.flush()
+        adjust_trip_count(self.db, self.device_id, 1)
+        self.trip_fix = None
+        self.next_tow_number = 1
+        self.trips_created += 1
+
+    def _close_trip(self) -> None:
+        """End the current trip (its aggregates are already up to date)."""
+        self._close_tow()
+        self.trip = None
+
+    def _open_tow(self, first_ts: float, lat: float, lon: float) -> None:
+        """Start a new tow in the current trip."""
+        start = epoch_to_datetime(first_ts)
+        self.tow = Tow(
+            trip_id=self.trip.id,
+            start_time=start,
+            end_time=start,
+            start_lat=lat,
+            start_lon=lon,
+            end_lat=lat,
+            end_lon=lon,
+            tow_number=self.next_tow_number,
+            distance_nm=0.0,
+            duration_hours=0.0,
+            sounding_count=0,
+        )
+        self.db.add(self.tow)
+        self.db.flush()
+        self.tow_fix = None
+        self.next_tow_number += 1
+        self.tows_created += 1
+
+    def _close_tow(self) -> None:
+        """
+        End the open tow.
+
+        A tow left open at a batch or file boundary is only known to be too
+        short once it ends; such tows are removed again here.
+        """
+        tow = self.tow
+        if tow is None:
+            return
+        self.tow = None
+        self.last_tow_ts = None
+        self.tow_fix = None
+
+        if (tow.duration_hours or 0.0) * 3600.0 >= self.tow_min_duration:
+            return
+
+        logger.debug(f"Dropping short tow {tow.id} ({(tow.duration_hours or 0.0) * 60:.1f} min)")
+        if self.coverage is not None:
+            self.coverage.drop_tow(tow)
+        if self._tow_ids is not None:
+            self._tow_ids[self._tow_ids == tow.id] = 0
+        # Bulk statements: going through the relationship cascade would delete the soundings
+        self.db.execute(update(Sounding).where(Sounding.tow_id == tow.id).values(tow_id=None))
+        self.db.expunge(tow)
+        self.db.execute(delete(Tow).where(Tow.id == tow.id))
+        if tow.tow_number == self.next_tow_number - 1:
+            self.next_tow_number -= 1
+        self.tows_dropped += 1
@@ -10,6 +10,7 @@ Orchestrates the parsing of raw plotter files. This service:
 """
 
 import logging
+from functools import partial
 from typing import Optional
 from pathlib import Path
 
@@ -19,6 +20,16 @@ from core.models import FileRecord
 from core.config import settings
 from .registry import get_parser_for_file
 from .parsers import ParseResult
+from .claims import Claim, ClaimLostError
+from .cleanup import discard_file_soundings
+from .sink import SoundingSink
+from .segmentation import TripSegmenter
+from modules.bathymetry.grid import BathymetryAggregator
+from modules.history.coverage import CoverageAggregator
+from modules.soundings.store import write_segments
+from modules.tiles.cache import invalidate_tiles
+from modules.tiles.cells import TileAggregator
+from modules.trips.track_cache import invalidate_trips
 
 logger = logging.getLogger(__name__)
 
@@ -43,22 +54,30 @@ class NoParserError(IngestionError):
     pass
 
 
-def ingest_file(file_record_id: int, db: Session) -> ParseResult:
+def ingest_file(file_record_id: int, db: Session, claim: Optional[Claim] = None) -> ParseResult:
     """
     Ingest a raw plotter file and parse it into normalized entities.
     
     This is the main ingestion orchestration function. It:
     1. Loads the file_record from the database
-    2. Validates processing_status is "stored"
+    2. Validates processing_status is "stored" (or "processing" if claimed by a worker)
     3. Finds the appropriate parser using the registry
     4. Updates status to "processing"
-    5. Calls the parser
-    6. Updates status to "parsed_stub" (success) or "failed" (error)
+    5. Calls the parser, which streams soundings to a SoundingSink; they are
+       committed every INGESTION_COMMIT_SOUNDINGS
+    6. Updates status to "processed" (success), "parsed_stub" (stub parser
+       success) or "failed" (error); a failed file's committed soundings are
+       removed again (see modules.ingestion.cleanup), so it leaves none behind
     7. Logs all steps
     
+    A claimed file's claim is renewed with every commit; if another worker
+    has taken the file over, the attempt stops without touching it.
+    
     Args:
         file_record_id: ID of the FileRecord to ingest
         db: Database session
+        claim: The worker's claim when a background worker has claimed the record
+            (see modules.ingestion.worker), which moves it to "processing"
         
     Returns:
         ParseResult from the parser
@@ -67,6 +86,7 @@ def ingest_file(file_record_id: int, db: Session) -> ParseResult:
         FileNotFoundError: If file_record_id doesn't exist
         InvalidStatusError: If file is not in "stored" status
         NoParserError: If no parser can handle the file
+        ClaimLostError: If another worker took the claimed file over
         IngestionError: For other ingestion failures
     """
     logger.info(f"Starting ingestion for file_record_id={file_record_id}")
@@ -81,10 +101,11 @@ def ingest_file(file_record_id: int, db: Session) -> ParseResult:
                 f"file_type='{file_record.file_type}', status='{file_record.processing_status}'")
     
     # Step 2: Validate processing_status
-    if file_record.processing_status != "stored":
-        logger.warning(f"File_record {file_record_id} has status '{file_record.processing_status}', expected 'stored'. Skipping ingestion.")
+    expected_status = "processing" if claim is not None else "stored"
+    if file_record.processing_status != expected_status:
+        logger.warning(f"File_record {file_record_id} has status '{file_record.processing_status}', expected '{expected_status}'. Skipping ingestion.")
         raise InvalidStatusError(
-            f"FileRecord {file_record_id} has status '{file_record.processing_status}', expected 'stored'"
+            f"FileRecord {file_record_id} has status '{file_record.processing_status}', expected '{expected_status}'"
         )
     
     # Step 3: Resolve parser using registry
@@ -96,6 +117,8 @@ def ingest_file(file_record_id: int, db: Session) -> ParseResult:
         
         # Update status to failed
         file_record.processing_status = "failed"
+        if claim is not None:
+            claim.renew(db)
         db.commit()
         
         raise NoParserError(
@@ -106,42 +129,117 @@ def ingest_file(file_record_id: int, db: Session) -> ParseResult:
     
     # Step 4: Update status to "processing"
     file_record.processing_status = "processing"
+    if claim is not None:
+        claim.renew(db)
     db.commit()
     logger.info(f"Updated file_record {file_record_id} status to 'processing'")
     
     # Step 5: Call parser
     try:
+        # Soundings an earlier attempt committed before it died
+        discard_file_soundings(db, file_record)
+        
         logger.info(f"Calling {parser.__class__.__name__}.parse() for file_record_id={file_record_id}")
-        result = parser.parse(file_record)
+        coverage = CoverageAggregator(db, file_record.device_id) if settings.coverage_enabled else None
+        segmenter = (
+            TripSegmenter(db, file_record.device_id, coverage=coverage) if settings.segmentation_enabled else None
+        )
+        tiles = TileAggregator(db, file_record.device_id) if settings.tile_aggregation_enabled else None
+        bathymetry = BathymetryAggregator(db, file_record.device_id) if settings.bathymetry_enabled else None
+        sink = SoundingSink(
+            db, file_record.device_id, segmenter=segmenter, tiles=tiles, bathymetry=bathymetry,
+            file_record_id=file_record.id, commit_every=settings.ingestion_commit_soundings,
+            before_commit=partial(claim.renew, db) if claim is not None else None,
+        )
+        result = parser.parse(file_record, sink)
+        if segmenter is not None and result.success:
+            segmenter.finish()
+            logger.info(f"Segmentation: {segmenter.trips_created} new trip(s), "
+                        f"{segmenter.tows_created - segmenter.tows_dropped} new tow(s)")
         
         logger.info(f"Parser returned: success={result.success}, message='{result.message}'")
-        logger.info(f"Parsed entities count: {len(result.parsed_entities)}")
+        logger.info(f"Parsed entities count: {len(result.parsed_entities)}, soundings: {result.soundings_count}")
         
         # Step 6: Update status based on result
         if result.success:
-            # Note: We use "parsed_stub" instead of "processed" to indicate
-            # that parsing succeeded but no real data was extracted (stub behavior)
-            file_record.processing_status = "parsed_stub"
-            logger.info(f"Parser succeeded. Updated file_record {file_record_id} status to 'parsed_stub'")
+            # Stub parsers succeed without extracting data; keep them distinguishable
+            is_stub = bool((result.metadata or {}).get("stub"))
+            file_record.processing_status = "parsed_stub" if is_stub else "processed"
+            logger.info(f"Parser succeeded. Updated file_record {file_record_id} status to '{file_record.processing_status}'")
         else:
+            # Discard anything the parser streamed before giving up
+            db.rollback()
+            if claim is not None:
+                claim.renew(db)
+            discard_file_soundings(db, file_record)
             file_record.processing_status = "failed"
             logger.warning(f"Parser failed. Updated file_record {file_record_id} status to 'failed'")
         
+        if claim is not None:
+            claim.renew(db)
         db.commit()
         
-        return result
+    except ClaimLostError:
+        # Whatever this attempt left uncommitted is the new owner's to redo
+        db.rollback()
+        raise
         
     except Exception as e:
         # Step 6 (error path): Update status to failed
         logger.error(f"Parser raised exception for file_record_id={file_record_id}: {e}", exc_info=True)
         
+        # Roll back soundings inserted before the failure, and remove those already committed
+        db.rollback()
+        try:
+            if claim is not None:
+                claim.renew(db)
+            discard_file_soundings(db, file_record)
+        except ClaimLostError:
+            db.rollback()
+            raise
+        except Exception as cleanup_error:
+            # The next attempt retries the cleanup before parsing
+            logger.error(f"Could not discard soundings of file_record {file_record_id}: {cleanup_error}", exc_info=True)
+            db.rollback()
         file_record.processing_status = "failed"
+        if claim is not None:
+            try:
+                claim.renew(db)
+            except ClaimLostError:
+                db.rollback()
+                raise
         db.commit()
         
         raise IngestionError(f"Parsing failed for file_record {file_record_id}: {str(e)}") from e
+    
+    # The file is committed from here on: a failing step is logged, never turned into a failed
+    # (and re-ingested) file
+    if result.success:
+        # Cached tracks and tiles that received soundings are stale now
+        if segmenter is not None:
+            _after_commit("track cache invalidation", file_record_id, invalidate_trips, segmenter.touched_trip_ids)
+        if tiles is not None:
+            _after_commit(
+                "tile cache invalidation", file_record_id,
+                invalidate_tiles, file_record.device_id, tiles.touched_tiles(),
+            )
+        
+        # Columnar copies of the trips that grew (read paths fall back to rows until written)
+        if segmenter is not None and settings.sounding_store_backend == "segments":
+            _after_commit("segment write", file_record_id, write_segments, db, segmenter.touched_trip_ids)
+    
+    return result
+
 
+def _after_commit(step: str, file_record_id: int, func, *args) -> None:
+    """Run a step that follows the ingestion commit, logging (not raising) its errors."""
+    try:
+        func(*args)
+    except Exception as e:
+        logger.error(f"{step.capitalize()} failed after ingesting file_record_id={file_record_id}: {e}", exc_info=True)
 
-def ingest_file_safe(file_record_id: int, db: Session) -> dict:
+
+def ingest_file_safe(file_record_id: int, db: Session, claim: Optional[Claim] = None) -> dict:
     """
     Safe wrapper around ingest_file that catches exceptions and returns a dict.
     
@@ -150,17 +248,19 @@ def ingest_file_safe(file_record_id: int, db: Session) -> dict:
     Args:
         file_record_id: ID of the FileRecord to ingest
         db: Database session
+        claim: The worker's claim when a background worker has claimed the record
         
     Returns:
         Dict with status, message, and optional result
     """
     try:
-        result = ingest_file(file_record_id, db)
+        result = ingest_file(file_record_id, db, claim=claim)
         return {
             "status": "success" if result.success else "failed",
             "file_record_id": file_record_id,
             "message": result.message,
             "parsed_entities_count": len(result.parsed_entities),
+            "soundings_count": result.soundings_count,
             "metadata": result.metadata
         }
     except FileNotFoundError as e:
@@ -187,6 +287,14 @@ def ingest_file_safe(file_record_id: int, db: Session) -> dict:
             "message": str(e),
             "error_type": "NoParserError"
         }
+    except ClaimLostError as e:
+        logger.warning(f"ingest_file_safe: ClaimLostError - {e}")
+        return {
+            "status": "error",
+            "file_record_id": file_record_id,
+            "message": str(e),
+            "error_type": "ClaimLostError"
+        }
     except IngestionError as e:
         logger.error(f"ingest_file_safe: IngestionError - {e}")
         return {
@@ -0,0 +1,305 @@
+"""
+DeckBrain Core API - Batched sounding sink.
+
+Parsers hand soundings to a SoundingSink in fixed-size columnar batches
+instead of materialising every fix as a dict or ORM object. The sink writes
+each batch to the soundings table with one bulk statement (COPY on
+PostgreSQL, executemany elsewhere), so memory stays bounded by the batch
+size no matter how large the source file is. Ingestion commits every
+INGESTION_COMMIT_SOUNDINGS soundings, so a large file never holds the
+database's write lock for long; each sounding records its file_record_id so
+a file that fails after some commits can be removed again (see
+modules.ingestion.cleanup).
+
+Rows are written in the table's compact integer encoding (see
+core.models.types). Each batch is first rounded to that precision, so trip
+aggregates, detail levels, quadkeys and cells are computed from exactly the
+values that are stored.
+"""
+
+import io
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import Sounding
+from core.models.types import EpochMillis
+from modules.soundings.spatial import quadkeys
+from modules.trips.simplify import detail_levels
+
+if TYPE_CHECKING:
+    from modules.bathymetry.grid import BathymetryAggregator
+    from modules.tiles.cells import TileAggregator
+    from .segmentation import TripSegmenter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SoundingBatch:
+    """
+    A batch of soundings in columnar form.
+
+    All arrays have the same length. Timestamps are UTC epoch seconds
+    (float64); missing optional values are NaN.
+    """
+    timestamp: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    depth: np.ndarray
+    water_temp: Optional[np.ndarray] = None
+    speed_knots: Optional[np.ndarray] = None
+    course_deg: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def stored_precision(self) -> "SoundingBatch":
+        """Return the batch rounded to the precision the soundings table stores."""
+        columns = Sounding.__table__.c
+
+        def quantize(name: str) -> Optional[np.ndarray]:
+            values = getattr(self, name)
+            return columns[name].type.quantize(values) if values is not None else None
+
+        return SoundingBatch(
+            timestamp=EpochMillis.quantize(self.timestamp),
+            **{name: quantize(name) for name in (
+                "latitude", "longitude", "depth", "water_temp", "speed_knots", "course_deg"
+            )},
+        )
+
+    def sorted_by_time(self) -> "SoundingBatch":
+        """Return the batch ordered by timestamp (self if it already is)."""
+        if len(self) < 2 or not np.any(np.diff(self.timestamp) < 0):
+            return self
+        order = np.argsort(self.timestamp, kind="stable")
+        return SoundingBatch(**{
+            name: (values[order] if values is not None else None)
+            for name, values in vars(self).items()
+        })
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[float]]) -> "SoundingBatch":
+        """
+        Build a batch from per-column Python lists (as collected by text parsers).
+
+        Args:
+            columns: Mapping of column name to list of values; optional columns may be omitted
+
+        Returns:
+            SoundingBatch with float64 arrays
+        """
+        def as_array(name: str) -> Optional[np.ndarray]:
+            values = columns.get(name)
+            return np.asarray(values, dtype=np.float64) if values is not None else None
+
+        return cls(
+            timestamp=as_array("timestamp"),
+            latitude=as_array("latitude"),
+            longitude=as_array("longitude"),
+            depth=as_array("depth"),
+            water_temp=as_array("water_temp"),
+            speed_knots=as_array("speed_knots"),
+            course_deg=as_array("course_deg"),
+        )
+
+
+# Column order used for both executemany and COPY (the table's own order: the compiled INSERT follows it)
+INSERT_COLUMNS = (
+    "device_id", "trip_id", "tow_id", "file_record_id", "timestamp", "latitude", "longitude", "depth",
+    "water_temp", "speed_knots", "course_deg", "detail_level", "quadkey",
+)
+
+
+def _encoded_columns(batch: SoundingBatch, n: int) -> List[List]:
+    """Stored integer values of the batch's sounding columns, in INSERT_COLUMNS order."""
+    columns = Sounding.__table__.c
+    return [
+        EpochMillis.encode(batch.timestamp),
+        *(
+            columns[name].type.encode(getattr(batch, name), n)
+            for name in ("latitude", "longitude", "depth", "water_temp", "speed_knots", "course_deg")
+        ),
+    ]
+
+
+class SoundingSink:
+    """
+    Writes sounding batches for one device into the soundings table.
+
+    Rows bypass the ORM and SQLAlchemy's per-row bind processing:
+    - PostgreSQL (psycopg2): COPY soundings FROM STDIN
+    - Other databases: a single DBAPI executemany per batch
+
+    Each batch is ordered by time and every sounding gets its detail_level
+    (see modules.trips.simplify) so simplified tracks can be served without
+    recomputation, and its quadkey (see modules.soundings.spatial) for
+    bounding-box queries. If a TripSegmenter is given, soundings are also assigned
+    trip/tow ids before they are inserted; levels are then computed per
+    trip/tow piece of the batch. If a TileAggregator is given, the batch is
+    also merged into the per-zoom sounding cells used by vector tiles, and
+    with a BathymetryAggregator into the device's depth grid.
+
+    The caller owns the transaction. With commit_every set, the sink commits
+    the session (soundings, trips/tows and cells alike) once that many
+    soundings were written since the last commit, calling before_commit
+    first (ingestion renews the worker's claim there, see
+    modules.ingestion.claims); otherwise nothing is committed here, and a
+    file that fails halfway leaves no partial soundings (or trips) behind
+    after rollback.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        device_id: int,
+        segmenter: Optional["TripSegmenter"] = None,
+        tiles: Optional["TileAggregator"] = None,
+        bathymetry: Optional["BathymetryAggregator"] = None,
+        file_record_id: Optional[int] = None,
+        commit_every: int = 0,
+        before_commit: Optional[Callable[[], None]] = None,
+    ):
+        """
+        Args:
+            db: Database session
+            device_id: Internal devices.id the soundings belong to
+            segmenter: Optional trip/tow segmenter for this device
+            tiles: Optional vector tile aggregator for this device
+            bathymetry: Optional depth grid aggregator for this device
+            file_record_id: File the soundings come from (stored on every row)
+            commit_every: Commit after this many soundings (0 = never commit)
+            before_commit: Called in the transaction right before each of those commits
+        """
+        self.db = db
+        self.device_id = device_id
+        self.segmenter = segmenter
+        self.tiles = tiles
+        self.bathymetry = bathymetry
+        self.file_record_id = file_record_id
+        self.commit_every = commit_every
+        self.before_commit = before_commit
+        self.count = 0
+        self.committed = 0  # Soundings already committed by the sink
+        self._insert_sql: Optional[str] = None
+        self._use_copy = False
+
+    def _prepare(self) -> None:
+        """Pick the insert strategy for the session's dialect."""
+        dialect = self.db.connection().dialect
+        self._use_copy = dialect.name == "postgresql" and dialect.driver == "psycopg2"
+        self._insert_sql = str(
+            Sounding.__table__.insert().compile(dialect=dialect, column_keys=list(INSERT_COLUMNS))
+        )
+
+    def write(self, batch: SoundingBatch) -> None:
+        """
+        Insert one batch of soundings.
+
+        Args:
+            batch: Columnar batch to insert
+        """
+        n = len(batch)
+        if n == 0:
+            return
+        if self._insert_sql is None:
+            self._prepare()
+
+        batch = batch.sorted_by_time().stored_precision()
+        trip_ids: List[Optional[int]] = [None] * n
+        tow_ids: List[Optional[int]] = [None] * n
+        piece_starts = None
+        if self.segmenter is not None:
+            trip_array, tow_array = self.segmenter.assign(batch)
+            trip_ids = trip_array.tolist()
+            tow_ids = [tow_id or None for tow_id in tow_array.tolist()]
+            # A new trip or tow starts an independent polyline
+            changes = (np.diff(trip_array) != 0) | (np.diff(tow_array) != 0)
+            piece_starts = np.flatnonzero(changes) + 1
+        levels = detail_levels(batch.latitude, batch.longitude, piece_starts).tolist()
+        keys = quadkeys(batch.latitude, batch.longitude).tolist()
+
+        if self._use_copy:
+            self._copy(batch, n, trip_ids, tow_ids, levels, keys)
+        else:
+            self._executemany(batch, n, trip_ids, tow_ids, levels, keys)
+        if self.tiles is not None:
+            self.tiles.add(batch.latitude, batch.longitude, batch.depth)
+        if self.bathymetry is not None:
+            self.bathymetry.add(batch.latitude, batch.longitude, batch.depth)
+
+        self.count += n
+        logger.debug(f"Inserted {n} soundings for device_id={self.device_id} ({self.count} total)")
+        if self.commit_every and self.count - self.committed >= self.commit_every:
+            if self.before_commit is not None:
+                self.before_commit()
+            self.db.commit()
+            self.committed = self.count
+
+    def _executemany(
+        self, batch: SoundingBatch, n: int, trip_ids: List, tow_ids: List, levels: List, keys: List
+    ) -> None:
+        """Insert a batch with one DBAPI executemany call."""
+        rows = list(zip(
+            [self.device_id] * n,
+            trip_ids,
+            tow_ids,
+            [self.file_record_id] * n,
+            *_encoded_columns(batch, n),
+            levels,
+            keys,
+        ))
+        self.db.connection().exec_driver_sql(self._insert_sql, rows)
+
+    def _copy(
+        self, batch: SoundingBatch, n: int, trip_ids: List, tow_ids: List, levels: List, keys: List
+    ) -> None:
+        """Stream a batch into PostgreSQL with COPY ... FROM STDIN (text format)."""
+        def column(values: List) -> List[str]:
+            return ["\\N" if v is None else repr(v) for v in values]
+
+        device_id = str(self.device_id)
+        file_record_id = "\\N" if self.file_record_id is None else str(self.file_record_id)
+        lines = [
+            "\t".join(fields)
+            for fields in zip(
+                [device_id] * n,
+                column(trip_ids),
+                column(tow_ids),
+                [file_record_id] * n,
+                *(column(values) for values in _encoded_columns(batch, n)),
+                map(str, levels),
+                map(str, keys),
+            )
+        ]
+        buffer = io.StringIO("\n".join(lines) + "\n")
+        cursor = self.db.connection().connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY soundings ({', '.join(INSERT_COLUMNS)}) FROM STDIN",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
+    def write_all(self, batches: Iterable[SoundingBatch]) -> int:
+        """
+        Insert every batch from an iterable (typically a parser generator).
+
+        Returns:
+            Number of soundings written by this call
+        """
+        before = self.count
+        for batch in batches:
+            self.write(batch)
+        return self.count - before
+
+
+def batch_size() -> int:
+    """Number of soundings per batch parsers should produce."""
+    return settings.ingestion_batch_size
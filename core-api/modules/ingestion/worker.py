@@ -0,0 +1,454 @@
+"""
+DeckBrain Core API - Background ingestion workers.
+
+Decouples ingestion from the upload request. Uploads only store the file and
+create a FileRecord with processing_status="stored"; this worker pool claims
+those records and parses them in a process pool, so CPU-bound parsing never
+blocks the API event loop.
+
+Claiming is row-level and safe across workers and API processes:
+- PostgreSQL: candidates are selected with FOR UPDATE SKIP LOCKED
+- All databases: the claim itself is a conditional UPDATE on the
+  processing_status and claimed_at that were read, so only one worker can
+  win a given record, including when several reclaim the same stale claim
+
+Files of one device are ingested one at a time, oldest first: trip/tow
+segmentation extends the device's latest trip (see
+modules.ingestion.segmentation), which concurrent files would race on. Only
+the device's lowest claimable id is a candidate, and devices with a file
+still in "processing" (claimed within the claim timeout) are skipped.
+
+A worker renews its claim with every commit of the file it ingests and
+stops if another worker has taken the file over (see
+modules.ingestion.claims); the outcome of an attempt is only recorded
+while its claim still holds.
+
+Failed files are retried with exponential backoff until
+settings.ingestion_max_attempts is reached. Files whose failure cannot be
+fixed by retrying (no parser for the format) are not retried. A stale claim
+on a file that has used up its attempts is marked "failed".
+
+Run standalone (instead of inside the API process) with:
+    python -m modules.ingestion.worker
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from core.config import settings
+from core.db import SessionLocal
+from core.models import FileRecord
+from .claims import Claim
+from .cleanup import discard_file_soundings
+from .service import ingest_file_safe
+
+logger = logging.getLogger(__name__)
+
+# Error types that retrying cannot fix
+NON_RETRYABLE_ERRORS = {"NoParserError", "FileNotFoundError", "InvalidStatusError"}
+
+
+def _stale_before(now: datetime) -> datetime:
+    """Claims older than this are considered abandoned (e.g. the worker crashed)."""
+    return now - timedelta(seconds=settings.ingestion_claim_timeout_seconds)
+
+
+def _claimable_filter(now: datetime, record=FileRecord):
+    """SQL condition selecting file_records a worker may claim (record may be an alias)."""
+    return or_(
+        record.processing_status == "stored",
+        and_(
+            record.processing_status == "failed",
+            record.next_attempt_at.isnot(None),
+            record.next_attempt_at <= now,
+            record.attempts < settings.ingestion_max_attempts,
+        ),
+        and_(
+            record.processing_status == "processing",
+            record.claimed_at.isnot(None),
+            record.claimed_at < _stale_before(now),
+            record.attempts < settings.ingestion_max_attempts,
+        ),
+    )
+
+
+def _next_per_device(now: datetime):
+    """Subquery of the lowest claimable file_record id of each device that is not busy."""
+    active = aliased(FileRecord)
+    busy_devices = select(active.device_id).where(
+        active.processing_status == "processing",
+        active.claimed_at >= _stale_before(now),
+    )
+    candidate = aliased(FileRecord)
+    return (
+        select(func.min(candidate.id))
+        .where(_claimable_filter(now, candidate), candidate.device_id.notin_(busy_devices))
+        .group_by(candidate.device_id)
+    )
+
+
+def fail_abandoned_claims(db: Session, now: datetime) -> List[int]:
+    """
+    Mark files whose claim went stale on their last allowed attempt as "failed".
+
+    Such files are no longer claimable and would otherwise stay in
+    "processing" forever. Nothing is committed here.
+
+    Args:
+        db: Database session
+        now: Reference time (naive UTC)
+
+    Returns:
+        IDs of the file_records marked failed
+    """
+    abandoned = (
+        db.query(FileRecord.id, FileRecord.claimed_at)
+        .filter(
+            FileRecord.processing_status == "processing",
+            FileRecord.claimed_at.isnot(None),
+            FileRecord.claimed_at < _stale_before(now),
+            FileRecord.attempts >= settings.ingestion_max_attempts,
+        )
+        .all()
+    )
+    failed: List[int] = []
+    for file_record_id, claimed_at in abandoned:
+        # Same compare-and-swap as a claim, so only one worker fails (and cleans up) the file
+        result = db.execute(
+            update(FileRecord)
+            .where(
+                FileRecord.id == file_record_id,
+                FileRecord.processing_status == "processing",
+                FileRecord.claimed_at == claimed_at,
+            )
+            .values(
+                processing_status="failed",
+                claimed_at=None,
+                claimed_by=None,
+                next_attempt_at=None,
+                last_error=f"Ingestion did not finish within {settings.ingestion_claim_timeout_seconds}s "
+                           f"on the last allowed attempt",
+            )
+        )
+        if result.rowcount == 1:
+            failed.append(file_record_id)
+    if failed:
+        logger.error(f"Marked file_records {failed} failed: claim timed out after "
+                     f"{settings.ingestion_max_attempts} attempt(s)")
+    return failed
+
+
+def claim_files(db: Session, worker_id: str, limit: int) -> List[int]:
+    """
+    Claim up to `limit` file_records for ingestion.
+
+    Each claimed record is moved to processing_status="processing" with
+    claimed_at/claimed_by set and attempts incremented, in its own short
+    transaction. At most one record per device is claimed, and none of a
+    device that already has a file being processed.
+
+    Args:
+        db: Database session
+        worker_id: Identifier of the claiming worker (for diagnostics)
+        limit: Maximum number of records to claim
+
+    Returns:
+        IDs of the records this worker now owns
+    """
+    now = datetime.utcnow()
+    abandoned = fail_abandoned_claims(db, now)
+    candidates = (
+        db.query(FileRecord.id, FileRecord.processing_status, FileRecord.claimed_at)
+        .filter(FileRecord.id.in_(_next_per_device(now)), _claimable_filter(now))
+        .order_by(FileRecord.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    claimed: List[int] = []
+    for file_record_id, current_status, claimed_at in candidates:
+        # Compare-and-swap on the status and claim we saw, so concurrent workers cannot both win
+        same_claim = FileRecord.claimed_at.is_(None) if claimed_at is None else FileRecord.claimed_at == claimed_at
+        result = db.execute(
+            update(FileRecord)
+            .where(FileRecord.id == file_record_id, FileRecord.processing_status == current_status, same_claim)
+            .values(
+                processing_status="processing",
+                claimed_at=now,
+                claimed_by=worker_id,
+                attempts=FileRecord.attempts + 1,
+            )
+        )
+        if result.rowcount == 1:
+            claimed.append(file_record_id)
+    db.commit()
+
+    # Their last attempt may have committed soundings before it died
+    for file_record_id in abandoned:
+        try:
+            discard_file_soundings(db, db.get(FileRecord, file_record_id))
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not discard soundings of file_record {file_record_id}: {e}", exc_info=True)
+
+    if claimed:
+        logger.info(f"Worker {worker_id} claimed file_records {claimed}")
+    return claimed
+
+
+def record_outcome(db: Session, claim: Claim, result: dict) -> bool:
+    """
+    Store the outcome of an ingestion attempt and schedule a retry if needed.
+
+    Nothing is written unless the claim still holds: a worker that lost the
+    file to another one must not overwrite the new owner's state.
+
+    Args:
+        db: Database session
+        claim: The claim the attempt ran under
+        result: Dict returned by ingest_file_safe
+
+    Returns:
+        True if the outcome was recorded
+    """
+    file_record_id = claim.file_record_id
+    file_record = db.query(FileRecord).filter(FileRecord.id == file_record_id).first()
+    if not file_record:
+        return False
+
+    values = {"claimed_at": None, "claimed_by": None}
+    if result["status"] == "success":
+        values.update(last_error=None, next_attempt_at=None)
+    else:
+        if file_record.processing_status == "processing":
+            # Errors raised before the parser ran leave the claim status behind
+            values["processing_status"] = "failed"
+        values["last_error"] = result.get("message")
+
+        retryable = result.get("error_type") not in NON_RETRYABLE_ERRORS
+        if retryable and file_record.attempts < settings.ingestion_max_attempts:
+            delay = settings.ingestion_retry_backoff_seconds * (2 ** max(file_record.attempts - 1, 0))
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            message = f"Ingestion of file_record {file_record_id} failed (attempt {file_record.attempts}), retrying in {delay:.0f}s"
+        else:
+            values["next_attempt_at"] = None
+            message = f"Ingestion of file_record {file_record_id} failed permanently after {file_record.attempts} attempt(s): {result.get('message')}"
+
+    # Compare-and-swap on the claim, so a stale worker never overwrites the new owner's result
+    updated = db.execute(
+        update(FileRecord).where(claim.owned()).values(**values).execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not updated:
+        logger.warning(f"Worker {claim.worker_id} no longer owns file_record {file_record_id}; outcome not recorded")
+        return False
+    if result["status"] != "success":
+        if values["next_attempt_at"] is not None:
+            logger.warning(message)
+        else:
+            logger.error(message)
+    return True
+
+
+def run_claimed_ingestion(file_record_id: int, worker_id: str) -> dict:
+    """
+    Ingest a claimed file_record (process pool entry point).
+
+    Runs in a worker process with its own database session.
+
+    Args:
+        file_record_id: ID of a FileRecord already claimed by this worker
+        worker_id: claimed_by of the claim (see claim_files)
+
+    Returns:
+        Dict returned by ingest_file_safe
+    """
+    db = SessionLocal()
+    try:
+        claimed_at = (
+            db.query(FileRecord.claimed_at)
+            .filter(FileRecord.id == file_record_id, FileRecord.claimed_by == worker_id)
+            .scalar()
+        )
+        if claimed_at is None:
+            return {
+                "status": "error",
+                "file_record_id": file_record_id,
+                "message": f"FileRecord {file_record_id} is no longer claimed by {worker_id}",
+                "error_type": "ClaimLostError",
+            }
+        claim = Claim(file_record_id, worker_id, claimed_at)
+        result = ingest_file_safe(file_record_id, db, claim=claim)
+        record_outcome(db, claim, result)
+        return result
+    finally:
+        db.close()
+
+
+class IngestionWorkerPool:
+    """
+    Polls for claimable file_records and parses them in a process pool.
+
+    At most settings.ingestion_concurrency files are in flight at once.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None):
+        """
+        Initialize the worker pool (call start() to begin processing).
+
+        Args:
+            concurrency: Max files in flight (defaults to settings.ingestion_concurrency)
+            poll_interval: Idle wait in seconds (defaults to settings.ingestion_poll_interval_seconds)
+        """
+        self.concurrency = max(1, concurrency or settings.ingestion_concurrency)
+        self.poll_interval = poll_interval if poll_interval is not None else settings.ingestion_poll_interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_broken = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Future] = set()
+        self._wakeup = asyncio.Event()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        """Create the parser process pool."""
+        # "spawn" so children never inherit the parent's pooled DB connections
+        return ProcessPoolExecutor(
+            max_workers=self.concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def start(self) -> None:
+        """Start the process pool and the polling loop on the running event loop."""
+        self._executor = self._new_executor()
+        self._loop = asyncio.get_running_loop()
+        self._loop_task = self._loop.create_task(self._run())
+        logger.info(f"Ingestion worker pool started: worker_id={self.worker_id}, concurrency={self.concurrency}")
+
+    def notify(self) -> None:
+        """Wake the polling loop early (e.g. right after an upload); safe from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def stop(self) -> None:
+        """Stop polling, wait for in-flight files, and shut the process pool down."""
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        logger.info("Ingestion worker pool stopped")
+
+    async def _run(self) -> None:
+        """Polling loop: claim files while there is free capacity."""
+        loop = asyncio.get_running_loop()
+        while True:
+            free = self.concurrency - len(self._in_flight)
+            claimed: List[int] = []
+            if free > 0:
+                try:
+                    claimed = await loop.run_in_executor(None, self._claim, free)
+                except Exception as e:
+                    logger.error(f"Failed to claim files for ingestion: {e}", exc_info=True)
+
+            if claimed and self._executor_broken:
+                # A parser process died and took the pool down with it; start a fresh one
+                logger.warning("Replacing broken ingestion process pool")
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self._executor_broken = False
+
+            for file_record_id in claimed:
+                future = loop.run_in_executor(self._executor, run_claimed_ingestion, file_record_id, self.worker_id)
+                self._in_flight.add(future)
+                future.add_done_callback(lambda f, fid=file_record_id: self._on_done(f, fid))
+
+            if not claimed or len(self._in_flight) >= self.concurrency:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _claim(self, limit: int) -> List[int]:
+        """Claim files in a short-lived session (runs in a thread)."""
+        db = SessionLocal()
+        try:
+            return claim_files(db, self.worker_id, limit)
+        finally:
+            db.close()
+
+    def _on_done(self, future: asyncio.Future, file_record_id: int) -> None:
+        """Log the outcome of a finished file and free its slot."""
+        self._in_flight.discard(future)
+        self._wakeup.set()
+        try:
+            result = future.result()
+            logger.info(f"Ingestion finished for file_record {file_record_id}: {result['status']} - {result.get('message')}")
+        except BrokenProcessPool as e:
+            # The claim times out and the file is picked up again by a fresh pool
+            self._executor_broken = True
+            logger.error(f"Ingestion worker process died on file_record {file_record_id}: {e}")
+        except Exception as e:
+            # Unexpected failure outside ingest_file_safe; the claim times out and the file is retried
+            logger.error(f"Ingestion worker crashed on file_record {file_record_id}: {e}", exc_info=True)
+
+
+# Pool started by the API process (see app.main), if enabled
+_pool: Optional[IngestionWorkerPool] = None
+
+
+def start_worker_pool() -> IngestionWorkerPool:
+    """Start the global ingestion worker pool on the running event loop."""
+    global _pool
+    if _pool is None:
+        _pool = IngestionWorkerPool()
+        _pool.start()
+    return _pool
+
+
+async def stop_worker_pool() -> None:
+    """Stop the global ingestion worker pool, if running."""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
+
+def notify_new_file() -> None:
+    """Tell the in-process worker pool (if any) that a file is waiting."""
+    if _pool is not None:
+        _pool.notify()
+
+
+async def _main() -> None:
+    """Run the worker pool until interrupted."""
+    start_worker_pool()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_worker_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
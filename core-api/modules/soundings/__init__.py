@@ -0,0 +1,6 @@
+"""
+DeckBrain Core API - Soundings module.
+
+Spatial indexing and queries over the normalized soundings table, and the
+per-trip read path (soundings table or columnar segments).
+"""
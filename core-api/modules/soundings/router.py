@@ -0,0 +1,169 @@
+"""
+DeckBrain Core API - Sounding query endpoints.
+
+Serves depth soundings across trips, filtered by area, time, depth and device.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.db import SessionLocal, get_db
+from core.models import Device
+from .stream import (
+    BINARY_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    SoundingFilter,
+    SoundingStream,
+    binary_body,
+    decode_position,
+    ndjson_body
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """
+    Parse "min_lon,min_lat,max_lon,max_lat" into (min_lat, min_lon, max_lat, max_lon).
+
+    min_lon may exceed max_lon for boxes crossing the antimeridian.
+
+    Raises:
+        HTTPException 400: If the box is malformed
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox must be min_lon,min_lat,max_lon,max_lat"
+        )
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox is out of range (latitudes -90..90 with min_lat <= max_lat, longitudes -180..180)"
+        )
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a query datetime to naive UTC (how timestamps are stored)."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _stream_body(stream_factory, encode) -> Iterator[bytes]:
+    """Run a stream on its own session, which lives as long as the response body."""
+    db = SessionLocal()
+    try:
+        stream = stream_factory(db)
+        yield from encode(stream)
+        logger.info(f"Streamed {stream.count} soundings (next_cursor={'yes' if stream.next_cursor else 'no'})")
+    finally:
+        db.close()
+
+
+@router.get("/soundings")
+def query_soundings(
+    device_id: Optional[List[str]] = Query(None, description="Device(s) to include (repeatable); all devices if omitted"),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat in degrees"),
+    start: Optional[datetime] = Query(None, description="Earliest timestamp (inclusive, ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Latest timestamp (inclusive, ISO 8601)"),
+    min_depth: Optional[float] = Query(None, description="Minimum depth in meters"),
+    max_depth: Optional[float] = Query(None, description="Maximum depth in meters"),
+    limit: int = Query(
+        10000, ge=1, le=settings.soundings_query_max_limit,
+        description="Maximum number of soundings in this response"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    response_format: str = Query(
+        "ndjson",
+        alias="format",
+        pattern="^(ndjson|binary)$",
+        description="ndjson (default) or binary (columnar blocks)"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Query soundings across trips.
+
+    Results are ordered by (device, timestamp, id) and streamed as they are
+    read, so responses of any size use constant memory. Each response holds
+    at most `limit` soundings; pass its next_cursor (same filters) to get
+    the next page.
+
+    Query Parameters:
+    - device_id: Device(s) to include (repeatable; default: all devices)
+    - bbox: Bounding box "min_lon,min_lat,max_lon,max_lat" (min_lon > max_lon crosses the antimeridian)
+    - start, end: Time window (inclusive)
+    - min_depth, max_depth: Depth range in meters (inclusive)
+    - limit: Page size (default: 10000)
+    - cursor: Continue after the previous page
+    - format: ndjson (default) or binary
+
+    Returns:
+        NDJSON lines (one sounding each, then {"next_cursor": ...}) or the
+        binary block stream described in modules/soundings/stream.py
+
+    Raises:
+        HTTPException 400: If bbox, the depth range, the time window or the cursor is invalid
+        HTTPException 404: If a device is not found
+    """
+    box = parse_bbox(bbox) if bbox else None
+    start, end = as_utc(start), as_utc(end)
+    if start is not None and end is not None and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+    if min_depth is not None and max_depth is not None and min_depth > max_depth:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_depth must not exceed max_depth"
+        )
+    try:
+        after = decode_position(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    query = db.query(Device.id, Device.device_id).order_by(Device.id)
+    if device_id:
+        query = query.filter(Device.device_id.in_(device_id))
+    devices = [(row.id, row.device_id) for row in query]
+    missing = set(device_id or []) - {name for _, name in devices}
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device not found: {', '.join(sorted(missing))}"
+        )
+
+    logger.info(
+        f"Querying soundings: devices={[name for _, name in devices]}, bbox={bbox}, "
+        f"start={start}, end={end}, depth={min_depth}..{max_depth}, limit={limit}, format={response_format}"
+    )
+    filters = SoundingFilter(
+        devices=devices,
+        bbox=box,
+        start=start,
+        end=end,
+        min_depth=min_depth,
+        max_depth=max_depth,
+    )
+
+    def stream_factory(stream_db: Session) -> SoundingStream:
+        return SoundingStream(stream_db, filters, limit, settings.soundings_query_chunk_size, after)
+
+    if response_format == "binary":
+        return StreamingResponse(_stream_body(stream_factory, binary_body), media_type=BINARY_MEDIA_TYPE)
+    return StreamingResponse(_stream_body(stream_factory, ndjson_body), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,230 @@
+"""
+DeckBrain Core API - Quadkey spatial index for soundings.
+
+A (latitude, longitude) B-tree cannot answer bounding-box queries: only the
+latitude prefix is selective, so a viewport reads every sounding in its
+latitude band around the globe. Instead, each sounding stores a quadkey: the
+Morton (Z-order) code of its cell in a quadtree over geographic coordinates,
+QUADKEY_ZOOM levels deep (cells of about 2.4 x 1.2 m at the equator).
+
+Every quadtree cell is one contiguous quadkey range, so a bounding box is
+covered by cells of a coarser level and queried as a handful of range
+scans on the (device_id, quadkey) index; an exact latitude/longitude filter
+then drops the overshoot at the edges of the cover. Plain B-tree ranges work
+the same on SQLite and PostgreSQL, without R*Tree or PostGIS.
+"""
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from core.models import Sounding
+
+# Depth of the quadtree: 2 ** 24 cells per axis, 48-bit keys
+QUADKEY_ZOOM = 24
+# Most quadtree cells a bounding box is covered with, and most key ranges
+# they are merged into (one index range scan each)
+MAX_COVER_CELLS = 256
+MAX_RANGES = 8
+METERS_PER_DEGREE = 111320.0
+
+_CELLS = 1 << QUADKEY_ZOOM
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Move bit i of each value to bit 2i (values below 2 ** 32)."""
+    v = values.astype(np.uint64)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def _cell_coordinates(lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+    """Column and row of the QUADKEY_ZOOM cells containing the coordinates."""
+    x = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * _CELLS)
+    y = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / 180.0 * _CELLS)
+    return (
+        np.clip(x, 0, _CELLS - 1).astype(np.int64),
+        np.clip(y, 0, _CELLS - 1).astype(np.int64),
+    )
+
+
+def quadkeys(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Compute the quadkeys of coordinates.
+
+    Args:
+        lat: Latitudes in degrees
+        lon: Longitudes in degrees
+
+    Returns:
+        int64 array of quadkeys
+    """
+    x, y = _cell_coordinates(lat, lon)
+    return (_spread_bits(x) | (_spread_bits(y) << np.uint64(1))).astype(np.int64)
+
+
+def quadkey_ranges(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    max_ranges: int = MAX_RANGES
+) -> List[Tuple[int, int]]:
+    """
+    Cover a bounding box with inclusive quadkey ranges.
+
+    The box is covered by the cells of the deepest quadtree level that needs
+    at most MAX_COVER_CELLS of them. Runs of consecutive cells become one
+    range each; while there are more than max_ranges, the ranges separated
+    by the smallest gaps are joined (each gap is key space outside the box).
+
+    Args:
+        min_lat, min_lon, max_lat, max_lon: Bounding box in degrees (min_lon <= max_lon)
+        max_ranges: Upper bound on the number of ranges
+
+    Returns:
+        Sorted, non-overlapping (first, last) quadkey ranges
+    """
+    (x0, x1), (y0, y1) = (
+        values.tolist() for values in _cell_coordinates([min_lat, max_lat], [min_lon, max_lon])
+    )
+    shift = 0
+    while shift < QUADKEY_ZOOM:
+        cover = ((x1 >> shift) - (x0 >> shift) + 1) * ((y1 >> shift) - (y0 >> shift) + 1)
+        if cover <= MAX_COVER_CELLS:
+            break
+        shift += 1
+
+    xs, ys = np.meshgrid(
+        np.arange(x0 >> shift, (x1 >> shift) + 1, dtype=np.int64),
+        np.arange(y0 >> shift, (y1 >> shift) + 1, dtype=np.int64),
+    )
+    cells = np.sort((_spread_bits(xs.ravel()) | (_spread_bits(ys.ravel()) << np.uint64(1))).astype(np.int64))
+    width = 2 * shift  # quadkey bits below the cell level
+
+    run_starts = np.flatnonzero(np.concatenate(([True], np.diff(cells) != 1)))
+    firsts = cells[run_starts] << width
+    lasts = ((cells[np.append(run_starts[1:], len(cells)) - 1] + 1) << width) - 1
+    if len(firsts) > max_ranges:
+        # Keep the max_ranges - 1 largest gaps as range boundaries
+        gaps = firsts[1:] - lasts[:-1]
+        kept = np.sort(np.argsort(gaps, kind="stable")[len(gaps) - (max_ranges - 1):])
+        firsts = np.concatenate((firsts[:1], firsts[kept + 1]))
+        lasts = np.concatenate((lasts[kept], lasts[-1:]))
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+def _has_unindexed(db: Session, device_id: int) -> bool:
+    """Whether a device has soundings without a quadkey (ingested before the index existed)."""
+    pending = (
+        db.query(Sounding.id)
+        .filter(Sounding.device_id == device_id, Sounding.quadkey.is_(None))
+        .first()
+    )
+    return pending is not None
+
+
+def bbox_criteria(
+    db: Session,
+    device_id: int,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float
+) -> List:
+    """
+    SQL filters selecting a device's soundings inside a bounding box.
+
+    Each covering quadkey range becomes its own (device_id, quadkey) index
+    range scan. A box crossing the antimeridian (min_lon > max_lon) is split
+    in two. Devices with soundings that have no quadkey yet fall back to a
+    plain latitude/longitude filter until scripts/backfill_quadkeys.py has run.
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+        min_lat, min_lon, max_lat, max_lon: Bounding box in degrees
+
+    Returns:
+        List of filter expressions on Sounding (device filter included)
+    """
+    boxes: Sequence[Tuple[float, float]] = (
+        [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+    )
+    inside = and_(
+        Sounding.latitude.between(min_lat, max_lat),
+        or_(*(Sounding.longitude.between(west, east) for west, east in boxes)),
+    )
+    if _has_unindexed(db, device_id):
+        return [Sounding.device_id == device_id, inside]
+
+    ranges = [
+        key_range
+        for west, east in boxes
+        for key_range in quadkey_ranges(min_lat, west, max_lat, east)
+    ]
+    # device_id is repeated in every branch so each one is a composite index
+    # range; table columns keep building the expression cheap
+    column = Sounding.__table__.c
+    return [
+        or_(*(
+            and_(column.device_id == device_id, column.quadkey.between(first, last))
+            for first, last in ranges
+        )),
+        inside,
+    ]
+
+
+def radius_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Bounding box of a circle (equirectangular approximation).
+
+    Returns:
+        (min_lat, min_lon, max_lat, max_lon) in degrees
+    """
+    dlat = radius_m / METERS_PER_DEGREE
+    dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lat - dlat, -90.0),
+        (lon - dlon + 180.0) % 360.0 - 180.0,
+        min(lat + dlat, 90.0),
+        (lon + dlon + 180.0) % 360.0 - 180.0,
+    )
+
+
+def tows_passing(
+    db: Session,
+    device_id: int,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: Optional[int] = None
+) -> List[int]:
+    """
+    Tows of a device with at least one sounding within radius_m of a point.
+
+    The search box is the circle's bounding box, matched through the
+    quadkey index (see bbox_criteria()).
+
+    Returns:
+        Tow ids in ascending order
+    """
+    query = (
+        db.query(Sounding.tow_id)
+        .filter(
+            *bbox_criteria(db, device_id, *radius_box(lat, lon, radius_m)),
+            Sounding.tow_id.isnot(None),
+        )
+        .distinct()
+        .order_by(Sounding.tow_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return [tow_id for (tow_id,) in query]
@@ -0,0 +1,314 @@
+"""
+DeckBrain Core API - Sounding store (per-trip track reads).
+
+Every fix is a row of the soundings table, which is what bounding-box
+queries, tiles and segmentation work on. Reading a whole trip back from it
+costs an index range scan and per-row decoding, however often the (never
+changing) trip is read. With SOUNDING_STORE_BACKEND=segments each trip
+touched by ingestion is also written, after the ingestion commit, as one
+immutable columnar segment:
+
+    STORAGE_PATH/segments/<devices.id>/<trip id>.<version digest>.npz
+
+a NumPy archive with one array per column (deflated unless
+SOUNDING_SEGMENTS_COMPRESSED is false), catalogued in sounding_segments.
+
+Trip and tow tracks, and analyses of single trips, read through
+read_track() (read_track_async() in async endpoints). It serves the
+trip's segment when the segment was written for the trip's current version
+(see modules.trips.track_cache.trip_version) and the soundings table
+otherwise, so a trip that grew since its segment was written is never
+served stale. Both backends return the same columns, ordered by
+(timestamp, id):
+
+    time          int64     UTC epoch microseconds
+    latitude      float64   degrees
+    longitude     float64   degrees
+    depth         float64   meters
+    water_temp    float64   Celsius (NaN = not recorded)
+    speed_knots   float64   knots (NaN = not recorded)
+    course_deg    float64   degrees (NaN = not recorded)
+    tow_id        int32     0 = not towing
+    detail_level  int16     -1 = not computed (kept at every level)
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import BigInteger, Integer, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import Sounding, SoundingSegment, Trip
+from modules.trips.aggregates import epoch_to_datetime
+from modules.trips.simplify import detail_criteria
+from modules.trips.track_cache import trip_version
+
+logger = logging.getLogger(__name__)
+
+TrackColumns = Dict[str, np.ndarray]
+
+# Column name -> dtype, in segment and query order
+COLUMNS = (
+    ("time", np.dtype("<i8")),
+    ("latitude", np.dtype("<f8")),
+    ("longitude", np.dtype("<f8")),
+    ("depth", np.dtype("<f8")),
+    ("water_temp", np.dtype("<f8")),
+    ("speed_knots", np.dtype("<f8")),
+    ("course_deg", np.dtype("<f8")),
+    ("tow_id", np.dtype("<i4")),
+    ("detail_level", np.dtype("<i2")),
+)
+
+# Scaled float columns of Sounding, read as their stored integers and decoded per chunk
+SCALED_COLUMNS = ("latitude", "longitude", "depth", "water_temp", "speed_knots", "course_deg")
+
+SEGMENT_FORMAT_VERSION = 1
+
+# Rows fetched per round trip
+FETCH_CHUNK_SIZE = 50000
+
+
+def read_rows(
+    db: Session,
+    trip_id: int,
+    tow_id: Optional[int] = None,
+    detail_level: Optional[int] = None
+) -> TrackColumns:
+    """
+    Read a trip's (or tow's) soundings from the soundings table.
+
+    Args:
+        db: Database session
+        trip_id: Trip to read
+        tow_id: Only the soundings of this tow of the trip
+        detail_level: Maximum detail_level (None for the full track)
+
+    Returns:
+        Track columns (see module docstring)
+    """
+    criteria = [Sounding.tow_id == tow_id] if tow_id is not None else [Sounding.trip_id == trip_id]
+    criteria.extend(detail_criteria(db, [trip_id], detail_level))
+    query = (
+        select(
+            # Stored integers, skipping the per-value conversion of core.models.types
+            type_coerce(Sounding.timestamp, BigInteger),
+            *(type_coerce(getattr(Sounding, name), Integer) for name in SCALED_COLUMNS),
+            func.coalesce(Sounding.tow_id, 0),
+            func.coalesce(Sounding.detail_level, -1),
+        )
+        .where(*criteria)
+        .order_by(Sounding.timestamp, Sounding.id)
+        .execution_options(yield_per=FETCH_CHUNK_SIZE)
+    )
+
+    times = []
+    values = []
+    for chunk in db.connection().execute(query).partitions():
+        times.append(np.array([row[0] for row in chunk], dtype=np.int64) * 1000)
+        # None (NULL) becomes NaN
+        values.append(np.array([row[1:] for row in chunk], dtype=np.float64))
+
+    columns = {"time": np.concatenate(times) if times else np.empty(0, dtype=np.int64)}
+    stacked = np.concatenate(values) if values else np.empty((0, len(COLUMNS) - 1))
+    for i, (name, dtype) in enumerate(COLUMNS[1:]):
+        column = stacked[:, i]
+        if name in SCALED_COLUMNS:
+            column = getattr(Sounding, name).type.decode(column)
+        columns[name] = column.astype(dtype)
+    logger.debug(f"Read {len(columns['time'])} soundings of trip {trip_id} from rows")
+    return columns
+
+
+def _select(columns: TrackColumns, tow_id: Optional[int], detail_level: Optional[int]) -> TrackColumns:
+    """Apply the tow and detail level filters to a whole-trip segment."""
+    mask = None
+    if tow_id is not None:
+        mask = columns["tow_id"] == tow_id
+    if detail_level is not None:
+        # -1 (not computed) passes every level, like NULL in detail_criteria()
+        level_mask = columns["detail_level"] <= detail_level
+        mask = level_mask if mask is None else mask & level_mask
+    if mask is None:
+        return columns
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def segment_path(trip: Trip, version: str) -> Path:
+    """Path of a trip's segment file for one version, relative to STORAGE_PATH."""
+    digest = hashlib.sha1(version.encode()).hexdigest()[:12]
+    return Path("segments") / str(trip.device_id) / f"{trip.id}.{digest}.npz"
+
+
+def write_segment_file(path: Path, columns: TrackColumns) -> int:
+    """
+    Write track columns as a segment file.
+
+    The file is written under a temporary name and renamed into place, so
+    readers never see a partial segment.
+
+    Returns:
+        Size of the file in bytes
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    save = np.savez_compressed if settings.sounding_segments_compressed else np.savez
+    arrays = {name: np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in COLUMNS}
+    with open(temp, "wb") as f:
+        save(f, format_version=np.array(SEGMENT_FORMAT_VERSION), **arrays)
+    os.replace(temp, path)
+    return path.stat().st_size
+
+
+def load_segment_file(path: Path) -> TrackColumns:
+    """
+    Read every column of a segment file.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a supported segment
+    """
+    with np.load(path) as archive:
+        if "format_version" not in archive.files or int(archive["format_version"]) != SEGMENT_FORMAT_VERSION:
+            raise ValueError(f"Not a sounding segment (version {SEGMENT_FORMAT_VERSION}): {path}")
+        return {name: archive[name] for name, _ in COLUMNS}
+
+
+def write_segment(db: Session, trip: Trip) -> SoundingSegment:
+    """
+    Write a trip's segment from its rows and point the catalog at it (commits).
+
+    The previous segment file of the trip, if any, is removed once the
+    catalog no longer refers to it.
+
+    Args:
+        db: Database session
+        trip: Trip to write
+
+    Returns:
+        The catalog row
+    """
+    # Version first: soundings committed while the rows are read only make the segment look older
+    version = trip_version(trip)
+    columns = read_rows(db, trip.id)
+    relative = segment_path(trip, version)
+    root = Path(settings.storage_path)
+    size = write_segment_file(root / relative, columns)
+
+    segment = db.query(SoundingSegment).filter(SoundingSegment.trip_id == trip.id).first()
+    previous = segment.path if segment is not None else None
+    if segment is None:
+        segment = SoundingSegment(trip_id=trip.id, device_id=trip.device_id)
+        db.add(segment)
+    times = columns["time"]
+    segment.path = relative.as_posix()
+    segment.trip_version = version
+    segment.sounding_count = len(times)
+    segment.start_time = epoch_to_datetime(times[0] / 1e6) if len(times) else None
+    segment.end_time = epoch_to_datetime(times[-1] / 1e6) if len(times) else None
+    segment.byte_size = size
+    db.commit()
+
+    if previous is not None and previous != segment.path:
+        (root / previous).unlink(missing_ok=True)
+    logger.info(f"Wrote sounding segment {segment.path} ({len(times)} soundings, {size} bytes)")
+    return segment
+
+
+def write_segments(db: Session, trip_ids: Iterable[int]) -> int:
+    """
+    Rewrite the segments of trips whose soundings changed (called after ingestion commits).
+
+    Segments are derived data: a trip whose segment cannot be written keeps
+    being served from the soundings table.
+
+    Returns:
+        Number of segments written
+    """
+    trip_ids = sorted(set(trip_ids))
+    if not trip_ids:
+        return 0
+    written = 0
+    for trip in db.query(Trip).filter(Trip.id.in_(trip_ids)).order_by(Trip.id).all():
+        try:
+            write_segment(db, trip)
+            written += 1
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not write sounding segment for trip {trip.id}: {e}")
+    return written
+
+
+def _current_path(segment: Optional[SoundingSegment], trip: Trip) -> Optional[Path]:
+    """Absolute path of the segment if it holds the trip's current version."""
+    if segment is None or segment.trip_version != trip_version(trip):
+        return None
+    return Path(settings.storage_path) / segment.path
+
+
+def _read_segment(path: Path, tow_id: Optional[int], detail_level: Optional[int]) -> Optional[TrackColumns]:
+    """Load and filter a segment; None (read the rows instead) if it is unreadable."""
+    try:
+        return _select(load_segment_file(path), tow_id, detail_level)
+    except (OSError, ValueError, KeyError) as e:
+        # E.g. replaced by a newer segment between the catalog lookup and the read
+        logger.warning(f"Could not read sounding segment {path}: {e}")
+        return None
+
+
+def read_track(
+    db: Session,
+    trip: Trip,
+    tow_id: Optional[int] = None,
+    detail_level: Optional[int] = None
+) -> TrackColumns:
+    """
+    Read a trip's (or tow's) soundings from the configured backend.
+
+    Args:
+        db: Database session
+        trip: Trip to read
+        tow_id: Only the soundings of this tow of the trip
+        detail_level: Maximum detail_level (None for the full track)
+
+    Returns:
+        Track columns (see module docstring)
+    """
+    if settings.sounding_store_backend == "segments":
+        segment = db.query(SoundingSegment).filter(SoundingSegment.trip_id == trip.id).first()
+        path = _current_path(segment, trip)
+        if path is not None:
+            columns = _read_segment(path, tow_id, detail_level)
+            if columns is not None:
+                return columns
+    return read_rows(db, trip.id, tow_id, detail_level)
+
+
+async def read_track_async(
+    db: AsyncSession,
+    trip: Trip,
+    tow_id: Optional[int] = None,
+    detail_level: Optional[int] = None
+) -> TrackColumns:
+    """
+    read_track() for async endpoints.
+
+    The catalog lookup is awaited and the segment is decompressed in the
+    threadpool; reading rows goes through AsyncSession.run_sync().
+    """
+    if settings.sounding_store_backend == "segments":
+        segment = await db.scalar(select(SoundingSegment).where(SoundingSegment.trip_id == trip.id))
+        path = _current_path(segment, trip)
+        if path is not None:
+            columns = await run_in_threadpool(_read_segment, path, tow_id, detail_level)
+            if columns is not None:
+                return columns
+    return await db.run_sync(read_rows, trip.id, tow_id, detail_level)
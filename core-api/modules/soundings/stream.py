@@ -0,0 +1,298 @@
+"""
+DeckBrain Core API - Streaming sounding queries.
+
+GET /api/soundings can match millions of rows, so results are never built
+in memory. SoundingStream walks the matches in (device, timestamp, id)
+order with keyset pagination: each chunk is one query continuing after the
+last row of the previous chunk, using the (device_id, timestamp) index (or
+the quadkey index for small boxes). A response stops after `limit` rows and
+hands out a cursor for the next page.
+
+Two encodings are produced chunk by chunk:
+
+- NDJSON (application/x-ndjson): one JSON object per sounding, then a final
+  {"next_cursor": ...} line (null when there is nothing left).
+- Binary (application/vnd.deckbrain.soundings): a sequence of blocks of
+  little-endian columns, one device per block:
+
+      offset        type          content
+      0             char[4]       magic "DBSQ"
+      4             uint16        format version (1)
+      6             uint16        column count (7)
+      8             uint32        row count n (0 = end block)
+      12            uint32        label length L
+      16            char[L]       device_id (UTF-8); next_cursor in the end block
+      16 + P        int64[n]      sounding id          (P = L rounded up to 8)
+      16 + P + 8n   int64[n]      time, UTC epoch milliseconds
+      16 + P + 16n  float64[n]    latitude, degrees
+      16 + P + 24n  float64[n]    longitude, degrees
+      16 + P + 32n  float32[n]    depth, meters
+      16 + P + 36n  int32[n]      trip id (0 = none)
+      16 + P + 40n  int32[n]      tow id (0 = none)
+
+  Blocks are zero-padded to a multiple of 8 bytes, so every column of every
+  block can be wrapped in a typed array. The stream always ends with an end
+  block (n = 0) whose label is the next cursor (empty when there is nothing
+  left).
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from core.models import Sounding
+from core.pagination import decode_cursor, encode_cursor, parse_cursor_datetime
+from .spatial import bbox_criteria
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BINARY_MEDIA_TYPE = "application/vnd.deckbrain.soundings"
+MAGIC = b"DBSQ"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("column_count", "<u2"),
+    ("row_count", "<u4"),
+    ("label_length", "<u4"),
+])
+
+# Column name -> wire dtype, in wire order
+COLUMNS = (
+    ("id", np.dtype("<i8")),
+    ("time", np.dtype("<i8")),
+    ("latitude", np.dtype("<f8")),
+    ("longitude", np.dtype("<f8")),
+    ("depth", np.dtype("<f4")),
+    ("trip_id", np.dtype("<i4")),
+    ("tow_id", np.dtype("<i4")),
+)
+ROW_SIZE = sum(dtype.itemsize for _, dtype in COLUMNS)
+
+
+@dataclass
+class SoundingFilter:
+    """Filters of a sounding query; None means unrestricted."""
+    devices: Sequence[Tuple[int, str]]  # (devices.id, devices.device_id), ordered by devices.id
+    bbox: Optional[Tuple[float, float, float, float]] = None  # (min_lat, min_lon, max_lat, max_lon)
+    start: Optional[datetime] = None  # naive UTC, inclusive
+    end: Optional[datetime] = None  # naive UTC, inclusive
+    min_depth: Optional[float] = None
+    max_depth: Optional[float] = None
+
+
+# Keyset position: (devices.id, timestamp, sounding id); timestamp/id are
+# None to start at the beginning of the device
+Position = Tuple[int, Optional[datetime], Optional[int]]
+
+
+def encode_position(position: Position) -> str:
+    """Cursor for a keyset position."""
+    return encode_cursor(*position)
+
+
+def decode_position(cursor: str) -> Position:
+    """
+    Parse a cursor of this endpoint.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    device_pk, timestamp, sounding_id = decode_cursor(cursor, 3)
+    if not isinstance(device_pk, int) or not (sounding_id is None or isinstance(sounding_id, int)):
+        raise ValueError("Invalid cursor")
+    if (timestamp is None) != (sounding_id is None):
+        raise ValueError("Invalid cursor")
+    return device_pk, (parse_cursor_datetime(timestamp) if timestamp is not None else None), sounding_id
+
+
+class SoundingStream:
+    """
+    Matching soundings in (device, timestamp, id) order, chunk by chunk.
+
+    After the chunks are exhausted, next_cursor holds the position to resume
+    from, or None if every match was returned.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        filters: SoundingFilter,
+        limit: int,
+        chunk_size: int,
+        after: Optional[Position] = None
+    ):
+        """
+        Args:
+            db: Database session (used for the lifetime of the iteration)
+            filters: Query filters
+            limit: Maximum number of soundings to return
+            chunk_size: Soundings fetched per query
+            after: Position to continue after (decoded cursor)
+        """
+        self.db = db
+        self.filters = filters
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.after = after
+        self.next_cursor: Optional[str] = None
+        self.count = 0
+
+    def _criteria(self, device_pk: int) -> List:
+        f = self.filters
+        criteria = [Sounding.device_id == device_pk]
+        if f.bbox is not None:
+            criteria.extend(bbox_criteria(self.db, device_pk, *f.bbox))
+        if f.start is not None:
+            criteria.append(Sounding.timestamp >= f.start)
+        if f.end is not None:
+            criteria.append(Sounding.timestamp <= f.end)
+        if f.min_depth is not None:
+            criteria.append(Sounding.depth >= f.min_depth)
+        if f.max_depth is not None:
+            criteria.append(Sounding.depth <= f.max_depth)
+        return criteria
+
+    def _fetch(self, criteria: List, after: Optional[Tuple[datetime, int]], limit: int) -> List:
+        query = select(
+            Sounding.id,
+            Sounding.timestamp,
+            Sounding.latitude,
+            Sounding.longitude,
+            Sounding.depth,
+            Sounding.trip_id,
+            Sounding.tow_id,
+        ).where(*criteria)
+        if after is not None:
+            query = query.where(tuple_(Sounding.timestamp, Sounding.id) > after)
+        query = query.order_by(Sounding.timestamp, Sounding.id).limit(limit)
+        return self.db.connection().execute(query).all()
+
+    def chunks(self) -> Iterator[Tuple[str, List]]:
+        """
+        Yield (device_id, rows) chunks; rows have id, timestamp, latitude,
+        longitude, depth, trip_id and tow_id.
+        """
+        remaining = self.limit
+        for device_pk, device_id in self.filters.devices:
+            after = None
+            if self.after is not None:
+                if device_pk < self.after[0]:
+                    continue
+                if device_pk == self.after[0] and self.after[1] is not None:
+                    after = (self.after[1], self.after[2])
+            criteria = self._criteria(device_pk)
+
+            while True:
+                # One row beyond the limit tells whether another page exists
+                requested = min(self.chunk_size, remaining + 1)
+                rows = self._fetch(criteria, after, requested)
+                if len(rows) > remaining:
+                    rows = rows[:remaining]
+                    if rows:
+                        yield device_id, rows
+                        self.count += len(rows)
+                        after = (rows[-1].timestamp, rows[-1].id)
+                    self.next_cursor = encode_position((device_pk, *after) if after else (device_pk, None, None))
+                    return
+                if rows:
+                    yield device_id, rows
+                    self.count += len(rows)
+                    remaining -= len(rows)
+                    after = (rows[-1].timestamp, rows[-1].id)
+                if len(rows) < requested:
+                    break
+
+
+def ndjson_body(stream: SoundingStream) -> Iterator[bytes]:
+    """Encode a stream as NDJSON, one chunk of lines per database chunk."""
+    for device_id, rows in stream.chunks():
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "device_id": device_id,
+                "trip_id": row.trip_id,
+                "tow_id": row.tow_id,
+                "timestamp": row.timestamp.isoformat(),
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+                "depth": row.depth,
+            }) + "\n"
+            for row in rows
+        ).encode()
+    yield (json.dumps({"next_cursor": stream.next_cursor}) + "\n").encode()
+
+
+def _block(label: str, columns: Optional[List[np.ndarray]], n: int) -> bytes:
+    label_bytes = label.encode()
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["column_count"] = len(COLUMNS)
+    header["row_count"] = n
+    header["label_length"] = len(label_bytes)
+    parts = [header.tobytes(), label_bytes, b"\0" * (-len(label_bytes) % 8)]
+    if columns is not None:
+        parts.extend(np.ascontiguousarray(values, dtype=dtype).tobytes() for values, (_, dtype) in zip(columns, COLUMNS))
+        parts.append(b"\0" * (-ROW_SIZE * n % 8))
+    return b"".join(parts)
+
+
+def _epoch_ms(timestamps: Sequence[datetime]) -> np.ndarray:
+    """Convert stored timestamps (naive UTC, or aware on PostgreSQL) to epoch milliseconds."""
+    if timestamps and timestamps[0].tzinfo is not None:
+        timestamps = [value.astimezone(timezone.utc).replace(tzinfo=None) for value in timestamps]
+    return np.array(timestamps, dtype="datetime64[ms]").astype(np.int64)
+
+
+def binary_body(stream: SoundingStream) -> Iterator[bytes]:
+    """Encode a stream in the binary block format, one block per database chunk."""
+    for device_id, rows in stream.chunks():
+        ids, timestamps, lat, lon, depth, trip_ids, tow_ids = zip(*rows)
+        columns = [
+            np.array(ids, dtype=np.int64),
+            _epoch_ms(timestamps),
+            np.array(lat, dtype=np.float64),
+            np.array(lon, dtype=np.float64),
+            np.array(depth, dtype=np.float32),
+            np.array([value or 0 for value in trip_ids], dtype=np.int32),
+            np.array([value or 0 for value in tow_ids], dtype=np.int32),
+        ]
+        yield _block(device_id, columns, len(rows))
+    yield _block(stream.next_cursor or "", None, 0)
+
+
+def decode_binary(body: bytes) -> Tuple[List[Tuple[str, dict]], Optional[str]]:
+    """
+    Parse a binary response body (for scripts and debugging).
+
+    Returns:
+        ([(device_id, columns), ...], next_cursor)
+
+    Raises:
+        ValueError: If the body is not a supported binary sounding stream
+    """
+    blocks = []
+    offset = 0
+    while True:
+        header = np.frombuffer(body, dtype=HEADER_DTYPE, count=1, offset=offset)[0]
+        if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+            raise ValueError("Not a DeckBrain binary sounding stream (version 1)")
+        n = int(header["row_count"])
+        length = int(header["label_length"])
+        offset += HEADER_DTYPE.itemsize
+        label = body[offset:offset + length].decode()
+        offset += length + (-length % 8)
+        if n == 0:
+            return blocks, label or None
+        columns = {}
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+            offset += dtype.itemsize * n
+        offset += -ROW_SIZE * n % 8
+        blocks.append((label, columns))
@@ -0,0 +1,5 @@
+"""
+DeckBrain Core API - Tiles module.
+
+Serves Mapbox Vector Tiles of tracks and soundings for the History layer.
+"""
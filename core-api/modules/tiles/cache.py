@@ -0,0 +1,237 @@
+"""
+DeckBrain Core API - Vector tile cache.
+
+Rendered tiles are stored gzipped under
+STORAGE_PATH/cache/tiles/<device_id>/<z>/<x>/<y>.mvt.gz and served as-is.
+The ETag is derived from the file's mtime and size, so it changes whenever
+a tile is re-rendered.
+
+Ingestion invalidates exactly the tiles its soundings fell into (see
+TileAggregator.touched_tiles()); only cached files are visited, so the
+cost follows the size of the cache, not the number of touched tiles.
+
+A tile rendered from data read before an ingestion committed could be
+written after that ingestion's invalidation ran, and would then be served
+stale until the next one. Each device therefore has a generation token
+(STORAGE_PATH/cache/tiles/<device_id>/generation), replaced by every
+invalidation before it removes tiles: the router reads it before
+rendering, and put() drops the tile it just wrote if the token changed in
+the meantime. The token lives on disk, so invalidations by ingestion
+worker processes are seen too.
+
+The cache is bounded by TILE_CACHE_MAX_MB: once a process has written
+that much since its last count, the least recently written tiles are
+removed down to 90% of the budget.
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from modules.trips.track_cache import CachedBody
+from .cells import split_key
+from .mvt import MEDIA_TYPE
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+
+# Eviction brings the cache down to this fraction of TILE_CACHE_MAX_MB
+EVICT_TO_FRACTION = 0.9
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+class TileCache:
+    """Disk cache of gzipped vector tiles, per device."""
+
+    def __init__(self, directory: Path, max_bytes: int = 0):
+        """
+        Args:
+            directory: Root directory of the cache
+            max_bytes: Disk budget (0 = unbounded)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # Bytes on disk as of the last count, plus those written since
+        self._lock = threading.Lock()
+
+    def _path(self, device_id: int, z: int, x: int, y: int) -> Path:
+        return self.directory / str(device_id) / str(z) / str(x) / f"{y}.mvt.gz"
+
+    def _generation_path(self, device_id: int) -> Path:
+        return self.directory / str(device_id) / "generation"
+
+    def generation(self, device_id: int) -> str:
+        """Current generation token of a device's tiles (read it before rendering a tile to put())."""
+        try:
+            return self._generation_path(device_id).read_text()
+        except OSError:
+            return ""
+
+    def _bump_generation(self, device_id: int) -> None:
+        """Replace the device's generation token, so renders in flight are not stored."""
+        path = self._generation_path(device_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            temp.write_text(os.urandom(8).hex())
+            os.replace(temp, path)
+        except OSError as e:
+            logger.warning(f"Could not write tile cache generation {path}: {e}")
+
+    def get(self, device_id: int, z: int, x: int, y: int) -> Optional[CachedBody]:
+        """Return the cached tile, or None on a miss."""
+        path = self._path(device_id, z, x, y)
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                body = f.read()
+        except OSError:
+            return None
+        return CachedBody(etag=_etag(stat), gzip_body=body, media_type=MEDIA_TYPE)
+
+    def put(self, device_id: int, z: int, x: int, y: int, body: bytes, generation: str) -> CachedBody:
+        """
+        Compress and store a rendered tile.
+
+        Args:
+            device_id: Internal devices.id
+            z, x, y: Tile address
+            body: Rendered tile
+            generation: generation() of the device, read before the tile was rendered
+
+        Returns:
+            The stored tile (served directly if it cannot be written or is already outdated)
+        """
+        gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        path = self._path(device_id, z, x, y)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            temp.write_bytes(gzip_body)
+            os.replace(temp, path)
+            stat = path.stat()
+        except OSError as e:
+            logger.warning(f"Could not write tile cache entry {path}: {e}")
+            stat = None
+        if stat is not None and self.generation(device_id) != generation:
+            # Invalidated while rendering: the tile may predate the new data
+            path.unlink(missing_ok=True)
+            stat = None
+        if stat is None:
+            return CachedBody(etag=f'"{hash(gzip_body) & 0xFFFFFFFFFFFF:x}"', gzip_body=gzip_body, media_type=MEDIA_TYPE)
+        self._account(stat.st_size)
+        return CachedBody(etag=_etag(stat), gzip_body=gzip_body, media_type=MEDIA_TYPE)
+
+    def _account(self, written: int) -> None:
+        """Count bytes written and evict once the budget is exceeded."""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            self._size += written
+            if self._size > self.max_bytes:
+                self._size = self._evict(int(self.max_bytes * EVICT_TO_FRACTION))
+
+    def _tiles(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every cached tile."""
+        tiles = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".mvt.gz"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    tiles.append((stat.st_mtime, stat.st_size, path))
+        return tiles
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._tiles())
+
+    def _evict(self, target: int) -> int:
+        """Remove the least recently written tiles until at most target bytes remain; returns the size left."""
+        tiles = sorted(self._tiles())
+        size = sum(size for _, size, _ in tiles)
+        removed = 0
+        for _, tile_size, path in tiles:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= tile_size
+            removed += 1
+        if removed:
+            logger.info(f"Tile cache over {self.max_bytes // (1024 * 1024)} MB: evicted {removed} tiles")
+        return size
+
+    def invalidate(self, device_id: int, touched: Dict[int, np.ndarray]) -> int:
+        """
+        Remove cached tiles that received new soundings.
+
+        Args:
+            device_id: Internal devices.id
+            touched: Mapping of zoom to tile keys (TileAggregator.touched_tiles())
+
+        Returns:
+            Number of tiles removed
+        """
+        self._bump_generation(device_id)
+        removed = 0
+        for zoom, keys in touched.items():
+            zoom_dir = self.directory / str(device_id) / str(zoom)
+            try:
+                cached_columns = np.array([int(name) for name in os.listdir(zoom_dir)], dtype=np.int64)
+            except (FileNotFoundError, ValueError):
+                continue
+            xs, ys = split_key(keys)
+            candidates = np.isin(xs, cached_columns)
+            for x, y in zip(xs[candidates].tolist(), ys[candidates].tolist()):
+                try:
+                    (zoom_dir / str(x) / f"{y}.mvt.gz").unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            logger.debug(f"Invalidated {removed} cached tiles for device_id={device_id}")
+        return removed
+
+    def clear_device(self, device_id: int) -> None:
+        """Remove every cached tile of a device."""
+        shutil.rmtree(self.directory / str(device_id), ignore_errors=True)
+        # After the removal, which also took the previous token
+        self._bump_generation(device_id)
+
+
+_tile_cache: Optional[TileCache] = None
+
+
+def get_tile_cache() -> Optional[TileCache]:
+    """Process-wide tile cache (None when TILE_CACHE_ENABLED is false)."""
+    global _tile_cache
+    if not settings.tile_cache_enabled:
+        return None
+    if _tile_cache is None:
+        _tile_cache = TileCache(Path(settings.storage_path) / "cache" / "tiles", settings.tile_cache_max_mb * 1024 * 1024)
+    return _tile_cache
+
+
+def invalidate_tiles(device_id: int, touched: Dict[int, np.ndarray]) -> None:
+    """Drop cached tiles touched by ingestion (no-op when the cache is off)."""
+    cache = get_tile_cache()
+    if cache is not None and touched:
+        cache.invalidate(device_id, touched)
@@ -0,0 +1,211 @@
+"""
+DeckBrain Core API - Per-zoom sounding aggregation for vector tiles.
+
+Rendering a low-zoom tile from raw soundings would mean scanning every
+sounding a device ever recorded in that area. Instead, ingestion maintains
+sounding_cells: for every zoom z up to TILE_AGGREGATE_MAX_ZOOM, soundings
+are counted into the cells of zoom z + CELL_ZOOM_OFFSET (a 64 x 64 grid per
+tile) together with their depth sum/min/max. A tile then costs one primary
+key range scan of at most 4096 rows, whatever the sounding density.
+
+The aggregator also records which tiles each batch touched, at every tile
+zoom, so the tile cache can drop exactly those tiles after ingestion.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import Sounding, SoundingCell
+from .mvt import lonlat_to_world
+
+logger = logging.getLogger(__name__)
+
+# Cells of zoom z are the tiles of zoom z + CELL_ZOOM_OFFSET: 64 x 64 per tile
+CELL_ZOOM_OFFSET = 6
+CELLS_PER_TILE = 1 << CELL_ZOOM_OFFSET
+
+# Soundings aggregated per step when rebuilding a device's cells
+REBUILD_CHUNK_SIZE = 50000
+
+
+def tile_key(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pack tile/cell columns and rows into one int64 key (x in the high bits)."""
+    return (x.astype(np.int64) << 32) | y.astype(np.int64)
+
+
+def split_key(key: np.ndarray):
+    """Inverse of tile_key()."""
+    return key >> 32, key & 0xFFFFFFFF
+
+
+def group_depths(keys: np.ndarray, depth: np.ndarray):
+    """
+    Group depths by cell key (vectorised group-by).
+
+    Returns:
+        (unique keys, counts, depth sums, depth minimums, depth maximums), sorted by key
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_depth = depth[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    return (
+        sorted_keys[starts],
+        np.diff(np.append(starts, len(sorted_keys))),
+        np.add.reduceat(sorted_depth, starts),
+        np.minimum.reduceat(sorted_depth, starts),
+        np.maximum.reduceat(sorted_depth, starts),
+    )
+
+
+def merge_statement(model, index_elements: List[str], dialect_name: str):
+    """
+    INSERT ... ON CONFLICT that merges a cell's aggregates into the stored row.
+
+    Args:
+        model: Cell model with sounding_count, depth_sum, depth_min and depth_max
+        index_elements: Primary key columns of the model
+        dialect_name: Database dialect
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        least, greatest = func.least, func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        least, greatest = func.min, func.max  # SQLite's scalar min()/max()
+
+    stmt = insert(model)
+    cell = model.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            "sounding_count": cell.sounding_count + stmt.excluded.sounding_count,
+            "depth_sum": cell.depth_sum + stmt.excluded.depth_sum,
+            "depth_min": least(cell.depth_min, stmt.excluded.depth_min),
+            "depth_max": greatest(cell.depth_max, stmt.excluded.depth_max),
+        },
+    )
+
+
+class TileAggregator:
+    """
+    Merges sounding batches of one device into sounding_cells.
+
+    Like SoundingSink, it writes inside the caller's transaction, so cells
+    and soundings are committed (or rolled back) together.
+    """
+
+    def __init__(self, db: Session, device_id: int):
+        """
+        Args:
+            db: Database session
+            device_id: Internal devices.id the soundings belong to
+        """
+        self.db = db
+        self.device_id = device_id
+        self.max_cell_zoom = settings.tile_aggregate_max_zoom
+        self.max_tile_zoom = settings.tile_max_zoom
+        # Finest grid needed; coarser ones are derived by shifting
+        self.base_zoom = max(self.max_cell_zoom + CELL_ZOOM_OFFSET, self.max_tile_zoom)
+        self._sql: Optional[str] = None
+        self._positions: Optional[List[str]] = None
+        self._touched: Dict[int, List[np.ndarray]] = defaultdict(list)
+        self.cells_written = 0
+
+    def _prepare(self) -> None:
+        """Compile the upsert once; rows bypass SQLAlchemy's per-row bind processing."""
+        dialect = self.db.connection().dialect
+        statement = merge_statement(
+            SoundingCell, ["device_id", "zoom", "cell_x", "cell_y"], dialect.name
+        )
+        compiled = statement.compile(dialect=dialect)
+        self._sql = str(compiled)
+        self._positions = list(compiled.positiontup) if compiled.positional else None
+
+    def add(self, lat: np.ndarray, lon: np.ndarray, depth: np.ndarray) -> None:
+        """
+        Aggregate one batch of soundings into the cells of every zoom.
+
+        Args:
+            lat: Latitudes in degrees
+            lon: Longitudes in degrees
+            depth: Depths in meters
+        """
+        if len(lat) == 0:
+            return
+        if self._sql is None:
+            self._prepare()
+
+        wx, wy = lonlat_to_world(lon, lat, self.base_zoom)
+        limit = (1 << self.base_zoom) - 1
+        ix = np.clip(wx.astype(np.int64), 0, limit)
+        iy = np.clip(wy.astype(np.int64), 0, limit)
+
+        columns: Dict[str, List] = defaultdict(list)
+        for zoom in range(self.max_cell_zoom + 1):
+            shift = self.base_zoom - (zoom + CELL_ZOOM_OFFSET)
+            keys, counts, sums, mins, maxs = group_depths(tile_key(ix >> shift, iy >> shift), depth)
+            cell_x, cell_y = split_key(keys)
+            columns["device_id"].extend([self.device_id] * len(keys))
+            columns["zoom"].extend([zoom] * len(keys))
+            columns["cell_x"].extend(cell_x.tolist())
+            columns["cell_y"].extend(cell_y.tolist())
+            columns["sounding_count"].extend(counts.tolist())
+            columns["depth_sum"].extend(sums.tolist())
+            columns["depth_min"].extend(mins.tolist())
+            columns["depth_max"].extend(maxs.tolist())
+
+        for zoom in range(self.max_tile_zoom + 1):
+            shift = self.base_zoom - zoom
+            self._touched[zoom].append(np.unique(tile_key(ix >> shift, iy >> shift)))
+
+        if self._positions is not None:
+            rows = list(zip(*(columns[name] for name in self._positions)))
+        else:
+            names = list(columns)
+            rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+        self.db.connection().exec_driver_sql(self._sql, rows)
+        self.cells_written += len(rows)
+
+    def touched_tiles(self) -> Dict[int, np.ndarray]:
+        """
+        Tiles that received soundings, per zoom.
+
+        Returns:
+            Mapping of zoom to unique tile_key() values
+        """
+        return {zoom: np.unique(np.concatenate(keys)) for zoom, keys in self._touched.items()}
+
+
+def rebuild_tile_cells(db: Session, device_id: int) -> int:
+    """
+    Replace a device's sounding_cells with a fresh aggregation of its soundings.
+
+    Runs in the caller's transaction (nothing is committed here).
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+
+    Returns:
+        Number of soundings aggregated
+    """
+    db.query(SoundingCell).filter(SoundingCell.device_id == device_id).delete(synchronize_session=False)
+    aggregator = TileAggregator(db, device_id)
+    query = (
+        select(Sounding.latitude, Sounding.longitude, Sounding.depth)
+        .where(Sounding.device_id == device_id)
+        .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+    count = 0
+    for chunk in db.execute(query).partitions():
+        values = np.array([tuple(row) for row in chunk], dtype=np.float64)
+        aggregator.add(values[:, 0], values[:, 1], values[:, 2])
+        count += len(values)
+    return count
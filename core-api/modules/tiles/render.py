@@ -0,0 +1,178 @@
+"""
+DeckBrain Core API - Vector tile rendering.
+
+A tile has two layers:
+
+- "tracks": the device's trip tracks as linestrings, using the soundings
+  whose detail_level is needed at the tile's zoom (see
+  modules.trips.simplify). Properties: trip_id.
+- "soundings": depth points. Up to TILE_AGGREGATE_MAX_ZOOM they are the
+  precomputed sounding_cells (one point per cell, at its center); above
+  it, raw soundings inside the tile, found through the quadkey index (at
+  most TILE_MAX_SOUNDINGS).
+  Properties: count, depth (mean), depth_min, depth_max.
+"""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.models import Sounding, SoundingCell, Trip
+from modules.soundings.spatial import bbox_criteria
+from modules.trips.simplify import MAX_DETAIL_LEVEL, detail_criteria
+from .cells import CELLS_PER_TILE
+from .mvt import (
+    EXTENT,
+    LINESTRING,
+    POINT,
+    LayerBuilder,
+    encode_tile,
+    linestring_geometry,
+    lonlat_to_world,
+    point_geometry,
+    tile_bounds,
+)
+
+logger = logging.getLogger(__name__)
+
+# Geometry kept around the tile (in tile extent units) so lines join across tiles
+BUFFER = 64
+# Tile coordinates are clamped to this range (far beyond any buffer)
+COORDINATE_LIMIT = 1 << 24
+# Rows fetched per round trip
+FETCH_CHUNK_SIZE = 50000
+
+
+def _tile_coordinates(lon: np.ndarray, lat: np.ndarray, z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Project coordinates to integer tile coordinates (0..EXTENT inside the tile)."""
+    wx, wy = lonlat_to_world(lon, lat, z)
+    px = np.clip(np.rint((wx - x) * EXTENT), -COORDINATE_LIMIT, COORDINATE_LIMIT).astype(np.int64)
+    py = np.clip(np.rint((wy - y) * EXTENT), -COORDINATE_LIMIT, COORDINATE_LIMIT).astype(np.int64)
+    return px, py
+
+
+def _fetch(db: Session, query) -> np.ndarray:
+    """Run a query of numeric columns into a 2-D float array, chunk by chunk."""
+    # Executed on the connection (no ORM row loading); rows are converted to
+    # tuples first because numpy indexing Row objects is far slower
+    result = db.connection().execute(query.execution_options(yield_per=FETCH_CHUNK_SIZE))
+    chunks = [np.array([tuple(row) for row in chunk], dtype=np.float64) for chunk in result.partitions()]
+    return np.concatenate(chunks) if chunks else np.empty((0, len(query.selected_columns)))
+
+
+def _tracks_layer(db: Session, device_id: int, z: int, x: int, y: int) -> LayerBuilder:
+    layer = LayerBuilder("tracks")
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    margin_lon = (max_lon - min_lon) * BUFFER / EXTENT
+    margin_lat = (max_lat - min_lat) * BUFFER / EXTENT
+
+    trip_ids = [
+        trip_id for (trip_id,) in db.query(Trip.id).filter(
+            Trip.device_id == device_id,
+            Trip.min_lat <= max_lat + margin_lat,
+            Trip.max_lat >= min_lat - margin_lat,
+            Trip.min_lon <= max_lon + margin_lon,
+            Trip.max_lon >= min_lon - margin_lon,
+        )
+    ]
+    if not trip_ids:
+        return layer
+
+    level = min(z, MAX_DETAIL_LEVEL)
+    rows = _fetch(db, (
+        select(Sounding.trip_id, Sounding.longitude, Sounding.latitude)
+        .where(Sounding.trip_id.in_(trip_ids), *detail_criteria(db, trip_ids, level))
+        .order_by(Sounding.trip_id, Sounding.timestamp, Sounding.id)
+    ))
+    if len(rows) < 2:
+        return layer
+
+    trips = rows[:, 0].astype(np.int64)
+    px, py = _tile_coordinates(rows[:, 1], rows[:, 2], z, x, y)
+
+    # Keep segments whose bounding box reaches the buffered tile
+    low, high = -BUFFER, EXTENT + BUFFER
+    keep = (
+        (trips[1:] == trips[:-1])
+        & (np.maximum(px[1:], px[:-1]) >= low) & (np.minimum(px[1:], px[:-1]) <= high)
+        & (np.maximum(py[1:], py[:-1]) >= low) & (np.minimum(py[1:], py[:-1]) <= high)
+    )
+
+    # Consecutive kept segments form one linestring
+    edges = np.diff(np.concatenate(([0], keep.astype(np.int8), [0])))
+    for start, end in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+        geometry = linestring_geometry(px[start:end + 1], py[start:end + 1])
+        if geometry is not None:
+            layer.add(LINESTRING, geometry, {"trip_id": int(trips[start])})
+    return layer
+
+
+def _soundings_layer(db: Session, device_id: int, z: int, x: int, y: int) -> LayerBuilder:
+    layer = LayerBuilder("soundings")
+
+    if z <= settings.tile_aggregate_max_zoom:
+        first_x, first_y = x * CELLS_PER_TILE, y * CELLS_PER_TILE
+        rows = _fetch(db, (
+            select(
+                SoundingCell.cell_x, SoundingCell.cell_y, SoundingCell.sounding_count,
+                SoundingCell.depth_sum, SoundingCell.depth_min, SoundingCell.depth_max,
+            )
+            .where(
+                SoundingCell.device_id == device_id,
+                SoundingCell.zoom == z,
+                SoundingCell.cell_x.between(first_x, first_x + CELLS_PER_TILE - 1),
+                SoundingCell.cell_y.between(first_y, first_y + CELLS_PER_TILE - 1),
+            )
+        ))
+        cell_size = EXTENT // CELLS_PER_TILE
+        px = ((rows[:, 0] - first_x) * cell_size + cell_size // 2).astype(np.int64)
+        py = ((rows[:, 1] - first_y) * cell_size + cell_size // 2).astype(np.int64)
+        counts = rows[:, 2].astype(np.int64)
+        means = rows[:, 3] / np.maximum(counts, 1)
+        mins, maxs = rows[:, 4], rows[:, 5]
+    else:
+        min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+        rows = _fetch(db, (
+            select(Sounding.longitude, Sounding.latitude, Sounding.depth)
+            .where(*bbox_criteria(db, device_id, min_lat, min_lon, max_lat, max_lon))
+            .limit(settings.tile_max_soundings)
+        ))
+        px, py = _tile_coordinates(rows[:, 0], rows[:, 1], z, x, y)
+        counts = np.ones(len(rows), dtype=np.int64)
+        means = mins = maxs = rows[:, 2]
+
+    # Depths to 0.1 m keep the layer's value table small
+    means, mins, maxs = (np.round(values, 1) for values in (means, mins, maxs))
+    for i in range(len(rows)):
+        layer.add(POINT, point_geometry(int(px[i]), int(py[i])), {
+            "count": int(counts[i]),
+            "depth": float(means[i]),
+            "depth_min": float(mins[i]),
+            "depth_max": float(maxs[i]),
+        })
+    return layer
+
+
+def render_tile(db: Session, device_id: int, z: int, x: int, y: int) -> bytes:
+    """
+    Render one vector tile for a device.
+
+    Args:
+        db: Database session
+        device_id: Internal devices.id
+        z: Zoom
+        x: Tile column
+        y: Tile row
+
+    Returns:
+        Encoded (uncompressed) MVT tile; empty if there is nothing to draw
+    """
+    tracks = _tracks_layer(db, device_id, z, x, y)
+    soundings = _soundings_layer(db, device_id, z, x, y)
+    logger.debug(f"Rendered tile {z}/{x}/{y} for device_id={device_id}: "
+                 f"{len(tracks)} track lines, {len(soundings)} sounding points")
+    return encode_tile([tracks, soundings])
@@ -0,0 +1,80 @@
+"""
+DeckBrain Core API - Vector tile endpoints.
+
+Serves Mapbox Vector Tiles of a device's tracks and soundings.
+"""
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.db import get_db
+from core.models import Device
+from modules.trips.track_cache import cached_response
+from .cache import get_tile_cache
+from .mvt import MEDIA_TYPE, tile_exists
+from .render import render_tile
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    device_id: str = Query(..., description="Device whose tracks and soundings to draw"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a Mapbox Vector Tile of a device's tracks and soundings.
+    
+    Layers:
+    - tracks: trip tracks (linestrings, simplified for the zoom), property trip_id
+    - soundings: depth points (aggregated per grid cell up to TILE_AGGREGATE_MAX_ZOOM),
+      properties count, depth, depth_min, depth_max
+    
+    Path Parameters:
+    - z, x, y: Tile address (XYZ scheme, Web Mercator)
+    
+    Query Parameters:
+    - device_id: Device to draw (required)
+    
+    Tiles are cached on disk and carry an ETag; a matching If-None-Match
+    returns 304 Not Modified.
+    
+    Returns:
+        application/vnd.mapbox-vector-tile body (empty if there is nothing to draw)
+        
+    Raises:
+        HTTPException 404: If the tile address is invalid or the device is not found
+    """
+    if not 0 <= z <= settings.tile_max_zoom or not tile_exists(z, x, y):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tile not found: {z}/{x}/{y}"
+        )
+    
+    device = db.query(Device).filter(Device.device_id == device_id).first()
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device not found: {device_id}"
+        )
+    
+    cache = get_tile_cache()
+    if cache is not None:
+        cached = cache.get(device.id, z, x, y)
+        if cached is not None:
+            return cached_response(request, cached)
+        # Before reading any data, so a concurrent invalidation keeps this render out of the cache
+        generation = cache.generation(device.id)
+    
+    body = render_tile(db, device.id, z, x, y)
+    if cache is not None:
+        return cached_response(request, cache.put(device.id, z, x, y, body, generation))
+    return Response(content=body, media_type=MEDIA_TYPE)
@@ -0,0 +1,324 @@
+"""
+DeckBrain Core API - Incremental trip and tow aggregates.
+
+Trip and Tow carry aggregate columns (time span, bounds / end positions,
+distance_nm, duration_hours, depth statistics, sounding_count). Instead of
+recomputing them from every sounding of the trip, attach_soundings() merges
+one batch into the stored values:
+
+- min/max (time, position, depth) are merged with the batch's min/max
+- avg_depth_m is merged through the running count
+- distance_nm grows by the haversine distance along the batch, starting
+  from the entity's last known fix
+
+so keeping a trip current costs O(batch), not O(trip).
+
+recompute_trip()/recompute_tow() derive the same values from a full scan of
+the soundings; scripts/check_trip_aggregates.py uses them to verify (and
+optionally repair) the stored aggregates.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from sqlalchemy import func, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from core.models import Device, Sounding, Tow, Trip
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_NM = 3440.065
+
+# Aggregate columns compared by the consistency check
+TRIP_AGGREGATE_FIELDS = (
+    "start_time", "end_time", "min_lat", "max_lat", "min_lon", "max_lon",
+    "distance_nm", "duration_hours", "avg_depth_m", "min_depth_m", "max_depth_m", "sounding_count",
+)
+TOW_AGGREGATE_FIELDS = (
+    "start_time", "end_time", "start_lat", "start_lon", "end_lat", "end_lon",
+    "distance_nm", "duration_hours", "avg_depth_m", "min_depth_m", "max_depth_m", "sounding_count",
+)
+
+# Rows fetched per round trip when recomputing from soundings
+RECOMPUTE_CHUNK_SIZE = 50000
+
+
+@dataclass
+class Fix:
+    """Last known position of a trip or tow (the start of its next distance leg)."""
+    timestamp: float  # UTC epoch seconds
+    latitude: float
+    longitude: float
+
+
+def haversine_nm(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in nautical miles between coordinate arrays (degrees)."""
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def track_distance_nm(lat: np.ndarray, lon: np.ndarray, last_fix: Optional[Fix] = None) -> float:
+    """
+    Distance along a time-ordered track, optionally continuing from a previous fix.
+
+    Args:
+        lat: Latitudes in degrees
+        lon: Longitudes in degrees
+        last_fix: Fix preceding the first point (None if the track starts here)
+
+    Returns:
+        Distance in nautical miles
+    """
+    if last_fix is not None:
+        lat = np.concatenate(([last_fix.latitude], lat))
+        lon = np.concatenate(([last_fix.longitude], lon))
+    if len(lat) < 2:
+        return 0.0
+    return float(haversine_nm(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum())
+
+
+def epoch_to_datetime(epoch: float) -> datetime:
+    """Convert UTC epoch seconds to a naive UTC datetime (the convention used across the API)."""
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).replace(tzinfo=None)
+
+
+def datetime_to_epoch(value: datetime) -> float:
+    """Convert a stored datetime (naive UTC or aware) to UTC epoch seconds."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _merge_min(current: Optional[float], value: float) -> float:
+    return value if current is None else min(current, value)
+
+
+def _merge_max(current: Optional[float], value: float) -> float:
+    return value if current is None else max(current, value)
+
+
+def adjust_trip_count(db: Session, device_id: int, delta: int) -> None:
+    """
+    Add delta to a device's maintained trip count (in the caller's transaction).
+
+    Every code path that inserts or deletes trips calls this, so
+    devices.trip_count always equals the number of the device's trips.
+    """
+    db.execute(
+        update(Device).where(Device.id == device_id).values(trip_count=Device.trip_count + delta)
+    )
+
+
+def attach_soundings(
+    entity: Union[Trip, Tow],
+    ts: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    depth: np.ndarray,
+    last_fix: Optional[Fix] = None,
+) -> Optional[Fix]:
+    """
+    Merge a batch of soundings into a trip's or tow's stored aggregates.
+
+    Soundings must be ordered by time and follow the entity's existing
+    soundings (the usual case when a file extends a trip).
+
+    Args:
+        entity: Trip or Tow the soundings are attached to
+        ts: UTC epoch-second timestamps (sorted)
+        lat: Latitudes in degrees
+        lon: Longitudes in degrees
+        depth: Depths in meters
+        last_fix: The entity's last known fix, or None if it has no soundings yet
+
+    Returns:
+        The entity's new last fix (pass it to the next call)
+    """
+    n = len(ts)
+    if n == 0:
+        return last_fix
+
+    first_ts, last_ts = float(ts[0]), float(ts[-1])
+    if entity.start_time is not None:
+        first_ts = min(first_ts, datetime_to_epoch(entity.start_time))
+    if entity.end_time is not None:
+        last_ts = max(last_ts, datetime_to_epoch(entity.end_time))
+    entity.start_time = epoch_to_datetime(first_ts)
+    entity.end_time = epoch_to_datetime(last_ts)
+    entity.duration_hours = (last_ts - first_ts) / 3600.0
+    entity.distance_nm = (entity.distance_nm or 0.0) + track_distance_nm(lat, lon, last_fix)
+
+    count = entity.sounding_count or 0
+    entity.min_depth_m = _merge_min(entity.min_depth_m, float(depth.min()))
+    entity.max_depth_m = _merge_max(entity.max_depth_m, float(depth.max()))
+    entity.avg_depth_m = ((entity.avg_depth_m or 0.0) * count + float(depth.sum())) / (count + n)
+    entity.sounding_count = count + n
+
+    if isinstance(entity, Trip):
+        entity.min_lat = _merge_min(entity.min_lat, float(lat.min()))
+        entity.max_lat = _merge_max(entity.max_lat, float(lat.max()))
+        entity.min_lon = _merge_min(entity.min_lon, float(lon.min()))
+        entity.max_lon = _merge_max(entity.max_lon, float(lon.max()))
+    else:
+        if last_fix is None or entity.start_lat is None:
+            entity.start_lat = float(lat[0])
+            entity.start_lon = float(lon[0])
+        entity.end_lat = float(lat[-1])
+        entity.end_lon = float(lon[-1])
+
+    return Fix(timestamp=float(ts[-1]), latitude=float(lat[-1]), longitude=float(lon[-1]))
+
+
+def last_fix(db: Session, entity: Union[Trip, Tow]) -> Optional[Fix]:
+    """
+    Load an entity's last known fix (one indexed lookup, no scan).
+
+    Args:
+        db: Database session
+        entity: Trip or Tow
+
+    Returns:
+        Fix of its latest sounding, or None if it has none
+    """
+    column = Sounding.trip_id if isinstance(entity, Trip) else Sounding.tow_id
+    row = (
+        db.query(Sounding.timestamp, Sounding.latitude, Sounding.longitude)
+        .filter(column == entity.id)
+        .order_by(Sounding.timestamp.desc(), Sounding.id.desc())
+        .first()
+    )
+    if row is None:
+        return None
+    return Fix(timestamp=datetime_to_epoch(row.timestamp), latitude=row.latitude, longitude=row.longitude)
+
+
+def _recompute(db: Session, column, entity_id: int) -> Dict[str, Any]:
+    """Full recompute of the shared aggregates for soundings where column == entity_id."""
+    stats = (
+        db.query(
+            func.count(Sounding.id),
+            func.min(Sounding.timestamp),
+            func.max(Sounding.timestamp),
+            func.min(Sounding.latitude),
+            func.max(Sounding.latitude),
+            func.min(Sounding.longitude),
+            func.max(Sounding.longitude),
+            func.min(Sounding.depth),
+            func.max(Sounding.depth),
+            # avg() has no result type of its own; give it depth's so it is unscaled
+            type_coerce(func.avg(Sounding.depth), Sounding.depth.type),
+        )
+        .filter(column == entity_id)
+        .one()
+    )
+    count, start, end, min_lat, max_lat, min_lon, max_lon, min_depth, max_depth, avg_depth = stats
+
+    # Distance needs the ordered track; stream it in chunks to bound memory
+    distance = 0.0
+    previous: Optional[Fix] = None
+    first_position = last_position = None
+    track = (
+        select(Sounding.latitude, Sounding.longitude)
+        .where(column == entity_id)
+        .order_by(Sounding.timestamp, Sounding.id)
+        .execution_options(yield_per=RECOMPUTE_CHUNK_SIZE)
+    )
+    for chunk in db.execute(track).partitions():
+        positions = np.array([tuple(row) for row in chunk], dtype=np.float64)
+        lat, lon = positions[:, 0], positions[:, 1]
+        distance += track_distance_nm(lat, lon, previous)
+        previous = Fix(timestamp=0.0, latitude=float(lat[-1]), longitude=float(lon[-1]))
+        if first_position is None:
+            first_position = (float(lat[0]), float(lon[0]))
+        last_position = (float(lat[-1]), float(lon[-1]))
+
+    start_epoch = datetime_to_epoch(start) if start is not None else None
+    end_epoch = datetime_to_epoch(end) if end is not None else None
+    return {
+        "sounding_count": count,
+        "start_time": start_epoch,
+        "end_time": end_epoch,
+        "duration_hours": (end_epoch - start_epoch) / 3600.0 if count else None,
+        "distance_nm": distance if count else None,
+        "min_lat": min_lat,
+        "max_lat": max_lat,
+        "min_lon": min_lon,
+        "max_lon": max_lon,
+        "start_lat": first_position[0] if first_position else None,
+        "start_lon": first_position[1] if first_position else None,
+        "end_lat": last_position[0] if last_position else None,
+        "end_lon": last_position[1] if last_position else None,
+        "min_depth_m": min_depth,
+        "max_depth_m": max_depth,
+        "avg_depth_m": float(avg_depth) if avg_depth is not None else None,
+    }
+
+
+def recompute_trip(db: Session, trip: Trip) -> Dict[str, Any]:
+    """Recompute a trip's aggregates from all of its soundings (times as epoch seconds)."""
+    values = _recompute(db, Sounding.trip_id, trip.id)
+    return {field: values[field] for field in TRIP_AGGREGATE_FIELDS}
+
+
+def recompute_tow(db: Session, tow: Tow) -> Dict[str, Any]:
+    """Recompute a tow's aggregates from all of its soundings (times as epoch seconds)."""
+    values = _recompute(db, Sounding.tow_id, tow.id)
+    return {field: values[field] for field in TOW_AGGREGATE_FIELDS}
+
+
+def compare_aggregates(
+    entity: Union[Trip, Tow],
+    expected: Dict[str, Any],
+    rel_tolerance: float = 1e-6,
+    abs_tolerance: float = 1e-6,
+) -> List[str]:
+    """
+    Compare stored aggregates with recomputed ones.
+
+    Args:
+        entity: Trip or Tow with stored aggregates
+        expected: Output of recompute_trip()/recompute_tow()
+        rel_tolerance: Relative tolerance for float columns
+        abs_tolerance: Absolute tolerance for float columns (and seconds for times)
+
+    Returns:
+        Human-readable descriptions of the mismatching fields (empty if consistent)
+    """
+    if not expected.get("sounding_count"):
+        # Trips/tows without soundings (e.g. created by hand) have nothing to verify
+        return []
+
+    mismatches = []
+    for field, want in expected.items():
+        have = getattr(entity, field)
+        if isinstance(have, datetime):
+            have = datetime_to_epoch(have)
+        if want is None and have is None:
+            continue
+        if want is None or have is None:
+            mismatches.append(f"{field}: stored={have!r} expected={want!r}")
+            continue
+        if field == "sounding_count":
+            if int(have) != int(want):
+                mismatches.append(f"{field}: stored={have} expected={want}")
+            continue
+        # Stored times are rounded to microseconds
+        atol = max(abs_tolerance, 1e-3) if field in ("start_time", "end_time") else abs_tolerance
+        if not np.isclose(float(have), float(want), rtol=rel_tolerance, atol=atol):
+            mismatches.append(f"{field}: stored={have!r} expected={want!r}")
+    return mismatches
+
+
+def apply_aggregates(entity: Union[Trip, Tow], values: Dict[str, Any]) -> None:
+    """Overwrite an entity's aggregates with recomputed values."""
+    for field, value in values.items():
+        if field in ("start_time", "end_time"):
+            if value is not None:
+                setattr(entity, field, epoch_to_datetime(value))
+        else:
+            setattr(entity, field, value)
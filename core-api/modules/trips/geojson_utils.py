@@ -4,49 +4,64 @@ GeoJSON utilities for track data.
 Converts trip and sounding data to GeoJSON format for map visualization.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from core.models import Trip, Tow, Sounding
+import numpy as np
 
+from core.models import Trip, Tow
 
-def soundings_to_geojson(soundings: List[Sounding]) -> Dict[str, Any]:
+
+def soundings_to_geojson(
+    track: Dict[str, np.ndarray],
+    include_points: bool = True,
+    detail_level: Optional[int] = None
+) -> Dict[str, Any]:
     """
-    Convert a list of soundings to a GeoJSON FeatureCollection.
+    Convert track columns to a GeoJSON FeatureCollection.
     
     Args:
-        soundings: List of Sounding objects
+        track: Track columns from modules.soundings.store, ordered by timestamp
+        include_points: Whether to include per-point properties
+        detail_level: Detail level the soundings were filtered to (None = full track)
         
     Returns:
         GeoJSON FeatureCollection with LineString geometry
     """
-    if not soundings:
+    if not len(track["time"]):
         return {
             "type": "FeatureCollection",
             "features": []
         }
     
-    # Sort soundings by timestamp
-    sorted_soundings = sorted(soundings, key=lambda s: s.timestamp)
+    # Epoch microseconds -> naive UTC datetimes (the convention used across the API)
+    timestamps = [value.isoformat() for value in track["time"].astype("datetime64[us]").tolist()]
+    latitudes = track["latitude"].tolist()
+    longitudes = track["longitude"].tolist()
     
     # Build coordinates array [lon, lat] (GeoJSON order)
-    coordinates = [
-        [sounding.longitude, sounding.latitude]
-        for sounding in sorted_soundings
-    ]
+    coordinates = [[lon, lat] for lon, lat in zip(longitudes, latitudes)]
     
     # Build properties for each point (for detailed view)
-    point_properties = [
+    point_properties = None if not include_points else [
         {
-            "timestamp": sounding.timestamp.isoformat(),
-            "depth": sounding.depth,
-            "latitude": sounding.latitude,
-            "longitude": sounding.longitude,
-            "speed_knots": sounding.speed_knots,
-            "course_deg": sounding.course_deg,
-            "water_temp": sounding.water_temp
+            "timestamp": timestamp,
+            "depth": depth,
+            "latitude": lat,
+            "longitude": lon,
+            "speed_knots": speed,
+            "course_deg": course,
+            "water_temp": temp
         }
-        for sounding in sorted_soundings
+        for timestamp, depth, lat, lon, speed, course, temp in zip(
+            timestamps,
+            track["depth"].tolist(),
+            latitudes,
+            longitudes,
+            _nullable(track["speed_knots"]),
+            _nullable(track["course_deg"]),
+            _nullable(track["water_temp"]),
+        )
     ]
     
     # Create LineString feature for the track
@@ -58,12 +73,14 @@ def soundings_to_geojson(soundings: List[Sounding]) -> Dict[str, Any]:
         },
         "properties": {
             "type": "track",
-            "start_time": sorted_soundings[0].timestamp.isoformat(),
-            "end_time": sorted_soundings[-1].timestamp.isoformat(),
-            "points_count": len(sorted_soundings),
-            "points": point_properties  # Include all point data
+            "start_time": timestamps[0],
+            "end_time": timestamps[-1],
+            "points_count": len(timestamps),
+            "detail_level": detail_level,  # None = full resolution
         }
     }
+    if point_properties is not None:
+        track_feature["properties"]["points"] = point_properties
     
     return {
         "type": "FeatureCollection",
@@ -71,6 +88,11 @@ def soundings_to_geojson(soundings: List[Sounding]) -> Dict[str, Any]:
     }
 
 
+def _nullable(values: np.ndarray) -> List[Optional[float]]:
+    """Column values as a list, with None for NaN (not recorded)."""
+    return [None if value != value else value for value in values.tolist()]
+
+
 def tow_to_geojson_feature(tow: Tow) -> Dict[str, Any]:
     """
     Convert a Tow to a GeoJSON Feature.
@@ -133,6 +155,10 @@ def trip_to_summary_dict(trip: Trip) -> Dict[str, Any]:
         "name": trip.name,
         "distance_nm": trip.distance_nm,
         "duration_hours": trip.duration_hours,
+        "avg_depth_m": trip.avg_depth_m,
+        "min_depth_m": trip.min_depth_m,
+        "max_depth_m": trip.max_depth_m,
+        "sounding_count": trip.sounding_count,
         "bounds": {
             "min_lat": trip.min_lat,
             "max_lat": trip.max_lat,
@@ -168,7 +194,8 @@ def trip_to_detail_dict(trip: Trip, include_tows: bool = True) -> Dict[str, Any]
                 "duration_hours": tow.duration_hours,
                 "avg_depth_m": tow.avg_depth_m,
                 "min_depth_m": tow.min_depth_m,
-                "max_depth_m": tow.max_depth_m
+                "max_depth_m": tow.max_depth_m,
+                "sounding_count": tow.sounding_count
             }
             for tow in sorted(trip.tows, key=lambda t: t.start_time)
         ]
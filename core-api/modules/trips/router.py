@@ -5,24 +5,47 @@ Provides endpoints for listing and retrieving trip data (normalized across all p
 """
 
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from pydantic import BaseModel
 
-from core.db import get_db
-from core.models import Device, Trip, Tow, Sounding
+from core.db import get_async_read_db
+from core.models import Device, Trip, Tow
+from core.pagination import decode_cursor, encode_cursor, parse_cursor_datetime
+from modules.soundings.store import TrackColumns, read_track_async
 from .geojson_utils import (
     trip_to_summary_dict,
     trip_to_detail_dict,
     soundings_to_geojson,
     tow_to_geojson_feature
 )
+from .simplify import MAX_DETAIL_LEVEL, zoom_for_tolerance
+from . import track_binary
+from .track_cache import (
+    JSON_MEDIA_TYPE,
+    TrackCache,
+    get_track_cache,
+    not_modified,
+    track_etag,
+    cached_response,
+    trip_version
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Endpoints here only read, so they run on the async read session (the
+# replica when one is configured): queries are awaited, and tracks are read
+# through modules.soundings.store (rows via AsyncSession.run_sync(), segment
+# files in the threadpool). CPU-heavy rendering (GeoJSON, binary encoding,
+# gzip) and cache disk reads run in the threadpool so the event loop stays
+# responsive.
+
 
 class TripSummary(BaseModel):
     """Response model for trip summary."""
@@ -33,6 +56,10 @@ class TripSummary(BaseModel):
     name: Optional[str]
     distance_nm: Optional[float]
     duration_hours: Optional[float]
+    avg_depth_m: Optional[float]
+    min_depth_m: Optional[float]
+    max_depth_m: Optional[float]
+    sounding_count: Optional[int]
     bounds: Optional[dict]
     created_at: Optional[str]
 
@@ -42,6 +69,7 @@ class TripsListResponse(BaseModel):
     trips: List[dict]
     total: int
     device_id: Optional[str]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page (None on the last page)
 
 
 class TripDetailResponse(BaseModel):
@@ -55,31 +83,152 @@ class TrackGeoJSON(BaseModel):
     features: List[dict]
 
 
+def _resolve_detail_level(
+    zoom: Optional[int],
+    tolerance: Optional[float],
+    latitude: Optional[float]
+) -> Optional[int]:
+    """
+    Turn the zoom/tolerance query parameters into a detail level filter.
+    
+    Args:
+        zoom: Requested map zoom (None for no simplification)
+        tolerance: Requested tolerance in meters (None for no simplification)
+        latitude: Latitude the tolerance applies at (track center)
+        
+    Returns:
+        Maximum detail_level to return, or None for the full track
+        
+    Raises:
+        HTTPException 400: If both zoom and tolerance are given
+    """
+    if zoom is not None and tolerance is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Specify either zoom or tolerance, not both"
+        )
+    if zoom is not None:
+        return zoom
+    if tolerance is not None:
+        return zoom_for_tolerance(tolerance, latitude or 0.0)
+    return None
+
+
+def _wants_binary(request: Request, track_format: Optional[str]) -> bool:
+    """Pick the track encoding: explicit ?format=, else the Accept header."""
+    if track_format is not None:
+        return track_format == "binary"
+    return track_binary.MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _track_variant(
+    tow_id: Optional[int],
+    include_tows: bool,
+    detail_level: Optional[int],
+    include_points: bool,
+    binary: bool = False
+) -> str:
+    """Cache key of one rendering of a track (see modules.trips.track_cache)."""
+    scope = f"tow{tow_id}" if tow_id is not None else "trip"
+    level = "full" if detail_level is None else f"z{detail_level}"
+    if binary:
+        # Tow features and point properties only exist in GeoJSON
+        return f"{scope}-{level}-bin"
+    if tow_id is None:
+        scope += f"-tows{int(include_tows)}"
+    return f"{scope}-{level}-pts{int(include_points)}"
+
+
+async def _cached_track_response(
+    request: Request,
+    cache: Optional[TrackCache],
+    trip_id: int,
+    variant: str,
+    version: str,
+    media_type: str = JSON_MEDIA_TYPE
+) -> Optional[Response]:
+    """
+    Answer a track request without rendering it, if possible.
+    
+    Returns:
+        304 when the client's ETag is current, the cached body on a cache hit,
+        or None when the track has to be rendered
+    """
+    if cache is None:
+        return None
+    response = not_modified(request, track_etag(trip_id, variant, version))
+    if response is not None:
+        return response
+    # Disk hits read the body, and clients without gzip get it decompressed
+    cached = await run_in_threadpool(cache.get, trip_id, variant, version, media_type)
+    return await run_in_threadpool(cached_response, request, cached) if cached is not None else None
+
+
+def _put_and_respond(
+    request: Request,
+    cache: TrackCache,
+    trip_id: int,
+    variant: str,
+    version: str,
+    payload: Union[Dict[str, Any], bytes],
+    media_type: str = JSON_MEDIA_TYPE
+) -> Response:
+    """Cache a rendered track and serve it (call in the threadpool: it compresses, maybe decompresses)."""
+    return cached_response(request, cache.put(trip_id, variant, version, payload, media_type))
+
+
+def _encode_binary_track(track: TrackColumns) -> bytes:
+    return track_binary.encode_track(track_binary.wire_columns(track))
+
+
+async def _binary_track_response(
+    request: Request,
+    cache: Optional[TrackCache],
+    trip_id: int,
+    variant: str,
+    version: str,
+    track: TrackColumns
+) -> Response:
+    """Render a track in the binary columnar format (see modules.trips.track_binary)."""
+    logger.info(f"Encoding {len(track['time'])} soundings as binary track ({variant})")
+    body = await run_in_threadpool(_encode_binary_track, track)
+    if cache is not None:
+        return await run_in_threadpool(
+            _put_and_respond, request, cache, trip_id, variant, version, body, track_binary.MEDIA_TYPE
+        )
+    return Response(content=body, media_type=track_binary.MEDIA_TYPE)
+
+
 @router.get("/trips", response_model=TripsListResponse)
 async def list_trips(
     device_id: Optional[str] = Query(None, description="Filter by device_id"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of trips to return"),
-    offset: int = Query(0, ge=0, description="Number of trips to skip"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated: number of trips to skip (use cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     List trips for a device.
     
-    Returns trips sorted by start_time (most recent first).
+    Returns trips sorted by start_time (most recent first, then by id).
+    Pages are keyset-paginated: pass next_cursor of a response as cursor to
+    get the next page, which costs one index seek however deep it is.
     
     Query Parameters:
     - device_id: Filter trips by device_id (required for now)
     - limit: Maximum number of trips to return (default: 50, max: 100)
-    - offset: Number of trips to skip for pagination (default: 0)
+    - cursor: Continue after the previous page
+    - offset: Deprecated; number of trips to skip (default: 0)
     
     Returns:
-        TripsListResponse with list of trip summaries
+        TripsListResponse with list of trip summaries, the device's trip
+        count and next_cursor
         
     Raises:
-        HTTPException 400: If device_id not provided
+        HTTPException 400: If device_id not provided or the cursor is invalid
         HTTPException 404: If device not found
     """
-    logger.info(f"Listing trips: device_id={device_id}, limit={limit}, offset={offset}")
+    logger.info(f"Listing trips: device_id={device_id}, limit={limit}, cursor={cursor}, offset={offset}")
     
     # For now, require device_id
     # TODO: Add authentication and get device from auth context
@@ -90,28 +239,41 @@ async def list_trips(
         )
     
     # Verify device exists
-    device = db.query(Device).filter(Device.device_id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.device_id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Device not found: {device_id}"
         )
     
-    # Query trips
-    query = db.query(Trip).filter(Trip.device_id == device.id)
-    
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination and sorting
-    trips = (
+    # Query trips, seeking backwards along (device_id, start_time, id)
+    query = select(Trip).where(Trip.device_id == device.id)
+    if cursor:
+        try:
+            start_time, trip_id = decode_cursor(cursor, 2)
+            if not isinstance(trip_id, int):
+                raise ValueError("Invalid cursor")
+            query = query.where(tuple_(Trip.start_time, Trip.id) < (parse_cursor_datetime(start_time), trip_id))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    # One trip beyond the page tells whether there is a next page
+    trips = (await db.scalars(
         query
-        .order_by(Trip.start_time.desc())
+        .order_by(Trip.start_time.desc(), Trip.id.desc())
         .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    
+        .limit(limit + 1)
+    )).all()
+    next_cursor = None
+    if len(trips) > limit:
+        trips = trips[:limit]
+        next_cursor = encode_cursor(trips[-1].start_time, trips[-1].id)
+    
+    # Maintained on insert, so no COUNT(*) over the device's trips
+    total = device.trip_count
     logger.info(f"Found {total} trips for device {device_id}, returning {len(trips)}")
     
     # Convert to response format
@@ -120,14 +282,15 @@ async def list_trips(
     return TripsListResponse(
         trips=trips_data,
         total=total,
-        device_id=device_id
+        device_id=device_id,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/trips/{trip_id}", response_model=TripDetailResponse)
 async def get_trip_detail(
     trip_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get detailed information for a specific trip.
@@ -146,11 +309,10 @@ async def get_trip_detail(
     logger.info(f"Fetching trip detail for trip_id={trip_id}")
     
     # Query trip with tows loaded
-    trip = (
-        db.query(Trip)
-        .options(joinedload(Trip.tows))
-        .filter(Trip.id == trip_id)
-        .first()
+    trip = await db.scalar(
+        select(Trip)
+        .options(selectinload(Trip.tows))
+        .where(Trip.id == trip_id)
     )
     
     if not trip:
@@ -170,8 +332,16 @@ async def get_trip_detail(
 @router.get("/trips/{trip_id}/track", response_model=TrackGeoJSON)
 async def get_trip_track(
     trip_id: int,
+    request: Request,
     include_tows: bool = Query(False, description="Include tow boundary features"),
-    db: Session = Depends(get_db)
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_DETAIL_LEVEL, description="Simplify the track for this map zoom"),
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplify the track to this tolerance in meters"),
+    include_points: bool = Query(True, description="Include per-point properties"),
+    track_format: Optional[str] = Query(
+        None, alias="format", pattern="^(geojson|binary)$",
+        description="geojson or binary (default: negotiated from the Accept header)"
+    ),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get track data for a trip in GeoJSON format.
@@ -185,6 +355,19 @@ async def get_trip_track(
     
     Query Parameters:
     - include_tows: Whether to include tow boundary features (default: false)
+    - zoom: Return only the points needed to draw the track at this map zoom (0-20)
+    - tolerance: Return a track that deviates at most this many meters from the full one
+    - include_points: Whether to include per-point properties (default: true)
+    - format: "geojson" or "binary"; without it, binary is returned when the Accept
+      header asks for application/vnd.deckbrain.track
+    
+    Without zoom/tolerance the full-resolution track is returned. The binary
+    format (modules.trips.track_binary) carries time/lon/lat/depth/tow id
+    columns for direct upload to WebGL; tow features and point properties
+    are GeoJSON-only.
+    
+    Responses are cached (see modules.trips.track_cache) and carry an ETag;
+    a matching If-None-Match returns 304 Not Modified.
     
     Returns:
         GeoJSON FeatureCollection with track data
@@ -192,44 +375,57 @@ async def get_trip_track(
     Raises:
         HTTPException 404: If trip not found or no track data available
     """
-    logger.info(f"Fetching track for trip_id={trip_id}, include_tows={include_tows}")
+    logger.info(f"Fetching track for trip_id={trip_id}, include_tows={include_tows}, zoom={zoom}, tolerance={tolerance}")
     
     # Verify trip exists
-    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    trip = await db.get(Trip, trip_id)
     if not trip:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Trip not found: {trip_id}"
         )
     
-    # Query soundings for this trip
-    soundings = (
-        db.query(Sounding)
-        .filter(Sounding.trip_id == trip_id)
-        .order_by(Sounding.timestamp)
-        .all()
-    )
-    
-    if not soundings:
+    center_lat = (trip.min_lat + trip.max_lat) / 2 if trip.min_lat is not None and trip.max_lat is not None else None
+    detail_level = _resolve_detail_level(zoom, tolerance, center_lat)
+    
+    # Serve from the cache when the trip has not changed since it was rendered
+    cache = get_track_cache()
+    binary = _wants_binary(request, track_format)
+    variant = _track_variant(None, include_tows, detail_level, include_points, binary)
+    version = trip_version(trip)
+    media_type = track_binary.MEDIA_TYPE if binary else JSON_MEDIA_TYPE
+    response = await _cached_track_response(request, cache, trip_id, variant, version, media_type)
+    if response is not None:
+        return response
+    
+    # Soundings of this trip, from the segment or the soundings table
+    track = await read_track_async(db, trip, detail_level=detail_level)
+    if not len(track["time"]):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No track data available for trip {trip_id}"
         )
     
-    logger.info(f"Found {len(soundings)} soundings for trip {trip_id}")
+    logger.info(f"Found {len(track['time'])} soundings for trip {trip_id} (detail_level={detail_level})")
+    if binary:
+        return await _binary_track_response(request, cache, trip_id, variant, version, track)
     
     # Convert soundings to GeoJSON
-    geojson = soundings_to_geojson(soundings)
+    geojson = await run_in_threadpool(
+        soundings_to_geojson, track, include_points=include_points, detail_level=detail_level
+    )
     
     # Optionally add tow features
     if include_tows:
-        tows = db.query(Tow).filter(Tow.trip_id == trip_id).order_by(Tow.start_time).all()
+        tows = (await db.scalars(select(Tow).where(Tow.trip_id == trip_id).order_by(Tow.start_time))).all()
         logger.info(f"Adding {len(tows)} tow features")
         
         for tow in tows:
             tow_feature = tow_to_geojson_feature(tow)
             geojson["features"].append(tow_feature)
     
+    if cache is not None:
+        return await run_in_threadpool(_put_and_respond, request, cache, trip_id, variant, version, geojson)
     return geojson
 
 
@@ -237,7 +433,15 @@ async def get_trip_track(
 async def get_tow_track(
     trip_id: int,
     tow_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    zoom: Optional[int] = Query(None, ge=0, le=MAX_DETAIL_LEVEL, description="Simplify the track for this map zoom"),
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplify the track to this tolerance in meters"),
+    include_points: bool = Query(True, description="Include per-point properties"),
+    track_format: Optional[str] = Query(
+        None, alias="format", pattern="^(geojson|binary)$",
+        description="geojson or binary (default: negotiated from the Accept header)"
+    ),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get track data for a specific tow in GeoJSON format.
@@ -248,6 +452,15 @@ async def get_tow_track(
     - trip_id: ID of the trip
     - tow_id: ID of the tow
     
+    Query Parameters:
+    - zoom: Return only the points needed to draw the track at this map zoom (0-20)
+    - tolerance: Return a track that deviates at most this many meters from the full one
+    - include_points: Whether to include per-point properties (default: true)
+    - format: "geojson" or "binary"; without it, binary is returned when the Accept
+      header asks for application/vnd.deckbrain.track
+    
+    Responses are cached and carry an ETag like /trips/{trip_id}/track.
+    
     Returns:
         GeoJSON FeatureCollection with tow track data
         
@@ -257,10 +470,10 @@ async def get_tow_track(
     logger.info(f"Fetching track for tow_id={tow_id} in trip_id={trip_id}")
     
     # Verify tow exists and belongs to trip
-    tow = (
-        db.query(Tow)
-        .filter(Tow.id == tow_id, Tow.trip_id == trip_id)
-        .first()
+    tow = await db.scalar(
+        select(Tow)
+        .options(joinedload(Tow.trip))
+        .where(Tow.id == tow_id, Tow.trip_id == trip_id)
     )
     
     if not tow:
@@ -269,24 +482,37 @@ async def get_tow_track(
             detail=f"Tow {tow_id} not found in trip {trip_id}"
         )
     
-    # Query soundings for this tow
-    soundings = (
-        db.query(Sounding)
-        .filter(Sounding.tow_id == tow_id)
-        .order_by(Sounding.timestamp)
-        .all()
-    )
-    
-    if not soundings:
+    center_lat = (tow.start_lat + tow.end_lat) / 2 if tow.start_lat is not None and tow.end_lat is not None else None
+    detail_level = _resolve_detail_level(zoom, tolerance, center_lat)
+    
+    # Tow tracks change with their trip, so they share its version
+    cache = get_track_cache()
+    binary = _wants_binary(request, track_format)
+    variant = _track_variant(tow_id, False, detail_level, include_points, binary)
+    version = trip_version(tow.trip)
+    media_type = track_binary.MEDIA_TYPE if binary else JSON_MEDIA_TYPE
+    response = await _cached_track_response(request, cache, trip_id, variant, version, media_type)
+    if response is not None:
+        return response
+    
+    # Soundings of this tow, from the trip's segment or the soundings table
+    track = await read_track_async(db, tow.trip, tow_id=tow_id, detail_level=detail_level)
+    if not len(track["time"]):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No track data available for tow {tow_id}"
         )
     
-    logger.info(f"Found {len(soundings)} soundings for tow {tow_id}")
+    logger.info(f"Found {len(track['time'])} soundings for tow {tow_id} (detail_level={detail_level})")
+    if binary:
+        return await _binary_track_response(request, cache, trip_id, variant, version, track)
     
     # Convert soundings to GeoJSON
-    geojson = soundings_to_geojson(soundings)
+    geojson = await run_in_threadpool(
+        soundings_to_geojson, track, include_points=include_points, detail_level=detail_level
+    )
     
+    if cache is not None:
+        return await run_in_threadpool(_put_and_respond, request, cache, trip_id, variant, version, geojson)
     return geojson
 
@@ -0,0 +1,183 @@
+"""
+DeckBrain Core API - Track simplification and level of detail.
+
+Every sounding gets a detail_level at ingestion time: the lowest map zoom
+at which the point is needed to draw its track to within one pixel.
+Serving a simplified track is then a lookup (detail_level <= zoom), not a
+computation.
+
+Levels come from Douglas-Peucker significance: the deviation at which DP
+would select the point, capped by the significance of the point that split
+its parent segment, so the kept set for any tolerance is exactly the DP
+result for that tolerance. A point is needed at zoom z when its
+significance is at least one pixel at z (256 px tiles, Web Mercator).
+
+DP runs breadth-first: all segments at one recursion depth are split in a
+single vectorised NumPy pass, so a 10k-point batch takes tens of
+milliseconds instead of one Python step per point.
+"""
+
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from core.models import Sounding
+
+# Zoom levels with precomputed detail; points needed only beyond this are FULL_DETAIL_LEVEL
+MAX_DETAIL_LEVEL = 20
+FULL_DETAIL_LEVEL = MAX_DETAIL_LEVEL + 1
+
+TILE_SIZE = 256
+METERS_PER_DEGREE = 111320.0
+
+
+def pixel_size_degrees(zoom: float, latitude: float = 0.0) -> float:
+    """Size of one Web Mercator pixel at a zoom, in degrees of latitude."""
+    return 360.0 * math.cos(math.radians(latitude)) / (TILE_SIZE * 2.0 ** zoom)
+
+
+def dp_significance(x: np.ndarray, y: np.ndarray, min_tolerance: float = 0.0) -> np.ndarray:
+    """
+    Douglas-Peucker significance of every point of a polyline.
+
+    Args:
+        x: X coordinates (locally isotropic units, e.g. lon * cos(lat))
+        y: Y coordinates (same units)
+        min_tolerance: Segments whose points all deviate less than this are not split further
+
+    Returns:
+        Array of significances (inf for the endpoints, 0 for points never selected)
+    """
+    n = len(x)
+    significance = np.zeros(n)
+    if n == 0:
+        return significance
+    significance[0] = significance[-1] = np.inf
+    if n < 3:
+        return significance
+
+    # Every interior point that is not yet a split point, with its current segment
+    points = np.arange(1, n - 1)
+    start = np.zeros(n - 2, dtype=np.int64)
+    end = np.full(n - 2, n - 1, dtype=np.int64)
+    cap = np.full(n - 2, np.inf)
+
+    while len(points):
+        xa = x[start]
+        ya = y[start]
+        dx = x[end] - xa
+        dy = y[end] - ya
+        chord = np.hypot(dx, dy)
+        px = x[points] - xa
+        py = y[points] - ya
+        with np.errstate(divide="ignore", invalid="ignore"):
+            deviation = np.where(chord > 0, np.abs(dy * px - dx * py) / chord, np.hypot(px, py))
+
+        # Points of one segment are contiguous and share `start`
+        seg_first = np.flatnonzero(np.concatenate(([True], start[1:] != start[:-1])))
+        seg_max = np.maximum.reduceat(deviation, seg_first)
+        seg_of_point = np.repeat(np.arange(len(seg_first)), np.diff(np.append(seg_first, len(points))))
+
+        # First point reaching the segment maximum splits the segment
+        at_max = np.flatnonzero(deviation == seg_max[seg_of_point])
+        _, first = np.unique(seg_of_point[at_max], return_index=True)
+        split_pos = at_max[first]
+        split_point = points[split_pos]
+        split_sig = np.minimum(seg_max, cap[split_pos])
+        splits = seg_max >= min_tolerance
+        significance[split_point[splits]] = split_sig[splits]
+
+        k = split_point[seg_of_point]
+        left = points < k
+        keep = splits[seg_of_point] & (points != k)
+        end = np.where(left, k, end)[keep]
+        start = np.where(left, start, k)[keep]
+        cap = split_sig[seg_of_point][keep]
+        points = points[keep]
+
+    return significance
+
+
+def detail_levels(lat: np.ndarray, lon: np.ndarray, piece_starts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute the detail_level of each point of a time-ordered track.
+
+    Args:
+        lat: Latitudes in degrees
+        lon: Longitudes in degrees
+        piece_starts: Indices where an independent polyline starts (e.g. a new
+            trip or tow); each piece keeps its endpoints at level 0
+
+    Returns:
+        int16 array of levels in [0, FULL_DETAIL_LEVEL]
+    """
+    n = len(lat)
+    levels = np.full(n, FULL_DETAIL_LEVEL, dtype=np.int16)
+    if n == 0:
+        return levels
+
+    if piece_starts is None or len(piece_starts) == 0:
+        piece_starts = np.array([0])
+    bounds = np.append(np.unique(np.append(piece_starts, 0)), n)
+
+    for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        piece_lat = lat[a:b]
+        mid_lat = float(np.mean(piece_lat))
+        x = lon[a:b] * math.cos(math.radians(mid_lat))
+        significance = dp_significance(x, piece_lat, pixel_size_degrees(MAX_DETAIL_LEVEL, mid_lat))
+
+        # Needed at zoom z when significance >= one pixel at z
+        with np.errstate(divide="ignore"):
+            zoom = np.ceil(np.log2(pixel_size_degrees(0, mid_lat) / significance))
+        zoom = np.nan_to_num(zoom, nan=FULL_DETAIL_LEVEL, posinf=FULL_DETAIL_LEVEL, neginf=0)
+        levels[a:b] = np.clip(zoom, 0, FULL_DETAIL_LEVEL).astype(np.int16)
+
+    return levels
+
+
+def zoom_for_tolerance(tolerance_m: float, latitude: float = 0.0) -> int:
+    """
+    Convert a simplification tolerance in meters to the matching detail level.
+
+    Args:
+        tolerance_m: Maximum allowed deviation of the simplified track, in meters
+        latitude: Latitude the tolerance applies at (e.g. the trip's center)
+
+    Returns:
+        Zoom level whose pixel is at least tolerance_m
+    """
+    pixel_at_zero_m = pixel_size_degrees(0, latitude) * METERS_PER_DEGREE
+    zoom = math.floor(math.log2(pixel_at_zero_m / max(tolerance_m, 1e-9)))
+    return max(0, min(zoom, FULL_DETAIL_LEVEL))
+
+
+def detail_criteria(db: Session, trip_ids: Sequence[int], detail_level: Optional[int]) -> List:
+    """
+    SQL filters selecting the soundings of some trips needed at a detail level.
+
+    Soundings without a level (ingested before levels existed) are always
+    kept. Checking for them first lets fully levelled trips use a plain
+    range on the (trip_id, detail_level) index; the OR form would make the
+    database scan the whole trip instead.
+
+    Args:
+        db: Database session
+        trip_ids: Trips the query is restricted to
+        detail_level: Maximum detail_level (None for the full track)
+
+    Returns:
+        List of filter expressions on Sounding (empty for the full track)
+    """
+    if detail_level is None:
+        return []
+    pending = (
+        db.query(Sounding.id)
+        .filter(Sounding.trip_id.in_(list(trip_ids)), Sounding.detail_level.is_(None))
+        .first()
+    )
+    if pending is None:
+        return [Sounding.detail_level <= detail_level]
+    return [or_(Sounding.detail_level <= detail_level, Sounding.detail_level.is_(None))]
@@ -0,0 +1,112 @@
+"""
+DeckBrain Core API - Binary columnar track encoding.
+
+Dense tracks are expensive as GeoJSON: every point becomes nested Python
+lists and dicts plus an isoformat() timestamp, and the dashboard has to
+parse it all again before uploading it to WebGL. The binary format sends
+the same track as contiguous little-endian columns that can be wrapped in
+typed arrays without parsing:
+
+    offset            type         content
+    0                 char[4]      magic "DBTK"
+    4                 uint16       format version (1)
+    6                 uint16       column count (5)
+    8                 uint32       point count n
+    12                uint32       reserved (0)
+    16                int64[n]     time, UTC epoch milliseconds
+    16 + 8n           float32[n]   longitude, degrees
+    16 + 12n          float32[n]   latitude, degrees
+    16 + 16n          float32[n]   depth, meters
+    16 + 20n          int32[n]     tow id (0 = not towing)
+
+Every column starts at a multiple of its element size, so a JavaScript
+client can create e.g. new Float32Array(buffer, 16 + 8 * n, n) directly.
+
+Columns come straight from the track columns of modules.soundings.store
+(rows or segments), so no ORM objects or per-row dicts are created.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+MEDIA_TYPE = "application/vnd.deckbrain.track"
+MAGIC = b"DBTK"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("column_count", "<u2"),
+    ("point_count", "<u4"),
+    ("reserved", "<u4"),
+])
+
+# Column name -> wire dtype, in wire order
+COLUMNS = (
+    ("time", np.dtype("<i8")),
+    ("longitude", np.dtype("<f4")),
+    ("latitude", np.dtype("<f4")),
+    ("depth", np.dtype("<f4")),
+    ("tow_id", np.dtype("<i4")),
+)
+
+
+def wire_columns(track: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Convert track columns (see modules.soundings.store) to the wire columns.
+
+    Args:
+        track: Track columns
+
+    Returns:
+        Mapping of column name to array (wire dtypes, see COLUMNS)
+    """
+    columns = {
+        "time": track["time"] // 1000,
+        "longitude": track["longitude"],
+        "latitude": track["latitude"],
+        "depth": track["depth"],
+        "tow_id": track["tow_id"],
+    }
+    return {name: columns[name].astype(dtype) for name, dtype in COLUMNS}
+
+
+def encode_track(columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Serialise track columns into the binary track format.
+
+    Args:
+        columns: Output of wire_columns()
+
+    Returns:
+        Encoded body
+    """
+    n = len(columns["time"])
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["column_count"] = len(COLUMNS)
+    header["point_count"] = n
+    parts = [header.tobytes()]
+    parts.extend(np.ascontiguousarray(columns[name], dtype=dtype).tobytes() for name, dtype in COLUMNS)
+    return b"".join(parts)
+
+
+def decode_track(body: bytes) -> Dict[str, np.ndarray]:
+    """
+    Parse a binary track body back into columns (for scripts and debugging).
+
+    Raises:
+        ValueError: If the body is not a supported binary track
+    """
+    header = np.frombuffer(body, dtype=HEADER_DTYPE, count=1)[0]
+    if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+        raise ValueError("Not a DeckBrain binary track (version 1)")
+    n = int(header["point_count"])
+    columns = {}
+    offset = HEADER_DTYPE.itemsize
+    for name, dtype in COLUMNS:
+        columns[name] = np.frombuffer(body, dtype=dtype, count=n, offset=offset)
+        offset += dtype.itemsize * n
+    return columns
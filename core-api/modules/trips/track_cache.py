@@ -0,0 +1,281 @@
+"""
+DeckBrain Core API - Track response cache.
+
+Rendering a track means loading every (simplified) sounding of a trip and
+serialising it to GeoJSON, while historic trips never change. Rendered
+bodies are therefore cached, gzipped, in two tiers:
+
+- memory: a byte-bounded LRU inside the API process
+- disk: STORAGE_PATH/cache/tracks/<trip_id>/, shared with the ingestion
+  worker processes and surviving restarts
+
+Entries are keyed by trip, variant (trip or tow track, include_tows,
+detail level, include_points, GeoJSON or binary format) and the trip's version - its updated_at and
+sounding_count, which change whenever ingestion attaches soundings. A
+request therefore never sees a stale body even if it is served by a
+process that missed an invalidation; invalidate_trips() (called after
+ingestion commits) only reclaims the space early.
+
+The version also makes the ETag: clients revalidating with If-None-Match
+get a 304 without the body being loaded or rendered at all.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from fastapi import Request, Response, status
+
+from core.config import settings
+from core.models import Trip
+from modules.trips.aggregates import datetime_to_epoch
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@dataclass
+class CachedBody:
+    """A rendered response body (gzipped) with its ETag and media type."""
+    etag: str
+    gzip_body: bytes
+    media_type: str = JSON_MEDIA_TYPE
+
+
+def trip_version(trip: Trip) -> str:
+    """Version token of a trip's track data (changes whenever soundings are attached)."""
+    updated = datetime_to_epoch(trip.updated_at) if trip.updated_at is not None else 0.0
+    return f"{updated:.6f}-{trip.sounding_count or 0}"
+
+
+def track_etag(trip_id: int, variant: str, version: str) -> str:
+    """Strong ETag for one rendered variant of a trip's track."""
+    digest = hashlib.sha1(f"{trip_id}/{variant}/{version}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+class TrackCache:
+    """
+    Two-tier (memory LRU + disk) cache of gzipped track bodies.
+    """
+
+    def __init__(self, directory: Optional[Path], memory_bytes: int):
+        """
+        Args:
+            directory: Root of the disk tier (None to keep entries in memory only)
+            memory_bytes: Budget of the in-memory LRU, in gzipped bytes
+        """
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self._entries: "OrderedDict[tuple, CachedBody]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, trip_id: int, variant: str, etag: str) -> Path:
+        tag = etag.strip('"')
+        return self.directory / str(trip_id) / f"{variant}.{tag}.gz"
+
+    def _remember(self, key: tuple, entry: CachedBody) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        size = len(entry.gzip_body)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.gzip_body)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.memory_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.gzip_body)
+
+    def get(
+        self,
+        trip_id: int,
+        variant: str,
+        version: str,
+        media_type: str = JSON_MEDIA_TYPE,
+    ) -> Optional[CachedBody]:
+        """
+        Look up a rendered track.
+
+        Args:
+            trip_id: Trip the track belongs to
+            variant: Variant key (see track variants in router)
+            version: Current trip_version() of the trip
+            media_type: Media type of the variant (restored for disk hits)
+
+        Returns:
+            CachedBody, or None on a miss
+        """
+        key = (trip_id, variant, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.directory is not None:
+            etag = track_etag(trip_id, variant, version)
+            try:
+                body = self._path(trip_id, variant, etag).read_bytes()
+            except OSError:
+                body = None
+            if body is not None:
+                entry = CachedBody(etag=etag, gzip_body=body, media_type=media_type)
+                self._remember(key, entry)
+                self.disk_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        trip_id: int,
+        variant: str,
+        version: str,
+        payload: Union[Dict[str, Any], bytes],
+        media_type: str = JSON_MEDIA_TYPE,
+    ) -> CachedBody:
+        """
+        Render, compress and store a track.
+
+        Args:
+            trip_id: Trip the track belongs to
+            variant: Variant key
+            version: Current trip_version() of the trip
+            payload: GeoJSON document, or an already encoded body
+            media_type: Media type of the body
+
+        Returns:
+            The stored CachedBody
+        """
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, separators=(",", ":")).encode()
+        entry = CachedBody(
+            etag=track_etag(trip_id, variant, version),
+            gzip_body=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+            media_type=media_type,
+        )
+        self._remember((trip_id, variant, version), entry)
+
+        if self.directory is not None:
+            path = self._path(trip_id, variant, entry.etag)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename so readers never see a partial body
+                temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                temp.write_bytes(entry.gzip_body)
+                os.replace(temp, path)
+                # Older versions of this variant can never be requested again
+                for stale in path.parent.glob(f"{variant}.*.gz"):
+                    if stale != path:
+                        stale.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Could not write track cache entry {path}: {e}")
+        return entry
+
+    def invalidate_trips(self, trip_ids: Iterable[int]) -> None:
+        """
+        Drop every cached variant of the given trips (memory and disk).
+
+        Args:
+            trip_ids: Trips whose soundings changed
+        """
+        trip_ids = set(trip_ids)
+        if not trip_ids:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in trip_ids]:
+                self._size -= len(self._entries.pop(key).gzip_body)
+        if self.directory is not None:
+            for trip_id in trip_ids:
+                shutil.rmtree(self.directory / str(trip_id), ignore_errors=True)
+        logger.debug(f"Invalidated track cache for trips {sorted(trip_ids)}")
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the client already has this ETag, else None."""
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag))
+    return None
+
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    # Clients may keep the body but must revalidate (tracks of open trips still grow); the
+    # body depends on Accept (GeoJSON or binary track) as well as on Accept-Encoding
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+
+
+def cached_response(request: Request, entry: CachedBody) -> Response:
+    """
+    Serve a cached track: 304 on a matching If-None-Match, otherwise the
+    gzipped body as-is (or decompressed for clients without gzip).
+    """
+    response = not_modified(request, entry.etag)
+    if response is not None:
+        return response
+    headers = _cache_headers(entry.etag)
+    if _accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        body = entry.gzip_body
+    else:
+        body = gzip.decompress(entry.gzip_body)
+    return Response(content=body, media_type=entry.media_type, headers=headers)
+
+
+_track_cache: Optional[TrackCache] = None
+
+
+def get_track_cache() -> Optional[TrackCache]:
+    """Process-wide track cache (None when TRACK_CACHE_ENABLED is false)."""
+    global _track_cache
+    if not settings.track_cache_enabled:
+        return None
+    if _track_cache is None:
+        directory = Path(settings.storage_path) / "cache" / "tracks" if settings.track_cache_disk_enabled else None
+        _track_cache = TrackCache(directory, settings.track_cache_memory_mb * 1024 * 1024)
+    return _track_cache
+
+
+def invalidate_trips(trip_ids: Iterable[int]) -> None:
+    """Drop cached tracks of trips whose soundings changed (no-op when caching is off)."""
+    cache = get_track_cache()
+    if cache is not None:
+        cache.invalidate_trips(trip_ids)
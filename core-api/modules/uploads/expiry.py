@@ -0,0 +1,143 @@
+"""
+DeckBrain Core API - Upload session expiry.
+
+Each open upload session owns a sparse part file under storage/tmp, sized
+to the whole file. A connector that gives up on a session (it crashed, the
+file was deleted, or it aborted without calling DELETE /api/uploads/{id})
+would leave that file behind forever. Sessions that received nothing for
+UPLOAD_SESSION_EXPIRY_HOURS are therefore marked "aborted" and their part
+files deleted, as are sessions left "completing" by a request that died
+while finalizing; temp files in storage/tmp that no open session owns (e.g.
+a plain upload interrupted by a crash) are deleted after the same idle time.
+
+The API process runs the sweep every UPLOAD_SESSION_SWEEP_INTERVAL_MINUTES.
+Aborting is a compare-and-swap on the session's version, so a chunk that
+arrives while the sweep runs either lands first (and the session is no
+longer idle) or is rejected with 409.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, update
+
+from core.config import settings
+from core.db import async_engine
+from core.models import UploadSession
+from .sessions import remove_part_file
+from .storage import temp_dir, remove_quietly
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses of sessions that still own a part file
+ACTIVE_STATUSES = ("open", "completing")
+
+
+async def _abort_idle_sessions(cutoff: datetime) -> int:
+    """Mark active sessions last updated before cutoff as aborted and delete their part files."""
+    async with async_engine.connect() as conn:
+        idle = (await conn.execute(
+            select(UploadSession.id, UploadSession.upload_id, UploadSession.version, UploadSession.status)
+            .where(UploadSession.status.in_(ACTIVE_STATUSES), UploadSession.updated_at < cutoff)
+        )).all()
+
+    aborted = 0
+    for session_id, upload_id, version, current in idle:
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                update(UploadSession)
+                .where(
+                    UploadSession.id == session_id,
+                    UploadSession.version == version,
+                    UploadSession.status == current,
+                )
+                .values(status="aborted", version=version + 1)
+            )
+        if result.rowcount == 1:
+            remove_part_file(upload_id)
+            aborted += 1
+    return aborted
+
+
+async def _remove_orphaned_temp_files(cutoff: datetime) -> int:
+    """Delete temp files not modified since cutoff that no active session owns."""
+    async with async_engine.connect() as conn:
+        open_ids = set((await conn.execute(
+            select(UploadSession.upload_id).where(UploadSession.status.in_(ACTIVE_STATUSES))
+        )).scalars())
+
+    cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+    removed = 0
+    for path in temp_dir().glob("*.part"):
+        if path.name.startswith("session-") and path.name[len("session-"):-len(".part")] in open_ids:
+            continue
+        try:
+            if os.stat(path).st_mtime >= cutoff_ts:
+                continue
+        except OSError:
+            continue
+        remove_quietly(path)
+        removed += 1
+    return removed
+
+
+async def expire_upload_sessions(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Abort idle upload sessions and delete orphaned temp files.
+
+    Args:
+        now: Reference time (naive UTC; defaults to now)
+
+    Returns:
+        Counts: {"sessions": n, "temp_files": n}
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=settings.upload_session_expiry_hours)
+    expired = {
+        "sessions": await _abort_idle_sessions(cutoff),
+        "temp_files": await _remove_orphaned_temp_files(cutoff),
+    }
+    if any(expired.values()):
+        logger.info(f"Upload expiry: aborted {expired['sessions']} idle session(s), "
+                    f"deleted {expired['temp_files']} orphaned temp file(s)")
+    return expired
+
+
+async def _run(interval: float) -> None:
+    """Expiry loop: sweep now, then every interval seconds."""
+    while True:
+        try:
+            await expire_upload_sessions()
+        except Exception as e:
+            logger.error(f"Upload session expiry failed: {e}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+# Expiry loop of the API process (see app.main)
+_task: Optional[asyncio.Task] = None
+
+
+def start_upload_expiry() -> Optional[asyncio.Task]:
+    """Start the expiry loop on the running event loop (unless the interval or expiry time is 0)."""
+    global _task
+    if _task is None and settings.upload_session_sweep_interval_minutes > 0 and settings.upload_session_expiry_hours > 0:
+        _task = asyncio.get_running_loop().create_task(_run(settings.upload_session_sweep_interval_minutes * 60))
+        logger.info(f"Upload session expiry started: every {settings.upload_session_sweep_interval_minutes} min, "
+                    f"idle sessions aborted after {settings.upload_session_expiry_hours} h")
+    return _task
+
+
+async def stop_upload_expiry() -> None:
+    """Stop the expiry loop."""
+    global _task
+    if _task is not None:
+        task, _task = _task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
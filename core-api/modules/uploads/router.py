@@ -4,24 +4,26 @@ DeckBrain Core API - Upload endpoints.
 Handles raw file uploads from connectors with authentication.
 """
 
-import os
-import hashlib
 import logging
 from datetime import datetime
-from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import IntegrityError, OperationalError
 from pydantic import BaseModel
 
 from core.db import get_db
-from core.models import Device, FileRecord
+from core.models import Device, FileRecord, UploadSession
 from core.auth import get_authenticated_device
 from core.config import settings
 from modules.ingestion.service import ingest_file_safe
+from modules.ingestion.worker import notify_new_file
+from .storage import StoredFile, stream_upload_to_temp, commit_blob, remove_quietly
+from . import sessions
 
 
 logger = logging.getLogger(__name__)
@@ -36,42 +38,230 @@ class UploadResponse(BaseModel):
     size_bytes: int
     sha256: str
     processing_status: str
+    duplicate: bool = False  # True if the device had already uploaded this content
 
 
-def compute_sha256(file_path: Path) -> str:
+class FileCheckResponse(BaseModel):
+    """Response model for the pre-flight file check endpoint."""
+    sha256: str
+    exists: bool
+    file_record_id: Optional[int] = None
+    processing_status: Optional[str] = None
+
+
+class UploadSessionCreateRequest(BaseModel):
+    """Request model for opening a resumable upload session."""
+    filename: str
+    size_bytes: int
+    file_type: Optional[str] = "unknown"
+    source_format: Optional[str] = "unknown"
+    local_path: Optional[str] = None
+    sha256: Optional[str] = None  # Expected hash of the whole file, verified on finalize
+
+
+class UploadSessionResponse(BaseModel):
+    """Response model describing a resumable upload session."""
+    upload_id: str
+    status: str
+    size_bytes: int
+    bytes_received: int
+    received_ranges: List[List[int]]  # Half-open [start, end) byte ranges
+    missing_ranges: List[List[int]]
+    next_offset: Optional[int]  # First byte not yet received (None when complete)
+    file_record_id: Optional[int] = None
+
+
+def _session_response(session: UploadSession) -> UploadSessionResponse:
+    """Build the API response for an upload session."""
+    received = sessions.load_ranges(session.received_ranges)
+    if session.status == "completed":
+        # Completed sessions may have short-circuited on known content
+        missing = []
+    else:
+        missing = sessions.missing_ranges(received, session.size_bytes)
+    return UploadSessionResponse(
+        upload_id=session.upload_id,
+        status=session.status,
+        size_bytes=session.size_bytes,
+        bytes_received=session.bytes_received,
+        received_ranges=[[start, end] for start, end in received],
+        missing_ranges=[[start, end] for start, end in missing],
+        next_offset=missing[0][0] if missing else None,
+        file_record_id=session.file_record_id,
+    )
+
+
+def _get_device_session(db: Session, device: Device, upload_id: str) -> UploadSession:
+    """Load an upload session owned by the authenticated device or raise 404."""
+    session = (
+        db.query(UploadSession)
+        .filter(UploadSession.upload_id == upload_id, UploadSession.device_id == device.id)
+        .first()
+    )
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload session not found: {upload_id}"
+        )
+    return session
+
+
+def _record_chunk(db: Session, session: UploadSession, start: int, end: int) -> None:
+    """
+    Mark bytes [start, end) of an upload session as received.
+
+    Concurrent chunk requests of a session each merge their range into the
+    latest received_ranges: the write is a compare-and-swap on the session's
+    version, retried against the fresh row when another request won.
+
+    Raises:
+        HTTPException 409: If the session stopped being open meanwhile
+    """
+    while True:
+        db.refresh(session)
+        if session.status != "open":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload session {session.upload_id} is {session.status}"
+            )
+        ranges = sessions.merge_range(sessions.load_ranges(session.received_ranges), start, end)
+        result = db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session.id,
+                UploadSession.version == session.version,
+                UploadSession.status == "open",
+            )
+            .values(
+                received_ranges=sessions.dump_ranges(ranges),
+                bytes_received=sessions.covered_bytes(ranges),
+                version=UploadSession.version + 1,
+            )
+        )
+        db.commit()
+        if result.rowcount == 1:
+            db.refresh(session)
+            return
+
+
+def find_device_file(db: Session, device: Device, sha256: str) -> Optional[FileRecord]:
     """
-    Compute SHA256 hash of a file.
+    Find a file the device has already uploaded, by content hash.
     
     Args:
-        file_path: Path to file
+        db: Database session
+        device: Authenticated device
+        sha256: Hexadecimal SHA256 hash of the file content
         
     Returns:
-        Hexadecimal SHA256 hash
+        The earliest FileRecord with this content for the device, or None
     """
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        # Read file in chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    return (
+        db.query(FileRecord)
+        .filter(FileRecord.device_id == device.id, FileRecord.sha256 == sha256.lower())
+        .order_by(FileRecord.id)
+        .first()
+    )
+
 
+def duplicate_upload_response(file_record: FileRecord) -> "UploadResponse":
+    """Build the upload response for content the device already uploaded."""
+    logger.info(f"Duplicate upload short-circuited to file_record_id={file_record.id}, sha256={file_record.sha256[:8]}...")
+    return UploadResponse(
+        status="ok",
+        file_record_id=file_record.id,
+        remote_path=file_record.remote_path,
+        size_bytes=file_record.size_bytes,
+        sha256=file_record.sha256,
+        processing_status=file_record.processing_status,
+        duplicate=True
+    )
 
-def ensure_storage_dir_exists(device_id: str) -> Path:
+
+def register_stored_file(
+    db: Session,
+    device: Device,
+    stored: StoredFile,
+    filename: str,
+    file_type: Optional[str],
+    source_format: Optional[str],
+    local_path: Optional[str],
+) -> Tuple[FileRecord, str]:
     """
-    Ensure storage directory exists for a device.
+    Create the FileRecord for a file already committed to storage.
+    
+    Shared by the single-request upload and the resumable upload finalize
+    step. The record is left in "stored" status for the background
+    ingestion workers; only when workers are disabled does development mode
+    ingest inline.
     
-    Creates directory structure: storage/devices/<device_id>/raw/<yyyy>/<mm>/<dd>/
+    (device_id, sha256) is unique: if a concurrent upload of the same content
+    registered it first, that record is returned and nothing is queued.
     
     Args:
-        device_id: Device identifier
+        db: Database session
+        device: Authenticated device that uploaded the file
+        stored: StoredFile describing the file in the storage tree
+        filename: Original filename as uploaded
+        file_type: Logical file type from the connector
+        source_format: Source format hint from the connector
+        local_path: Path on the connector's disk
         
     Returns:
-        Path to storage directory for today
+        Tuple of (file_record, processing_status after any auto-ingestion)
     """
-    now = datetime.utcnow()
-    storage_path = Path(settings.storage_path) / "devices" / device_id / "raw" / f"{now.year:04d}" / f"{now.month:02d}" / f"{now.day:02d}"
-    storage_path.mkdir(parents=True, exist_ok=True)
-    return storage_path
+    file_record = FileRecord(
+        device_id=device.id,
+        file_type=file_type or "unknown",
+        source_format=source_format or "unknown",
+        filename=filename,
+        local_path=local_path,  # Path on connector's disk
+        remote_path=stored.relative_path,  # Path in Core API storage
+        size_bytes=stored.size_bytes,
+        sha256=stored.sha256,
+        processing_status="stored",  # File is now stored, awaiting processing
+        received_at=datetime.utcnow()
+    )
+    
+    db.add(file_record)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = find_device_file(db, device, stored.sha256)
+        if existing is None:
+            raise
+        logger.info(f"Concurrent upload of sha256={stored.sha256[:8]}... already registered as file_record_id={existing.id}")
+        return existing, existing.processing_status
+    db.refresh(file_record)
+    
+    logger.info(f"File record created: id={file_record.id}, device={device.device_id}, size={stored.size_bytes}, sha256={stored.sha256[:8]}...")
+    
+    # Hand off to background ingestion, or ingest inline in development mode without workers
+    final_processing_status = file_record.processing_status
+    if settings.ingestion_worker_enabled:
+        logger.info(f"File record {file_record.id} queued for background ingestion")
+        notify_new_file()
+    elif settings.app_env == "development":
+        logger.info(f"[AUTO-INGEST] Triggering ingestion for file_record_id={file_record.id} (dev mode)")
+        ingestion_result = ingest_file_safe(file_record.id, db)
+        
+        if ingestion_result["status"] == "success":
+            logger.info(f"[AUTO-INGEST] Ingestion completed successfully for file_record_id={file_record.id}")
+            logger.info(f"[AUTO-INGEST] Status: {ingestion_result.get('message', 'No message')}")
+        elif ingestion_result["status"] == "failed":
+            logger.warning(f"[AUTO-INGEST] Ingestion failed (parser) for file_record_id={file_record.id}: {ingestion_result.get('message')}")
+        else:
+            # Error cases (FileNotFoundError, NoParserError, etc.)
+            logger.error(f"[AUTO-INGEST] Ingestion error for file_record_id={file_record.id}: {ingestion_result.get('error_type')} - {ingestion_result.get('message')}")
+        
+        # Refresh file_record to get updated processing_status
+        db.refresh(file_record)
+        final_processing_status = file_record.processing_status
+    else:
+        logger.debug(f"Auto-ingestion skipped (app_env={settings.app_env}, not 'development')")
+    
+    return file_record, final_processing_status
 
 
 @router.post("/upload_file", response_model=UploadResponse)
@@ -126,22 +316,9 @@ async def upload_file(
         
         logger.info(f"Receiving file upload from device {device.device_id}: {file.filename}")
         
-        # Ensure storage directory exists
-        storage_dir = ensure_storage_dir_exists(device.device_id)
-        
-        # Generate unique filename: <uuid>__<original_filename>
-        file_uuid = str(uuid4())
-        safe_filename = file.filename.replace("/", "_").replace("\\", "_")  # Sanitize
-        unique_filename = f"{file_uuid}__{safe_filename}"
-        file_path = storage_dir / unique_filename
-        
-        # Save file to disk
+        # Stream file to a temp file (hashing in the same pass)
         try:
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            logger.info(f"Saved file to {file_path}")
+            temp_path, size_bytes, sha256_hash = await stream_upload_to_temp(file)
         except Exception as e:
             logger.error(f"Failed to save file {file.filename}: {e}")
             raise HTTPException(
@@ -149,62 +326,45 @@ async def upload_file(
                 detail=f"Failed to save file: {str(e)}"
             )
         
-        # Compute file metadata
-        size_bytes = os.path.getsize(file_path)
-        sha256_hash = compute_sha256(file_path)
+        # Database work runs in the threadpool: waiting for a database lock
+        # must not stall the event loop
         
-        # Create relative path for storage (relative to storage root)
-        relative_path = str(file_path.relative_to(Path(settings.storage_path)))
-        
-        # Create file record in database
-        file_record = FileRecord(
-            device_id=device.id,
-            file_type=file_type or "unknown",
-            source_format=source_format or "unknown",
-            local_path=local_path,  # Path on connector's disk
-            remote_path=relative_path,  # Path in Core API storage
-            size_bytes=size_bytes,
-            sha256=sha256_hash,
-            processing_status="stored",  # File is now stored, awaiting processing
-            received_at=datetime.utcnow()
-        )
+        # Duplicate content from this device: reuse the existing record, never re-ingest
+        existing = await run_in_threadpool(find_device_file, db, device, sha256_hash)
+        if existing:
+            remove_quietly(temp_path)
+            return duplicate_upload_response(existing)
         
-        db.add(file_record)
-        db.commit()
-        db.refresh(file_record)
+        # Atomically move the temp file to its content-addressed blob
+        try:
+            stored = commit_blob(temp_path, size_bytes, sha256_hash)
+        except Exception as e:
+            remove_quietly(temp_path)
+            logger.error(f"Failed to move file {file.filename} into storage: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to save file: {str(e)}"
+            )
         
-        logger.info(f"File record created: id={file_record.id}, device={device.device_id}, size={size_bytes}, sha256={sha256_hash[:8]}...")
+        logger.info(f"Saved file to {stored.path}")
         
-        # Auto-trigger ingestion in development mode
-        final_processing_status = file_record.processing_status
-        if settings.app_env == "development":
-            logger.info(f"[AUTO-INGEST] Triggering ingestion for file_record_id={file_record.id} (dev mode)")
-            ingestion_result = ingest_file_safe(file_record.id, db)
-            
-            if ingestion_result["status"] == "success":
-                logger.info(f"[AUTO-INGEST] Ingestion completed successfully for file_record_id={file_record.id}")
-                logger.info(f"[AUTO-INGEST] Status: {ingestion_result.get('message', 'No message')}")
-                # Refresh file_record to get updated processing_status
-                db.refresh(file_record)
-                final_processing_status = file_record.processing_status
-            elif ingestion_result["status"] == "failed":
-                logger.warning(f"[AUTO-INGEST] Ingestion failed (parser) for file_record_id={file_record.id}: {ingestion_result.get('message')}")
-                db.refresh(file_record)
-                final_processing_status = file_record.processing_status
-            else:
-                # Error cases (FileNotFoundError, NoParserError, etc.)
-                logger.error(f"[AUTO-INGEST] Ingestion error for file_record_id={file_record.id}: {ingestion_result.get('error_type')} - {ingestion_result.get('message')}")
-                db.refresh(file_record)
-                final_processing_status = file_record.processing_status
-        else:
-            logger.debug(f"Auto-ingestion skipped (app_env={settings.app_env}, not 'development')")
+        file_record, final_processing_status = await run_in_threadpool(
+            register_stored_file,
+            db=db,
+            device=device,
+            stored=stored,
+            filename=file.filename,
+            file_type=file_type,
+            source_format=source_format,
+            local_path=local_path,
+        )
         
         return UploadResponse(
             status="ok",
             file_record_id=file_record.id,
-            remote_path=relative_path,
-            size_bytes=size_bytes,
-            sha256=sha256_hash,
+            remote_path=stored.relative_path,
+            size_bytes=stored.size_bytes,
+            sha256=stored.sha256,
             processing_status=final_processing_status
         )
         
@@ -233,3 +393,395 @@ async def upload_file(
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+
+
+# One route per method: a two-method route shares one OpenAPI operation id between them
+@router.get("/files/{sha256}", response_model=FileCheckResponse)
+@router.head("/files/{sha256}", response_model=FileCheckResponse)
+def check_file(
+    sha256: str,
+    request: Request,
+    response: Response,
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Pre-flight check: has this device already uploaded this content?
+    
+    Connectors hash a file locally and call this (HEAD is enough) before
+    uploading, skipping files the server already has.
+    
+    Path Parameters:
+    - sha256: Hexadecimal SHA256 hash of the file content
+    
+    Returns:
+        200 with FileCheckResponse if the content is known for this device
+        (also exposed as the X-File-Record-ID header), 404 otherwise
+    """
+    existing = find_device_file(db, device, sha256)
+    if not existing:
+        if request.method == "HEAD":
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No file with sha256={sha256} for this device"
+        )
+    
+    response.headers["X-File-Record-ID"] = str(existing.id)
+    return FileCheckResponse(
+        sha256=existing.sha256,
+        exists=True,
+        file_record_id=existing.id,
+        processing_status=existing.processing_status
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+def create_upload_session(
+    request: UploadSessionCreateRequest,
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Open a resumable upload session.
+    
+    Connectors on unreliable links use this instead of POST /api/upload_file
+    for large files. The file is then sent as Content-Range chunks with
+    PUT /api/uploads/{upload_id} and finalized with
+    POST /api/uploads/{upload_id}/complete.
+    
+    Body (JSON):
+    - filename: Required. Original filename.
+    - size_bytes: Required. Total file size in bytes.
+    - file_type, source_format, local_path: Same meaning as for /api/upload_file.
+    - sha256: Optional. Expected hash of the whole file; verified on finalize.
+    
+    Returns:
+        UploadSessionResponse with the new upload_id
+    """
+    if not request.filename:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File has no filename"
+        )
+    if request.size_bytes <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="size_bytes must be positive"
+        )
+    
+    upload_id = str(uuid4())
+    expected_sha256 = request.sha256.lower() if request.sha256 else None
+    
+    # Content the device already uploaded: complete immediately, no bytes needed
+    existing = find_device_file(db, device, expected_sha256) if expected_sha256 else None
+    if existing:
+        session = UploadSession(
+            upload_id=upload_id,
+            device_id=device.id,
+            filename=request.filename,
+            file_type=request.file_type or "unknown",
+            source_format=request.source_format or "unknown",
+            local_path=request.local_path,
+            size_bytes=request.size_bytes,
+            expected_sha256=expected_sha256,
+            received_ranges="[]",
+            bytes_received=0,
+            status="completed",
+            file_record_id=existing.id,
+        )
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+        logger.info(f"Upload session {upload_id} short-circuited: content already stored as file_record_id={existing.id}")
+        return _session_response(session)
+    
+    sessions.create_part_file(upload_id, request.size_bytes)
+    
+    session = UploadSession(
+        upload_id=upload_id,
+        device_id=device.id,
+        filename=request.filename,
+        file_type=request.file_type or "unknown",
+        source_format=request.source_format or "unknown",
+        local_path=request.local_path,
+        size_bytes=request.size_bytes,
+        expected_sha256=expected_sha256,
+        received_ranges="[]",
+        bytes_received=0,
+        status="open",
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    
+    logger.info(f"Upload session opened: upload_id={upload_id}, device={device.device_id}, file={request.filename}, size={request.size_bytes}")
+    
+    return _session_response(session)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+def get_upload_session(
+    upload_id: str,
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Report the progress of a resumable upload session.
+    
+    Connectors call this after a dropped connection to learn which byte
+    ranges the server already has and resume from `next_offset`.
+    """
+    session = _get_device_session(db, device, upload_id)
+    return _session_response(session)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_session_chunk(
+    upload_id: str,
+    request: Request,
+    content_range: Optional[str] = Header(None, alias="Content-Range"),
+    x_chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-SHA256"),
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload one chunk of a resumable upload session.
+    
+    The raw request body holds the chunk bytes.
+    
+    Headers:
+    - Content-Range: Required. `bytes <first>-<last>/<total>`, total must match the session size.
+    - X-Chunk-SHA256: Optional. Hash of the chunk; the chunk is rejected if it does not match.
+    
+    Chunks may arrive in any order and may be retransmitted; a chunk is only
+    written to the part file once its length (and hash, if one was sent) is
+    verified, and its range is recorded as received once its bytes are on disk.
+    
+    Raises:
+        HTTPException 400: Missing/invalid Content-Range or short body
+        HTTPException 404: Unknown session
+        HTTPException 409: Session already completed or aborted
+        HTTPException 422: Chunk hash mismatch
+    """
+    # Database work runs in the threadpool: waiting for a database lock must
+    # not stall the event loop
+    session = await run_in_threadpool(_get_device_session, db, device, upload_id)
+    if session.status != "open":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session {upload_id} is {session.status}"
+        )
+    
+    try:
+        start, end, total = sessions.parse_content_range(content_range)
+        if total != session.size_bytes:
+            raise sessions.ContentRangeError(
+                f"Content-Range total {total} does not match session size {session.size_bytes}"
+            )
+        await sessions.write_chunk(upload_id, start, end - start, request.stream(), x_chunk_sha256)
+    except FileNotFoundError:
+        # The part file is deleted when the session is aborted or expires
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session {upload_id} is no longer open"
+        )
+    except sessions.ContentRangeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except sessions.ChunkHashError as e:
+        logger.warning(f"Chunk hash mismatch for upload {upload_id} range {start}-{end}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    
+    await run_in_threadpool(_record_chunk, db, session, start, end)
+    
+    logger.debug(f"Upload {upload_id}: received bytes {start}-{end}, {session.bytes_received}/{session.size_bytes} total")
+    
+    return _session_response(session)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=UploadResponse)
+def complete_upload_session(
+    upload_id: str,
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Finalize a resumable upload session.
+    
+    Verifies every byte has been received and the whole-file hash matches the
+    declared sha256 (if any), moves the file into the storage tree and creates
+    the FileRecord. Calling it again on a completed session returns the same
+    record.
+    
+    The request first moves the session from "open" to "completing" with a
+    compare-and-swap on its version (like _record_chunk and the abort), so
+    of concurrent calls (e.g. a connector retrying after a timeout) only one
+    assembles and registers the file; the others get the same record once it
+    is done, or 409 while it is still being completed.
+    
+    Raises:
+        HTTPException 404: Unknown session
+        HTTPException 409: Bytes still missing, session aborted or being completed
+        HTTPException 422: Whole-file hash mismatch
+    """
+    session = _get_device_session(db, device, upload_id)
+    
+    taken = False
+    while session.status == "open" and not taken:
+        missing = sessions.missing_ranges(sessions.load_ranges(session.received_ranges), session.size_bytes)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload incomplete: {session.size_bytes - session.bytes_received} bytes missing, first gap at {missing[0][0]}"
+            )
+        # Retried against the fresh row if a (retransmitted) chunk landed meanwhile
+        taken = _swap_session_status(db, session, "open", "completing")
+    
+    if not taken:
+        if session.status == "completed" and session.file_record:
+            record = session.file_record
+            return UploadResponse(
+                status="ok",
+                file_record_id=record.id,
+                remote_path=record.remote_path,
+                size_bytes=record.size_bytes,
+                sha256=record.sha256,
+                processing_status=record.processing_status
+            )
+        detail = "is being completed" if session.status == "completing" else f"is {session.status}"
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session {upload_id} {detail}"
+        )
+    
+    try:
+        return _finish_upload_session(db, device, session)
+    except BaseException:
+        # Hand the session back, so the connector can retry (or resend chunks)
+        db.rollback()
+        db.refresh(session)
+        _swap_session_status(db, session, "completing", "open")
+        raise
+
+
+def _swap_session_status(db: Session, session: UploadSession, current: str, new: str, **values) -> bool:
+    """
+    Move a session from one status to another with a compare-and-swap on its version.
+    
+    Returns:
+        True if this call made the change (the session is refreshed either way)
+    """
+    result = db.execute(
+        update(UploadSession)
+        .where(
+            UploadSession.id == session.id,
+            UploadSession.version == session.version,
+            UploadSession.status == current,
+        )
+        .values(status=new, version=UploadSession.version + 1, **values)
+    )
+    db.commit()
+    db.refresh(session)
+    return result.rowcount == 1
+
+
+def _finish_upload_session(db: Session, device: Device, session: UploadSession) -> UploadResponse:
+    """Assemble a session taken for completion and register its file (see complete_upload_session)."""
+    upload_id = session.upload_id
+    try:
+        sha256_hash = sessions.hash_part_file(upload_id)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session {upload_id} is no longer open"
+        )
+    if session.expected_sha256 and session.expected_sha256 != sha256_hash:
+        logger.warning(f"Upload {upload_id} hash mismatch: expected {session.expected_sha256[:8]}..., got {sha256_hash[:8]}...")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="File SHA256 does not match the hash declared when the session was opened"
+        )
+    
+    # Another session (or a plain upload) may have stored this content meanwhile
+    existing = find_device_file(db, device, sha256_hash)
+    if existing:
+        sessions.remove_part_file(upload_id)
+        _swap_session_status(db, session, "completing", "completed", file_record_id=existing.id)
+        return duplicate_upload_response(existing)
+    
+    stored = commit_blob(sessions.part_path(upload_id), session.size_bytes, sha256_hash)
+    logger.info(f"Upload session {upload_id} assembled at {stored.path}")
+    
+    file_record, final_processing_status = register_stored_file(
+        db=db,
+        device=device,
+        stored=stored,
+        filename=session.filename,
+        file_type=session.file_type,
+        source_format=session.source_format,
+        local_path=session.local_path,
+    )
+    
+    _swap_session_status(db, session, "completing", "completed", file_record_id=file_record.id)
+    
+    return UploadResponse(
+        status="ok",
+        file_record_id=file_record.id,
+        remote_path=stored.relative_path,
+        size_bytes=stored.size_bytes,
+        sha256=stored.sha256,
+        processing_status=final_processing_status
+    )
+
+
+@router.delete("/uploads/{upload_id}", response_model=UploadSessionResponse)
+def abort_upload_session(
+    upload_id: str,
+    device: Device = Depends(get_authenticated_device),
+    db: Session = Depends(get_db)
+):
+    """
+    Abort a resumable upload session.
+    
+    Connectors call this when they give up on a file (e.g. it was deleted
+    locally). The session is marked "aborted" and its part file deleted;
+    later chunks and finalize calls get 409. Aborting an aborted session is
+    a no-op. Sessions left idle are aborted automatically after
+    UPLOAD_SESSION_EXPIRY_HOURS (see modules.uploads.expiry).
+    
+    Raises:
+        HTTPException 404: Unknown session
+        HTTPException 409: Session already completed
+    """
+    session = _get_device_session(db, device, upload_id)
+    
+    while session.status == "open":
+        # Compare-and-swap on the version, like _record_chunk; retried if a chunk landed meanwhile
+        result = db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session.id,
+                UploadSession.version == session.version,
+                UploadSession.status == "open",
+            )
+            .values(status="aborted", version=UploadSession.version + 1)
+        )
+        db.commit()
+        db.refresh(session)
+        if result.rowcount == 1:
+            sessions.remove_part_file(upload_id)
+            logger.info(f"Upload session {upload_id} aborted by device {device.device_id}")
+    
+    if session.status in ("completed", "completing"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session {upload_id} is {session.status}"
+        )
+    
+    return _session_response(session)
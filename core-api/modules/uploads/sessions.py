@@ -0,0 +1,215 @@
+"""
+DeckBrain Core API - Resumable upload helpers.
+
+Byte-range bookkeeping and part-file I/O for resumable upload sessions.
+Received ranges are stored as a sorted list of half-open [start, end)
+intervals, merged as chunks arrive.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import IO, AsyncIterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+from .storage import temp_dir, remove_quietly
+
+
+Range = Tuple[int, int]
+
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class ContentRangeError(ValueError):
+    """Raised when a Content-Range header is missing or malformed."""
+    pass
+
+
+class ChunkHashError(ValueError):
+    """Raised when a chunk does not match its X-Chunk-SHA256."""
+    pass
+
+
+def parse_content_range(header: Optional[str]) -> Tuple[int, int, int]:
+    """
+    Parse a `Content-Range: bytes <first>-<last>/<total>` header.
+
+    Args:
+        header: Raw header value
+
+    Returns:
+        Tuple of (start, end, total) where [start, end) is half-open
+
+    Raises:
+        ContentRangeError: If the header is missing or malformed
+    """
+    if not header:
+        raise ContentRangeError("Missing required header: Content-Range")
+
+    match = _CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        raise ContentRangeError(f"Invalid Content-Range header: {header!r}")
+
+    first, last, total = (int(g) for g in match.groups())
+    if first > last or last >= total:
+        raise ContentRangeError(f"Invalid Content-Range bounds: {header!r}")
+
+    return first, last + 1, total
+
+
+def load_ranges(raw: Optional[str]) -> List[Range]:
+    """Decode the JSON range list stored on an UploadSession."""
+    return [(int(start), int(end)) for start, end in json.loads(raw or "[]")]
+
+
+def dump_ranges(ranges: List[Range]) -> str:
+    """Encode a range list for storage on an UploadSession."""
+    return json.dumps([[start, end] for start, end in ranges])
+
+
+def merge_range(ranges: List[Range], start: int, end: int) -> List[Range]:
+    """
+    Merge [start, end) into a sorted list of disjoint ranges.
+
+    Overlapping and adjacent ranges are coalesced, so retransmitted chunks
+    are harmless.
+    """
+    merged: List[Range] = []
+    for r_start, r_end in sorted(ranges + [(start, end)]):
+        if merged and r_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], r_end))
+        else:
+            merged.append((r_start, r_end))
+    return merged
+
+
+def covered_bytes(ranges: List[Range]) -> int:
+    """Total number of bytes covered by a disjoint range list."""
+    return sum(end - start for start, end in ranges)
+
+
+def missing_ranges(ranges: List[Range], total: int) -> List[Range]:
+    """Return the gaps in [0, total) not covered by the given ranges."""
+    gaps: List[Range] = []
+    cursor = 0
+    for start, end in ranges:
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < total:
+        gaps.append((cursor, total))
+    return gaps
+
+
+def part_path(upload_id: str) -> Path:
+    """Path of the part file holding the bytes received so far."""
+    return temp_dir() / f"session-{upload_id}.part"
+
+
+def create_part_file(upload_id: str, size_bytes: int) -> Path:
+    """
+    Create the (sparse) part file for a new session.
+
+    The file is truncated to its final size up front so chunks can be
+    written at their offsets in any order.
+    """
+    path = part_path(upload_id)
+    with open(path, "wb") as f:
+        f.truncate(size_bytes)
+    return path
+
+
+def remove_part_file(upload_id: str) -> None:
+    """Delete a session's part file (e.g. when its content turned out to be a duplicate)."""
+    remove_quietly(part_path(upload_id))
+
+
+def _spool(spool: IO[bytes], chunk_hash, pieces: List[bytes]) -> None:
+    """Hash and spool received pieces of a chunk (runs in the threadpool)."""
+    for piece in pieces:
+        chunk_hash.update(piece)
+        spool.write(piece)
+
+
+def _copy_into_part_file(spool: IO[bytes], upload_id: str, offset: int) -> None:
+    """Copy a verified chunk into the part file and fsync it (runs in the threadpool)."""
+    spool.seek(0)
+    with open(part_path(upload_id), "r+b") as f:
+        f.seek(offset)
+        shutil.copyfileobj(spool, f, settings.upload_chunk_size)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+async def write_chunk(
+    upload_id: str,
+    offset: int,
+    length: int,
+    stream: AsyncIterator[bytes],
+    expected_sha256: Optional[str] = None,
+) -> str:
+    """
+    Write a streamed request body into the part file at the given offset.
+
+    The body is spooled (in memory up to settings.upload_chunk_size, on disk
+    beyond) and only copied into the part file once its length and hash are
+    verified, so a corrupt retransmission never overwrites bytes that were
+    already received. Received pieces are hashed and spooled in the
+    threadpool, settings.upload_chunk_size bytes at a time, and the copy and
+    fsync run there too, so disk I/O never stalls the event loop.
+
+    Args:
+        upload_id: Session identifier
+        offset: Byte offset of the first byte of the chunk
+        length: Chunk length announced by Content-Range
+        stream: Async iterator over the request body
+        expected_sha256: Optional hash the chunk must match (X-Chunk-SHA256)
+
+    Returns:
+        SHA256 of the chunk
+
+    Raises:
+        ContentRangeError: If the body length differs from the announced range
+        ChunkHashError: If the chunk does not match expected_sha256
+    """
+    chunk_hash = hashlib.sha256()
+    received = 0
+    pending: List[bytes] = []
+    pending_bytes = 0
+    with tempfile.SpooledTemporaryFile(max_size=settings.upload_chunk_size, dir=temp_dir()) as spool:
+        async for piece in stream:
+            if not piece:
+                continue
+            if received + len(piece) > length:
+                raise ContentRangeError("Chunk body is longer than its Content-Range")
+            pending.append(piece)
+            pending_bytes += len(piece)
+            received += len(piece)
+            if pending_bytes >= settings.upload_chunk_size:
+                await run_in_threadpool(_spool, spool, chunk_hash, pending)
+                pending, pending_bytes = [], 0
+
+        if received != length:
+            raise ContentRangeError(f"Chunk body has {received} bytes, Content-Range announced {length}")
+        await run_in_threadpool(_spool, spool, chunk_hash, pending)
+        chunk_sha256 = chunk_hash.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != chunk_sha256:
+            raise ChunkHashError("Chunk SHA256 does not match X-Chunk-SHA256")
+
+        await run_in_threadpool(_copy_into_part_file, spool, upload_id, offset)
+    return chunk_sha256
+
+
+def hash_part_file(upload_id: str) -> str:
+    """Compute the SHA256 of a completed part file."""
+    sha256_hash = hashlib.sha256()
+    with open(part_path(upload_id), "rb") as f:
+        for block in iter(lambda: f.read(settings.upload_chunk_size), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
@@ -0,0 +1,156 @@
+"""
+DeckBrain Core API - Upload storage helpers.
+
+Streams uploaded files to disk in fixed-size chunks, hashing them in the
+same pass, and moves completed files into content-addressed storage
+atomically. Each unique file content is stored once, as
+storage/blobs/<aa>/<bb>/<sha256>, however many times it is uploaded.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Tuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredFile:
+    """
+    A file that has been written to the storage tree.
+
+    Attributes:
+        path: Absolute path of the stored file
+        relative_path: Path relative to the storage root (stored as remote_path)
+        size_bytes: File size in bytes
+        sha256: Hexadecimal SHA256 hash of the file content
+    """
+    path: Path
+    relative_path: str
+    size_bytes: int
+    sha256: str
+
+
+def storage_root() -> Path:
+    """Return the configured storage root directory."""
+    return Path(settings.storage_path)
+
+
+def temp_dir() -> Path:
+    """
+    Return the directory used for in-flight uploads.
+
+    Lives under the storage root so the final rename stays on the same
+    filesystem and is atomic.
+    """
+    path = storage_root() / "tmp"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def blob_path(sha256: str) -> Path:
+    """
+    Content-addressed location of a file in the storage tree.
+
+    Layout: storage/blobs/<sha256[0:2]>/<sha256[2:4]>/<sha256>
+
+    Args:
+        sha256: Hexadecimal SHA256 hash of the file content
+
+    Returns:
+        Absolute path of the blob
+    """
+    return storage_root() / "blobs" / sha256[0:2] / sha256[2:4] / sha256
+
+
+def remove_quietly(path: Path) -> None:
+    """Delete a file, ignoring errors (used to clean up partial uploads)."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def commit_blob(temp_path: Path, size_bytes: int, sha256: str) -> StoredFile:
+    """
+    Atomically move a fully written temp file to its content-addressed blob.
+
+    If a blob with the same hash already exists, the temp file is discarded
+    and the existing blob is reused.
+
+    Args:
+        temp_path: Path of the completed temp file
+        size_bytes: Size of the file in bytes
+        sha256: Hexadecimal SHA256 hash of the file
+
+    Returns:
+        StoredFile describing the blob
+    """
+    destination = blob_path(sha256)
+    if destination.exists():
+        logger.info(f"Blob {sha256[:8]}... already stored, discarding duplicate content")
+        remove_quietly(temp_path)
+    else:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, destination)
+    return StoredFile(
+        path=destination,
+        relative_path=str(destination.relative_to(storage_root())),
+        size_bytes=size_bytes,
+        sha256=sha256,
+    )
+
+
+def _copy_to_temp(source: IO[bytes]) -> Tuple[Path, int, str]:
+    """Copy, hash and fsync an upload into a new temp file (runs in the threadpool)."""
+    chunk_size = settings.upload_chunk_size
+    sha256_hash = hashlib.sha256()
+    size_bytes = 0
+
+    fd, temp_name = tempfile.mkstemp(dir=temp_dir(), prefix="upload-", suffix=".part")
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                sha256_hash.update(chunk)
+                out.write(chunk)
+                size_bytes += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        remove_quietly(temp_path)
+        raise
+
+    return temp_path, size_bytes, sha256_hash.hexdigest()
+
+
+async def stream_upload_to_temp(upload: UploadFile) -> Tuple[Path, int, str]:
+    """
+    Stream an upload into a temp file, hashing it in the same pass.
+
+    The upload is read in chunks of settings.upload_chunk_size bytes, so
+    peak memory stays constant regardless of file size. The temp file is
+    fsynced before returning so a later rename cannot expose a torn file.
+    Reading, hashing, writing and the fsync all run in the threadpool (on
+    the UploadFile's underlying file), so they never stall the event loop.
+
+    Args:
+        upload: Incoming FastAPI UploadFile
+
+    Returns:
+        Tuple of (temp_path, size_bytes, sha256)
+    """
+    return await run_in_threadpool(_copy_to_temp, upload.file)
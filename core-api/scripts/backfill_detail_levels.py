@@ -0,0 +1,114 @@
+"""
+Backfill soundings.detail_level for soundings ingested before track simplification.
+
+Soundings with a NULL detail_level are returned at every zoom by the track
+endpoints. This script computes their levels trip by trip (each tow and each
+gap between tows is simplified as its own polyline, as during ingestion).
+
+Usage:
+    python scripts/backfill_detail_levels.py                      # all trips
+    python scripts/backfill_detail_levels.py --device-id vessel-1 # one device
+    python scripts/backfill_detail_levels.py --trip-id 42         # one trip
+    python scripts/backfill_detail_levels.py --all                # recompute existing levels too
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import update
+
+from core.config import settings
+from core.db import SessionLocal
+from core.models import Device, Sounding, Trip
+from modules.soundings.store import write_segments
+from modules.trips.simplify import detail_levels
+from modules.trips.track_cache import invalidate_trips
+
+# Rows per bulk UPDATE statement
+UPDATE_CHUNK_SIZE = 10000
+
+
+def backfill_trip(db, trip_id: int) -> int:
+    """
+    Recompute detail levels for every sounding of one trip.
+
+    Returns:
+        Number of soundings updated
+    """
+    rows = (
+        db.query(Sounding.id, Sounding.latitude, Sounding.longitude, Sounding.tow_id)
+        .filter(Sounding.trip_id == trip_id)
+        .order_by(Sounding.timestamp, Sounding.id)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    lat = np.array([row.latitude for row in rows], dtype=np.float64)
+    lon = np.array([row.longitude for row in rows], dtype=np.float64)
+    tows = np.array([row.tow_id or 0 for row in rows], dtype=np.int64)
+    piece_starts = np.flatnonzero(np.diff(tows) != 0) + 1
+    levels = detail_levels(lat, lon, piece_starts)
+
+    for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+        db.execute(
+            update(Sounding),
+            [
+                {"id": sounding_id, "detail_level": level}
+                for sounding_id, level in zip(
+                    ids[start:start + UPDATE_CHUNK_SIZE].tolist(),
+                    levels[start:start + UPDATE_CHUNK_SIZE].tolist(),
+                )
+            ],
+        )
+    return len(ids)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compute detail levels for soundings that lack them")
+    parser.add_argument("--device-id", help="Only backfill trips of this device (devices.device_id)")
+    parser.add_argument("--trip-id", type=int, help="Only backfill this trip")
+    parser.add_argument("--all", action="store_true", help="Recompute trips whose soundings already have levels")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Trip.id).order_by(Trip.id)
+        if args.device_id:
+            device = db.query(Device).filter(Device.device_id == args.device_id).first()
+            if not device:
+                print(f"Device not found: {args.device_id}")
+                return 1
+            query = query.filter(Trip.device_id == device.id)
+        if args.trip_id:
+            query = query.filter(Trip.id == args.trip_id)
+        if not args.all:
+            pending = db.query(Sounding.trip_id).filter(Sounding.detail_level.is_(None)).distinct()
+            query = query.filter(Trip.id.in_(pending))
+
+        trip_ids = [trip_id for (trip_id,) in query]
+        updated = 0
+        for trip_id in trip_ids:
+            count = backfill_trip(db, trip_id)
+            db.commit()
+            invalidate_trips([trip_id])
+            if settings.sounding_store_backend == "segments":
+                # Levels live in the segment too (the trip's version does not change)
+                write_segments(db, [trip_id])
+            updated += count
+            print(f"✓ trip {trip_id}: {count} soundings")
+
+        print(f"\nBackfilled {updated} soundings in {len(trip_ids)} trips")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
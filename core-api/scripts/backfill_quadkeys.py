@@ -0,0 +1,95 @@
+"""
+Backfill soundings.quadkey for soundings ingested before the spatial index.
+
+Bounding-box queries of a device fall back to a plain latitude/longitude
+filter while any of its soundings lacks a quadkey. This script computes the
+missing quadkeys in id order, committing after every chunk, so it can be
+interrupted and resumed.
+
+Usage:
+    python scripts/backfill_quadkeys.py                      # all devices
+    python scripts/backfill_quadkeys.py --device-id vessel-1 # one device
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import update
+
+from core.db import SessionLocal
+from core.models import Device, Sounding
+from modules.soundings.spatial import quadkeys
+
+# Soundings read and updated per transaction
+CHUNK_SIZE = 20000
+
+
+def backfill_device(db, device_id: int) -> int:
+    """
+    Compute quadkeys for every sounding of one device that lacks one.
+
+    Returns:
+        Number of soundings updated
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Sounding.id, Sounding.latitude, Sounding.longitude)
+            .filter(Sounding.device_id == device_id, Sounding.quadkey.is_(None), Sounding.id > last_id)
+            .order_by(Sounding.id)
+            .limit(CHUNK_SIZE)
+            .all()
+        )
+        if not rows:
+            return updated
+
+        ids = [row.id for row in rows]
+        lat = np.array([row.latitude for row in rows], dtype=np.float64)
+        lon = np.array([row.longitude for row in rows], dtype=np.float64)
+        db.execute(
+            update(Sounding),
+            [
+                {"id": sounding_id, "quadkey": key}
+                for sounding_id, key in zip(ids, quadkeys(lat, lon).tolist())
+            ],
+        )
+        db.commit()
+        updated += len(ids)
+        last_id = ids[-1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compute quadkeys for soundings that lack them")
+    parser.add_argument("--device-id", help="Only backfill this device (devices.device_id)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Device).order_by(Device.id)
+        if args.device_id:
+            query = query.filter(Device.device_id == args.device_id)
+        devices = query.all()
+        if args.device_id and not devices:
+            print(f"Device not found: {args.device_id}")
+            return 1
+
+        total = 0
+        for device in devices:
+            count = backfill_device(db, device.id)
+            total += count
+            print(f"✓ {device.device_id}: {count} soundings")
+
+        print(f"\nBackfilled {total} soundings")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Benchmark for event-loop blocking under mixed load.
+
+Ingests a synthetic trip into a throwaway SQLite database, serves the API
+with uvicorn (one worker, as deployed), then runs two phases:
+
+- light: connector heartbeats and dashboard trip/device lookups only
+- mixed: the same light clients while other clients keep downloading the
+  full-resolution track of the large trip (track cache disabled, so every
+  request reads and encodes the whole trip)
+
+Latencies (and failed requests) are reported per phase and request kind.
+When handlers run queries on a synchronous session inside async endpoints,
+every track request freezes the event loop and the light requests queue
+behind it; on the async session they keep being served.
+
+To compare two revisions, point --app-dir at another checkout (e.g. a git
+worktree of the previous commit); the database is seeded by this checkout.
+
+Usage:
+    python scripts/bench_async_db.py                              # this checkout
+    python scripts/bench_async_db.py --app-dir /tmp/before/core-api
+    python scripts/bench_async_db.py --soundings 500000 --duration 30
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import synthetic_batches
+
+API_KEY = "bench-key"
+
+
+def seed(soundings: int, devices: int) -> int:
+    """Create the schema, the devices and the synthetic voyage; return the largest trip's id."""
+    from core.auth import hash_api_key
+    from core.config import settings
+    from core.db import Base, SessionLocal, engine
+    from core.models import Device, Trip
+    from modules.ingestion.segmentation import TripSegmenter
+    from modules.ingestion.sink import SoundingSink
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all([
+        Device(device_id=f"bench-vessel-{i}", plotter_type="olex", api_key_hash=hash_api_key(API_KEY))
+        for i in range(devices)
+    ])
+    db.commit()
+    device = db.query(Device).filter(Device.device_id == "bench-vessel-0").one()
+
+    print(f"Ingesting {soundings:,} synthetic soundings...")
+    sink = SoundingSink(db, device.id, segmenter=TripSegmenter(db, device.id))
+    sink.write_all(synthetic_batches(soundings, settings.ingestion_batch_size))
+    db.commit()
+    trip = db.query(Trip).order_by(Trip.sounding_count.desc()).first()
+    print(f"  largest trip {trip.id}: {trip.sounding_count:,} soundings")
+    db.close()
+    engine.dispose()
+    return trip.id
+
+
+def percentiles(latencies) -> str:
+    values = np.array(latencies) * 1000
+    return (f"p50 {np.percentile(values, 50):>8.1f} ms   p95 {np.percentile(values, 95):>8.1f} ms   "
+            f"p99 {np.percentile(values, 99):>8.1f} ms   ({len(values):,} requests)")
+
+
+async def run_phase(base_url: str, trip_id: int, devices: int, light_clients: int, track_clients: int, duration: float):
+    """Run the clients for duration seconds; return ({kind: latencies}, {kind: failed requests})."""
+    import httpx
+
+    latencies = {"heartbeat": [], "trip list": [], "device": [], "track": []}
+    failures = {kind: 0 for kind in latencies}
+    deadline = time.perf_counter() + duration
+
+    async def timed(kind, send):
+        started = time.perf_counter()
+        try:
+            response = await send()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies[kind].append(time.perf_counter() - started)
+        failures[kind] += not ok
+
+    async def light(client, n):
+        device_id = f"bench-vessel-{n % devices}"
+        headers = {"X-Device-ID": device_id, "X-API-Key": API_KEY}
+        while time.perf_counter() < deadline:
+            await timed("heartbeat", lambda: client.post("/api/heartbeat", json={"queue_size": 0}, headers=headers))
+            await timed("trip list", lambda: client.get("/api/trips", params={"device_id": "bench-vessel-0"}))
+            await timed("device", lambda: client.get(f"/api/devices/{device_id}"))
+
+    async def track(client):
+        while time.perf_counter() < deadline:
+            await timed("track", lambda: client.get(f"/api/trips/{trip_id}/track", params={"format": "binary"}))
+
+    limits = httpx.Limits(max_connections=light_clients + track_clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        await asyncio.gather(
+            *(light(client, n) for n in range(light_clients)),
+            *(track(client) for _ in range(track_clients)),
+        )
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request latency under mixed load (event-loop blocking)")
+    parser.add_argument("--soundings", type=int, default=300_000, help="Soundings of the synthetic voyage (default 300k)")
+    parser.add_argument("--devices", type=int, default=20, help="Registered devices (default 20)")
+    parser.add_argument("--light-clients", type=int, default=16, help="Concurrent heartbeat/lookup clients (default 16)")
+    parser.add_argument("--track-clients", type=int, default=2, help="Concurrent track downloads (default 2)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per phase (default 20)")
+    parser.add_argument("--app-dir", default=str(Path(__file__).parent.parent),
+                        help="core-api checkout to serve (default: this one)")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the benchmark server (default 8765)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-async-") as workdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(workdir) / 'bench.db'}",
+            "STORAGE_PATH": workdir,
+            "APP_ENV": "bench",
+            "TRACK_CACHE_ENABLED": "false",
+            "INGESTION_WORKER_ENABLED": "false",
+        }
+        os.environ.update(env)
+        trip_id = seed(args.soundings, args.devices)
+
+        print(f"Serving {args.app_dir} on port {args.port}...")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=args.app_dir, env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            import httpx
+
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/health").raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.2)
+            else:
+                print("✗ Server did not start")
+                return 1
+
+            for phase, track_clients in (("light", 0), ("mixed", args.track_clients)):
+                latencies, failures = asyncio.run(
+                    run_phase(base_url, trip_id, args.devices, args.light_clients, track_clients, args.duration)
+                )
+                print(f"\n{phase}: {args.light_clients} light clients, {track_clients} track clients, "
+                      f"{args.duration:.0f}s")
+                for kind, values in latencies.items():
+                    if values:
+                        failed = f"   {failures[kind]:,} failed" if failures[kind] else ""
+                        print(f"  {kind:<10} {percentiles(values)}{failed}")
+        finally:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
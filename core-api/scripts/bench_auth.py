@@ -0,0 +1,135 @@
+"""
+Benchmark for connector authentication overhead.
+
+Registers devices in a throwaway SQLite database, then authenticates
+requests the way the connector endpoints do (a fresh async session per
+request, get_authenticated_device() on it), from concurrent clients that
+cycle through the devices. Each configuration reports the time per request,
+its latency percentiles and the SQL statements per request:
+
+- previous: no cache, last_seen_at committed on every request (devices
+  query, SHA-256 and a write transaction per request)
+- throttled: no cache, last_seen_at written at most every
+  AUTH_LAST_SEEN_INTERVAL_SECONDS per device
+- cached: the current defaults (authentication cache and throttled
+  last_seen_at); the first request of each device misses
+
+Usage:
+    python scripts/bench_auth.py
+    python scripts/bench_auth.py --devices 200 --clients 32 --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+API_KEY = "bench-key"
+
+# Configuration -> (AUTH_CACHE_ENABLED, AUTH_LAST_SEEN_INTERVAL_SECONDS)
+CONFIGURATIONS = {
+    "previous": (False, 0.0),
+    "throttled": (False, 60.0),
+    "cached": (True, 60.0),
+}
+
+
+def seed(devices: int) -> None:
+    """Create the schema and the devices."""
+    from core.auth import hash_api_key
+    from core.db import Base, SessionLocal, engine
+    from core.models import Device
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all([
+        Device(device_id=f"bench-vessel-{i}", plotter_type="olex", api_key_hash=hash_api_key(API_KEY))
+        for i in range(devices)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+async def run(devices: int, clients: int, requests: int) -> tuple:
+    """Authenticate requests from concurrent clients; return (latencies, wall seconds)."""
+    from core.auth import get_authenticated_device
+    from core.db import get_async_db
+
+    latencies = []
+    per_client = requests // clients
+
+    async def client(n):
+        for i in range(per_client):
+            device_id = f"bench-vessel-{(n * per_client + i) % devices}"
+            started = time.perf_counter()
+            # What FastAPI does for a request: open the session dependency, authenticate, close
+            sessions = get_async_db()
+            db = await sessions.__anext__()
+            try:
+                await get_authenticated_device(device_id, API_KEY, None, db)
+            finally:
+                await sessions.aclose()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure authentication overhead per request with and without the cache")
+    parser.add_argument("--devices", type=int, default=50, help="Registered devices (default 50)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients (default 16)")
+    parser.add_argument("--requests", type=int, default=10000, help="Requests per configuration (default 10000)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-auth-") as workdir:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{Path(workdir) / 'bench.db'}",
+            "STORAGE_PATH": workdir,
+            "APP_ENV": "bench",
+        })
+        from sqlalchemy import event
+        import core.auth
+        import core.auth_cache
+        from core.config import settings
+        from core.db import async_engine
+
+        logging.disable(logging.INFO)  # one log line per authentication would dominate
+        seed(args.devices)
+        statements = [0]
+
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+
+        print(f"{args.requests:,} authentications of {args.devices} devices from {args.clients} concurrent clients")
+        for name, (cache_enabled, last_seen_interval) in CONFIGURATIONS.items():
+            settings.auth_cache_enabled = cache_enabled
+            settings.auth_last_seen_interval_seconds = last_seen_interval
+            core.auth_cache._auth_cache = None
+            core.auth._last_seen_writes.clear()
+            statements[0] = 0
+
+            latencies, seconds = asyncio.run(run(args.devices, args.clients, args.requests))
+            asyncio.run(async_engine.dispose())
+            ms = np.array(latencies) * 1000
+            print(f"  {name:<10} {seconds / len(latencies) * 1e6:>8.1f} us/request   "
+                  f"p50 {np.percentile(ms, 50):>7.2f} ms   p99 {np.percentile(ms, 99):>7.2f} ms   "
+                  f"{statements[0] / len(latencies):.2f} SQL statements/request")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Benchmark for database pool and SQLite tuning under concurrent writes.
+
+Seeds a throwaway SQLite database (registered devices and one ingested
+trip), then serves the API with uvicorn under each configuration in turn and
+runs the same load against it:
+
+- connectors uploading small files (file record inserts)
+- connectors sending heartbeats (heartbeat insert + last_seen_at update)
+- dashboard clients listing trips and downloading a trip track (long reads)
+
+Configurations:
+
+- previous: rollback journal, synchronous=FULL, SQLite's default page
+  cache and no mmap (the engine settings before pool/PRAGMA tuning), one
+  write transaction per heartbeat, uncached authentication with a
+  last_seen_at write per request
+- tuned (sync heartbeats): WAL, synchronous=NORMAL, larger cache, mmap,
+  longer busy_timeout; heartbeats still written one by one
+- tuned (group heartbeats): heartbeats batched, acknowledged once committed
+- tuned: the current defaults (heartbeats batched, acknowledged on receipt)
+
+Throughput, latency percentiles and failed requests ("database is locked",
+pool timeouts) are reported per request kind.
+
+Usage:
+    python scripts/bench_db_pool.py
+    python scripts/bench_db_pool.py --upload-clients 16 --heartbeat-clients 32 --duration 30
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import synthetic_batches
+
+API_KEY = "bench-key"
+
+CONFIGURATIONS = {
+    "previous": {
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",  # pysqlite's default timeout
+        "SQLITE_CACHE_SIZE_MB": "2",  # SQLite's default page cache (2000 KiB)
+        "SQLITE_MMAP_SIZE_MB": "0",
+        "HEARTBEAT_WRITE_MODE": "sync",
+        "AUTH_CACHE_ENABLED": "false",
+        "AUTH_LAST_SEEN_INTERVAL_SECONDS": "0",
+    },
+    "tuned (sync heartbeats)": {"HEARTBEAT_WRITE_MODE": "sync"},
+    "tuned (group heartbeats)": {"HEARTBEAT_WRITE_MODE": "group"},
+    "tuned": {},
+}
+
+
+def seed(soundings: int, devices: int) -> int:
+    """Create the schema, the devices and one ingested voyage; return its largest trip's id."""
+    from core.auth import hash_api_key
+    from core.config import settings
+    from core.db import Base, SessionLocal, engine
+    from core.models import Device, Trip
+    from modules.ingestion.segmentation import TripSegmenter
+    from modules.ingestion.sink import SoundingSink
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all([
+        Device(device_id=f"bench-vessel-{i}", plotter_type="olex", api_key_hash=hash_api_key(API_KEY))
+        for i in range(devices)
+    ])
+    db.commit()
+    device = db.query(Device).filter(Device.device_id == "bench-vessel-0").one()
+
+    print(f"Ingesting {soundings:,} synthetic soundings...")
+    sink = SoundingSink(db, device.id, segmenter=TripSegmenter(db, device.id))
+    sink.write_all(synthetic_batches(soundings, settings.ingestion_batch_size, seed=9))
+    db.commit()
+    trip = db.query(Trip).order_by(Trip.sounding_count.desc()).first()
+    db.close()
+    engine.dispose()
+    return trip.id
+
+
+async def run_load(base_url: str, trip_id: int, args) -> tuple:
+    """Run every client for args.duration seconds; return ({kind: latencies}, {kind: failures})."""
+    import httpx
+
+    latencies = {"upload": [], "heartbeat": [], "trip list": [], "track": []}
+    failures = {kind: 0 for kind in latencies}
+    deadline = time.perf_counter() + args.duration
+
+    async def timed(kind, send):
+        started = time.perf_counter()
+        try:
+            ok = (await send()).status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latencies[kind].append(time.perf_counter() - started)
+        failures[kind] += not ok
+
+    def headers(n):
+        return {"X-Device-ID": f"bench-vessel-{n % args.devices}", "X-API-Key": API_KEY}
+
+    async def uploader(client, n):
+        sequence = 0
+        while time.perf_counter() < deadline:
+            body = os.urandom(args.upload_kb * 1024)
+            sequence += 1
+            await timed("upload", lambda: client.post(
+                "/api/upload_file", headers=headers(n),
+                files={"file": (f"bench-{n}-{sequence}.raw", body)}, data={"file_type": "track"},
+            ))
+
+    async def heartbeat(client, n):
+        while time.perf_counter() < deadline:
+            await timed("heartbeat", lambda: client.post("/api/heartbeat", json={"queue_size": 0}, headers=headers(n)))
+
+    async def reader(client):
+        while time.perf_counter() < deadline:
+            await timed("trip list", lambda: client.get("/api/trips", params={"device_id": "bench-vessel-0"}))
+            await timed("track", lambda: client.get(f"/api/trips/{trip_id}/track", params={"format": "binary"}))
+
+    clients = args.upload_clients + args.heartbeat_clients + args.readers
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=httpx.Limits(max_connections=clients)) as client:
+        await asyncio.gather(
+            *(uploader(client, n) for n in range(args.upload_clients)),
+            *(heartbeat(client, n) for n in range(args.heartbeat_clients)),
+            *(reader(client) for _ in range(args.readers)),
+        )
+    return latencies, failures
+
+
+def serve(app_dir: str, port: int, env: dict) -> subprocess.Popen:
+    """Start uvicorn and wait until /health answers."""
+    import httpx
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "critical"],
+        cwd=app_dir, env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite/pool tuning under concurrent uploads and heartbeats")
+    parser.add_argument("--soundings", type=int, default=100_000, help="Soundings of the seeded trip (default 100k)")
+    parser.add_argument("--devices", type=int, default=20, help="Registered devices (default 20)")
+    parser.add_argument("--upload-clients", type=int, default=8, help="Concurrent uploaders (default 8)")
+    parser.add_argument("--upload-kb", type=int, default=64, help="Size of each uploaded file in KiB (default 64)")
+    parser.add_argument("--heartbeat-clients", type=int, default=16, help="Concurrent heartbeat senders (default 16)")
+    parser.add_argument("--readers", type=int, default=2, help="Concurrent dashboard readers (default 2)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per configuration (default 20)")
+    parser.add_argument("--port", type=int, default=8766, help="Port of the benchmark server (default 8766)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database and storage (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-db-pool-") as workdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(workdir) / 'bench.db'}",
+            "STORAGE_PATH": str(Path(workdir) / "storage"),
+            "APP_ENV": "bench",
+            "TRACK_CACHE_ENABLED": "false",
+            "INGESTION_WORKER_ENABLED": "false",
+        }
+        os.environ.update(env)
+        trip_id = seed(args.soundings, args.devices)
+
+        for name, overrides in CONFIGURATIONS.items():
+            server = serve(str(Path(__file__).parent.parent), args.port, {**env, **overrides})
+            try:
+                latencies, failures = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", trip_id, args))
+            finally:
+                server.terminate()
+                server.wait()
+
+            print(f"\n{name}: {args.upload_clients} uploaders, {args.heartbeat_clients} heartbeat senders, "
+                  f"{args.readers} readers, {args.duration:.0f}s")
+            for kind, values in latencies.items():
+                if not values:
+                    continue
+                ms = np.array(values) * 1000
+                failed = f"   {failures[kind]:,} failed" if failures[kind] else ""
+                print(f"  {kind:<10} {len(values) / args.duration:>7.1f} req/s   p50 {np.percentile(ms, 50):>8.1f} ms   "
+                      f"p99 {np.percentile(ms, 99):>8.1f} ms{failed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
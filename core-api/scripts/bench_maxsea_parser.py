@@ -0,0 +1,142 @@
+"""
+Benchmark for the MaxSea memory-mapped track parser.
+
+Generates a synthetic MF2 track file (default 1 GiB, ~44.7M records) and
+measures decode throughput of MaxSeaParser.iter_batches(), optionally also
+inserting into a throwaway SQLite database through the SoundingSink.
+
+Usage:
+    python scripts/bench_maxsea_parser.py                       # 1 GiB plain .mf2, decode only
+    python scripts/bench_maxsea_parser.py --size-mb 2048        # larger file
+    python scripts/bench_maxsea_parser.py --zip stored          # TZ backup, member mapped in place
+    python scripts/bench_maxsea_parser.py --zip deflated        # TZ backup, member extracted first
+    python scripts/bench_maxsea_parser.py --size-mb 64 --sink   # include SQLite inserts
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+
+def write_synthetic_mf2(path: Path, size_mb: int, chunk_records: int = 1_000_000) -> int:
+    """
+    Write a synthetic MF2 track file of roughly size_mb megabytes.
+
+    Args:
+        path: Destination file
+        size_mb: Target size in MiB
+        chunk_records: Records generated per write
+
+    Returns:
+        Number of records written
+    """
+    from modules.ingestion.parsers.maxsea import (
+        MF2_HEADER_DTYPE, MF2_MAGIC, MF2_RECORD_DTYPE, MF2_VERSION, MISSING_U16,
+    )
+
+    total = (size_mb * 1024 * 1024 - MF2_HEADER_DTYPE.itemsize) // MF2_RECORD_DTYPE.itemsize
+    rng = np.random.default_rng(42)
+
+    header = np.zeros(1, dtype=MF2_HEADER_DTYPE)
+    header["magic"] = MF2_MAGIC
+    header["version"] = MF2_VERSION
+    header["record_size"] = MF2_RECORD_DTYPE.itemsize
+    header["record_count"] = total
+
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        written = 0
+        while written < total:
+            n = min(chunk_records, total - written)
+            records = np.zeros(n, dtype=MF2_RECORD_DTYPE)
+            index = np.arange(written, written + n)
+            records["time"] = 1_600_000_000 + index
+            records["lat_e7"] = (58.0 + np.cumsum(rng.normal(0, 1e-5, n))) * 1e7
+            records["lon_e7"] = (10.0 + np.cumsum(rng.normal(0, 1e-5, n))) * 1e7
+            records["depth_m"] = rng.uniform(5, 400, n)
+            records["depth_m"][::50] = np.nan  # some fixes without depth
+            records["water_temp_c"] = rng.uniform(2, 14, n)
+            records["speed_cknots"] = rng.integers(0, 1200, n)
+            records["speed_cknots"][::100] = MISSING_U16
+            records["course_cdeg"] = rng.integers(0, 36000, n)
+            f.write(records.tobytes())
+            written += n
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MaxSea mmap parser")
+    parser.add_argument("--size-mb", type=int, default=1024, help="Synthetic file size in MiB (default 1024)")
+    parser.add_argument("--zip", choices=["stored", "deflated"], help="Wrap the track file in a zip archive")
+    parser.add_argument("--sink", action="store_true", help="Also insert soundings into a temp SQLite database")
+    parser.add_argument("--workdir", default=None, help="Directory for the synthetic files (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-maxsea-") as workdir:
+        workdir = Path(workdir)
+        os.environ["STORAGE_PATH"] = str(workdir)
+        if args.sink:
+            os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+        os.environ.setdefault("APP_ENV", "bench")
+
+        track = workdir / "track.mf2"
+        print(f"Generating {args.size_mb} MiB synthetic MF2 file...")
+        t0 = time.perf_counter()
+        records = write_synthetic_mf2(track, args.size_mb)
+        print(f"  {records:,} records in {time.perf_counter() - t0:.1f}s")
+
+        target = track
+        if args.zip:
+            target = workdir / "backup.zip"
+            compression = zipfile.ZIP_STORED if args.zip == "stored" else zipfile.ZIP_DEFLATED
+            print(f"Packing into {args.zip} zip archive...")
+            with zipfile.ZipFile(target, "w", compression=compression, allowZip64=True) as zf:
+                zf.write(track, "Tracks/track.mf2")
+            track.unlink()
+
+        from modules.ingestion.parsers.maxsea import MaxSeaParser
+
+        sink = None
+        db = None
+        if args.sink:
+            from core.db import Base, SessionLocal, engine
+            import core.models  # noqa: F401
+            from modules.ingestion.sink import SoundingSink
+            Base.metadata.create_all(bind=engine)
+            db = SessionLocal()
+            sink = SoundingSink(db, device_id=1)
+
+        file_size = target.stat().st_size
+        stats = {}
+        soundings = 0
+        t0 = time.perf_counter()
+        for batch in MaxSeaParser().iter_batches(target, stats):
+            if sink is not None:
+                sink.write(batch)
+            soundings += len(batch)
+        if db is not None:
+            db.commit()
+            db.close()
+        elapsed = time.perf_counter() - t0
+
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"\nFile:        {target.name} ({file_size / 1024 / 1024:,.0f} MiB)")
+        print(f"Records:     {stats['records']:,} ({stats['records_without_depth']:,} without depth)")
+        print(f"Soundings:   {soundings:,}{' (inserted)' if sink else ''}")
+        print(f"Elapsed:     {elapsed:.2f}s")
+        print(f"Throughput:  {file_size / 1024 / 1024 / elapsed:,.0f} MiB/s, {stats['records'] / elapsed:,.0f} records/s")
+        print(f"Peak RSS:    {peak_rss_mb:,.0f} MiB (includes generation; mapped pages are file-backed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Benchmark for the compact sounding encoding (migration 016).
+
+Ingests synthetic 1 Hz trips for a few vessels into a throwaway SQLite
+database through the SoundingSink, copies it and converts the copy back to
+the previous layout (ISO text timestamps, double coordinates and values)
+with the migration's downgrade, then compares the two layouts:
+
+- disk footprint: the soundings table and each of its indexes (SQLite
+  dbstat), after VACUUM
+- range-query latency: time windows of several lengths for one vessel
+  (ix_soundings_device_timestamp) and whole trips (ix_soundings_trip_timestamp),
+  alternating the layouts query by query; each is timed fetching the
+  driver's rows ('sql') and through SQLAlchemy's result conversion
+  ('rows', what API queries pay: text parsing before, integer scaling after)
+
+Usage:
+    python scripts/bench_sounding_encoding.py
+    python scripts/bench_sounding_encoding.py --devices 8 --days 10 --queries 200
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import synthetic_batches
+
+TRIP_HOURS = 20  # at sea per day; the gap ashore splits trips
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "016_compact_sounding_encoding.py"
+
+
+def downgrade(engine) -> None:
+    """Convert soundings to the previous layout with migration 016's downgrade()."""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    spec = importlib.util.spec_from_file_location("compact_sounding_encoding", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.downgrade()
+
+
+def legacy_table():
+    """The soundings table as it was before migration 016 (for queries only)."""
+    from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, MetaData, SmallInteger, Table
+
+    return Table(
+        "soundings", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("device_id", Integer),
+        Column("trip_id", Integer),
+        Column("tow_id", Integer),
+        Column("timestamp", DateTime(timezone=True)),
+        Column("latitude", Float),
+        Column("longitude", Float),
+        Column("depth", Float),
+        Column("water_temp", Float),
+        Column("speed_knots", Float),
+        Column("course_deg", Float),
+        Column("detail_level", SmallInteger),
+        Column("quadkey", BigInteger),
+    )
+
+
+def footprint(engine) -> dict:
+    """Bytes per soundings table and index (SQLite dbstat), after VACUUM."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+        rows = conn.execute(text(
+            "SELECT name, SUM(pgsize) FROM dbstat "
+            "WHERE name = 'soundings' OR name LIKE 'ix_soundings_%' GROUP BY name"
+        )).all()
+    return dict(rows)
+
+
+def range_query(table, case):
+    """Soundings of a trip (case: trip id) or of a vessel in a time window (device id, start, end)."""
+    from sqlalchemy import select
+
+    if isinstance(case, tuple):
+        device_id, start, end = case
+        criteria = [table.c.device_id == device_id, table.c.timestamp.between(start, end)]
+    else:
+        criteria = [table.c.trip_id == case]
+    return (
+        select(table.c.timestamp, table.c.latitude, table.c.longitude, table.c.depth)
+        .where(*criteria)
+        .order_by(table.c.timestamp, table.c.id)
+    )
+
+
+def timed_query(conn, query, convert: bool):
+    """(seconds, rows) for one query; without convert the driver's rows are fetched as they are."""
+    started = time.perf_counter()
+    result = conn.execute(query)
+    rows = result.all() if convert else result.cursor.fetchall()
+    result.close()
+    return time.perf_counter() - started, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compact sounding encoding with the previous layout")
+    parser.add_argument("--devices", type=int, default=4, help="Vessels (default 4)")
+    parser.add_argument("--days", type=int, default=5, help="Daily trips per vessel, 20 h at 1 Hz (default 5)")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per kind (default 100)")
+    parser.add_argument("--windows", default="0.25,1,6",
+                        help="Comma-separated time window lengths in hours (default 0.25,1,6)")
+    parser.add_argument("--workdir", default=None, help="Directory for the databases (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-encoding-") as workdir:
+        compact_path = Path(workdir) / "compact.db"
+        legacy_path = Path(workdir) / "legacy.db"
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{compact_path}",
+            "STORAGE_PATH": workdir,
+            "APP_ENV": "bench",
+        })
+        from sqlalchemy import create_engine
+        from core.config import settings
+        from core.db import Base, SessionLocal, engine
+        from core.models import Device, Sounding, Trip
+        from modules.ingestion.segmentation import TripSegmenter
+        from modules.ingestion.sink import SoundingSink
+        from modules.trips.aggregates import epoch_to_datetime
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        devices = [Device(device_id=f"bench-vessel-{i}", plotter_type="olex") for i in range(1, args.devices + 1)]
+        db.add_all(devices)
+        db.commit()
+
+        total = args.devices * args.days * TRIP_HOURS * 3600
+        print(f"Ingesting {args.devices} vessels x {args.days} trips ({total:,} soundings)...")
+        for seed, device in enumerate(devices):
+            sink = SoundingSink(db, device.id, segmenter=TripSegmenter(db, device.id))
+            sink.write_all(synthetic_batches(
+                args.days * TRIP_HOURS * 3600, settings.ingestion_batch_size, trip_length=TRIP_HOURS * 3600,
+                interval=1.0, turn_sd=0.002, gap=(24 - TRIP_HOURS) * 3600, olex_precision=True,
+                all_columns=True, seed=seed,
+            ))
+            db.commit()
+        trip_ids = [trip_id for trip_id, in db.query(Trip.id)]
+        device_ids = [device.id for device in devices]
+        db.close()
+        engine.dispose()
+
+        shutil.copyfile(compact_path, legacy_path)
+        legacy_engine = create_engine(f"sqlite:///{legacy_path}")
+        print("Converting a copy to the previous layout...")
+        downgrade(legacy_engine)
+
+        rng = np.random.default_rng(5)
+        windows = [float(hours) for hours in args.windows.split(",")]
+        cases = {"trip": rng.choice(trip_ids, size=args.queries).tolist()}
+        for hours in windows:
+            cases[f"{hours:g} h window"] = []
+            for _ in range(args.queries):
+                start = epoch_to_datetime(1_600_000_000.0 + rng.integers(args.days) * 86400
+                                          + rng.uniform(0, TRIP_HOURS - hours) * 3600)
+                cases[f"{hours:g} h window"].append((int(rng.choice(device_ids)), start, start + timedelta(hours=hours)))
+
+        layouts = {
+            "before": (legacy_engine, legacy_table()),
+            "after": (create_engine(f"sqlite:///{compact_path}"), Sounding.__table__),
+        }
+        sizes = {label: footprint(layout_engine) for label, (layout_engine, _) in layouts.items()}
+        connections = {label: layout_engine.connect() for label, (layout_engine, _) in layouts.items()}
+        # (kind, label, convert) -> latencies in ms; kind -> rows per query
+        runs = {}
+        rows = {}
+        for kind, kind_cases in cases.items():
+            for case in kind_cases:
+                # Alternate the layouts query by query so both see the same machine state
+                for label, (_, table) in layouts.items():
+                    query = range_query(table, case)
+                    timed_query(connections[label], query, False)  # warm the page cache
+                    for convert in (False, True):
+                        seconds, count = timed_query(connections[label], query, convert)
+                        runs.setdefault((kind, label, convert), []).append(seconds * 1000)
+                rows[kind] = rows.get(kind, 0) + count / len(kind_cases)
+        for label, (layout_engine, _) in layouts.items():
+            connections[label].close()
+            layout_engine.dispose()
+
+        print(f"\nFootprint ({total:,} soundings)")
+        print(f"  {'':<30} {'before':>10} {'after':>10}")
+        for name in sorted(sizes["before"], key=lambda name: (name != "soundings", name)):
+            before, after = sizes["before"][name], sizes["after"].get(name, 0)
+            print(f"  {name:<30} {before / 2**20:>6.1f} MiB {after / 2**20:>6.1f} MiB")
+        before, after = sum(sizes["before"].values()), sum(sizes["after"].values())
+        print(f"  {'total':<30} {before / 2**20:>6.1f} MiB {after / 2**20:>6.1f} MiB   "
+              f"({before / total:.1f} -> {after / total:.1f} B per sounding)")
+
+        print("\nRange queries: 'sql' fetches the driver's rows, 'rows' adds SQLAlchemy's result conversion")
+        for kind in cases:
+            print(f"\n{kind} ({args.queries} queries, {rows[kind]:,.0f} rows/query)")
+            for label in layouts:
+                for convert in (False, True):
+                    latencies = np.array(runs[(kind, label, convert)])
+                    name = f"{label} {'rows' if convert else 'sql'}"
+                    print(f"  {name:<12} p50 {np.percentile(latencies, 50):>9.2f} ms   "
+                          f"p95 {np.percentile(latencies, 95):>9.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Benchmark for the columnar sounding store (rows vs per-trip segments).
+
+Ingests synthetic 1 Hz trips (steaming legs around a long tow, separated by
+gaps longer than TRIP_GAP_HOURS) into a throwaway SQLite database, then
+compares the soundings table with per-trip segment files, deflated and
+stored uncompressed:
+
+- insert rate: soundings/s through the SoundingSink (bulk insert with
+  segmentation and detail levels) vs writing the same trips' columns as
+  segment files
+- disk footprint: soundings table plus its indexes (SQLite dbstat) vs the
+  segment files
+- full-trip read latency: read_track() for every trip on each backend
+
+Usage:
+    python scripts/bench_sounding_store.py
+    python scripts/bench_sounding_store.py --trips 20 --hours 24 --repeats 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import synthetic_batches
+
+
+def table_bytes(db) -> int:
+    """Bytes used by the soundings table and its indexes (SQLite dbstat)."""
+    from sqlalchemy import text
+
+    return db.execute(text(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name = 'soundings' OR name LIKE 'ix_soundings_%'"
+    )).scalar() or 0
+
+
+def latency(values) -> str:
+    ms = np.array(values) * 1000
+    return f"p50 {np.percentile(ms, 50):>8.1f} ms   p95 {np.percentile(ms, 95):>8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the soundings table with columnar per-trip segments")
+    parser.add_argument("--trips", type=int, default=10, help="Synthetic trips (default 10)")
+    parser.add_argument("--hours", type=float, default=12.0, help="Length of each trip at 1 Hz (default 12)")
+    parser.add_argument("--repeats", type=int, default=3, help="Full reads of every trip per backend (default 3)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database and segments (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-store-") as workdir:
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{Path(workdir) / 'bench.db'}",
+            "STORAGE_PATH": workdir,
+            "APP_ENV": "bench",
+        })
+        from core.config import settings
+        from core.db import Base, SessionLocal, engine
+        from core.models import Device, SoundingSegment, Trip
+        from modules.ingestion.segmentation import TripSegmenter
+        from modules.ingestion.sink import SoundingSink
+        from modules.soundings.store import read_rows, read_track, segment_path, write_segment_file
+        from modules.trips.track_cache import trip_version
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        device = Device(device_id="bench-vessel", plotter_type="olex")
+        db.add(device)
+        db.commit()
+
+        per_trip = int(args.hours * 3600)
+        total = args.trips * per_trip
+        print(f"Ingesting {args.trips} trips x {per_trip:,} soundings ({total:,})...")
+        started = time.perf_counter()
+        sink = SoundingSink(db, device.id, segmenter=TripSegmenter(db, device.id))
+        sink.write_all(synthetic_batches(
+            total, settings.ingestion_batch_size, trip_length=per_trip, interval=1.0, turn_sd=0.002,
+            towing=True, all_columns=True, seed=21,
+        ))
+        db.commit()
+        row_seconds = time.perf_counter() - started
+        row_bytes = table_bytes(db)
+        trips = db.query(Trip).filter(Trip.device_id == device.id).order_by(Trip.id).all()
+        tracks = {trip.id: read_rows(db, trip.id) for trip in trips}
+
+        print(f"\n{'':<20} {'insert rate':>16}   {'footprint':>10}   {'per sounding':>12}")
+        print(f"{'rows':<20} {total / row_seconds:>10,.0f} snd/s   {row_bytes / 2**20:>7.1f} MiB   {row_bytes / total:>9.1f} B")
+
+        reads = {"rows": []}
+        settings.sounding_store_backend = "rows"
+        for _ in range(args.repeats):
+            for trip in trips:
+                started = time.perf_counter()
+                read_track(db, trip)
+                reads["rows"].append(time.perf_counter() - started)
+
+        for compressed in (True, False):
+            name = "segments (deflate)" if compressed else "segments (stored)"
+            settings.sounding_segments_compressed = compressed
+            db.query(SoundingSegment).delete()
+            write_seconds = 0.0
+            segment_bytes = 0
+            for trip in trips:
+                version = trip_version(trip)
+                relative = segment_path(trip, version)
+                started = time.perf_counter()
+                size = write_segment_file(Path(workdir) / relative, tracks[trip.id])
+                write_seconds += time.perf_counter() - started
+                segment_bytes += size
+                db.add(SoundingSegment(
+                    trip_id=trip.id, device_id=device.id, path=relative.as_posix(), trip_version=version,
+                    sounding_count=len(tracks[trip.id]["time"]), byte_size=size,
+                ))
+            db.commit()
+            print(f"{name:<20} {total / write_seconds:>10,.0f} snd/s   {segment_bytes / 2**20:>7.1f} MiB   "
+                  f"{segment_bytes / total:>9.1f} B")
+
+            settings.sounding_store_backend = "segments"
+            reads[name] = []
+            for _ in range(args.repeats):
+                for trip in trips:
+                    started = time.perf_counter()
+                    track = read_track(db, trip)
+                    reads[name].append(time.perf_counter() - started)
+                    assert np.array_equal(track["time"], tracks[trip.id]["time"])
+            settings.sounding_store_backend = "rows"
+
+        print(f"\nFull-trip reads ({per_trip:,} soundings, {len(trips)} trips x {args.repeats}):")
+        for name, values in reads.items():
+            print(f"  {name:<20} {latency(values)}")
+        db.close()
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
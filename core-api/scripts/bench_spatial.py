@@ -0,0 +1,213 @@
+"""
+Benchmark for the quadkey spatial index on soundings.
+
+Loads synthetic fleet tracks (random walks at 10 s fixes, several vessels
+in the same fishing grounds) into a throwaway SQLite database, then runs the
+same queries twice:
+
+- lat/lon: the previous (latitude, longitude) B-tree with a plain
+  device + latitude/longitude range filter
+- quadkey: the (device_id, quadkey) index through bbox_criteria()
+
+Queries are viewports of several sizes around random track points, and
+"tows passing this point" lookups (tows_passing()).
+
+Usage:
+    python scripts/bench_spatial.py                    # 50M soundings
+    python scripts/bench_spatial.py --rows 5000000     # quicker run
+    python scripts/bench_spatial.py --queries 500 --viewports 0.01,0.1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import KNOTS_TO_DEG_PER_S, random_walk
+
+LOAD_CHUNK_SIZE = 500_000
+TOW_LENGTH = 1_000  # soundings per synthetic tow
+
+
+def synthetic_chunks(rows: int, devices: int):
+    """
+    Yield (device_id, tow_id, timestamp, lat, lon, depth) column chunks.
+
+    Every vessel random-walks (8 knots, slowly drifting course) inside the
+    same 10 x 10 degree area, so tracks of different devices overlap.
+    """
+    rng = np.random.default_rng(11)
+    per_device = rows // devices
+    for device in range(1, devices + 1):
+        lat0, lon0 = rng.uniform(53.0, 63.0), rng.uniform(-3.0, 7.0)
+        heading = rng.uniform(0, 2 * np.pi)
+        t0 = 1_600_000_000.0
+        count = per_device if device < devices else rows - per_device * (devices - 1)
+        for start in range(0, count, LOAD_CHUNK_SIZE):
+            n = min(LOAD_CHUNK_SIZE, count - start)
+            course, lat, lon = random_walk(rng, n, 8 * KNOTS_TO_DEG_PER_S * 10, lat0, lon0, heading)
+            # Reflect at the edges of the area
+            lat = 53.0 + np.abs((lat - 53.0 + 20.0) % 20.0 - 10.0)
+            lon = -3.0 + np.abs((lon + 3.0 + 20.0) % 20.0 - 10.0)
+            ts = t0 + (start + np.arange(n)) * 10.0
+            tows = (device * 10_000_000 + (start + np.arange(n)) // TOW_LENGTH).astype(np.int64)
+            depth = 60 + 40 * np.sin(lat * 30) * np.cos(lon * 20) + rng.normal(0, 2, n)
+            yield device, tows, ts, lat, lon, depth
+            lat0, lon0, heading = float(lat[-1]), float(lon[-1]), float(course[-1])
+
+
+def load(conn, rows: int, devices: int) -> float:
+    """Bulk-insert the synthetic soundings (no secondary indexes yet)."""
+    from core.models import Sounding
+    from core.models.types import EpochMillis
+    from modules.soundings.spatial import quadkeys
+
+    sql = (
+        "INSERT INTO soundings (device_id, tow_id, timestamp, latitude, longitude, depth, quadkey, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, '2026-01-01 00:00:00')"
+    )
+    started = time.perf_counter()
+    loaded = 0
+    for device, tows, ts, lat, lon, depth in synthetic_chunks(rows, devices):
+        n = len(ts)
+        conn.executemany(sql, zip(
+            [device] * len(ts), tows.tolist(), EpochMillis.encode(ts),
+            Sounding.latitude.type.encode(lat, n), Sounding.longitude.type.encode(lon, n),
+            Sounding.depth.type.encode(depth, n), quadkeys(lat, lon).tolist(),
+        ))
+        conn.commit()
+        loaded += len(ts)
+        print(f"\r  {loaded:,} / {rows:,}", end="", flush=True)
+    print()
+    return time.perf_counter() - started
+
+
+def timed(run, cases):
+    """Run run(case) for every case; return (latencies in ms, total rows)."""
+    latencies = []
+    total = 0
+    for case in cases:
+        started = time.perf_counter()
+        total += run(case)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return np.array(latencies), total
+
+
+def report(label: str, latencies: np.ndarray, total: int) -> None:
+    print(f"  {label:<8} p50 {np.percentile(latencies, 50):>9.2f} ms   p95 {np.percentile(latencies, 95):>9.2f} ms   "
+          f"{total / len(latencies):>10,.0f} rows/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quadkey spatial index against the lat/lon B-tree")
+    parser.add_argument("--rows", type=int, default=50_000_000, help="Synthetic soundings (default 50M)")
+    parser.add_argument("--devices", type=int, default=10, help="Vessels sharing the area (default 10)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per viewport size (default 200)")
+    parser.add_argument("--viewports", default="0.01,0.05,0.25",
+                        help="Comma-separated viewport sizes in degrees (default 0.01,0.05,0.25)")
+    parser.add_argument("--radius", type=float, default=500.0, help="Radius of tow lookups in meters (default 500)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-spatial-") as workdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(workdir) / 'bench.db'}"
+        os.environ.setdefault("APP_ENV", "bench")
+
+        from sqlalchemy import select
+        from core.db import Base, SessionLocal, engine
+        from core.models import Device, Sounding
+        from modules.soundings.spatial import bbox_criteria, radius_box, tows_passing
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        db.add_all([Device(device_id=f"bench-vessel-{i}", plotter_type="olex") for i in range(1, args.devices + 1)])
+        db.commit()
+
+        # Load without secondary indexes, then build only the ones compared
+        raw = engine.raw_connection()
+        for index in Sounding.__table__.indexes:
+            raw.execute(f"DROP INDEX IF EXISTS {index.name}")
+        print(f"Loading {args.rows:,} synthetic soundings...")
+        elapsed = load(raw, args.rows, args.devices)
+        print(f"  loaded in {elapsed:.0f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+        rng = np.random.default_rng(3)
+        sample_ids = (rng.choice(args.rows, size=args.queries, replace=False) + 1).tolist()
+        points = db.execute(
+            select(Sounding.device_id, Sounding.latitude, Sounding.longitude).where(Sounding.id.in_(sample_ids))
+        ).all()
+        sizes = [float(size) for size in args.viewports.split(",")]
+
+        def viewport(device_id, lat, lon, size):
+            return (device_id, lat - size / 2, lon - size / 2, lat + size / 2, lon + size / 2)
+
+        def plain_bbox(case):
+            device_id, min_lat, min_lon, max_lat, max_lon = case
+            query = select(Sounding.latitude, Sounding.longitude, Sounding.depth).where(
+                Sounding.device_id == device_id,
+                Sounding.latitude.between(min_lat, max_lat),
+                Sounding.longitude.between(min_lon, max_lon),
+            )
+            return len(db.connection().execute(query).all())
+
+        def quadkey_bbox(case):
+            device_id, *box = case
+            query = select(Sounding.latitude, Sounding.longitude, Sounding.depth).where(
+                *bbox_criteria(db, device_id, *box)
+            )
+            return len(db.connection().execute(query).all())
+
+        def plain_tows(case):
+            device_id, lat, lon = case
+            min_lat, min_lon, max_lat, max_lon = radius_box(lat, lon, args.radius)
+            query = select(Sounding.tow_id).where(
+                Sounding.device_id == device_id,
+                Sounding.latitude.between(min_lat, max_lat),
+                Sounding.longitude.between(min_lon, max_lon),
+                Sounding.tow_id.isnot(None),
+            ).distinct()
+            return len(db.connection().execute(query).all())
+
+        def quadkey_tows(case):
+            return len(tows_passing(db, *case, args.radius))
+
+        runs = {}
+        for label, index_sql, bbox_run, tows_run in (
+            ("lat/lon", "CREATE INDEX ix_soundings_location ON soundings (latitude, longitude)",
+             plain_bbox, plain_tows),
+            ("quadkey", "CREATE INDEX ix_soundings_device_quadkey ON soundings (device_id, quadkey)",
+             quadkey_bbox, quadkey_tows),
+        ):
+            db.rollback()  # release the session's read lock before DDL
+            raw.execute("DROP INDEX IF EXISTS ix_soundings_location")
+            started = time.perf_counter()
+            raw.execute(index_sql)
+            raw.execute("ANALYZE")
+            raw.commit()
+            print(f"\n{label}: index built in {time.perf_counter() - started:.0f}s")
+            for size in sizes:
+                runs[(label, size)] = timed(bbox_run, [viewport(*point, size) for point in points])
+            runs[(label, "tows")] = timed(tows_run, points)
+
+        for size in sizes:
+            print(f"\nViewport {size}° x {size}° ({args.queries} queries)")
+            for label in ("lat/lon", "quadkey"):
+                report(label, *runs[(label, size)])
+        print(f"\nTows within {args.radius:.0f} m of a point ({args.queries} queries)")
+        for label in ("lat/lon", "quadkey"):
+            report(label, *runs[(label, "tows")])
+
+        db.close()
+        raw.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
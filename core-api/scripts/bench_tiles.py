@@ -0,0 +1,111 @@
+"""
+Benchmark for the vector tile endpoint.
+
+Ingests synthetic fishing trips (random-walk tracks at 10 s fixes) into a
+throwaway SQLite database through the normal SoundingSink path (trip
+segmentation, detail levels, sounding_cells), then measures tile rendering
+for a sample of tiles at several zooms:
+
+- cold: rendered from the database and written to the tile cache
+- warm: read back from the tile cache
+
+Usage:
+    python scripts/bench_tiles.py                          # 1M soundings, zooms 6,9,12,15
+    python scripts/bench_tiles.py --soundings 5000000      # denser data
+    python scripts/bench_tiles.py --zooms 4,8,12,16 --tiles 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from synthetic import synthetic_batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector tile rendering and caching")
+    parser.add_argument("--soundings", type=int, default=1_000_000, help="Synthetic soundings to ingest (default 1M)")
+    parser.add_argument("--zooms", default="6,9,12,15", help="Comma-separated zooms to sample (default 6,9,12,15)")
+    parser.add_argument("--tiles", type=int, default=100, help="Tiles sampled per zoom (default 100)")
+    parser.add_argument("--workdir", default=None, help="Directory for the database and cache (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir, prefix="bench-tiles-") as workdir:
+        workdir = Path(workdir)
+        os.environ["STORAGE_PATH"] = str(workdir)
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+        os.environ.setdefault("APP_ENV", "bench")
+
+        from core.config import settings
+        from core.db import Base, SessionLocal, engine
+        from core.models import Device, Sounding
+        from modules.ingestion.segmentation import TripSegmenter
+        from modules.ingestion.sink import SoundingSink
+        from modules.tiles.cache import get_tile_cache
+        from modules.tiles.cells import TileAggregator
+        from modules.tiles.mvt import lonlat_to_world
+        from modules.tiles.render import render_tile
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        device = Device(device_id="bench-vessel", plotter_type="olex")
+        db.add(device)
+        db.commit()
+
+        print(f"Ingesting {args.soundings:,} synthetic soundings...")
+        tiles = TileAggregator(db, device.id)
+        sink = SoundingSink(db, device.id, segmenter=TripSegmenter(db, device.id), tiles=tiles)
+        t0 = time.perf_counter()
+        sink.write_all(synthetic_batches(args.soundings, settings.ingestion_batch_size, trip_length=20000, area_deg=2.0, seed=7))
+        db.commit()
+        elapsed = time.perf_counter() - t0
+        print(f"  {sink.count:,} soundings, {tiles.cells_written:,} cell upserts in {elapsed:.1f}s "
+              f"({sink.count / elapsed:,.0f} soundings/s)")
+
+        # Sample tiles where the data is, so every tile has content
+        rng = np.random.default_rng(1)
+        sample = rng.choice(sink.count, size=min(sink.count, 5000), replace=False) + 1
+        positions = np.array(
+            db.query(Sounding.longitude, Sounding.latitude).filter(Sounding.id.in_(sample.tolist())).all()
+        )
+        cache = get_tile_cache()
+
+        print(f"\n{'zoom':>4} {'tiles':>6} {'cold tiles/s':>13} {'cold p95 ms':>12} "
+              f"{'warm tiles/s':>13} {'avg KiB (gz)':>13}")
+        for zoom in [int(z) for z in args.zooms.split(",")]:
+            wx, wy = lonlat_to_world(positions[:, 0], positions[:, 1], zoom)
+            addresses = np.unique(np.stack((wx.astype(np.int64), wy.astype(np.int64)), axis=1), axis=0)
+            addresses = addresses[rng.permutation(len(addresses))[:args.tiles]]
+
+            cold = []
+            sizes = []
+            for x, y in addresses.tolist():
+                t0 = time.perf_counter()
+                generation = cache.generation(device.id)
+                entry = cache.put(device.id, zoom, x, y, render_tile(db, device.id, zoom, x, y), generation)
+                cold.append(time.perf_counter() - t0)
+                sizes.append(len(entry.gzip_body))
+
+            t0 = time.perf_counter()
+            for x, y in addresses.tolist():
+                cache.get(device.id, zoom, x, y)
+            warm = time.perf_counter() - t0
+
+            cold = np.array(cold)
+            print(f"{zoom:>4} {len(addresses):>6} {len(cold) / cold.sum():>13,.0f} "
+                  f"{np.percentile(cold, 95) * 1000:>12.1f} {len(addresses) / warm:>13,.0f} "
+                  f"{np.mean(sizes) / 1024:>13.1f}")
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
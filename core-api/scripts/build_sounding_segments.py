@@ -0,0 +1,66 @@
+"""
+Write columnar sounding segments (sounding_segments) for existing trips.
+
+With SOUNDING_STORE_BACKEND=segments, ingestion rewrites the segment of
+every trip it adds soundings to; this script is for trips ingested before
+the backend was enabled, or after SOUNDING_SEGMENTS_COMPRESSED changed.
+Trips whose segment is current are skipped unless --force is given.
+
+Usage:
+    python scripts/build_sounding_segments.py                      # all trips
+    python scripts/build_sounding_segments.py --device-id vessel-1 # one device
+    python scripts/build_sounding_segments.py --trip-id 42         # one trip
+    python scripts/build_sounding_segments.py --force              # rewrite current segments too
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.db import SessionLocal
+from core.models import Device, SoundingSegment, Trip
+from modules.soundings.store import write_segment
+from modules.trips.track_cache import trip_version
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Write columnar sounding segments for existing trips")
+    parser.add_argument("--device-id", help="Only trips of this device (devices.device_id)")
+    parser.add_argument("--trip-id", type=int, help="Only this trip")
+    parser.add_argument("--force", action="store_true", help="Rewrite segments that are already current")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Trip).order_by(Trip.id)
+        if args.device_id:
+            device = db.query(Device).filter(Device.device_id == args.device_id).first()
+            if not device:
+                print(f"Device not found: {args.device_id}")
+                return 1
+            query = query.filter(Trip.device_id == device.id)
+        if args.trip_id:
+            query = query.filter(Trip.id == args.trip_id)
+
+        versions = dict(db.query(SoundingSegment.trip_id, SoundingSegment.trip_version))
+        written = 0
+        total_bytes = 0
+        for trip in query.all():
+            if not args.force and versions.get(trip.id) == trip_version(trip):
+                continue
+            segment = write_segment(db, trip)
+            written += 1
+            total_bytes += segment.byte_size
+            print(f"✓ trip {trip.id}: {segment.sounding_count} soundings, {segment.byte_size / 1024:.1f} KiB")
+
+        print(f"\nWrote {written} segments ({total_bytes / 1024 / 1024:.1f} MiB)")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
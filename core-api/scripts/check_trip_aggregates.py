@@ -0,0 +1,108 @@
+"""
+Consistency check for incrementally maintained trip/tow aggregates.
+
+Recomputes every trip's and tow's aggregates (time span, bounds, distance,
+duration, depth statistics, sounding count) from a full scan of their
+soundings and compares them with the stored values, and each device's
+maintained trip_count with its number of trips.
+
+Usage:
+    python scripts/check_trip_aggregates.py                      # check all trips
+    python scripts/check_trip_aggregates.py --device-id vessel-1 # one device
+    python scripts/check_trip_aggregates.py --trip-id 42         # one trip
+    python scripts/check_trip_aggregates.py --fix                # repair mismatches
+
+Exits with status 1 if mismatches were found (and not fixed).
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+
+from core.db import SessionLocal
+from core.models import Device, Tow, Trip
+from modules.trips.aggregates import (
+    apply_aggregates,
+    compare_aggregates,
+    recompute_tow,
+    recompute_trip,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify stored trip/tow aggregates against a full recompute")
+    parser.add_argument("--device-id", help="Only check trips of this device (devices.device_id)")
+    parser.add_argument("--trip-id", type=int, help="Only check this trip")
+    parser.add_argument("--fix", action="store_true", help="Overwrite mismatching aggregates with recomputed values")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Relative tolerance for float columns (default 1e-6)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Trip).order_by(Trip.id)
+        if args.device_id:
+            device = db.query(Device).filter(Device.device_id == args.device_id).first()
+            if not device:
+                print(f"Device not found: {args.device_id}")
+                return 1
+            query = query.filter(Trip.device_id == device.id)
+        if args.trip_id:
+            query = query.filter(Trip.id == args.trip_id)
+
+        trip_ids = [trip_id for (trip_id,) in query.with_entities(Trip.id)]
+        checked = 0
+        inconsistent = 0
+
+        for trip_id in trip_ids:
+            trip = db.get(Trip, trip_id)
+            entities = [(f"trip {trip.id}", trip, recompute_trip(db, trip))]
+            for tow in db.query(Tow).filter(Tow.trip_id == trip.id).order_by(Tow.id):
+                entities.append((f"  tow {tow.id} (trip {trip.id})", tow, recompute_tow(db, tow)))
+
+            for label, entity, expected in entities:
+                checked += 1
+                mismatches = compare_aggregates(entity, expected, rel_tolerance=args.tolerance)
+                if not mismatches:
+                    continue
+                inconsistent += 1
+                print(f"✗ {label.strip()}:")
+                for mismatch in mismatches:
+                    print(f"    {mismatch}")
+                if args.fix:
+                    apply_aggregates(entity, expected)
+
+            if args.fix:
+                db.commit()
+            db.expunge_all()  # keep memory flat across many trips
+
+        if not args.trip_id:
+            trip_counts = dict(db.query(Trip.device_id, func.count(Trip.id)).group_by(Trip.device_id).all())
+            devices = db.query(Device).order_by(Device.id)
+            if args.device_id:
+                devices = devices.filter(Device.device_id == args.device_id)
+            for device in devices:
+                checked += 1
+                actual = trip_counts.get(device.id, 0)
+                if device.trip_count == actual:
+                    continue
+                inconsistent += 1
+                print(f"✗ device {device.device_id}: trip_count stored={device.trip_count} actual={actual}")
+                if args.fix:
+                    device.trip_count = actual
+            if args.fix:
+                db.commit()
+
+        print(f"\nChecked {checked} trips/tows/devices: {inconsistent} inconsistent"
+              f"{' (fixed)' if args.fix and inconsistent else ''}")
+        return 1 if inconsistent and not args.fix else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Delete heartbeats (and hourly rollups) older than their retention horizon.
+
+The API process runs the same job every HEARTBEAT_RETENTION_INTERVAL_MINUTES;
+this script is for deployments that set it to 0 and prune from cron, or to
+prune once after lowering HEARTBEAT_RETENTION_DAYS.
+
+Usage:
+    python scripts/prune_heartbeats.py                    # HEARTBEAT_RETENTION_DAYS
+    python scripts/prune_heartbeats.py --days 7           # override the horizon
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.config import settings
+from core.db import async_engine
+from modules.heartbeat.retention import DELETE_BATCH_SIZE, prune_heartbeats
+
+
+async def run(batch_size: int) -> dict:
+    """Prune once, then close the async engine's connections."""
+    try:
+        return await prune_heartbeats(batch_size=batch_size)
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Delete heartbeats beyond the retention horizon")
+    parser.add_argument("--days", type=int, help="Keep heartbeats of this many days (default: HEARTBEAT_RETENTION_DAYS)")
+    parser.add_argument("--rollup-days", type=int,
+                        help="Keep hourly rollups of this many days (default: HEARTBEAT_ROLLUP_RETENTION_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE,
+                        help=f"Heartbeats deleted per transaction (default {DELETE_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    if args.days is not None:
+        settings.heartbeat_retention_days = args.days
+    if args.rollup_days is not None:
+        settings.heartbeat_rollup_retention_days = args.rollup_days
+    if settings.heartbeat_retention_days <= 0 and settings.heartbeat_rollup_retention_days <= 0:
+        print("Retention is disabled (HEARTBEAT_RETENTION_DAYS and HEARTBEAT_ROLLUP_RETENTION_DAYS are 0)")
+        return 0
+
+    deleted = asyncio.run(run(args.batch_size))
+    print(f"✓ {deleted['heartbeats']} heartbeats deleted (kept {settings.heartbeat_retention_days} days)")
+    if settings.heartbeat_rollup_retention_days > 0:
+        print(f"✓ {deleted['heartbeat_rollups']} hourly rollups deleted "
+              f"(kept {settings.heartbeat_rollup_retention_days} days)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Rebuild coverage_cells (towing coverage index) from tows and soundings.
+
+Ingestion keeps coverage_cells current as it creates tows; this script is
+for tows created before the index existed, or after COVERAGE_CELL_SIZE_DEG /
+COVERAGE_LEVELS / TOW_MIN_DURATION_MINUTES changed. It replaces the cells of
+each device.
+
+Usage:
+    python scripts/rebuild_coverage.py                      # all devices
+    python scripts/rebuild_coverage.py --device-id vessel-1 # one device
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.db import SessionLocal
+from core.models import Device
+from modules.history.coverage import rebuild_coverage_cells
+
+
+def rebuild_device(db, device: Device) -> int:
+    """
+    Replace a device's coverage_cells with a fresh aggregation.
+
+    Returns:
+        Number of tows aggregated
+    """
+    count = rebuild_coverage_cells(db, device.id)
+    db.commit()
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the towing coverage index from tows")
+    parser.add_argument("--device-id", help="Only rebuild this device (devices.device_id)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Device).order_by(Device.id)
+        if args.device_id:
+            query = query.filter(Device.device_id == args.device_id)
+        devices = query.all()
+        if args.device_id and not devices:
+            print(f"Device not found: {args.device_id}")
+            return 1
+
+        for device in devices:
+            count = rebuild_device(db, device)
+            print(f"✓ {device.device_id}: {count} tows aggregated")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
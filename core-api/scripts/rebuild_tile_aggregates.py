@@ -0,0 +1,66 @@
+"""
+Rebuild sounding_cells (vector tile aggregates) from the soundings table.
+
+Ingestion keeps sounding_cells current; this script is for soundings
+ingested before tile aggregation existed, or after TILE_AGGREGATE_MAX_ZOOM
+changed. It replaces the cells of each device and clears its cached tiles.
+
+Usage:
+    python scripts/rebuild_tile_aggregates.py                      # all devices
+    python scripts/rebuild_tile_aggregates.py --device-id vessel-1 # one device
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.db import SessionLocal
+from core.models import Device
+from modules.tiles.cache import get_tile_cache
+from modules.tiles.cells import rebuild_tile_cells
+
+
+def rebuild_device(db, device: Device) -> int:
+    """
+    Replace a device's sounding_cells with a fresh aggregation.
+
+    Returns:
+        Number of soundings aggregated
+    """
+    count = rebuild_tile_cells(db, device.id)
+    db.commit()
+
+    cache = get_tile_cache()
+    if cache is not None:
+        cache.clear_device(device.id)
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild vector tile aggregates from soundings")
+    parser.add_argument("--device-id", help="Only rebuild this device (devices.device_id)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Device).order_by(Device.id)
+        if args.device_id:
+            query = query.filter(Device.device_id == args.device_id)
+        devices = query.all()
+        if args.device_id and not devices:
+            print(f"Device not found: {args.device_id}")
+            return 1
+
+        for device in devices:
+            count = rebuild_device(db, device)
+            print(f"✓ {device.device_id}: {count} soundings aggregated")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
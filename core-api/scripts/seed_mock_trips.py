@@ -14,8 +14,12 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 import random
 
+import numpy as np
+
 from core.db import SessionLocal
 from core.models import Device, Trip, Tow, Sounding
+from modules.soundings.spatial import quadkeys
+from modules.trips.aggregates import adjust_trip_count
 
 
 def create_mock_track_points(
@@ -69,6 +73,14 @@ def create_mock_track_points(
             'water_temp': 10.0 + random.uniform(-2, 2)
         })
     
+    # Spatial index keys, as the ingestion sink stores them
+    keys = quadkeys(
+        np.array([point['latitude'] for point in soundings]),
+        np.array([point['longitude'] for point in soundings])
+    )
+    for point, key in zip(soundings, keys.tolist()):
+        point['quadkey'] = key
+    
     return soundings
 
 
@@ -313,6 +325,8 @@ def seed_mock_data(db: Session):
     
     print(f"    ✓ Created trip: {trip3.name} with 1 tow")
     
+    adjust_trip_count(db, device.id, 3)
+    
     # Commit all changes
     db.commit()
     
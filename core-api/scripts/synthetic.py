@@ -0,0 +1,124 @@
+"""
+Synthetic vessel tracks shared by the benchmark scripts.
+
+Vessels random-walk: the course drifts by a normally distributed turn at
+every fix, at a constant 8 knots or out-tow-back (see towing_speed).
+Generation is seeded, so every run of a benchmark sees the same data.
+
+Usage (from a script in this directory):
+    from synthetic import KNOTS_TO_DEG_PER_S, synthetic_batches
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+KNOTS_TO_DEG_PER_S = 1.0 / 3600.0 / 60.0  # one knot, in degrees of latitude per second
+START_TIME = 1_600_000_000.0  # timestamp of the first fix
+CRUISE_KNOTS = 8.0
+
+
+def random_walk(
+    rng: np.random.Generator,
+    n: int,
+    step,
+    lat0: float = 58.0,
+    lon0: float = 10.0,
+    heading: Optional[float] = None,
+    turn_sd: float = 0.05,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Random-walk n fixes from (lat0, lon0).
+
+    Args:
+        rng: Random generator
+        n: Number of fixes
+        step: Distance per fix in degrees of latitude (scalar or per fix)
+        lat0: Start latitude
+        lon0: Start longitude
+        heading: Initial course in radians (default: random)
+        turn_sd: Standard deviation of the course change per fix, in radians
+
+    Returns:
+        Tuple of (course in radians, lat, lon)
+    """
+    if heading is None:
+        heading = rng.uniform(0, 2 * np.pi)
+    course = heading + np.cumsum(rng.normal(0, turn_sd, n))
+    lat = lat0 + np.cumsum(np.cos(course) * step)
+    lon = lon0 + np.cumsum(np.sin(course) * step / np.cos(np.radians(lat0)))
+    return course, lat, lon
+
+
+def towing_speed(n: int) -> np.ndarray:
+    """Speed in knots of a trip that steams out at 9 knots for a fifth, tows at 3 for three fifths and steams back."""
+    speed = np.full(n, 9.0)
+    speed[n // 5:n * 4 // 5] = 3.0
+    return speed
+
+
+def synthetic_batches(
+    total: int,
+    batch_size: int,
+    trip_length: Optional[int] = None,
+    interval: float = 10.0,
+    turn_sd: float = 0.05,
+    gap: float = 86400.0,
+    area_deg: float = 0.0,
+    towing: bool = False,
+    olex_precision: bool = False,
+    all_columns: bool = False,
+    seed: int = 5,
+) -> Iterator:
+    """
+    Yield SoundingBatch objects of one vessel's trips.
+
+    Args:
+        total: Number of soundings
+        batch_size: Soundings per batch
+        trip_length: Soundings per trip (default: one continuous voyage)
+        interval: Seconds between fixes
+        turn_sd: Course drift per fix, in radians
+        gap: Seconds ashore between trips (from a trip's end to the next trip's first fix)
+        area_deg: Trips start at random in an area this wide around 58N 10E
+            (0: every trip starts there)
+        towing: Use the out-tow-back speed profile instead of a constant 8 knots
+        olex_precision: Round positions to 6 decimal minutes, as Olex writes them
+        all_columns: Also fill water_temp, speed_knots and course_deg
+        seed: Random seed
+
+    Yields:
+        SoundingBatch objects in time order
+    """
+    from modules.ingestion.sink import SoundingBatch
+
+    rng = np.random.default_rng(seed)
+    trip_length = trip_length or total
+    t = START_TIME
+    done = 0
+    while done < total:
+        n = min(trip_length, total - done)
+        speed = towing_speed(n) if towing else np.full(n, CRUISE_KNOTS)
+        lat0 = 58.0 + rng.uniform(-area_deg / 2, area_deg / 2)
+        lon0 = 10.0 + rng.uniform(-area_deg / 2, area_deg / 2)
+        course, lat, lon = random_walk(rng, n, speed * KNOTS_TO_DEG_PER_S * interval, lat0, lon0, turn_sd=turn_sd)
+        if olex_precision:
+            lat = np.round(lat * 60, 6) / 60
+            lon = np.round(lon * 60, 6) / 60
+        ts = t + np.arange(n, dtype=np.float64) * interval
+        depth = np.round(80 + 40 * np.sin(lat * 30) + rng.normal(0, 1, n), 1)
+        columns = {}
+        if all_columns:
+            columns = dict(
+                water_temp=np.round(8 + rng.normal(0, 0.05, n), 2),
+                speed_knots=np.round(speed + rng.normal(0, 0.1, n), 1),
+                course_deg=np.round(np.degrees(course) % 360.0, 1),
+            )
+        for a in range(0, n, batch_size):
+            b = min(a + batch_size, n)
+            yield SoundingBatch(
+                timestamp=ts[a:b], latitude=lat[a:b], longitude=lon[a:b], depth=depth[a:b],
+                **{name: values[a:b] for name, values in columns.items()},
+            )
+        t = ts[-1] + interval + gap
+        done += n
@@ -18,13 +18,13 @@ export async function getTrips(
   deviceId: string,
   options?: {
     limit?: number;
-    offset?: number;
+    cursor?: string;
   }
 ): Promise<TripsListResponse> {
   const params = new URLSearchParams({
     device_id: deviceId,
     ...(options?.limit && { limit: options.limit.toString() }),
-    ...(options?.offset && { offset: options.offset.toString() }),
+    ...(options?.cursor && { cursor: options.cursor }),
   });
 
   const response = await fetch(`${API_URL}/api/trips?${params}`);
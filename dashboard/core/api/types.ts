@@ -40,6 +40,7 @@ export interface TripsListResponse {
   trips: Trip[];
   total: number;
   device_id: string;
+  next_cursor: string | null; // pass as `cursor` to fetch the next page
 }
 
 export interface TripDetailResponse {